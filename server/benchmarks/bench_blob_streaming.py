@@ -0,0 +1,169 @@
+"""
+Benchmark peak RSS and latency of reading large ItemTable values.
+
+Each strategy runs in a fresh interpreter so its peak resident set size is
+measured in isolation. Run from the server directory:
+
+    python -m benchmarks.bench_blob_streaming
+"""
+
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic_data import create_conversation_database, make_entries
+from src.config.constants import RECALL_CONVERSATIONS_QUERIES, SQLITE_MMAP_SIZE
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.execute_query import QueryExecutor
+
+STRATEGIES = {
+    "copy+full": "SELECT value, json.loads the whole array",
+    "copy+tail": "SELECT value, decode only the tail",
+    "blob stream": "incremental blob I/O in fixed-size chunks",
+}
+
+
+def reset_peak_rss() -> None:
+    """Reset the peak RSS high-water mark where the kernel allows it."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in megabytes."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss survives exec on Linux, so it is only a fallback; it reports
+    # kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def read_prompts(
+    strategy: str, db_path: str, limit: int, mmap_size: int
+) -> list[object]:
+    """Read the prompts value once with the given strategy."""
+    if strategy == "copy+full":
+        conn = sqlite3.connect(db_path)
+        row = conn.execute(
+            "SELECT value FROM ItemTable WHERE key = ?",
+            (RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],),
+        ).fetchone()
+        conn.close()
+        data = json.loads(row[0])
+        entries: list[object] = data[-limit:] if limit > 0 else data
+        return entries
+
+    executor = QueryExecutor(
+        access_mode="ro",
+        mmap_size=mmap_size,
+        blob_cache=ParsedBlobCache(max_bytes=0),
+        stream_blobs=strategy == "blob stream",
+    )
+    result = executor.execute_conversation_query(
+        db_path, limit, include_generations=False, include_history=False
+    )
+    if result["error"]:
+        raise RuntimeError(result["error"])
+    prompts: list[object] = result["prompts"]
+    return prompts
+
+
+def run_strategy(
+    strategy: str, db_path: str, limit: int, mmap_size: int
+) -> dict[str, float]:
+    """Report latency, peak RSS growth and peak Python heap for one read.
+
+    RSS includes SQLite's page cache and any mmapped database pages; the
+    Python heap peak isolates copies of the value made by the read path.
+    """
+    reset_peak_rss()
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    entries = read_prompts(strategy, db_path, limit, mmap_size)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    rss_growth = peak_rss_mb() - before
+    del entries
+
+    tracemalloc.start()
+    read_prompts(strategy, db_path, limit, mmap_size)
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ms": elapsed_ms,
+        "peak_growth_mb": rss_growth,
+        "heap_peak_mb": heap_peak / (1024 * 1024),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=60_000)
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument("--limits", type=int, nargs="+", default=[64, 0])
+    parser.add_argument(
+        "--mmap-size",
+        type=int,
+        default=SQLITE_MMAP_SIZE,
+        help="PRAGMA mmap_size; mmapped pages count towards RSS",
+    )
+    parser.add_argument("--child", nargs=3, metavar=("STRATEGY", "DB", "LIMIT"))
+    args = parser.parse_args()
+
+    if args.child:
+        strategy, db_path, limit = args.child
+        stats = run_strategy(strategy, db_path, int(limit), args.mmap_size)
+        print(json.dumps(stats))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "state.vscdb")
+        create_conversation_database(db_path, make_entries(args.entries, args.words))
+        size_mb = os.path.getsize(db_path) / 1_000_000
+        print(f"{args.entries} prompts, {size_mb:.1f} MB database")
+        print(
+            f"{'strategy':<12} {'limit':>6} {'ms':>9} "
+            f"{'peak RSS +MB':>13} {'py heap MB':>11}"
+        )
+        for limit in args.limits:
+            for strategy in STRATEGIES:
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "benchmarks.bench_blob_streaming",
+                        "--child",
+                        strategy,
+                        db_path,
+                        str(limit),
+                        "--mmap-size",
+                        str(args.mmap_size),
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                stats = json.loads(output)
+                print(
+                    f"{strategy:<12} {limit:>6} {stats['ms']:>9.2f} "
+                    f"{stats['peak_growth_mb']:>13.1f} {stats['heap_peak_mb']:>11.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark request latency of the stdio server under a mixed workload.
+
+Feeds the server a burst of requests where every few fast ``echo`` calls are
+followed by one slow tool call that waits on I/O, as a spell waiting on its
+subprocess does, and records when each response is written. Compares a
+concurrency limit of 1, which handles requests one after another as the
+server used to, with higher limits. Every run must answer every request.
+Run from the server directory:
+
+    python -m benchmarks.bench_concurrent_dispatch
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from src.protocol.jsonrpc_server import JSONRPCServer
+from src.protocol.models import ToolResult
+from src.tools.echo_tool import EchoTool
+
+
+class SlowTool:
+    """Tool that waits on I/O for a fixed time."""
+
+    name = "slow"
+    description = "Waits before answering"
+    input_schema: Dict[str, Any] = {"type": "object", "properties": {}}
+
+    def __init__(self, delay_seconds: float) -> None:
+        self.delay_seconds = delay_seconds
+
+    async def execute(self, arguments: Dict[str, Any] | None) -> List[ToolResult]:
+        await asyncio.sleep(self.delay_seconds)
+        return [ToolResult(text="done")]
+
+
+def make_requests(count: int, slow_every: int) -> List[Dict[str, Any]]:
+    requests = []
+    for i in range(count):
+        name = "slow" if i % slow_every == 0 else "echo"
+        requests.append(
+            {
+                "jsonrpc": "2.0",
+                "method": "tools/call",
+                "params": {"name": name, "arguments": {"message": str(i)}},
+                "id": i,
+            }
+        )
+    return requests
+
+
+def latencies_ms(
+    requests: List[Dict[str, Any]], limit: int, delay_seconds: float
+) -> Dict[int, float]:
+    """Run the server over the requests and return the latency of each id."""
+    server = JSONRPCServer("bench", max_concurrent_requests=limit)
+    server.tools = {"echo": EchoTool(), "slow": SlowTool(delay_seconds)}
+    written: Dict[int, float] = {}
+
+    def record(response: Dict[str, Any]) -> None:
+        written[response["id"]] = time.perf_counter()
+
+    stdin = io.StringIO("".join(json.dumps(r) + "\n" for r in requests))
+    start = time.perf_counter()
+    with patch("sys.stdin", stdin), patch.object(server, "_write_response", record):
+        asyncio.run(server.run())
+    if sorted(written) != [r["id"] for r in requests]:
+        raise RuntimeError(f"Limit {limit} did not answer every request")
+    return {rid: (at - start) * 1000 for rid, at in written.items()}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--slow-every", type=int, default=10)
+    parser.add_argument("--delay-ms", type=float, default=50)
+    parser.add_argument("--limits", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    requests = make_requests(args.requests, args.slow_every)
+    slow_ids = {r["id"] for r in requests if r["params"]["name"] == "slow"}
+    print(
+        f"{args.requests} requests, every {args.slow_every}th waiting "
+        f"{args.delay_ms:.0f}ms"
+    )
+    print(
+        f"{'limit':>6} {'fast p50':>10} {'fast p99':>10} {'slow p50':>10} {'total':>10}"
+    )
+    for limit in args.limits:
+        latency = latencies_ms(requests, limit, args.delay_ms / 1000)
+        fast = [ms for rid, ms in latency.items() if rid not in slow_ids]
+        slow = [ms for rid, ms in latency.items() if rid in slow_ids]
+        print(
+            f"{limit:>6} {statistics.median(fast):>8.1f}ms "
+            f"{percentile(fast, 0.99):>8.1f}ms {statistics.median(slow):>8.1f}ms "
+            f"{max(latency.values()):>8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
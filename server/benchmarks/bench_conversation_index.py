@@ -0,0 +1,92 @@
+"""
+Benchmark phrase searches through the conversation index against decoding
+every database per request.
+
+Builds a workspaceStorage-like tree, times the initial index build, then
+compares a warm indexed search (fingerprint check plus FTS5 lookup) with the
+per-database search for a rare and a common phrase. The synthetic text
+draws from a few dozen words, so nearly every trigram appears in nearly
+every entry; that is the worst case for a trigram index. Run from the
+server directory:
+
+    python -m benchmarks.bench_conversation_index
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, List
+
+from benchmarks.synthetic_data import create_workspace_tree
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.conversation_index import ConversationIndex
+from src.database_management.execute_query import QueryExecutor
+from src.database_management.extract_conversation_data import ConversationDataExtractor
+
+
+def median_ms(run: Callable[[], Any], rounds: int) -> float:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--databases", type=int, default=100)
+    parser.add_argument("--entries", type=int, default=1_000)
+    parser.add_argument("--limit", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if not ConversationIndex.is_supported():
+        raise SystemExit("SQLite lacks FTS5 with the trigram tokenizer")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        create_workspace_tree(temp_dir, args.databases, args.entries)
+        registry = {"cursor": [os.path.join(temp_dir, "workspaceStorage")]}
+        # No decoded value cache, so every direct search reads its databases
+        executor = QueryExecutor(blob_cache=ParsedBlobCache(max_bytes=0))
+        direct = ConversationDataExtractor(executor)
+        index = ConversationIndex(os.path.join(temp_dir, "index.db"), executor)
+        indexed = ConversationDataExtractor(executor, index)
+
+        start = time.perf_counter()
+        indexed.process_database_files(registry, args.limit)
+        build_s = time.perf_counter() - start
+        stats = index.get_stats()
+        print(
+            f"{args.databases} databases, {stats['entries']} entries, "
+            f"index {stats['size_bytes'] / 1_000_000:.1f} MB built in {build_s:.2f}s"
+        )
+
+        print(f"limit {args.limit}, median of {args.rounds} rounds")
+        print(f"{'phrase':>22} {'direct':>12} {'indexed':>12} {'speedup':>8}")
+        phrases: List[List[str]] = [["palantir balrog moria"], ["gandalf"]]
+        for phrase in phrases:
+            expected = direct.process_database_files(registry, args.limit, phrase)
+            if indexed.process_database_files(registry, args.limit, phrase) != (
+                expected
+            ):
+                raise RuntimeError(f"indexed search for {phrase} differs")
+            direct_ms = median_ms(
+                lambda: direct.process_database_files(registry, args.limit, phrase),
+                args.rounds,
+            )
+            indexed_ms = median_ms(
+                lambda: indexed.process_database_files(registry, args.limit, phrase),
+                args.rounds,
+            )
+            print(
+                f"{phrase[0]:>22} {direct_ms:>10.2f}ms {indexed_ms:>10.2f}ms "
+                f"{direct_ms / indexed_ms:>7.1f}x"
+            )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
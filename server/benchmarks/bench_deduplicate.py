@@ -0,0 +1,88 @@
+"""
+Benchmark recall over workspaces that repeat the same prompts.
+
+Builds a workspaceStorage-like tree where every database holds a shared set
+of prompts plus a few of its own, as when the same conversation is stored
+by several workspaces and the global storage, then runs a phrase search and
+formats every match with and without content-hash deduplication. Reports
+latency, entries returned and the size of the JSON handed to the model.
+Run from the server directory:
+
+    python -m benchmarks.bench_deduplicate
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic_data import create_conversation_database, make_entries
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.execute_query import QueryExecutor
+from src.database_management.extract_conversation_data import ConversationDataExtractor
+from src.database_management.format_output import OutputFormatter
+
+
+def median_ms(run: Callable[[], Any], rounds: int) -> float:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--databases", type=int, default=16)
+    parser.add_argument("--shared", type=int, default=2_000)
+    parser.add_argument("--own", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shared = make_entries(args.shared, seed=0)
+        for i in range(args.databases):
+            create_conversation_database(
+                os.path.join(temp_dir, "workspaceStorage", f"{i:08x}", "state.vscdb"),
+                shared + make_entries(args.own, seed=i + 1),
+            )
+        registry = {"cursor": [os.path.join(temp_dir, "workspaceStorage")]}
+        executor = QueryExecutor(blob_cache=ParsedBlobCache(max_bytes=0))
+        formatter = OutputFormatter()
+        phrases = ["palantir balrog"]
+
+        print(
+            f"{args.databases} databases sharing {args.shared} prompts with "
+            f"{args.own} of their own, median of {args.rounds} rounds"
+        )
+        print(f"{'deduplicate':>12} {'latency':>10} {'entries':>8} {'json':>10}")
+        for deduplicate in (False, True):
+            extractor = ConversationDataExtractor(executor, deduplicate=deduplicate)
+
+            def recall() -> List[Dict[str, Any]]:
+                conversations = extractor.process_database_files(registry, 0, phrases)[
+                    0
+                ]
+                entries: List[Dict[str, Any]] = []
+                for conv_data in conversations:
+                    entries.extend(
+                        formatter.format_conversation_entry(
+                            conv_data, True, True, phrases
+                        )["conversations"]
+                    )
+                return entries
+
+            entries = recall()
+            size = len(json.dumps(entries, ensure_ascii=False))
+            print(
+                f"{str(deduplicate):>12} {median_ms(recall, args.rounds):>8.1f}ms "
+                f"{len(entries):>8} {size / 1024:>8.0f}KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark normalizing entry timestamps once against parsing them at every use.
+
+A recall request reads each entry's timestamp for the date window, for
+recency scoring and for threading prompts with generations. Parsing at every
+use probes the timestamp fields and builds a datetime each time; normalizing
+once stores one epoch-millisecond integer per entry that all three read.
+Entries with numeric and with ISO-8601 timestamps are measured. Run from the
+server directory:
+
+    python -m benchmarks.bench_entry_timestamps
+"""
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic_data import make_entries
+from src.database_management.conversation_threading import ConversationThreader
+from src.database_management.entry_timestamps import (
+    attach_timestamps,
+    entry_timestamp_ms,
+)
+from src.database_management.recency_scorer import RecencyScorer
+from src.database_management.time_partitions import TimeWindow
+
+
+def median_ms(run: Callable[[], Any], rounds: int) -> float:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def as_iso(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            **entry,
+            "timestamp": datetime.fromtimestamp(
+                entry["timestamp"] / 1000, tz=timezone.utc
+            ).isoformat(),
+        }
+        for entry in entries
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    scorer = RecencyScorer()
+    threader = ConversationThreader()
+    newest = int(time.time() * 1000)
+    window = TimeWindow(newest - args.entries * 30_000, newest)
+
+    print(f"{args.entries} prompts and generations, median of {args.rounds} rounds")
+    print(f"{'timestamps':>10} {'per use':>10} {'once':>10} {'speedup':>8}")
+    for name, convert in (("numeric", list), ("iso", as_iso)):
+        prompts = convert(make_entries(args.entries, seed=1))
+        generations = convert(make_entries(args.entries, seed=2))
+
+        def per_use() -> List[float]:
+            scores = [
+                scorer.calculate_recency_score(entry)
+                for entry in prompts + generations
+                if window.contains(entry_timestamp_ms(entry))
+            ]
+            threader.thread_conversations(prompts[:200], generations[:200])
+            return scores
+
+        def once() -> List[float]:
+            timestamps = attach_timestamps(
+                {"prompts": prompts, "generations": generations}
+            )["timestamps"]
+            scores = [
+                scorer.score_timestamp_ms(timestamp_ms)
+                for field in ("prompts", "generations")
+                for timestamp_ms in timestamps[field]
+                if window.contains(timestamp_ms)
+            ]
+            threader.thread_conversations(
+                prompts[:200],
+                generations[:200],
+                timestamps["prompts"][:200],
+                timestamps["generations"][:200],
+            )
+            return scores
+
+        expected, actual = per_use(), once()
+        # Scores only drift by the time passing between the two runs
+        if len(expected) != len(actual) or any(
+            abs(a - b) > 1e-6 for a, b in zip(expected, actual)
+        ):
+            raise RuntimeError(f"{name} timestamps score differently")
+        per_use_ms = median_ms(per_use, args.rounds)
+        once_ms = median_ms(once, args.rounds)
+        print(
+            f"{name:>10} {per_use_ms:>8.1f}ms {once_ms:>8.1f}ms "
+            f"{per_use_ms / once_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
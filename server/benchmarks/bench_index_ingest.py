@@ -0,0 +1,66 @@
+"""
+Benchmark keeping the conversation index fresh as history grows.
+
+For each history size, times the initial ingest of one database, then the
+refresh after a handful of prompts are appended. With per-key watermarks the
+refresh only decodes the appended tail, so its cost should stay flat while
+the full ingest grows with history. Run from the server directory:
+
+    python -m benchmarks.bench_index_ingest
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic_data import create_conversation_database, make_entries
+from src.database_management.conversation_index import ConversationIndex
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--history", type=int, nargs="+", default=[1_000, 10_000, 40_000]
+    )
+    parser.add_argument("--appended", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if not ConversationIndex.is_supported():
+        raise SystemExit("SQLite lacks FTS5 with the trigram tokenizer")
+
+    print(f"{args.appended} prompts appended per refresh, median of {args.rounds}")
+    print(f"{'history':>8} {'full ingest':>12} {'append refresh':>15} {'ratio':>7}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for history in args.history:
+            db_path = os.path.join(temp_dir, f"history_{history}", "state.vscdb")
+            entries = make_entries(history + args.appended * args.rounds)
+            prompts = entries[:history]
+            create_conversation_database(db_path, prompts)
+            index = ConversationIndex(os.path.join(temp_dir, f"index_{history}.db"))
+
+            start = time.perf_counter()
+            index.refresh([db_path])
+            full_ms = (time.perf_counter() - start) * 1000
+
+            latencies = []
+            for _ in range(args.rounds):
+                prompts = entries[: len(prompts) + args.appended]
+                create_conversation_database(db_path, prompts)
+                start = time.perf_counter()
+                index.refresh([db_path])
+                latencies.append((time.perf_counter() - start) * 1000)
+                if index.last_stats["ingested_entries"] != args.appended:
+                    raise RuntimeError("refresh did not ingest only the new tail")
+            append_ms = statistics.median(latencies)
+            index.close()
+            print(
+                f"{history:>8} {full_ms:>10.1f}ms {append_ms:>13.2f}ms "
+                f"{full_ms / append_ms:>6.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark phrase searches through the in-memory inverted index.
+
+Builds a workspaceStorage-like tree, reports the index build time and
+footprint, then compares an indexed search for 1, 4 and 8 phrases with a
+scan running ``phrase.lower() in text.lower()`` over every loaded entry and
+with the per-database search. By default entries draw from 30 words, so
+every phrase word is in most entries; ``--vocabulary`` draws them from that
+many words with natural-language (Zipf) frequencies and searches phrases of
+two mid-frequency words. Run from the server directory:
+
+    python -m benchmarks.bench_inverted_index
+    python -m benchmarks.bench_inverted_index --vocabulary 20000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, List
+
+from benchmarks.synthetic_data import create_workspace_tree, make_vocabulary
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.conversation_source import entry_text
+from src.database_management.execute_query import QueryExecutor
+from src.database_management.extract_conversation_data import ConversationDataExtractor
+from src.database_management.inverted_index import InvertedIndex
+
+PHRASES = [
+    "palantir balrog",
+    "shire mordor",
+    "python sqlite",
+    "ring fellowship",
+    "cache recall",
+    "hobbit token",
+    "async thread",
+    "moria rivendell",
+]
+
+
+def median_ms(run: Callable[[], Any], rounds: int) -> float:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--databases", type=int, default=50)
+    parser.add_argument("--entries", type=int, default=1_000)
+    parser.add_argument("--limit", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--vocabulary", type=int, default=0)
+    args = parser.parse_args()
+    vocabulary = make_vocabulary(args.vocabulary) if args.vocabulary else None
+    searched = (
+        [f"{vocabulary[i]} {vocabulary[i + 1]}" for i in range(100, 116, 2)]
+        if vocabulary
+        else PHRASES
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        create_workspace_tree(
+            temp_dir, args.databases, args.entries, vocabulary=vocabulary
+        )
+        registry = {"cursor": [os.path.join(temp_dir, "workspaceStorage")]}
+        executor = QueryExecutor(blob_cache=ParsedBlobCache(max_bytes=0))
+        direct = ConversationDataExtractor(executor)
+        index = InvertedIndex(executor)
+        indexed = ConversationDataExtractor(executor, index)
+
+        indexed.process_database_files(registry, args.limit)
+        stats = index.get_stats()
+        print(
+            f"{args.databases} databases, {stats['documents']} entries, "
+            f"{stats['terms']} terms, built in {stats['build_ms'] / 1000:.2f}s"
+        )
+        print(
+            f"postings {stats['postings_bytes'] / 1_000_000:.1f} MB, "
+            f"vocabulary {stats['vocabulary_bytes'] / 1_000:.1f} kB, "
+            f"documents {stats['document_bytes'] / 1_000_000:.1f} MB, "
+            f"entries {stats['entry_bytes'] / 1_000_000:.1f} MB"
+        )
+
+        texts = [
+            entry_text(entry)
+            for conv_data in direct.process_database_files(registry, 0)[0]
+            for field in ("prompts", "generations", "history_entries")
+            for entry in conv_data[field]
+        ]
+
+        print(f"limit {args.limit}, median of {args.rounds} rounds")
+        print(
+            f"{'phrases':>8} {'linear scan':>12} {'direct':>12} {'indexed':>12} "
+            f"{'vs scan':>8}"
+        )
+        for count in (1, 4, 8):
+            phrases: List[str] = searched[:count]
+            expected = direct.process_database_files(registry, args.limit, phrases)
+            if indexed.process_database_files(registry, args.limit, phrases) != (
+                expected
+            ):
+                raise RuntimeError(f"indexed search for {phrases} differs")
+            lowered = [phrase.lower() for phrase in phrases]
+            scan_ms = median_ms(
+                lambda: [
+                    text
+                    for text in texts
+                    if any(phrase in text.lower() for phrase in lowered)
+                ],
+                args.rounds,
+            )
+            direct_ms = median_ms(
+                lambda: direct.process_database_files(registry, args.limit, phrases),
+                args.rounds,
+            )
+            indexed_ms = median_ms(
+                lambda: indexed.process_database_files(registry, args.limit, phrases),
+                args.rounds,
+            )
+            print(
+                f"{count:>8} {scan_ms:>10.2f}ms {direct_ms:>10.2f}ms "
+                f"{indexed_ms:>10.2f}ms {scan_ms / indexed_ms:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
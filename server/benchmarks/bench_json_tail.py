@@ -0,0 +1,59 @@
+"""
+Benchmark tail-only JSON decoding against a full decode on large values.
+
+Run from the server directory:
+
+    python -m benchmarks.bench_json_tail
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Callable, List
+
+from benchmarks.synthetic_data import make_entries
+from src.database_management.decode_json_tail import JsonTailDecoder
+
+
+def time_ms(func: Callable[[], Any], rounds: int) -> float:
+    """Return the median wall time of ``func`` in milliseconds."""
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=40_000)
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--limits", type=int, nargs="+", default=[10, 64, 1000])
+    args = parser.parse_args()
+
+    text = json.dumps(make_entries(args.entries, args.words))
+    values: List[tuple[str, str | bytes]] = [
+        ("str", text),
+        ("bytes", text.encode("utf-8")),
+    ]
+    decoder = JsonTailDecoder()
+    print(f"{args.entries} entries, {len(text) / 1_000_000:.1f} MB per value")
+    print(f"{'input':<6} {'limit':>6} {'full ms':>10} {'tail ms':>10} {'speedup':>8}")
+    for label, value in values:
+        full = time_ms(lambda: json.loads(value), args.rounds)
+        for limit in args.limits:
+            expected = json.loads(value)[-limit:]
+            if decoder.decode(value, limit)[0] != expected:
+                raise RuntimeError(f"Tail decode mismatch for limit {limit}")
+            tail = time_ms(lambda: decoder.decode(value, limit), args.rounds)
+            print(
+                f"{label:<6} {limit:>6} {full:>10.3f} {tail:>10.3f} "
+                f"{full / tail:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark per-database extraction with 1, 4 and 16 worker threads.
+
+Builds a workspaceStorage-like tree of many small databases and runs recall
+with and without phrases through extractors with different worker counts.
+The blob cache is disabled so every round opens, queries and decodes each
+database. Results are checked to match the sequential run in order. Run
+from the server directory:
+
+    python -m benchmarks.bench_parallel_extraction
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable
+
+from benchmarks.synthetic_data import create_conversation_database, make_entries
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.execute_query import QueryExecutor
+from src.database_management.extract_conversation_data import ConversationDataExtractor
+
+
+def median_ms(run: Callable[[], Any], rounds: int) -> float:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--databases", type=int, default=200)
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(args.databases):
+            create_conversation_database(
+                os.path.join(temp_dir, "workspaceStorage", f"{i:08x}", "state.vscdb"),
+                make_entries(args.entries, seed=i),
+                make_entries(args.entries // 2, seed=i + args.databases),
+            )
+        registry = {"cursor": [os.path.join(temp_dir, "workspaceStorage")]}
+
+        print(
+            f"{args.databases} databases of {args.entries} prompts, "
+            f"{os.cpu_count()} CPUs, median of {args.rounds} rounds"
+        )
+        print(f"{'phrases':>8} {'workers':>8} {'latency':>10} {'speedup':>8}")
+        for phrases in (None, ["palantir balrog"]):
+            baseline = None
+            expected = None
+            for workers in args.workers:
+                extractor = ConversationDataExtractor(
+                    QueryExecutor(blob_cache=ParsedBlobCache(max_bytes=0)),
+                    max_workers=workers,
+                )
+
+                def recall() -> Any:
+                    return extractor.process_database_files(registry, 0, phrases)[0]
+
+                result = recall()
+                if expected is None:
+                    expected = result
+                elif result != expected:
+                    raise RuntimeError(f"{workers} workers returned other results")
+                latency = median_ms(recall, args.rounds)
+                extractor.close()
+                baseline = baseline or latency
+                print(
+                    f"{len(phrases or []):>8} {workers:>8} {latency:>8.1f}ms "
+                    f"{baseline / latency:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
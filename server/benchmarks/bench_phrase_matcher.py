@@ -0,0 +1,114 @@
+"""
+Benchmark phrase scoring with the shared matcher and single-pass counting.
+
+Compares lowercasing every phrase for every entry, as scoring used to, with
+a matcher built once per request, and counting query matches in a pass of
+their own before filtering with a second one, as QueryHandler used to,
+with counting and filtering in the same pass. Run from the server directory:
+
+    python -m benchmarks.bench_phrase_matcher
+"""
+
+import argparse
+import statistics
+import time
+from typing import Any, Callable, List
+
+from benchmarks.synthetic_data import make_entries
+from src.database_management.phrase_matcher import PhraseMatcher
+
+PHRASES = [
+    "palantir balrog",
+    "shire mordor",
+    "python sqlite",
+    "ring fellowship",
+    "cache recall",
+    "hobbit token",
+    "async thread",
+    "moria rivendell",
+]
+
+
+def median_ms(run: Callable[[], Any], rounds: int) -> float:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def find_all(text: str, search: str) -> List[int]:
+    starts = []
+    lowered = text.lower()
+    position = lowered.find(search.lower())
+    while position != -1:
+        starts.append(position)
+        position = lowered.find(search.lower(), position + 1)
+    return starts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = [entry["text"] for entry in make_entries(args.entries)]
+    print(f"{len(texts)} entries, median of {args.rounds} rounds")
+    print(f"{'phrases':>8} {'task':>8} {'before':>12} {'after':>10} {'speedup':>8}")
+    for count in (1, 4, 8):
+        phrases = PHRASES[:count]
+
+        def score_per_phrase() -> List[float]:
+            scores = []
+            for text in texts:
+                lowered = text.lower()
+                matched = sum(
+                    1 for phrase in phrases if phrase and phrase.lower() in lowered
+                )
+                scores.append(matched / len(phrases))
+            return scores
+
+        def score_matcher() -> List[float]:
+            matcher = PhraseMatcher(phrases)
+            return [matcher.matched_count(text) / len(phrases) for text in texts]
+
+        if score_per_phrase() != score_matcher():
+            raise RuntimeError(f"matcher scores for {phrases} differ")
+        report(count, "score", score_per_phrase, score_matcher, args.rounds)
+
+    search = PHRASES[0]
+
+    def count_twice() -> int:
+        # Count every summary, then find its matches again to filter
+        total = sum(len(find_all(text, search)) for text in texts)
+        kept = [text for text in texts if find_all(text, search)]
+        return total + len(kept)
+
+    def count_once() -> int:
+        totals = [len(find_all(text, search)) for text in texts]
+        return sum(totals) + sum(1 for total in totals if total)
+
+    if count_twice() != count_once():
+        raise RuntimeError("matcher counts differ")
+    report(1, "count", count_twice, count_once, args.rounds)
+
+
+def report(
+    count: int,
+    task: str,
+    baseline: Callable[[], Any],
+    shared: Callable[[], Any],
+    rounds: int,
+) -> None:
+    baseline_ms = median_ms(baseline, rounds)
+    shared_ms = median_ms(shared, rounds)
+    print(
+        f"{count:>8} {task:>8} {baseline_ms:>10.1f}ms {shared_ms:>8.1f}ms "
+        f"{baseline_ms / shared_ms:>7.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark reading the newest N entries as conversation history grows.
+
+Compares decoding the whole value in Python, selecting the last N elements
+inside SQLite with json_array_length and json_each, fetching only trailing
+bytes with substr, and chunked blob I/O. Run from the server directory:
+
+    python -m benchmarks.bench_recent_entries
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, List
+
+from benchmarks.synthetic_data import create_conversation_database, make_entries
+from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.execute_query import QueryExecutor
+
+PROMPTS_KEY = RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"]
+
+# The length is materialized once; referencing json_array_length(value) in
+# the json_each predicate re-parses the value for every element.
+JSON_EACH_QUERY = (
+    "WITH item AS MATERIALIZED ("
+    "SELECT value, json_array_length(value) AS total "
+    "FROM ItemTable WHERE key = ?) "
+    "SELECT entry.value FROM item, json_each(item.value) AS entry "
+    "WHERE entry.key >= item.total - ? ORDER BY entry.key"
+)
+
+
+def copy_full(db_path: str, limit: int) -> List[Any]:
+    """Select the whole value and decode every entry."""
+    with sqlite3.connect(db_path) as conn:
+        row = conn.execute(
+            "SELECT value FROM ItemTable WHERE key = ?", (PROMPTS_KEY,)
+        ).fetchone()
+    entries: List[Any] = json.loads(row[0])[-limit:]
+    return entries
+
+
+def json_each(db_path: str, limit: int) -> List[Any]:
+    """Return the last elements as rows from json_each."""
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(JSON_EACH_QUERY, (PROMPTS_KEY, limit)).fetchall()
+    return [json.loads(row[0]) for row in rows]
+
+
+def executor_reader(stream_blobs: bool) -> Callable[[str, int], List[Any]]:
+    """Read prompts through QueryExecutor with or without blob streaming."""
+    executor = QueryExecutor(
+        access_mode="ro",
+        blob_cache=ParsedBlobCache(max_bytes=0),
+        stream_blobs=stream_blobs,
+    )
+
+    def read(db_path: str, limit: int) -> List[Any]:
+        result = executor.execute_conversation_query(
+            db_path, limit, include_generations=False, include_history=False
+        )
+        if result["error"]:
+            raise RuntimeError(result["error"])
+        prompts: List[Any] = result["prompts"]
+        return prompts
+
+    return read
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--history", type=int, nargs="+", default=[1_000, 10_000, 40_000]
+    )
+    parser.add_argument("--limit", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    strategies = {
+        "copy+full": copy_full,
+        "json_each": json_each,
+        "suffix": executor_reader(stream_blobs=False),
+        "blob stream": executor_reader(stream_blobs=True),
+    }
+    print(f"limit {args.limit}, median of {args.rounds} rounds")
+    print(f"{'history':>8} {'MB':>6} " + " ".join(f"{n:>12}" for n in strategies))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for history in args.history:
+            db_path = os.path.join(temp_dir, f"history_{history}.vscdb")
+            entries = make_entries(history)
+            create_conversation_database(db_path, entries)
+            expected = entries[-args.limit :]
+
+            medians = []
+            for name, read in strategies.items():
+                if read(db_path, args.limit) != expected:
+                    raise RuntimeError(f"{name} returned the wrong entries")
+                latencies = []
+                for _ in range(args.rounds):
+                    start = time.perf_counter()
+                    read(db_path, args.limit)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                medians.append(statistics.median(latencies))
+            size_mb = os.path.getsize(db_path) / 1_000_000
+            print(
+                f"{history:>8} {size_mb:>6.1f} "
+                + " ".join(f"{ms:>10.2f}ms" for ms in medians)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark regex queries narrowed by the literal every match contains.
+
+Builds a workspaceStorage-like tree with Zipf-distributed words and finds
+every match of a few patterns (limit 0), once reading every entry and once
+reading only the entries holding the pattern's longest required literal,
+both through the per-database search and through the conversation index,
+where the literal is looked up by its trigrams. Each pair must find the
+same matches. Run from the server directory:
+
+    python -m benchmarks.bench_regex_query
+"""
+
+import argparse
+import os
+import re
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic_data import create_workspace_tree, make_vocabulary
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.conversation_index import ConversationIndex
+from src.database_management.conversation_source import entry_text
+from src.database_management.execute_query import QueryExecutor
+from src.database_management.extract_conversation_data import ConversationDataExtractor
+from src.database_management.regex_literals import required_literals
+
+
+def median_ms(run: Callable[[], Any], rounds: int) -> float:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def find_all(
+    extractor: ConversationDataExtractor,
+    registry: Dict[str, Any],
+    pattern: str,
+    phrases: List[str] | None,
+) -> List[str]:
+    """Read the entries selected by ``phrases`` and match the pattern."""
+    compiled = re.compile(pattern, re.IGNORECASE)
+    conversations = extractor.process_database_files(registry, 0, phrases)[0]
+    return [
+        match.group()
+        for conv_data in conversations
+        for field in ("prompts", "generations")
+        for entry in conv_data[field]
+        for match in compiled.finditer(entry_text(entry))
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--databases", type=int, default=50)
+    parser.add_argument("--entries", type=int, default=1_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if not ConversationIndex.is_supported():
+        raise SystemExit("SQLite lacks FTS5 with the trigram tokenizer")
+
+    vocabulary = make_vocabulary(args.vocabulary)
+    # Moderately common words whose letters all fit a literal
+    words = [
+        word
+        for word in vocabulary[50:]
+        if len(word) >= 5 and not set(word) & set("iks")
+    ]
+    patterns = [
+        rf"\b{words[0]} \w+",
+        rf"{words[1]}\W+{words[2]}",
+        rf"\b\w+{words[3][1:]}\b",
+    ]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        create_workspace_tree(
+            temp_dir, args.databases, args.entries, vocabulary=vocabulary
+        )
+        registry = {"cursor": [os.path.join(temp_dir, "workspaceStorage")]}
+        # No decoded value cache, so every direct search reads its databases
+        executor = QueryExecutor(blob_cache=ParsedBlobCache(max_bytes=0))
+        direct = ConversationDataExtractor(executor)
+        index = ConversationIndex(os.path.join(temp_dir, "index.db"), executor)
+        indexed = ConversationDataExtractor(executor, index)
+        indexed.process_database_files(registry, 0)
+
+        print(
+            f"{args.databases} databases, {index.get_stats()['entries']} entries, "
+            f"median of {args.rounds} rounds"
+        )
+        print(
+            f"{'pattern':>24} {'matches':>8} {'search':>8} "
+            f"{'read all':>10} {'narrowed':>10} {'speedup':>8}"
+        )
+        for pattern in patterns:
+            literal = max(required_literals(pattern), key=len)
+            for name, extractor in (("direct", direct), ("indexed", indexed)):
+                expected = find_all(extractor, registry, pattern, None)
+                if find_all(extractor, registry, pattern, [literal]) != expected:
+                    raise RuntimeError(
+                        f"narrowed {name} search for {pattern!r} differs"
+                    )
+                all_ms = median_ms(
+                    lambda: find_all(extractor, registry, pattern, None), args.rounds
+                )
+                narrowed_ms = median_ms(
+                    lambda: find_all(extractor, registry, pattern, [literal]),
+                    args.rounds,
+                )
+                print(
+                    f"{pattern:>24} {len(expected):>8} {name:>8} "
+                    f"{all_ms:>8.1f}ms {narrowed_ms:>8.1f}ms "
+                    f"{all_ms / narrowed_ms:>7.1f}x"
+                )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
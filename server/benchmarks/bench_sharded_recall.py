@@ -0,0 +1,98 @@
+"""
+Benchmark recall in the server process against recall sharded over workers.
+
+Builds a workspaceStorage-like tree and runs a phrase search in process,
+then through ShardedRecall with different worker counts. The first round
+of each mode starts its workers and fills their caches, so it is reported
+apart from the median of the warm rounds that follow. Every mode must
+return the same ranked summaries as in-process recall. Speedup needs as
+many free cores as workers. Run from the server directory:
+
+    python -m benchmarks.bench_sharded_recall
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic_data import create_workspace_tree
+from src.database_management.recall_conversations import ConversationDatabaseManager
+from src.database_management.sharded_recall import ShardedRecall, ShardQuery
+
+
+def timed_ms(run: Callable[[], Any]) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = run()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def median_ms(run: Callable[[], Any], rounds: int) -> float:
+    return statistics.median(timed_ms(run)[1] for _ in range(rounds))
+
+
+def summaries(entries: List[Dict[str, Any]]) -> List[str]:
+    return [entry["summary"] for entry in entries]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--databases", type=int, default=64)
+    parser.add_argument("--entries", type=int, default=1_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    phrases = ["palantir balrog"]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        create_workspace_tree(temp_dir, args.databases, args.entries)
+        registry = {"cursor": [os.path.join(temp_dir, "workspaceStorage")]}
+        manager = ConversationDatabaseManager()
+        db_paths = manager.data_extractor.discover_databases(registry)[0]
+
+        def in_process() -> List[Dict[str, Any]]:
+            conversations = manager.process_database_files(
+                registry, args.limit, phrases
+            )[0]
+            entries: List[Dict[str, Any]] = []
+            for conv_data in conversations:
+                formatted = manager.format_conversation_entry(
+                    conv_data, True, True, phrases
+                )
+                entries.extend(formatted["conversations"])
+            entries = [e for e in entries if e.get("relevance", 0) > 0]
+            entries.sort(key=lambda e: e["relevance"], reverse=True)
+            return entries[: args.limit]
+
+        print(
+            f"{args.databases} databases of {args.entries} prompts and "
+            f"generations, {os.cpu_count()} CPUs, median of {args.rounds} rounds"
+        )
+        print(f"{'mode':>12} {'first':>10} {'warm':>10} {'speedup':>8}")
+        expected, first = timed_ms(in_process)
+        baseline = median_ms(in_process, args.rounds)
+        print(f"{'in process':>12} {first:>8.1f}ms {baseline:>8.1f}ms {1:>7.1f}x")
+
+        for workers in args.workers:
+            sharded = ShardedRecall(workers)
+            query = ShardQuery(args.limit, args.limit, phrases)
+
+            def recall() -> List[Dict[str, Any]]:
+                return sharded.recall(db_paths, query)
+
+            result, first = timed_ms(recall)
+            if summaries(result) != summaries(expected):
+                raise RuntimeError(f"{workers} workers returned other results")
+            latency = median_ms(recall, args.rounds)
+            sharded.close()
+            print(
+                f"{f'{workers} workers':>12} {first:>8.1f}ms {latency:>8.1f}ms "
+                f"{baseline / latency:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
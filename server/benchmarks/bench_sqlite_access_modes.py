@@ -0,0 +1,68 @@
+"""
+Benchmark per-database open and query latency across SQLite access modes.
+
+Run from the server directory:
+
+    python -m benchmarks.bench_sqlite_access_modes
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from typing import List
+
+from benchmarks.synthetic_data import create_workspace_tree
+from src.config.constants import SQLITE_ACCESS_MODES
+from src.database_management.execute_query import QueryExecutor
+
+
+def bench_mode(mode: str, db_paths: List[str], rounds: int, limit: int) -> List[float]:
+    """Time execute_conversation_query for every database in every round.
+
+    The first round is a warm-up so immutable mode can record fingerprints.
+
+    Returns:
+        Per-database latencies in milliseconds
+    """
+    executor = QueryExecutor(access_mode=mode)
+    for db_path in db_paths:
+        executor.execute_conversation_query(db_path, limit)
+
+    latencies = []
+    for _ in range(rounds):
+        for db_path in db_paths:
+            start = time.perf_counter()
+            result = executor.execute_conversation_query(db_path, limit)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if result["error"]:
+                raise RuntimeError(result["error"])
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--databases", type=int, default=50)
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_paths = create_workspace_tree(temp_dir, args.databases, args.entries)
+        print(
+            f"{args.databases} databases x {args.entries} entries, "
+            f"{args.rounds} rounds, limit {args.limit}"
+        )
+        print(f"{'mode':<10} {'median ms':>10} {'p95 ms':>10} {'mean ms':>10}")
+        for mode in SQLITE_ACCESS_MODES:
+            latencies = sorted(bench_mode(mode, db_paths, args.rounds, args.limit))
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            print(
+                f"{mode:<10} {statistics.median(latencies):>10.3f} "
+                f"{p95:>10.3f} {statistics.mean(latencies):>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark date-bounded recall with time-partition pruning.
+
+Builds a workspaceStorage-like tree whose databases each cover a different
+week, then searches a window of a few weeks two ways: reading every match
+and dropping the entries outside the window afterwards, as recall used to,
+and passing the window down so databases, index ranges and weeks outside it
+are skipped. Both the per-database search and the in-memory inverted index
+are measured. Run from the server directory:
+
+    python -m benchmarks.bench_time_window
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic_data import create_conversation_database, make_entries
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.entry_timestamps import entry_timestamp_ms
+from src.database_management.execute_query import QueryExecutor
+from src.database_management.extract_conversation_data import ConversationDataExtractor
+from src.database_management.inverted_index import InvertedIndex
+from src.database_management.time_partitions import PARTITION_MS, TimeWindow
+
+FIELDS = ("prompts", "generations", "history_entries")
+
+
+def median_ms(run: Callable[[], Any], rounds: int) -> float:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def drop_outside(
+    conversations: List[Dict[str, Any]], window: TimeWindow
+) -> List[Dict[str, Any]]:
+    return [
+        {
+            **conv_data,
+            **{
+                field: [
+                    entry
+                    for entry in conv_data[field]
+                    if window.contains(entry_timestamp_ms(entry))
+                ]
+                for field in FIELDS
+            },
+        }
+        for conv_data in conversations
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--databases", type=int, default=52)
+    parser.add_argument("--entries", type=int, default=1_000)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(args.databases):
+            # Database i covers the i-th week before the newest entries
+            prompts = make_entries(args.entries, seed=i)
+            for entry in prompts:
+                entry["timestamp"] -= i * PARTITION_MS
+            create_conversation_database(
+                os.path.join(temp_dir, "workspaceStorage", f"{i:08x}", "state.vscdb"),
+                prompts,
+            )
+        registry = {"cursor": [os.path.join(temp_dir, "workspaceStorage")]}
+        newest = int(time.time() * 1000)
+        window = TimeWindow(newest - args.weeks * PARTITION_MS, newest)
+        executor = QueryExecutor(blob_cache=ParsedBlobCache(max_bytes=0))
+        direct = ConversationDataExtractor(executor)
+        indexed = ConversationDataExtractor(executor, InvertedIndex(executor))
+        # Learn each database's weeks, as any earlier request would
+        direct.process_database_files(registry, 0, window=window)
+        indexed.process_database_files(registry, 0)
+
+        print(
+            f"{args.databases} databases of {args.entries} entries, "
+            f"{args.weeks}-week window, median of {args.rounds} rounds"
+        )
+        print(
+            f"{'search':>10} {'phrases':>8} {'filter after':>13} {'pruned':>10} "
+            f"{'speedup':>8}"
+        )
+        for name, extractor in (("direct", direct), ("indexed", indexed)):
+            for phrases in (None, ["palantir balrog"]):
+
+                def filter_after() -> List[Dict[str, Any]]:
+                    return drop_outside(
+                        extractor.process_database_files(registry, 0, phrases)[0],
+                        window,
+                    )
+
+                def pruned() -> List[Dict[str, Any]]:
+                    return extractor.process_database_files(
+                        registry, 0, phrases, window=window
+                    )[0]
+
+                if filter_after() != pruned():
+                    raise RuntimeError(f"{name} window search for {phrases} differs")
+                after_ms = median_ms(filter_after, args.rounds)
+                pruned_ms = median_ms(pruned, args.rounds)
+                print(
+                    f"{name:>10} {len(phrases or []):>8} {after_ms:>11.1f}ms "
+                    f"{pruned_ms:>8.1f}ms {after_ms / pruned_ms:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
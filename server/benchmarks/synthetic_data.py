@@ -0,0 +1,136 @@
+"""
+Synthetic conversation databases for benchmarks.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import string
+import time
+from itertools import accumulate
+from typing import Any, Dict, List, Sequence
+
+from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+
+WORDS = (
+    "gandalf wizard python sqlite query index cursor prompt generation history "
+    "async thread pool cache recall phrase search token rank buffer stream "
+    "shire mordor ring fellowship hobbit palantir balrog moria rivendell"
+).split()
+
+
+def make_vocabulary(size: int, seed: int = 0) -> List[str]:
+    """Build ``size`` distinct random lowercase words of 3 to 10 letters."""
+    rng = random.Random(seed)
+    words: Dict[str, None] = {}
+    while len(words) < size:
+        length = rng.randint(3, 10)
+        words["".join(rng.choice(string.ascii_lowercase) for _ in range(length))] = None
+    return list(words)
+
+
+def make_entries(
+    count: int,
+    text_words: int = 40,
+    seed: int = 0,
+    vocabulary: Sequence[str] | None = None,
+) -> List[Dict[str, Any]]:
+    """Build prompt-like entries with random text and ascending timestamps.
+
+    Args:
+        count: Number of entries
+        text_words: Words of text per entry
+        seed: Random seed so runs are repeatable
+        vocabulary: Words drawn with Zipf frequencies, the first the most
+            common, as in natural text; by default WORDS, drawn uniformly
+
+    Returns:
+        List of entry dictionaries
+    """
+    rng = random.Random(seed)
+    now_ms = int(time.time() * 1000)
+    if vocabulary is None:
+        texts = [
+            " ".join(rng.choice(WORDS) for _ in range(text_words)) for _ in range(count)
+        ]
+    else:
+        weights = list(accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+        texts = [
+            " ".join(rng.choices(vocabulary, cum_weights=weights, k=text_words))
+            for _ in range(count)
+        ]
+    return [
+        {
+            "text": text,
+            "commandType": 4,
+            "timestamp": now_ms - (count - i) * 60_000,
+        }
+        for i, text in enumerate(texts)
+    ]
+
+
+def create_conversation_database(
+    db_path: str,
+    prompts: List[Dict[str, Any]],
+    generations: List[Dict[str, Any]] | None = None,
+    history: List[Dict[str, Any]] | None = None,
+) -> None:
+    """Create a Cursor-style ItemTable database holding the given entries.
+
+    Args:
+        db_path: Path of the database to create
+        prompts: Entries stored under the prompts key
+        generations: Entries stored under the generations key
+        history: Entries stored under the history key
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ItemTable "
+            "(key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)"
+        )
+        rows = [
+            (RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"], json.dumps(prompts)),
+            (
+                RECALL_CONVERSATIONS_QUERIES["GENERATIONS_KEY"],
+                json.dumps(generations or []),
+            ),
+            (RECALL_CONVERSATIONS_QUERIES["HISTORY_KEY"], json.dumps(history or [])),
+        ]
+        conn.executemany("INSERT INTO ItemTable VALUES (?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def create_workspace_tree(
+    root: str,
+    databases: int,
+    entries_per_database: int,
+    text_words: int = 40,
+    vocabulary: Sequence[str] | None = None,
+) -> List[str]:
+    """Create a workspaceStorage-like tree of conversation databases.
+
+    Args:
+        root: Directory to create the tree in
+        databases: Number of workspace databases
+        entries_per_database: Prompts and generations per database
+        text_words: Words of text per entry
+        vocabulary: Words of the entries, see make_entries
+
+    Returns:
+        List of created database paths
+    """
+    paths = []
+    for i in range(databases):
+        db_path = os.path.join(root, "workspaceStorage", f"{i:08x}", "state.vscdb")
+        create_conversation_database(
+            db_path,
+            make_entries(entries_per_database, text_words, i, vocabulary),
+            make_entries(entries_per_database, text_words, i + 10_000, vocabulary),
+        )
+        paths.append(db_path)
+    return paths
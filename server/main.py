@@ -7,7 +7,12 @@ import asyncio
 import sys
 import traceback
 
-from src.config.constants import SERVER_NAME
+from src.config.constants import (
+    INDEX_MAINTENANCE_INTERVAL_SECONDS,
+    RECALL_INDEX_ENABLED,
+    SERVER_NAME,
+)
+from src.database_management.index_maintenance import IndexMaintenanceScheduler
 from src.protocol.jsonrpc_server import JSONRPCServer
 from src.tools.registry import ToolRegistry
 from src.utils.logger import log_error, log_info
@@ -31,7 +36,14 @@ class GandalfServer:
     async def run(self) -> None:
         """Run the server."""
         log_info("Starting Gandalf Server")
-        await self.server.run()
+        maintenance = None
+        if RECALL_INDEX_ENABLED and INDEX_MAINTENANCE_INTERVAL_SECONDS > 0:
+            maintenance = asyncio.create_task(IndexMaintenanceScheduler().run())
+        try:
+            await self.server.run()
+        finally:
+            if maintenance is not None:
+                maintenance.cancel()
 
 
 def main() -> None:
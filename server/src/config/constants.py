@@ -15,6 +15,13 @@ GANDALF_HOME = os.getenv("GANDALF_HOME", "")
 GANDALF_REGISTRY_FILE = os.getenv(
     "GANDALF_REGISTRY_FILE", os.path.expanduser("~/.gandalf/registry.json")
 )
+GANDALF_DISCOVERY_MANIFEST_FILE = os.getenv(
+    "GANDALF_DISCOVERY_MANIFEST_FILE",
+    os.path.expanduser("~/.gandalf/discovery_manifest.json"),
+)
+GANDALF_INDEX_FILE = os.getenv(
+    "GANDALF_INDEX_FILE", os.path.expanduser("~/.gandalf/index.db")
+)
 
 # Supported database files for conversation recall.
 # Matches the database files in the registry.json file.
@@ -26,6 +33,30 @@ SUPPORTED_DB_FILES = [
     "claude.db",
 ]
 
+# Database discovery configuration.
+# Maximum directory depth below each registry path. Unset, malformed or
+# negative values mean unlimited, so a bad value cannot stop the server.
+
+
+def _discovery_max_depth(value: str | None) -> int | None:
+    """Parse GANDALF_DISCOVERY_MAX_DEPTH, None for unlimited."""
+    try:
+        depth = int(value or "")
+    except ValueError:
+        return None
+    return depth if depth >= 0 else None
+
+
+DISCOVERY_MAX_DEPTH = _discovery_max_depth(os.getenv("GANDALF_DISCOVERY_MAX_DEPTH"))
+# Directory name patterns (fnmatch) that are never descended into.
+DISCOVERY_SKIP_PATTERNS = [
+    ".git",
+    "node_modules",
+    "__pycache__",
+]
+# Bump when the manifest layout changes so stale manifests are rebuilt.
+DISCOVERY_MANIFEST_VERSION = 1
+
 # Database query constants for recall conversations tool
 RECALL_CONVERSATIONS_QUERIES = {
     "PROMPTS_QUERY": "SELECT value FROM ItemTable WHERE key = ?",
@@ -36,6 +67,93 @@ RECALL_CONVERSATIONS_QUERIES = {
     "HISTORY_KEY": "history.entries",
 }
 
+# SQLite access configuration for conversation databases.
+# "rw" opens a regular read-write connection, "ro" opens with mode=ro, and
+# "immutable" also sets immutable=1 once a database snapshot is seen unchanged.
+SQLITE_ACCESS_MODES = ("rw", "ro", "immutable")
+SQLITE_ACCESS_MODE = os.getenv("GANDALF_SQLITE_ACCESS_MODE", "ro")
+SQLITE_MMAP_SIZE = int(
+    os.getenv("GANDALF_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))
+)  # Bytes of the database file mapped into memory, 0 disables mmap
+SQLITE_CACHE_SIZE = int(
+    os.getenv("GANDALF_SQLITE_CACHE_SIZE", "-16384")
+)  # Page cache size, negative values are KiB (SQLite convention)
+
+# Connection pool for conversation databases in the long-running server.
+# A pool size of 0 disables pooling and opens a fresh connection per query.
+CONNECTION_POOL_MAX_CONNECTIONS = int(os.getenv("GANDALF_CONNECTION_POOL_SIZE", "64"))
+CONNECTION_POOL_IDLE_TIMEOUT_SECONDS = float(
+    os.getenv("GANDALF_CONNECTION_POOL_IDLE_TIMEOUT", "300")
+)
+
+# Requests from one client handled at the same time. Each request runs as its
+# own task and its response is written as soon as it completes.
+SERVER_MAX_CONCURRENT_REQUESTS = max(
+    1, int(os.getenv("GANDALF_MAX_CONCURRENT_REQUESTS", "8"))
+)
+
+# Threads extracting conversation databases in parallel. sqlite3 releases the
+# GIL while it reads, so databases overlap their I/O. 1 extracts in sequence.
+RECALL_EXTRACTION_WORKERS = max(
+    1, int(os.getenv("GANDALF_RECALL_WORKERS", str(min(8, os.cpu_count() or 1))))
+)
+
+# Worker processes sharing recall by database shard when the persistent index
+# is off. Each decodes, scores and ranks its shard and returns only its best
+# matches. 0 or 1 keeps recall in the server process, the default: sharding
+# only pays off with as many free cores as workers.
+RECALL_PROCESS_WORKERS = max(0, int(os.getenv("GANDALF_RECALL_PROCESSES", "0")))
+
+# In-process cache of decoded ItemTable values, keyed by database fingerprint.
+# The budget counts raw JSON bytes; 0 disables the cache.
+BLOB_CACHE_MAX_BYTES = int(
+    os.getenv("GANDALF_BLOB_CACHE_MAX_BYTES", str(128 * 1024 * 1024))
+)
+
+# ItemTable values are read through incremental blob I/O in fixed-size chunks
+# so peak memory does not scale with the size of the stored value.
+BLOB_STREAMING_ENABLED = os.getenv("GANDALF_BLOB_STREAMING", "true").lower() == "true"
+BLOB_STREAM_CHUNK_BYTES = int(
+    os.getenv("GANDALF_BLOB_STREAM_CHUNK_BYTES", str(64 * 1024))
+)
+
+# Phrase filtering per entry inside SQLite with JSON1 json_each, falling back
+# to whole-value LIKE filtering when the SQLite build lacks JSON1.
+SQLITE_JSON_PUSHDOWN = (
+    os.getenv("GANDALF_SQLITE_JSON_PUSHDOWN", "true").lower() == "true"
+)
+
+# Persistent FTS5 index of every conversation entry. When enabled, recall
+# refreshes the index from changed databases and searches it instead of
+# decoding every database per request. Needs FTS5 with the trigram tokenizer.
+RECALL_INDEX_ENABLED = os.getenv("GANDALF_RECALL_INDEX", "false").lower() == "true"
+
+# Background maintenance of the persistent index, run at low CPU and I/O
+# priority: deletes entries older than the retention period (0 keeps every
+# entry), evicts the oldest entries over the size budget (0 for no budget),
+# merges full-text segments and vacuums. An interval of 0 disables it.
+INDEX_MAINTENANCE_INTERVAL_SECONDS = float(
+    os.getenv("GANDALF_INDEX_MAINTENANCE_INTERVAL", "3600")
+)
+INDEX_MAINTENANCE_TIMEOUT_SECONDS = float(
+    os.getenv("GANDALF_INDEX_MAINTENANCE_TIMEOUT", "600")
+)
+INDEX_MAX_BYTES = int(os.getenv("GANDALF_INDEX_MAX_BYTES", str(1024 * 1024 * 1024)))
+INDEX_RETENTION_DAYS = float(os.getenv("GANDALF_INDEX_RETENTION_DAYS", "0"))
+
+# In-memory positional inverted index for the long-running server, built on
+# the first recall and updated incrementally. Used when the persistent index
+# is disabled or unsupported.
+RECALL_MEMORY_INDEX_ENABLED = (
+    os.getenv("GANDALF_RECALL_MEMORY_INDEX", "false").lower() == "true"
+)
+
+# Entries repeated across workspaces and the global storage, with the same
+# normalized text and timestamp, are returned once with their source list.
+RECALL_DEDUPLICATE_ENABLED = (
+    os.getenv("GANDALF_RECALL_DEDUPLICATE", "true").lower() == "true"
+)
+
 # Recall conversations tool specific constants
 MAX_PHRASES = 8  # Maximum number of search phrases allowed
 DEFAULT_RESULTS_LIMIT = 64  # Default number of results returned
@@ -55,6 +173,16 @@ INCLUDE_GENERATIONS_DEFAULT = (
 # Recency scoring configuration
 RECENCY_DECAY_RATE = float(os.getenv("GANDALF_RECENCY_DECAY_RATE", "0.1"))
 
+# Ranking of phrase matches. "phrase" scores the share of phrases matched,
+# "bm25" ranks matches with BM25 over the phrase terms, using term statistics
+# precomputed per database snapshot or kept by the conversation index.
+RANKING_MODES = ("phrase", "bm25")
+DEFAULT_RANKING = "phrase"
+BM25_K1 = float(os.getenv("GANDALF_BM25_K1", "1.2"))
+BM25_B = float(os.getenv("GANDALF_BM25_B", "0.75"))
+# Share of a BM25 relevance taken from recency, 0 disables blending
+BM25_RECENCY_WEIGHT = float(os.getenv("GANDALF_BM25_RECENCY_WEIGHT", "0.0"))
+
 # History entry filtering default
 DEFAULT_INCLUDE_EDITOR_HISTORY = (
     os.getenv("GANDALF_INCLUDE_EDITOR_HISTORY", "false").lower() == "true"
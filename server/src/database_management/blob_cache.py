@@ -0,0 +1,145 @@
+"""
+In-process cache of decoded ItemTable values.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from src.config.constants import BLOB_CACHE_MAX_BYTES
+from src.database_management.database_fingerprint import DatabaseFingerprint
+
+
+@dataclass
+class CachedEntries:
+    """Decoded entries for one key of one database snapshot."""
+
+    fingerprint: DatabaseFingerprint
+    entries: List[Any]
+    size_bytes: int
+    complete: bool = True
+
+
+class ParsedBlobCache:
+    """LRU cache of decoded entry lists bounded by a total byte budget.
+
+    Entries are keyed by (db_path, key) and only returned while the database
+    fingerprint (size, mtime and WAL size) still matches the snapshot they
+    were decoded from. The raw JSON length of each value is used as its size,
+    which keeps accounting cheap and proportional to the decoded footprint.
+    A value may be cached as just the tail of its array, in which case it
+    only serves requests for at most that many entries.
+    """
+
+    def __init__(self, max_bytes: int = BLOB_CACHE_MAX_BYTES) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Total raw bytes of values kept before evicting LRU-first
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[tuple[str, str], CachedEntries]" = OrderedDict()
+        self._resident_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(
+        self,
+        db_path: str,
+        query_key: str,
+        fingerprint: DatabaseFingerprint,
+        min_entries: int = 0,
+    ) -> List[Any] | None:
+        """Look up decoded entries for a database snapshot.
+
+        Args:
+            db_path: Path to the database file
+            query_key: ItemTable key
+            fingerprint: Current fingerprint of the database
+            min_entries: Number of trailing entries needed, 0 or less for all
+
+        Returns:
+            Cached entry list, or None on a miss
+        """
+        with self._lock:
+            item = self._items.get((db_path, query_key))
+            if (
+                item is None
+                or item.fingerprint != fingerprint
+                or (
+                    not item.complete
+                    and (min_entries <= 0 or len(item.entries) < min_entries)
+                )
+            ):
+                self._misses += 1
+                return None
+            self._items.move_to_end((db_path, query_key))
+            self._hits += 1
+            return item.entries
+
+    def put(
+        self,
+        db_path: str,
+        query_key: str,
+        fingerprint: DatabaseFingerprint,
+        entries: List[Any],
+        size_bytes: int,
+        complete: bool = True,
+    ) -> None:
+        """Store decoded entries, replacing any older snapshot of the same key.
+
+        Values larger than the whole budget are not cached.
+
+        Args:
+            db_path: Path to the database file
+            query_key: ItemTable key
+            fingerprint: Fingerprint the value was read under
+            entries: Decoded entry list
+            size_bytes: Bytes charged against the budget
+            complete: False when entries only hold the tail of the array
+        """
+        with self._lock:
+            previous = self._items.pop((db_path, query_key), None)
+            if previous is not None:
+                self._resident_bytes -= previous.size_bytes
+            if size_bytes > self.max_bytes:
+                return
+
+            self._items[(db_path, query_key)] = CachedEntries(
+                fingerprint=fingerprint,
+                entries=entries,
+                size_bytes=size_bytes,
+                complete=complete,
+            )
+            self._resident_bytes += size_bytes
+            while self._resident_bytes > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._resident_bytes -= evicted.size_bytes
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached value."""
+        with self._lock:
+            self._items.clear()
+            self._resident_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters for tuning.
+
+        Returns:
+            Dictionary with hit rate, resident bytes and entry counts
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "resident_bytes": self._resident_bytes,
+                "max_bytes": self.max_bytes,
+                "cached_values": len(self._items),
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,176 @@
+"""
+BM25 relevance scoring for conversation recall.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Iterable, List, Optional
+
+from src.config.constants import BM25_B, BM25_K1, BM25_RECENCY_WEIGHT
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Floor for phrase matches whose terms carry no weight, so they still rank
+# below every scored match instead of being dropped as non-matches
+MIN_MATCH_RELEVANCE = 0.0001
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word terms."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+@dataclass
+class TermStatistics:
+    """Corpus statistics BM25 needs: document count, length and frequencies.
+
+    ``document_frequency`` maps each term to the number of documents holding
+    it at least once. Statistics are built once per corpus snapshot and
+    combined per search, so scoring never rescans the corpus.
+    """
+
+    document_count: int = 0
+    total_length: int = 0
+    document_frequency: "Counter[str]" = field(default_factory=Counter)
+
+    def add(self, text: str) -> None:
+        """Count one document.
+
+        Args:
+            text: Document text
+        """
+        terms = tokenize(text)
+        self.document_count += 1
+        self.total_length += len(terms)
+        self.document_frequency.update(set(terms))
+
+    @property
+    def average_length(self) -> float:
+        """Average document length in terms."""
+        if not self.document_count:
+            return 0.0
+        return self.total_length / self.document_count
+
+    @classmethod
+    def combine(
+        cls, statistics: Iterable["TermStatistics"], terms: Iterable[str]
+    ) -> "TermStatistics":
+        """Sum statistics of disjoint corpora, keeping only the given terms.
+
+        Args:
+            statistics: Statistics of each corpus
+            terms: Terms whose document frequencies are needed
+
+        Returns:
+            Statistics of the union of the corpora
+        """
+        wanted = set(terms)
+        combined = cls()
+        for stats in statistics:
+            combined.document_count += stats.document_count
+            combined.total_length += stats.total_length
+            for term in wanted:
+                count = stats.document_frequency.get(term)
+                if count:
+                    combined.document_frequency[term] += count
+        return combined
+
+
+class BM25Scorer:
+    """Scores entries against the terms of the search phrases with Okapi BM25.
+
+    Raw BM25 scores are unbounded, so they are mapped to [0, 1) with
+    ``score / (score + 1)``, which keeps their order and lets them be
+    blended with a recency score on the same scale.
+    """
+
+    def __init__(
+        self,
+        statistics: TermStatistics,
+        phrases: List[str],
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        recency_weight: float = BM25_RECENCY_WEIGHT,
+        recency_scorer: Optional[Any] = None,
+    ) -> None:
+        """Initialize the scorer.
+
+        Args:
+            statistics: Statistics of the searched corpus, covering at least
+                the phrase terms
+            phrases: Search phrases, split into terms
+            k1: Term frequency saturation
+            b: Document length normalization, 0 to 1
+            recency_weight: Share of the relevance taken from recency, 0 to 1
+            recency_scorer: RecencyScorer used when recency_weight is set
+        """
+        self.k1 = k1
+        self.b = b
+        self.recency_weight = max(0.0, min(1.0, recency_weight))
+        self.recency_scorer = recency_scorer
+        self.terms = list(dict.fromkeys(t for p in phrases for t in tokenize(p)))
+        self.average_length = statistics.average_length
+        self.idf = {
+            term: self._idf(
+                statistics.document_count,
+                statistics.document_frequency.get(term, 0),
+            )
+            for term in self.terms
+        }
+
+    @staticmethod
+    def _idf(document_count: int, frequency: int) -> float:
+        """Inverse document frequency, kept positive for very common terms."""
+        return math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+
+    def score_text(self, text: str) -> float:
+        """Return the raw BM25 score of one document.
+
+        Args:
+            text: Document text
+
+        Returns:
+            Sum of the weighted term scores, 0.0 if no term occurs
+        """
+        terms = tokenize(text)
+        if not terms or not self.terms:
+            return 0.0
+        counts = Counter(terms)
+        norm = self.k1 * (
+            1 - self.b + self.b * len(terms) / (self.average_length or len(terms))
+        )
+        score = 0.0
+        for term in self.terms:
+            frequency = counts.get(term)
+            if frequency:
+                score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+        return score
+
+    def calculate_relevance(
+        self, conversation: Any, text: str, timestamp_ms: Optional[int] = None
+    ) -> float:
+        """Return the relevance of an entry that matched a search phrase.
+
+        Args:
+            conversation: Entry data, used for its timestamp
+            text: Entry text the phrases were matched against
+            timestamp_ms: Normalized timestamp of the entry, read from the
+                entry data when not given
+
+        Returns:
+            Relevance between MIN_MATCH_RELEVANCE and 1.0
+        """
+        score = self.score_text(text)
+        relevance = score / (score + 1)
+        if self.recency_weight and self.recency_scorer is not None:
+            recency: float = (
+                self.recency_scorer.calculate_recency_score(conversation)
+                if timestamp_ms is None
+                else self.recency_scorer.score_timestamp_ms(timestamp_ms)
+            )
+            relevance = (
+                1 - self.recency_weight
+            ) * relevance + self.recency_weight * recency
+        return max(MIN_MATCH_RELEVANCE, relevance)
@@ -0,0 +1,234 @@
+"""
+Connection pooling for conversation databases.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterator
+
+from src.config.constants import (
+    CONNECTION_POOL_IDLE_TIMEOUT_SECONDS,
+    CONNECTION_POOL_MAX_CONNECTIONS,
+)
+from src.utils.logger import log_debug
+
+
+@dataclass
+class PooledConnection:
+    """An open connection and the state needed to decide if it can be reused."""
+
+    connection: sqlite3.Connection
+    identity: Hashable
+    inode: int | None
+    last_used: float
+
+
+class ConnectionPool:
+    """Keeps warm SQLite connections keyed by database path.
+
+    Each path holds at most one idle connection. Idle connections are closed
+    after ``idle_timeout`` seconds, and the least recently used idle
+    connection is evicted when opening a new one would exceed
+    ``max_connections``. When every handle is checked out, extra connections
+    are opened unpooled and closed on release so callers never block.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = CONNECTION_POOL_MAX_CONNECTIONS,
+        idle_timeout: float = CONNECTION_POOL_IDLE_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the pool.
+
+        Args:
+            max_connections: Maximum number of handles held by the pool
+            idle_timeout: Seconds an idle connection is kept before closing
+            clock: Monotonic time source, injectable for tests
+        """
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._idle: "OrderedDict[str, PooledConnection]" = OrderedDict()
+        self._in_use = 0
+        self._stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "health_check_failures": 0,
+            "overflow": 0,
+        }
+
+    @staticmethod
+    def _inode(db_path: str) -> int | None:
+        try:
+            return os.stat(db_path).st_ino
+        except OSError:
+            return None
+
+    @staticmethod
+    def _close(pooled: PooledConnection) -> None:
+        try:
+            pooled.connection.close()
+        except sqlite3.Error:
+            pass
+
+    def _is_healthy(self, db_path: str, pooled: PooledConnection) -> bool:
+        """Check that a pooled connection still points at a readable database.
+
+        A replaced database file keeps the old inode open, so the current
+        inode must match the one recorded when the connection was opened.
+        """
+        if pooled.inode is None or pooled.inode != self._inode(db_path):
+            return False
+        try:
+            pooled.connection.execute("PRAGMA schema_version").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _expire_idle_locked(self, now: float) -> list[PooledConnection]:
+        """Remove idle connections past the timeout, oldest first."""
+        expired = []
+        while self._idle:
+            db_path, pooled = next(iter(self._idle.items()))
+            if now - pooled.last_used < self.idle_timeout:
+                break
+            del self._idle[db_path]
+            expired.append(pooled)
+        self._stats["expirations"] += len(expired)
+        return expired
+
+    @contextmanager
+    def acquire(
+        self,
+        db_path: str,
+        open_connection: Callable[[], sqlite3.Connection],
+        identity: Hashable = None,
+    ) -> Iterator[sqlite3.Connection]:
+        """Check out a connection for a database, opening one if needed.
+
+        Args:
+            db_path: Database path used as the pool key
+            open_connection: Opens a new connection when none can be reused
+            identity: Connection settings; an idle connection opened with a
+                different identity is closed instead of reused
+
+        Yields:
+            SQLite connection, returned to the pool when the block exits
+            without an exception
+        """
+        to_close: list[PooledConnection] = []
+        pooled: PooledConnection | None = None
+        pooled_slot = True
+
+        with self._lock:
+            to_close.extend(self._expire_idle_locked(self._clock()))
+            candidate = self._idle.pop(db_path, None)
+            if candidate is not None:
+                if candidate.identity == identity:
+                    pooled = candidate
+                else:
+                    to_close.append(candidate)
+            if pooled is None:
+                self._stats["misses"] += 1
+                while self._idle and len(self._idle) + self._in_use >= (
+                    self.max_connections
+                ):
+                    _, evicted = self._idle.popitem(last=False)
+                    to_close.append(evicted)
+                    self._stats["evictions"] += 1
+                if self._in_use >= self.max_connections:
+                    pooled_slot = False
+                    self._stats["overflow"] += 1
+            self._in_use += 1
+
+        for stale in to_close:
+            self._close(stale)
+
+        try:
+            if pooled is not None and not self._is_healthy(db_path, pooled):
+                with self._lock:
+                    self._stats["health_check_failures"] += 1
+                    self._stats["misses"] += 1
+                self._close(pooled)
+                pooled = None
+            elif pooled is not None:
+                with self._lock:
+                    self._stats["hits"] += 1
+
+            if pooled is None:
+                pooled = PooledConnection(
+                    connection=open_connection(),
+                    identity=identity,
+                    inode=self._inode(db_path),
+                    last_used=self._clock(),
+                )
+        except BaseException:
+            with self._lock:
+                self._in_use -= 1
+            raise
+
+        try:
+            yield pooled.connection
+        except BaseException:
+            with self._lock:
+                self._in_use -= 1
+            self._close(pooled)
+            raise
+
+        pooled.last_used = self._clock()
+        displaced: PooledConnection | None = None
+        with self._lock:
+            self._in_use -= 1
+            if pooled_slot and self.max_connections > 0:
+                displaced = self._idle.pop(db_path, None)
+                self._idle[db_path] = pooled
+                pooled = None
+        if displaced is not None:
+            self._close(displaced)
+        if pooled is not None:
+            self._close(pooled)
+
+    def close_idle(self) -> int:
+        """Close idle connections that have exceeded the idle timeout.
+
+        Returns:
+            Number of connections closed
+        """
+        with self._lock:
+            expired = self._expire_idle_locked(self._clock())
+        for pooled in expired:
+            self._close(pooled)
+        return len(expired)
+
+    def close_all(self) -> None:
+        """Close every idle connection held by the pool."""
+        with self._lock:
+            idle = list(self._idle.values())
+            self._idle.clear()
+        for pooled in idle:
+            self._close(pooled)
+        log_debug("Connection pool closed", {"closed": len(idle)})
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get pool counters for tuning.
+
+        Returns:
+            Dictionary with open, idle and in-use handle counts plus hit, miss,
+            eviction, expiration, health check failure and overflow counters
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._in_use
+            stats["open"] = len(self._idle) + self._in_use
+            stats["max_connections"] = self.max_connections
+        return stats
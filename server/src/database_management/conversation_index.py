@@ -0,0 +1,950 @@
+"""
+Persistent full-text index of conversation entries across every database.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from array import array
+from collections import Counter
+from contextlib import closing
+from typing import Any, Dict, Iterable, List
+from urllib.parse import unquote, urlparse
+
+from src.config.constants import GANDALF_INDEX_FILE
+from src.database_management.bm25_scorer import TermStatistics
+from src.database_management.conversation_source import (
+    ENTRY_TYPE_FIELDS,
+    IncrementalArrayReader,
+    Watermark,
+    entry_text,
+)
+from src.database_management.create_filters import SearchFilterBuilder
+from src.database_management.database_fingerprint import get_database_fingerprint
+from src.database_management.entry_timestamps import (
+    CONVERSATION_FIELDS,
+    UNDATED,
+    entry_timestamp_ms,
+)
+from src.database_management.execute_query import QueryExecutor
+from src.database_management.time_partitions import TimeWindow, partition_runs
+from src.utils.cancellation import raise_if_cancelled
+from src.utils.logger import log_debug, log_error
+
+# Shortest phrase the trigram tokenizer can match
+MIN_MATCH_LENGTH = 3
+
+# Fewest entries an id range holds before it is split at a time partition
+MIN_RANGE_ENTRIES = 64
+
+# Entries deleted per transaction by maintenance, so searches wait briefly
+MAINTENANCE_BATCH_ENTRIES = 500
+
+DAY_MS = 24 * 3600 * 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    db_path TEXT PRIMARY KEY,
+    workspace TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    wal_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    db_path TEXT NOT NULL,
+    entry_type TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    workspace TEXT NOT NULL,
+    timestamp_ms INTEGER,
+    text TEXT NOT NULL,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entry_ranges (
+    db_path TEXT NOT NULL,
+    entry_type TEXT NOT NULL,
+    first_id INTEGER NOT NULL,
+    last_id INTEGER NOT NULL,
+    start_ms INTEGER,
+    end_ms INTEGER,
+    undated INTEGER NOT NULL,
+    PRIMARY KEY (db_path, entry_type, first_id)
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    db_path TEXT NOT NULL,
+    entry_type TEXT NOT NULL,
+    entry_count INTEGER NOT NULL,
+    boundary_start INTEGER NOT NULL,
+    boundary_end INTEGER NOT NULL,
+    boundary_hash TEXT NOT NULL,
+    PRIMARY KEY (db_path, entry_type)
+);
+CREATE TABLE IF NOT EXISTS corpus_stats (
+    entry_type TEXT PRIMARY KEY,
+    document_count INTEGER NOT NULL,
+    total_length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS term_stats (
+    entry_type TEXT NOT NULL,
+    term TEXT NOT NULL,
+    document_count INTEGER NOT NULL,
+    PRIMARY KEY (entry_type, term)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_by_source
+    ON entries (db_path, entry_type, position);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    text, content='entries', content_rowid='id', tokenize='trigram'
+);
+"""
+
+
+class ConversationIndex:
+    """SQLite FTS5 index holding every prompt, generation and history entry.
+
+    Each row records the source database, entry type, position in the source
+    array, workspace and epoch-millisecond timestamp next to the raw entry.
+    ``refresh`` only reads sources whose fingerprint changed and drops
+    sources that are no longer discovered, so a search touches the index
+    alone. Within a changed source, each array is checked against its
+    watermark and only entries appended since the last refresh are decoded;
+    an array whose indexed prefix changed is ingested again in full.
+    Phrases are matched with the trigram tokenizer, which gives the same
+    case-insensitive substring semantics as the per-database search. BM25
+    term statistics per entry type are kept up to date as entries are
+    written and deleted. Each id range of a source array records the time
+    span of its entries and is cut where they move on to another week, so a
+    search bounded by dates passes over the ranges outside its window.
+    """
+
+    SCHEMA_VERSION = 4
+
+    _fts5_trigram: bool | None = None
+
+    def __init__(
+        self,
+        index_path: str | None = None,
+        query_executor: QueryExecutor | None = None,
+    ) -> None:
+        """Initialize the index.
+
+        Args:
+            index_path: Index database location, defaults to GANDALF_INDEX_FILE
+            query_executor: Executor used to open source databases
+        """
+        self.index_path = index_path if index_path is not None else GANDALF_INDEX_FILE
+        self.query_executor = query_executor or QueryExecutor()
+        self.filter_builder = SearchFilterBuilder()
+        self.reader = IncrementalArrayReader(self.query_executor)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self.last_stats: Dict[str, Any] = {}
+
+    @classmethod
+    def is_supported(cls) -> bool:
+        """Check once whether SQLite provides FTS5 with the trigram tokenizer."""
+        if cls._fts5_trigram is None:
+            try:
+                with closing(sqlite3.connect(":memory:")) as conn:
+                    conn.execute(
+                        "CREATE VIRTUAL TABLE probe USING fts5(text, tokenize='trigram')"
+                    )
+                cls._fts5_trigram = True
+            except sqlite3.Error:
+                cls._fts5_trigram = False
+        return cls._fts5_trigram
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the index database, rebuilding it on a schema version change.
+
+        Raises:
+            sqlite3.Error: If the index cannot be opened or created
+            OSError: If the index directory cannot be created
+        """
+        if self._conn is not None:
+            return self._conn
+
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The handle is shared by request threads and guarded by self._lock
+        conn = sqlite3.connect(self.index_path, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA busy_timeout = 5000")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != self.SCHEMA_VERSION:
+                with conn:
+                    for table in (
+                        "entries_fts",
+                        "entries",
+                        "entry_ranges",
+                        "watermarks",
+                        "corpus_stats",
+                        "term_stats",
+                        "sources",
+                    ):
+                        conn.execute(f"DROP TABLE IF EXISTS {table}")
+                    conn.executescript(SCHEMA)
+                    conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        except sqlite3.Error:
+            conn.close()
+            raise
+        self._conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Close the index database handle."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def resolve_workspace(db_path: str) -> str:
+        """Name the workspace a database belongs to.
+
+        Cursor keeps a ``workspace.json`` naming the opened folder next to
+        each workspace database. Anything else is identified by the directory
+        holding the database.
+
+        Args:
+            db_path: Path to the database file
+
+        Returns:
+            Workspace folder path, or the database's directory
+        """
+        directory = os.path.dirname(db_path)
+        try:
+            with open(
+                os.path.join(directory, "workspace.json"), "r", encoding="utf-8"
+            ) as f:
+                data = json.load(f)
+            folder = data.get("folder") or data.get("workspace")
+        except (OSError, ValueError, AttributeError):
+            return directory
+        if not isinstance(folder, str) or not folder:
+            return directory
+        if folder.startswith("file://"):
+            return unquote(urlparse(folder).path)
+        return folder
+
+    def _entry_rows(
+        self,
+        db_path: str,
+        entry_type: str,
+        workspace: str,
+        entries: Iterable[Any],
+        start: int = 0,
+    ) -> Iterable[tuple[Any, ...]]:
+        """Build index rows for consecutive entries of one source array."""
+        for position, entry in enumerate(entries, start):
+            yield (
+                db_path,
+                entry_type,
+                position,
+                workspace,
+                entry_timestamp_ms(entry),
+                entry_text(entry),
+                json.dumps(entry, ensure_ascii=False),
+            )
+
+    def _ingest_source(self, conn: sqlite3.Connection, db_path: str) -> int:
+        """Bring the indexed entries of one source database up to date.
+
+        Returns:
+            Number of entries written
+
+        Raises:
+            sqlite3.Error: If the source or the index cannot be accessed
+            ValueError: If a source value is not valid JSON
+        """
+        fingerprint = get_database_fingerprint(db_path)
+        if fingerprint is None:
+            raise OSError(f"Database not found: {db_path}")
+        workspace = self.resolve_workspace(db_path)
+        previous = {
+            row[0]: Watermark(*row[1:])
+            for row in conn.execute(
+                "SELECT entry_type, entry_count, boundary_start, boundary_end, "
+                "boundary_hash FROM watermarks WHERE db_path = ?",
+                (db_path,),
+            )
+        }
+        updates = self.reader.read_updates(db_path, previous)
+
+        written = 0
+        with conn:
+            for update in updates:
+                if update.reset:
+                    where = "db_path = ? AND entry_type = ?"
+                    params = (db_path, update.entry_type)
+                    self._delete_entries(conn, where, params)
+                    conn.execute(f"DELETE FROM entry_ranges WHERE {where}", params)
+            # Taken after the deletes, which may free the highest ids
+            indexed_id = self._last_id(conn)
+            for update in updates:
+                rows = list(
+                    self._entry_rows(
+                        db_path,
+                        update.entry_type,
+                        workspace,
+                        update.entries,
+                        update.position,
+                    )
+                )
+                conn.executemany(
+                    "INSERT INTO entries (db_path, entry_type, position, workspace, "
+                    "timestamp_ms, text, entry) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                written += len(rows)
+                statistics = TermStatistics()
+                for row in rows:
+                    statistics.add(row[5])
+                self._apply_term_statistics(conn, update.entry_type, statistics, 1)
+                if rows:
+                    first_id = self._last_id(conn) - len(rows) + 1
+                    conn.executemany(
+                        "INSERT INTO entry_ranges (db_path, entry_type, first_id, "
+                        "last_id, start_ms, end_ms, undated) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            (
+                                db_path,
+                                update.entry_type,
+                                first_id + first,
+                                first_id + last,
+                                start_ms,
+                                end_ms,
+                                undated,
+                            )
+                            for first, last, start_ms, end_ms, undated in (
+                                partition_runs(
+                                    [row[4] for row in rows], MIN_RANGE_ENTRIES
+                                )
+                            )
+                        ),
+                    )
+                if update.watermark is None:
+                    conn.execute(
+                        "DELETE FROM watermarks WHERE db_path = ? AND entry_type = ?",
+                        (db_path, update.entry_type),
+                    )
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO watermarks (db_path, entry_type, "
+                        "entry_count, boundary_start, boundary_end, boundary_hash) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            db_path,
+                            update.entry_type,
+                            update.watermark.entry_count,
+                            update.watermark.boundary_start,
+                            update.watermark.boundary_end,
+                            update.watermark.boundary_hash,
+                        ),
+                    )
+            # Indexing the new rows in one statement is several times faster
+            # than a per-row trigger
+            conn.execute(
+                "INSERT INTO entries_fts (rowid, text) "
+                "SELECT id, text FROM entries WHERE id > ?",
+                (indexed_id,),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sources "
+                "(db_path, workspace, size, mtime_ns, wal_size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    db_path,
+                    workspace,
+                    fingerprint.size,
+                    fingerprint.mtime_ns,
+                    fingerprint.wal_size,
+                ),
+            )
+        return written
+
+    @staticmethod
+    def _last_id(conn: sqlite3.Connection) -> int:
+        last_id: int = conn.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM entries"
+        ).fetchone()[0]
+        return last_id
+
+    @staticmethod
+    def _apply_term_statistics(
+        conn: sqlite3.Connection,
+        entry_type: str,
+        statistics: TermStatistics,
+        sign: int,
+    ) -> None:
+        """Add (sign 1) or subtract (sign -1) entries' BM25 term statistics."""
+        if not statistics.document_count:
+            return
+        conn.execute(
+            "INSERT INTO corpus_stats (entry_type, document_count, total_length) "
+            "VALUES (?, ?, ?) ON CONFLICT (entry_type) DO UPDATE SET "
+            "document_count = document_count + excluded.document_count, "
+            "total_length = total_length + excluded.total_length",
+            (
+                entry_type,
+                sign * statistics.document_count,
+                sign * statistics.total_length,
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO term_stats (entry_type, term, document_count) "
+            "VALUES (?, ?, ?) ON CONFLICT (entry_type, term) DO UPDATE SET "
+            "document_count = document_count + excluded.document_count",
+            (
+                (entry_type, term, sign * count)
+                for term, count in statistics.document_frequency.items()
+            ),
+        )
+        if sign < 0:
+            conn.executemany(
+                "DELETE FROM term_stats WHERE entry_type = ? AND term = ? "
+                "AND document_count <= 0",
+                ((entry_type, term) for term in statistics.document_frequency),
+            )
+
+    def _delete_entries(
+        self, conn: sqlite3.Connection, where: str, params: tuple[Any, ...]
+    ) -> None:
+        """Delete entries, their full-text postings and term statistics."""
+        removed: Dict[str, TermStatistics] = {}
+        for entry_type, text in conn.execute(
+            f"SELECT entry_type, text FROM entries WHERE {where}", params
+        ):
+            removed.setdefault(entry_type, TermStatistics()).add(text)
+        for entry_type, statistics in removed.items():
+            self._apply_term_statistics(conn, entry_type, statistics, -1)
+        conn.execute(
+            "INSERT INTO entries_fts (entries_fts, rowid, text) "
+            f"SELECT 'delete', id, text FROM entries WHERE {where}",
+            params,
+        )
+        conn.execute(f"DELETE FROM entries WHERE {where}", params)
+
+    def _remove_source(self, conn: sqlite3.Connection, db_path: str) -> None:
+        with conn:
+            self._delete_entries(conn, "db_path = ?", (db_path,))
+            conn.execute("DELETE FROM entry_ranges WHERE db_path = ?", (db_path,))
+            conn.execute("DELETE FROM watermarks WHERE db_path = ?", (db_path,))
+            conn.execute("DELETE FROM sources WHERE db_path = ?", (db_path,))
+
+    def _delete_batches(
+        self, conn: sqlite3.Connection, select_ids: str, params: tuple[Any, ...]
+    ) -> int:
+        """Delete the entries a query selects, one short transaction at a time.
+
+        The lock is released between batches, so searches only wait for
+        one batch rather than the whole deletion.
+
+        Returns:
+            Number of entries deleted
+        """
+        with self._lock:
+            ids = [row[0] for row in conn.execute(select_ids, params)]
+        for start in range(0, len(ids), MAINTENANCE_BATCH_ENTRIES):
+            batch = ids[start : start + MAINTENANCE_BATCH_ENTRIES]
+            with self._lock, conn:
+                self._delete_entries(
+                    conn, f"id IN ({', '.join('?' * len(batch))})", tuple(batch)
+                )
+        return len(ids)
+
+    @staticmethod
+    def _used_bytes(conn: sqlite3.Connection) -> int:
+        """Bytes of the pages in use, not counting free pages."""
+        page_size, page_count, free_pages = (
+            conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+            for pragma in ("page_size", "page_count", "freelist_count")
+        )
+        return int(page_size * (page_count - free_pages))
+
+    def maintain(self, max_bytes: int, retention_days: float) -> Dict[str, Any]:
+        """Apply retention and the size budget, merge segments and vacuum.
+
+        Entries older than the retention period are deleted, then the oldest
+        remaining entries until the pages in use fit the budget; undated
+        entries go last. Sources stay indexed, so only entries appended
+        later are ingested again. The full-text segments are merged into
+        one and the file is vacuumed when deletions left free pages.
+
+        Args:
+            max_bytes: Size budget of the index, 0 or less for none
+            retention_days: Age after which entries are deleted, 0 or less
+                to keep every entry
+
+        Returns:
+            Counters and file sizes of the run
+
+        Raises:
+            sqlite3.Error: If the index database cannot be used
+            OSError: If the index directory cannot be created
+        """
+        started = time.perf_counter()
+        with self._lock:
+            conn = self._connect()
+        size_before = self._file_bytes()
+        stats: Dict[str, Any] = {"expired_entries": 0, "evicted_entries": 0}
+
+        if retention_days > 0:
+            cutoff_ms = int(time.time() * 1000 - retention_days * DAY_MS)
+            stats["expired_entries"] = self._delete_batches(
+                conn,
+                "SELECT id FROM entries WHERE timestamp_ms < ?",
+                (cutoff_ms,),
+            )
+
+        if max_bytes > 0:
+            with self._lock:
+                used_bytes = self._used_bytes(conn)
+                entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if used_bytes > max_bytes and entries:
+                # Entries are evicted by their average share of the used pages
+                excess = -(-(used_bytes - max_bytes) * entries // used_bytes)
+                stats["evicted_entries"] = self._delete_batches(
+                    conn,
+                    "SELECT id FROM entries "
+                    "ORDER BY timestamp_ms IS NULL, timestamp_ms, id LIMIT ?",
+                    (excess,),
+                )
+
+        with self._lock, conn:
+            if stats["expired_entries"] or stats["evicted_entries"]:
+                # Freed top ids are reused, so ranges must not reach past
+                # their remaining entries
+                conn.execute(
+                    "DELETE FROM entry_ranges WHERE NOT EXISTS (SELECT 1 FROM "
+                    "entries WHERE id BETWEEN entry_ranges.first_id "
+                    "AND entry_ranges.last_id)"
+                )
+                conn.execute(
+                    "UPDATE entry_ranges SET "
+                    "first_id = (SELECT MIN(id) FROM entries WHERE id BETWEEN "
+                    "entry_ranges.first_id AND entry_ranges.last_id), "
+                    "last_id = (SELECT MAX(id) FROM entries WHERE id BETWEEN "
+                    "entry_ranges.first_id AND entry_ranges.last_id)"
+                )
+            conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('optimize')")
+
+        with self._lock:
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free_pages:
+                conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        stats.update(
+            {
+                "vacuumed": bool(free_pages),
+                "size_before_bytes": size_before,
+                "size_bytes": self._file_bytes(),
+                "maintenance_ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+        )
+        return stats
+
+    def _file_bytes(self) -> int:
+        """Size of the index file and its write-ahead log."""
+        size = 0
+        for path in (self.index_path, f"{self.index_path}-wal"):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
+
+    def refresh(self, db_paths: List[str]) -> Dict[str, str]:
+        """Bring the index up to date with the given source databases.
+
+        Sources whose fingerprint is unchanged are skipped without being
+        opened. Sources missing from ``db_paths`` are removed. A source that
+        fails to ingest is removed too, so it is retried on the next refresh.
+
+        Args:
+            db_paths: Every currently discovered database path
+
+        Returns:
+            Error messages keyed by the database paths that failed to ingest
+
+        Raises:
+            sqlite3.Error: If the index database itself cannot be used
+            OSError: If the index directory cannot be created
+        """
+        started = time.perf_counter()
+        errors: Dict[str, str] = {}
+        stats: Dict[str, Any] = {
+            "ingested_sources": 0,
+            "unchanged_sources": 0,
+            "ingested_entries": 0,
+        }
+
+        with self._lock:
+            conn = self._connect()
+            indexed = {
+                row[0]: tuple(row[1:])
+                for row in conn.execute(
+                    "SELECT db_path, size, mtime_ns, wal_size FROM sources"
+                )
+            }
+            wanted = set(db_paths)
+            for db_path in indexed.keys() - wanted:
+                self._remove_source(conn, db_path)
+
+            for db_path in dict.fromkeys(db_paths):
+                # Sources ingested so far stay indexed
+                raise_if_cancelled()
+                fingerprint = get_database_fingerprint(db_path)
+                if fingerprint is not None and indexed.get(db_path) == (
+                    fingerprint.size,
+                    fingerprint.mtime_ns,
+                    fingerprint.wal_size,
+                ):
+                    stats["unchanged_sources"] += 1
+                    continue
+                try:
+                    stats["ingested_entries"] += self._ingest_source(conn, db_path)
+                    stats["ingested_sources"] += 1
+                except (sqlite3.Error, OSError, ValueError) as e:
+                    error_msg = f"Index ingest error: {str(e)}"
+                    log_error(error_msg, {"traceback": traceback.format_exc()})
+                    errors[db_path] = error_msg
+                    self._remove_source(conn, db_path)
+
+        stats["refresh_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self.last_stats = stats
+        log_debug("Conversation index refreshed", stats)
+        return errors
+
+    def _match_clause(self, phrases: List[str]) -> tuple[str, List[str], bool]:
+        """Build the condition selecting entries that match any phrase.
+
+        Phrases the trigram tokenizer can handle become one FTS5 query; if any
+        phrase is too short for it, every phrase is matched with LIKE instead.
+
+        Returns:
+            Tuple of (condition, params, uses_fts)
+        """
+        if all(len(phrase) >= MIN_MATCH_LENGTH for phrase in phrases):
+            query = " OR ".join(
+                '"' + phrase.replace('"', '""') + '"' for phrase in phrases
+            )
+            return "entries_fts MATCH ?", [query], True
+        conditions, params = self.filter_builder.build_search_conditions(
+            phrases, column="text"
+        )
+        return "(" + " OR ".join(conditions) + ")", params, False
+
+    def _fts_matches(
+        self,
+        conn: sqlite3.Connection,
+        ranges: List[tuple[str, str, int, int]],
+        match_params: List[Any],
+        limit: int,
+        window: TimeWindow | None = None,
+    ) -> List[tuple[str, str, int | None, str]]:
+        """Pick the newest full-text matches of each source and type.
+
+        The FTS5 query runs once and only yields rowids, newest first. Each
+        source and type owns id ranges, so rowids are assigned to them by
+        walking the ranges in the same descending order, and only the chosen
+        entries are read back.
+
+        Args:
+            conn: Index database connection
+            ranges: (db_path, entry_type, first_id, last_id) id ranges to
+                search, ordered by first_id descending
+            match_params: FTS5 query parameter
+            limit: Maximum entries per source and type, 0 or less for all
+            window: Dates the matches must fall in
+
+        Returns:
+            (db_path, entry_type, timestamp_ms, entry JSON) rows in id order
+        """
+        open_groups = len(
+            {(db_path, entry_type) for db_path, entry_type, _, _ in ranges}
+        )
+        counts: Dict[tuple[str, str], int] = {}
+        chosen: Dict[int, tuple[str, str]] = {}
+        current = 0
+        if window is None:
+            query = (
+                "SELECT rowid FROM entries_fts WHERE entries_fts MATCH ? "
+                "ORDER BY rowid DESC"
+            )
+        else:
+            window_clause, window_params = self._window_clause(window)
+            query = (
+                "SELECT entries_fts.rowid FROM entries_fts "
+                "JOIN entries ON entries.id = entries_fts.rowid "
+                f"WHERE entries_fts MATCH ? AND {window_clause} "
+                "ORDER BY entries_fts.rowid DESC"
+            )
+            match_params = [*match_params, *window_params]
+        with closing(conn.execute(query, match_params)) as cursor:
+            for (rowid,) in cursor:
+                while current < len(ranges) and ranges[current][2] > rowid:
+                    current += 1
+                if current == len(ranges):
+                    break
+                db_path, entry_type, _, last_id = ranges[current]
+                if rowid > last_id:
+                    continue
+                count = counts.get((db_path, entry_type), 0)
+                if 0 < limit <= count:
+                    continue
+                counts[(db_path, entry_type)] = count + 1
+                chosen[rowid] = (db_path, entry_type)
+                if count + 1 == limit:
+                    open_groups -= 1
+                    if open_groups == 0:
+                        break
+
+        rows: List[tuple[str, str, int | None, str]] = []
+        ids = sorted(chosen)
+        # Stay well under SQLite's bound parameter limit
+        for start in range(0, len(ids), 500):
+            batch = ids[start : start + 500]
+            placeholders = ", ".join("?" for _ in batch)
+            for rowid, timestamp_ms, entry in conn.execute(
+                "SELECT id, timestamp_ms, entry FROM entries "
+                f"WHERE id IN ({placeholders}) ORDER BY id",
+                batch,
+            ):
+                rows.append((*chosen[rowid], timestamp_ms, entry))
+        return rows
+
+    def _recent_entries(
+        self,
+        conn: sqlite3.Connection,
+        ranges: List[tuple[str, str, int, int]],
+        match_clause: str,
+        match_params: List[Any],
+        limit: int,
+    ) -> List[tuple[str, str, int | None, str]]:
+        """Read the newest entries of each source and type, optionally filtered.
+
+        One index seek per source and type reads backward from the newest
+        entry and stops after ``limit`` rows.
+
+        Returns:
+            (db_path, entry_type, timestamp_ms, entry JSON) rows, oldest first
+            per group
+        """
+        query = (
+            "SELECT timestamp_ms, entry FROM entries "
+            "WHERE db_path = ? AND entry_type = ? "
+            + (f"AND {match_clause} " if match_clause else "")
+            + "ORDER BY position DESC LIMIT ?"
+        )
+        rows: List[tuple[str, str, int | None, str]] = []
+        for db_path, entry_type in dict.fromkeys(
+            (db_path, entry_type) for db_path, entry_type, _, _ in ranges
+        ):
+            recent = conn.execute(
+                query,
+                [db_path, entry_type, *match_params, limit if limit > 0 else -1],
+            ).fetchall()
+            rows.extend(
+                (db_path, entry_type, timestamp_ms, entry)
+                for timestamp_ms, entry in reversed(recent)
+            )
+        return rows
+
+    @staticmethod
+    def _window_clause(window: TimeWindow) -> tuple[str, List[int]]:
+        """Build the condition keeping undated entries and those in a window."""
+        conditions: List[str] = []
+        params: List[int] = []
+        if window.start_ms is not None:
+            conditions.append("timestamp_ms >= ?")
+            params.append(window.start_ms)
+        if window.end_ms is not None:
+            conditions.append("timestamp_ms <= ?")
+            params.append(window.end_ms)
+        if not conditions:
+            return "1", params
+        return (
+            "(timestamp_ms IS NULL OR (" + " AND ".join(conditions) + "))",
+            params,
+        )
+
+    def search(
+        self,
+        db_paths: List[str],
+        limit: int,
+        phrases: List[str] | None = None,
+        include_prompts: bool = True,
+        include_generations: bool = True,
+        include_history: bool = True,
+        window: TimeWindow | None = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Find entries in the index, shaped like per-database query results.
+
+        Each source contributes at most ``limit`` entries per type: the most
+        recent matches when phrases are given, otherwise the most recent
+        entries. Entries keep their source order. With a window, id ranges
+        whose time span lies outside it are skipped and only entries that
+        are undated or fall in it are returned.
+
+        Args:
+            db_paths: Databases to return results for
+            limit: Maximum entries per source and type, 0 or less for all
+            phrases: Phrases of which any must appear in the entry text
+            include_prompts: Whether to return prompts
+            include_generations: Whether to return generations
+            include_history: Whether to return history entries
+            window: Dates the entries must fall in
+
+        Returns:
+            Conversation data dictionaries keyed by database path, with the
+            indexed epoch-millisecond timestamps of each entry list under
+            "timestamps"
+
+        Raises:
+            sqlite3.Error: If the index database cannot be queried
+        """
+        results: Dict[str, Dict[str, Any]] = {
+            db_path: {
+                "prompts": [],
+                "generations": [],
+                "history_entries": [],
+                "database_path": db_path,
+                "error": None,
+                "timestamps": {field: array("q") for field in CONVERSATION_FIELDS},
+            }
+            for db_path in db_paths
+        }
+        entry_types = [
+            entry_type
+            for entry_type, included in (
+                ("prompt", include_prompts),
+                ("generation", include_generations),
+                ("history", include_history),
+            )
+            if included
+        ]
+        phrases = [phrase for phrase in phrases or [] if phrase]
+        if not entry_types or not results:
+            return results
+
+        type_placeholders = ", ".join("?" for _ in entry_types)
+        match_clause, match_params, uses_fts = (
+            self._match_clause(phrases) if phrases else ("", [], False)
+        )
+        clause_params: List[Any] = list(match_params)
+        if window is not None and not uses_fts:
+            window_clause, window_params = self._window_clause(window)
+            match_clause = (
+                f"{match_clause} AND {window_clause}" if match_clause else window_clause
+            )
+            clause_params.extend(window_params)
+        with self._lock:
+            conn = self._connect()
+            ranges = [
+                (db_path, entry_type, first_id, last_id)
+                for (
+                    db_path,
+                    entry_type,
+                    first_id,
+                    last_id,
+                    start_ms,
+                    end_ms,
+                    undated,
+                ) in conn.execute(
+                    "SELECT db_path, entry_type, first_id, last_id, start_ms, "
+                    "end_ms, undated FROM entry_ranges "
+                    f"WHERE entry_type IN ({type_placeholders}) "
+                    "ORDER BY first_id DESC",
+                    entry_types,
+                )
+                if db_path in results
+                and (window is None or undated or window.overlaps(start_ms, end_ms))
+            ]
+            if uses_fts:
+                rows = self._fts_matches(conn, ranges, match_params, limit, window)
+            else:
+                rows = self._recent_entries(
+                    conn, ranges, match_clause, clause_params, limit
+                )
+
+        for db_path, entry_type, timestamp_ms, entry in rows:
+            conv_data = results.get(db_path)
+            if conv_data is not None:
+                field = ENTRY_TYPE_FIELDS[entry_type]
+                conv_data[field].append(json.loads(entry))
+                conv_data["timestamps"][field].append(
+                    UNDATED if timestamp_ms is None else timestamp_ms
+                )
+        return results
+
+    def term_statistics(
+        self, entry_types: List[str], terms: Iterable[str]
+    ) -> TermStatistics:
+        """Read the BM25 statistics of the indexed entries of some types.
+
+        Args:
+            entry_types: Entry types making up the corpus
+            terms: Terms whose document frequencies are needed
+
+        Returns:
+            Statistics with document frequencies for the given terms only
+
+        Raises:
+            sqlite3.Error: If the index database cannot be queried
+        """
+        terms = list(dict.fromkeys(terms))
+        statistics = TermStatistics()
+        if not entry_types:
+            return statistics
+        type_placeholders = ", ".join("?" for _ in entry_types)
+        with self._lock:
+            conn = self._connect()
+            statistics.document_count, statistics.total_length = conn.execute(
+                "SELECT COALESCE(SUM(document_count), 0), "
+                "COALESCE(SUM(total_length), 0) FROM corpus_stats "
+                f"WHERE entry_type IN ({type_placeholders})",
+                entry_types,
+            ).fetchone()
+            if terms:
+                term_placeholders = ", ".join("?" for _ in terms)
+                statistics.document_frequency = Counter(
+                    dict(
+                        conn.execute(
+                            "SELECT term, SUM(document_count) FROM term_stats "
+                            f"WHERE entry_type IN ({type_placeholders}) "
+                            f"AND term IN ({term_placeholders}) GROUP BY term",
+                            [*entry_types, *terms],
+                        )
+                    )
+                )
+        return statistics
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size and the counters of the last refresh.
+
+        Returns:
+            Dictionary with source and entry counts, index file size and the
+            last refresh counters
+        """
+        with self._lock:
+            conn = self._connect()
+            sources = conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        try:
+            size_bytes = os.path.getsize(self.index_path)
+        except OSError:
+            size_bytes = 0
+        return {
+            "sources": sources,
+            "entries": entries,
+            "size_bytes": size_bytes,
+            **self.last_stats,
+        }
@@ -0,0 +1,259 @@
+"""
+Incremental reading of the conversation arrays of source databases.
+"""
+
+import hashlib
+import json
+import sqlite3
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List
+
+from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+from src.database_management.create_filters import SearchFilterBuilder
+from src.database_management.execute_query import QueryExecutor
+from src.database_management.stream_blob import BlobStreamReader
+
+# ItemTable key -> (entry type, conversation data field)
+INDEXED_KEYS = {
+    RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"]: ("prompt", "prompts"),
+    RECALL_CONVERSATIONS_QUERIES["GENERATIONS_KEY"]: ("generation", "generations"),
+    RECALL_CONVERSATIONS_QUERIES["HISTORY_KEY"]: ("history", "history_entries"),
+}
+ENTRY_TYPE_FIELDS = {entry_type: field for entry_type, field in INDEXED_KEYS.values()}
+
+JSON_WHITESPACE = b" \t\r\n"
+
+ByteReader = Callable[[int, int], bytes]
+
+
+def entry_text(entry: Any) -> str:
+    """Return the text phrases are matched against for one entry.
+
+    Mirrors OutputFormatter._extract_text_content, so anything the
+    formatter would score as a match is a match in an index too.
+    """
+    if isinstance(entry, dict):
+        for field in SearchFilterBuilder.ENTRY_TEXT_FIELDS:
+            value = entry.get(field)
+            if value:
+                return str(value)
+    return str(entry)
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """How much of one source array is indexed.
+
+    The boundary is the byte span of the last indexed entry in the stored
+    value. Arrays only grow by appending, so while the same bytes still sit
+    at the same offsets everything before them is taken to be unchanged.
+    """
+
+    entry_count: int
+    boundary_start: int
+    boundary_end: int
+    boundary_hash: str
+
+
+@dataclass
+class KeyUpdate:
+    """Entries read from one source array and the watermark they lead to."""
+
+    entry_type: str
+    entries: List[Any]
+    position: int
+    reset: bool
+    watermark: Watermark | None
+
+
+class IncrementalArrayReader:
+    """Reads what was appended to each conversation array since a watermark.
+
+    Every array is checked against its watermark: while the bytes of the
+    last read entry still sit at the same offsets, only the entries after
+    them are decoded. An array whose read prefix changed is decoded again in
+    full, one element at a time.
+    """
+
+    def __init__(self, query_executor: QueryExecutor | None = None) -> None:
+        """Initialize the reader.
+
+        Args:
+            query_executor: Executor used to open source databases
+        """
+        self.query_executor = query_executor or QueryExecutor()
+        self.tail_decoder = self.query_executor.tail_decoder
+        self.stream_reader = BlobStreamReader(decoder=self.tail_decoder)
+
+    @contextmanager
+    def _open_value(
+        self, source: sqlite3.Connection, rowid: int
+    ) -> Iterator[ByteReader]:
+        """Yield a reader over the raw bytes of one ItemTable value.
+
+        Uses incremental blob I/O when the executor streams blobs, and
+        ``substr`` on the row otherwise.
+        """
+        if self.query_executor.blob_reader is not None:
+            # Connection.blobopen is only available from Python 3.11
+            blobopen = getattr(source, "blobopen")
+            with closing(blobopen("ItemTable", "value", rowid, readonly=True)) as blob:
+
+                def read(lo: int, hi: int) -> bytes:
+                    chunk: bytes = blob[lo:hi]
+                    return chunk
+
+                yield read
+            return
+
+        def read_substr(lo: int, hi: int) -> bytes:
+            row = source.execute(
+                "SELECT substr(CAST(value AS BLOB), ?, ?) FROM ItemTable "
+                "WHERE rowid = ?",
+                (lo + 1, hi - lo, rowid),
+            ).fetchone()
+            return bytes(row[0]) if row is not None and row[0] is not None else b""
+
+        yield read_substr
+
+    @staticmethod
+    def _hash(boundary: bytes) -> str:
+        return hashlib.sha1(boundary).hexdigest()
+
+    def _watermark(
+        self, read: ByteReader, close: int, entry_count: int
+    ) -> Watermark | None:
+        """Record the span of the last entry of an array ending at ``close``.
+
+        An empty array records its opening bracket instead.
+        """
+        start = (
+            self.tail_decoder.find_tail_start(read, close, 1)
+            if entry_count > 0
+            else None
+        )
+        if start is None:
+            head = read(0, min(close, 64))
+            stripped = head.lstrip(JSON_WHITESPACE)
+            if not stripped.startswith(b"["):
+                return None
+            bracket = len(head) - len(stripped)
+            if entry_count == 0:
+                return Watermark(0, bracket, bracket + 1, self._hash(b"["))
+            # A single entry starts right after the opening bracket
+            start = bracket + 1
+        element = read(start, close)
+        stripped = element.strip(JSON_WHITESPACE)
+        if not stripped:
+            return None
+        boundary_start = start + len(element) - len(element.lstrip(JSON_WHITESPACE))
+        return Watermark(
+            entry_count=entry_count,
+            boundary_start=boundary_start,
+            boundary_end=boundary_start + len(stripped),
+            boundary_hash=self._hash(stripped),
+        )
+
+    def _read_appended(
+        self, read: ByteReader, close: int, previous: Watermark
+    ) -> tuple[List[Any], Watermark | None] | None:
+        """Decode the entries appended after a watermark.
+
+        Returns:
+            Tuple of (new entries, watermark after them), or None when the
+            indexed prefix no longer matches and the array must be re-read
+        """
+        if previous.boundary_end > close:
+            return None
+        boundary = read(previous.boundary_start, previous.boundary_end)
+        if self._hash(boundary) != previous.boundary_hash:
+            return None
+        tail = read(previous.boundary_end, close).lstrip(JSON_WHITESPACE)
+        if not tail:
+            return [], previous
+        if previous.entry_count > 0:
+            if not tail.startswith(b","):
+                return None
+            tail = tail[1:]
+        try:
+            entries = json.loads(b"[" + tail + b"]")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        if not isinstance(entries, list) or not entries:
+            return None
+        entry_count = previous.entry_count + len(entries)
+        return entries, self._watermark(read, close, entry_count)
+
+    def _read_key(
+        self,
+        read: ByteReader,
+        length: int,
+        entry_type: str,
+        previous: Watermark | None,
+    ) -> KeyUpdate:
+        """Read what changed in one source array since its watermark.
+
+        Raises:
+            json.JSONDecodeError: If the value is not valid JSON
+            UnicodeDecodeError: If the value is not valid UTF-8
+        """
+        close = BlobStreamReader.find_closing_bracket(read, length)
+        if previous is not None and close is not None:
+            appended = self._read_appended(read, close, previous)
+            if appended is not None:
+                entries, watermark = appended
+                return KeyUpdate(
+                    entry_type, entries, previous.entry_count, False, watermark
+                )
+
+        entries = list(self.stream_reader.iter_array(read, length))
+        watermark = (
+            self._watermark(read, close, len(entries)) if close is not None else None
+        )
+        return KeyUpdate(entry_type, entries, 0, True, watermark)
+
+    def read_updates(
+        self, db_path: str, previous: Dict[str, Watermark]
+    ) -> List[KeyUpdate]:
+        """Read the new entries of every indexed key of one source database.
+
+        Args:
+            db_path: Path to the source database
+            previous: Watermarks from the last read, keyed by entry type
+
+        Returns:
+            One update per indexed key, in INDEXED_KEYS order
+
+        Raises:
+            sqlite3.Error: If the database cannot be read
+            ValueError: If a value is not valid JSON
+        """
+        keys = list(INDEXED_KEYS)
+        placeholders = ", ".join("?" for _ in keys)
+        updates: List[KeyUpdate] = []
+        with self.query_executor.open_connection(db_path) as source:
+            found = {
+                key: (rowid, length)
+                for key, rowid, length in source.execute(
+                    "SELECT key, rowid, CASE typeof(value) WHEN 'blob' THEN length(value) "
+                    "ELSE length(CAST(value AS BLOB)) END FROM ItemTable "
+                    f"WHERE key IN ({placeholders})",
+                    keys,
+                )
+            }
+            for key, (entry_type, _) in INDEXED_KEYS.items():
+                rowid, length = found.get(key, (None, None))
+                if rowid is None or length is None:
+                    updates.append(KeyUpdate(entry_type, [], 0, True, None))
+                    continue
+                try:
+                    with self._open_value(source, rowid) as read:
+                        updates.append(
+                            self._read_key(
+                                read, length, entry_type, previous.get(entry_type)
+                            )
+                        )
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    raise ValueError(f"Error parsing {key}: {e}") from e
+        return updates
@@ -4,65 +4,25 @@ Conversation threading to pair prompts with corresponding generations.
 
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.database_management.entry_timestamps import UNDATED, entry_timestamps
 
 logger = logging.getLogger(__name__)
 
+# Largest gap between a prompt and a generation in the same time window
+THREAD_WINDOW_MS = 300 * 1000
+
 
 class ConversationThreader:
     """Threads conversations by matching prompts with corresponding generations."""
 
-    def _extract_timestamp(self, entry: Dict[str, Any]) -> Optional[datetime]:
-        """Extract timestamp from conversation entry.
-
-        Args:
-            entry: Conversation entry dictionary.
-
-        Returns:
-            Datetime object if found, None otherwise.
-        """
-        if not isinstance(entry, dict):
-            return None
-
-        timestamp_fields = ["timestamp", "createdAt", "date", "time", "created_at"]
-
-        for field in timestamp_fields:
-            if field in entry:
-                value = entry[field]
-                if isinstance(value, (int, float)):
-                    if value > 1e10:  # Milliseconds
-                        value = value / 1000
-                    return datetime.fromtimestamp(value, tz=timezone.utc)
-                elif isinstance(value, str):
-                    try:
-                        return datetime.fromisoformat(value.replace("Z", "+00:00"))
-                    except (ValueError, AttributeError):
-                        pass
-
-        return None
-
-    def _time_window_match(
-        self, prompt_time: Optional[datetime], gen_time: Optional[datetime]
-    ) -> bool:
-        """Check if generation is within reasonable time window of prompt.
-
-        Args:
-            prompt_time: Prompt timestamp.
-            gen_time: Generation timestamp.
-
-        Returns:
-            True if within 5 minute window, False otherwise.
-        """
-        if prompt_time is None or gen_time is None:
-            return False
-
-        time_diff = abs((gen_time - prompt_time).total_seconds())
-        return time_diff <= 300  # 5 minutes
-
     def thread_conversations(
         self,
         prompts: List[Dict[str, Any]],
         generations: List[Dict[str, Any]],
+        prompt_timestamps: Optional[Sequence[int]] = None,
+        generation_timestamps: Optional[Sequence[int]] = None,
     ) -> List[Dict[str, Any]]:
         """Thread conversations by pairing prompts with generations.
 
@@ -74,6 +34,9 @@ class ConversationThreader:
         Args:
             prompts: List of prompt dictionaries.
             generations: List of generation dictionaries.
+            prompt_timestamps: Normalized epoch-millisecond timestamps parallel
+                to ``prompts``, UNDATED where missing; computed if not given.
+            generation_timestamps: Likewise for ``generations``.
 
         Returns:
             List of threaded conversation dictionaries with structure:
@@ -91,8 +54,16 @@ class ConversationThreader:
         threaded: List[Dict[str, Any]] = []
         used_generations = set()
 
-        prompt_times = [self._extract_timestamp(p) for p in prompts]
-        gen_times = [self._extract_timestamp(g) for g in generations]
+        prompt_times = (
+            entry_timestamps(prompts)
+            if prompt_timestamps is None
+            else prompt_timestamps
+        )
+        gen_times = (
+            entry_timestamps(generations)
+            if generation_timestamps is None
+            else generation_timestamps
+        )
 
         for i, prompt in enumerate(prompts):
             prompt_time = prompt_times[i]
@@ -116,7 +87,11 @@ class ConversationThreader:
                 else:
                     score += 0.5 / abs(j - i)
 
-                if self._time_window_match(prompt_time, gen_time):
+                if (
+                    prompt_time != UNDATED
+                    and gen_time != UNDATED
+                    and abs(gen_time - prompt_time) <= THREAD_WINDOW_MS
+                ):
                     score += 1.0
 
                 if score > best_match_score:
@@ -127,7 +102,9 @@ class ConversationThreader:
                 generation = generations[best_match_idx]
                 used_generations.add(best_match_idx)
 
-                thread_time = prompt_time or gen_times[best_match_idx]
+                thread_time = (
+                    prompt_time if prompt_time != UNDATED else gen_times[best_match_idx]
+                )
 
                 threaded.append(
                     {
@@ -158,9 +135,16 @@ class ConversationThreader:
                     }
                 )
 
-        threaded.sort(
-            key=lambda x: x["timestamp"] if x["timestamp"] else datetime.min,
-            reverse=True,
-        )
+        # Sort on the integer timestamps, undated threads last
+        threaded.sort(key=lambda x: x["timestamp"], reverse=True)
+        for thread in threaded:
+            thread["timestamp"] = self._to_datetime(thread["timestamp"])
 
         return threaded
+
+    @staticmethod
+    def _to_datetime(timestamp_ms: int) -> Optional[datetime]:
+        """Convert a normalized timestamp back to an aware datetime."""
+        if timestamp_ms == UNDATED:
+            return None
+        return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
@@ -8,8 +8,12 @@ from typing import List
 class SearchFilterBuilder:
     """Builds SQL search conditions and parameters for phrase matching."""
 
+    # Entry fields checked in order for the text that phrases are matched
+    # against, mirroring OutputFormatter._extract_text_content
+    ENTRY_TEXT_FIELDS = ("text", "textDescription", "content", "message")
+
     def build_search_conditions(
-        self, phrases: List[str]
+        self, phrases: List[str], column: str = "value"
     ) -> tuple[List[str], List[str]]:
         """Build SQL search conditions for exact phrase matching.
 
@@ -17,6 +21,7 @@ class SearchFilterBuilder:
 
         Args:
             phrases: List of exact phrases to search for (case-insensitive)
+            column: Column or expression alias the phrases are matched against
 
         Returns:
             Tuple of (search_conditions, search_params)
@@ -30,7 +35,29 @@ class SearchFilterBuilder:
 
         for phrase in phrases:
             if phrase:
-                conditions.append("value LIKE ?")
+                conditions.append(f"{column} LIKE ?")
                 params.append(f"%{phrase}%")
 
         return conditions, params
+
+    def build_entry_text_expression(self, entry_alias: str = "entry") -> str:
+        """Build the SQL expression for the searchable text of a json_each row.
+
+        Objects use the first non-empty text field and fall back to their
+        JSON text; any other element is matched as-is.
+
+        Args:
+            entry_alias: Alias of the json_each table-valued function
+
+        Returns:
+            SQL expression text
+        """
+        fields = ", ".join(
+            f"NULLIF(json_extract({entry_alias}.value, '$.{field}'), '')"
+            for field in self.ENTRY_TEXT_FIELDS
+        )
+        return (
+            f"CASE WHEN {entry_alias}.type = 'object' "
+            f"THEN COALESCE({fields}, {entry_alias}.value) "
+            f"ELSE {entry_alias}.value END"
+        )
@@ -0,0 +1,43 @@
+"""
+Snapshot fingerprints for conversation database files.
+"""
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class DatabaseFingerprint:
+    """Cheap stat-based identity of a database file and its write-ahead log."""
+
+    size: int
+    mtime_ns: int
+    wal_size: int
+
+
+def get_database_fingerprint(db_path: str) -> DatabaseFingerprint | None:
+    """Stat a database file and its WAL to build a snapshot fingerprint.
+
+    Any committed write changes the size or mtime of either the database or
+    its ``-wal`` file, so two equal fingerprints mean the readable content is
+    unchanged.
+
+    Args:
+        db_path: Path to the database file
+
+    Returns:
+        DatabaseFingerprint, or None if the database file cannot be stat'ed
+    """
+    try:
+        db_stat = os.stat(db_path)
+    except OSError:
+        return None
+
+    try:
+        wal_size = os.stat(f"{db_path}-wal").st_size
+    except OSError:
+        wal_size = 0
+
+    return DatabaseFingerprint(
+        size=db_stat.st_size, mtime_ns=db_stat.st_mtime_ns, wal_size=wal_size
+    )
@@ -0,0 +1,188 @@
+"""
+Tail-only decoding of JSON arrays stored in ItemTable values.
+"""
+
+import json
+import re
+from typing import Any, Callable, List
+
+from src.config.constants import BLOB_STREAM_CHUNK_BYTES
+
+ChunkReader = Callable[[int, int], str | bytes]
+
+
+class JsonTailDecoder:
+    """Decodes only the last N elements of a top-level JSON array.
+
+    The value is scanned backward from the closing bracket one chunk at a
+    time, jumping between structural characters with a regex, until N top-level commas have been
+    seen. Only that suffix is handed to ``json.loads``, so the cost scales
+    with the size of the tail rather than the whole value. Any input the
+    scan cannot make sense of is decoded in full instead.
+    """
+
+    STRUCTURAL_STR = re.compile(r'["\[\]{},]')
+    STRUCTURAL_BYTES = re.compile(rb'["\[\]{},]')
+    WHITESPACE = " \t\r\n"
+
+    def __init__(self, chunk_size: int = BLOB_STREAM_CHUNK_BYTES) -> None:
+        """Initialize the decoder.
+
+        Args:
+            chunk_size: Bytes or characters scanned per backward step
+        """
+        self.chunk_size = chunk_size
+
+    def _is_escaped(
+        self, chunk: str | bytes, rel: int, lo: int, read: ChunkReader
+    ) -> bool:
+        """Check whether the quote at ``chunk[rel]`` is escaped.
+
+        A quote is escaped when preceded by an odd run of backslashes. Runs
+        that reach the start of the chunk continue into earlier bytes.
+        """
+        backslash: str | int = "\\" if isinstance(chunk, str) else 0x5C
+        run = 0
+        index = rel - 1
+        while index >= 0 and chunk[index] == backslash:
+            run += 1
+            index -= 1
+        if index < 0:
+            offset = lo - 1
+            while offset >= 0 and read(offset, offset + 1)[0] == backslash:
+                run += 1
+                offset -= 1
+        return run % 2 == 1
+
+    def find_tail_start(self, read: ChunkReader, close: int, count: int) -> int | None:
+        """Find where the last ``count`` elements of the array begin.
+
+        Args:
+            read: Returns the encoded value between two offsets
+            close: Offset of the closing bracket of the top-level array
+            count: Number of trailing elements wanted
+
+        Returns:
+            Offset just after the comma that precedes the tail, or None if the
+            array has ``count`` elements or fewer
+        """
+        depth = 0
+        commas = 0
+        in_string = False
+        hi = close
+        while hi > 0:
+            lo = max(0, hi - self.chunk_size)
+            chunk = read(lo, hi)
+            is_bytes = not isinstance(chunk, str)
+            pattern: re.Pattern[Any] = (
+                self.STRUCTURAL_BYTES if is_bytes else self.STRUCTURAL_STR
+            )
+            quote: str | int = 0x22 if is_bytes else '"'
+            comma: str | int = 0x2C if is_bytes else ","
+            closers = (0x5D, 0x7D) if is_bytes else ("]", "}")
+
+            for match in reversed(list(pattern.finditer(chunk))):
+                rel: int = match.start()
+                char = chunk[rel]
+                if char == quote:
+                    if not self._is_escaped(chunk, rel, lo, read):
+                        in_string = not in_string
+                elif in_string:
+                    continue
+                elif char in closers:
+                    depth += 1
+                elif char == comma:
+                    if depth == 0:
+                        commas += 1
+                        if commas == count:
+                            return lo + rel + 1
+                elif depth == 0:
+                    # Opening bracket of the top-level array
+                    return None
+                else:
+                    depth -= 1
+            hi = lo
+        return None
+
+    def _decode_full(self, value: str | bytes, count: int) -> tuple[List[Any], bool]:
+        data = json.loads(value)
+        if not isinstance(data, list):
+            return [], True
+        return (data[-count:] if count > 0 else data), True
+
+    def decode_tail(self, body: str | bytes, count: int) -> List[Any] | None:
+        """Decode the elements between a tail start and the closing bracket.
+
+        Args:
+            body: Encoded elements without the surrounding brackets
+            count: Number of elements the body is expected to hold
+
+        Returns:
+            The decoded elements, or None if the body does not hold exactly
+            ``count`` valid elements
+        """
+        try:
+            if isinstance(body, bytes):
+                data = json.loads(b"[" + body + b"]")
+            else:
+                data = json.loads("[" + body + "]")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        if not isinstance(data, list) or len(data) != count:
+            return None
+        return data
+
+    def decode_suffix(self, value: str | bytes, count: int) -> List[Any] | None:
+        """Decode the last ``count`` elements if they lie within ``value``.
+
+        ``value`` may be the whole array or only its trailing bytes, since
+        the scan never looks before the comma that starts the tail.
+
+        Args:
+            value: JSON text or UTF-8 bytes ending with the closing bracket
+            count: Number of trailing elements wanted, at least 1
+
+        Returns:
+            The last ``count`` elements, or None if the array is not longer
+            than ``count`` or they do not all fit in ``value``
+        """
+        close = len(value) - 1
+        if isinstance(value, bytes):
+            while close >= 0 and value[close] in b" \t\r\n":
+                close -= 1
+            is_array = close >= 0 and value[close] == 0x5D
+        else:
+            while close >= 0 and value[close] in self.WHITESPACE:
+                close -= 1
+            is_array = close >= 0 and value[close] == "]"
+        if not is_array:
+            return None
+
+        start = self.find_tail_start(lambda lo, hi: value[lo:hi], close, count)
+        if start is None:
+            return None
+        return self.decode_tail(value[start:close], count)
+
+    def decode(self, value: str | bytes, count: int) -> tuple[List[Any], bool]:
+        """Decode the last ``count`` elements of a JSON array.
+
+        Args:
+            value: JSON text or UTF-8 bytes
+            count: Number of trailing elements wanted, 0 or less for all
+
+        Returns:
+            Tuple of (entries, complete) where complete is True when entries
+            holds every element of the array. Non-array JSON decodes to an
+            empty, complete list.
+
+        Raises:
+            json.JSONDecodeError: If the value is not valid JSON
+            UnicodeDecodeError: If bytes are not valid UTF-8
+        """
+        if count <= 0:
+            return self._decode_full(value, count)
+
+        tail = self.decode_suffix(value, count)
+        if tail is None:
+            return self._decode_full(value, count)
+        return tail, False
@@ -0,0 +1,96 @@
+"""
+Deduplication of conversation entries repeated across databases.
+"""
+
+import hashlib
+from array import array
+from typing import Any, Dict, List, Optional
+
+from src.database_management.conversation_source import entry_text
+from src.database_management.entry_timestamps import (
+    CONVERSATION_FIELDS,
+    UNDATED,
+    conversation_timestamps,
+)
+
+
+def content_key(entry: Any, timestamp_ms: int) -> bytes:
+    """Hash an entry's normalized text together with its timestamp.
+
+    Text is case-folded and its whitespace collapsed, so copies that only
+    differ in formatting share a key. The timestamp keeps the same prompt
+    sent again later a separate entry.
+    """
+    text = " ".join(entry_text(entry).casefold().split())
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16)
+    digest.update(timestamp_ms.to_bytes(8, "big", signed=True))
+    return digest.digest()
+
+
+def deduplicate_conversations(
+    conversations: List[Dict[str, Any]], keep_keys: bool = False
+) -> int:
+    """Drop entries already returned by an earlier database, in place.
+
+    The same prompt is often stored by several workspaces and the global
+    storage. Each entry is kept in the first conversation holding it, in
+    discovery order, and that copy lists every database it came from under
+    ``"sources"``: per entry list, entry position to database paths, only
+    for entries found in more than one database. Entries are only merged
+    with entries of the same list, so a prompt never absorbs a history entry.
+
+    Only copies in another database are dropped: a prompt sent twice in one
+    workspace stays twice. Undated entries are never merged, since text
+    alone cannot tell a copy from the same prompt sent again.
+
+    Args:
+        conversations: Conversation data per database, in discovery order
+        keep_keys: Also store the content key of each kept entry under
+            ``"content_keys"``, parallel to the entry lists, so entries can
+            be merged again after they are formatted; None for undated ones
+
+    Returns:
+        Number of entries dropped
+    """
+    kept: Dict[tuple[str, bytes], tuple[Dict[str, Any], int]] = {}
+    dropped = 0
+    for conv_data in conversations:
+        if conv_data.get("error"):
+            continue
+        db_path = conv_data.get("database_path", "")
+        for field in CONVERSATION_FIELDS:
+            entries = conv_data.get(field)
+            if not entries or not isinstance(entries, list):
+                continue
+            timestamps = conversation_timestamps(conv_data, field)
+            keep: List[int] = []
+            keys: List[Optional[bytes]] = []
+            for position, (entry, timestamp_ms) in enumerate(zip(entries, timestamps)):
+                if timestamp_ms == UNDATED:
+                    keep.append(position)
+                    keys.append(None)
+                    continue
+                key = (field, content_key(entry, timestamp_ms))
+                first = kept.get(key)
+                if first is None:
+                    kept[key] = (conv_data, len(keep))
+                if first is None or first[0] is conv_data:
+                    keep.append(position)
+                    keys.append(key[1])
+                    continue
+                dropped += 1
+                first_data, first_position = first
+                sources = first_data.setdefault("sources", {}).setdefault(field, {})
+                paths = sources.setdefault(
+                    first_position, [first_data.get("database_path", "")]
+                )
+                if db_path not in paths:
+                    paths.append(db_path)
+            if len(keep) < len(entries):
+                conv_data[field] = [entries[p] for p in keep]
+                conv_data["timestamps"][field] = array(
+                    "q", (timestamps[p] for p in keep)
+                )
+            if keep_keys:
+                conv_data.setdefault("content_keys", {})[field] = keys
+    return dropped
@@ -0,0 +1,258 @@
+"""
+Database file discovery for conversation recall operations.
+"""
+
+import json
+import os
+import threading
+import traceback
+from fnmatch import fnmatch
+from typing import Any, Dict, Iterable, List
+
+from src.config.constants import (
+    DISCOVERY_MANIFEST_VERSION,
+    DISCOVERY_MAX_DEPTH,
+    DISCOVERY_SKIP_PATTERNS,
+    GANDALF_DISCOVERY_MANIFEST_FILE,
+    SUPPORTED_DB_FILES,
+)
+from src.utils.logger import log_error
+
+
+class DatabaseDiscovery:
+    """Finds supported database files beneath registry paths in a single pass.
+
+    Results are recorded in a manifest of every directory visited along with
+    its mtime. Later walks stat each recorded directory and only rescan the
+    ones whose mtime changed, since adding or removing a database file always
+    updates the mtime of the directory that holds it. Registry discovery is
+    serialized, so concurrent requests never interleave their walks or
+    manifest writes.
+    """
+
+    def __init__(
+        self,
+        db_file_names: Iterable[str] = SUPPORTED_DB_FILES,
+        max_depth: int | None = DISCOVERY_MAX_DEPTH,
+        skip_patterns: Iterable[str] = DISCOVERY_SKIP_PATTERNS,
+        manifest_path: str | None = None,
+        use_manifest: bool = True,
+    ) -> None:
+        """Initialize the discovery walker.
+
+        Args:
+            db_file_names: File names that identify conversation databases
+            max_depth: Maximum depth below each root to descend, None for unlimited
+            skip_patterns: fnmatch patterns for directory names that are skipped
+            manifest_path: Manifest file location, defaults to
+                GANDALF_DISCOVERY_MANIFEST_FILE
+            use_manifest: Whether to read and write the discovery manifest
+        """
+        self.db_file_names = frozenset(db_file_names)
+        self.max_depth = max_depth
+        self.skip_patterns = list(skip_patterns)
+        self.manifest_path = (
+            manifest_path
+            if manifest_path is not None
+            else GANDALF_DISCOVERY_MANIFEST_FILE
+        )
+        self.use_manifest = use_manifest
+        self.last_stats: Dict[str, int] = {
+            "manifest_hits": 0,
+            "manifest_misses": 0,
+        }
+        self._lock = threading.Lock()
+
+    def _should_skip(self, dir_name: str) -> bool:
+        """Return True if a directory name matches any skip pattern."""
+        return any(fnmatch(dir_name, pattern) for pattern in self.skip_patterns)
+
+    def _scan_directory(self, path: str) -> tuple[List[str], List[str]]:
+        """List the database files and traversable subdirectories of a directory.
+
+        Args:
+            path: Directory to scan
+
+        Returns:
+            Tuple of (db_file_names, subdirectory_names) in scandir order
+
+        Raises:
+            OSError: If the directory cannot be read
+        """
+        db_files: List[str] = []
+        subdirs: List[str] = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if is_dir:
+                    if not entry.is_symlink() and not self._should_skip(entry.name):
+                        subdirs.append(entry.name)
+                elif entry.name in self.db_file_names:
+                    db_files.append(entry.name)
+        return db_files, subdirs
+
+    def _walk(
+        self,
+        root: str,
+        cached_dirs: Dict[str, Any],
+        visited_dirs: Dict[str, Any],
+        stats: Dict[str, int],
+    ) -> List[str]:
+        """Walk a root, reusing cached directory listings whose mtime is unchanged.
+
+        Traversal is top-down in the same order as ``os.walk``. Symlinked
+        directories are not followed and unreadable directories are skipped.
+
+        Args:
+            root: Directory to search
+            cached_dirs: Directory records from a previous walk of this root
+            visited_dirs: Receives a fresh record for every directory visited
+            stats: Receives manifest hit and miss counts
+
+        Returns:
+            List of database file paths
+        """
+        found: List[str] = []
+        stack: List[tuple[str, int]] = [(root, 0)]
+
+        while stack:
+            current, depth = stack.pop()
+            try:
+                mtime_ns = os.stat(current).st_mtime_ns
+                cached = cached_dirs.get(current)
+                if cached is not None and cached.get("mtime_ns") == mtime_ns:
+                    stats["manifest_hits"] += 1
+                    db_files = list(cached["db_files"])
+                    subdirs = list(cached["subdirs"])
+                else:
+                    stats["manifest_misses"] += 1
+                    db_files, subdirs = self._scan_directory(current)
+            except (OSError, KeyError, TypeError):
+                continue
+
+            visited_dirs[current] = {
+                "mtime_ns": mtime_ns,
+                "db_files": db_files,
+                "subdirs": subdirs,
+            }
+            found.extend(os.path.join(current, name) for name in db_files)
+
+            if self.max_depth is None or depth < self.max_depth:
+                # Reverse so the first subdirectory is popped first
+                stack.extend(
+                    (os.path.join(current, name), depth + 1)
+                    for name in reversed(subdirs)
+                )
+
+        return found
+
+    def discover(self, root: str) -> List[str]:
+        """Walk a root once and return every supported database file below it.
+
+        Args:
+            root: Directory to search
+
+        Returns:
+            List of database file paths
+        """
+        return self._walk(root, {}, {}, {"manifest_hits": 0, "manifest_misses": 0})
+
+    def _settings_signature(self) -> Dict[str, Any]:
+        """Return the settings that a manifest must match to be reused."""
+        return {
+            "version": DISCOVERY_MANIFEST_VERSION,
+            "db_file_names": sorted(self.db_file_names),
+            "max_depth": self.max_depth,
+            "skip_patterns": self.skip_patterns,
+        }
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """Load manifest roots, returning an empty mapping if unusable."""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError, UnicodeDecodeError) as e:
+            log_error(
+                f"Discarding unreadable discovery manifest: {str(e)}",
+                {"traceback": traceback.format_exc()},
+            )
+            return {}
+
+        if (
+            not isinstance(manifest, dict)
+            or manifest.get("settings") != self._settings_signature()
+            or not isinstance(manifest.get("roots"), dict)
+        ):
+            return {}
+        roots: Dict[str, Any] = manifest["roots"]
+        return roots
+
+    def _save_manifest(self, roots: Dict[str, Any]) -> None:
+        """Atomically write the manifest, logging rather than raising on failure."""
+        manifest = {"settings": self._settings_signature(), "roots": roots}
+        temp_path = f"{self.manifest_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(temp_path, self.manifest_path)
+        except OSError as e:
+            log_error(
+                f"Error writing discovery manifest: {str(e)}",
+                {"traceback": traceback.format_exc()},
+            )
+
+    def discover_registry(
+        self, registry_data: Dict[str, Any], force_rescan: bool = False
+    ) -> List[str]:
+        """Discover database files for every path in the registry.
+
+        Args:
+            registry_data: The loaded registry data
+            force_rescan: Ignore the manifest and scan every directory again
+
+        Returns:
+            List of database file paths in registry order
+        """
+        with self._lock:
+            return self._discover_registry(registry_data, force_rescan)
+
+    def _discover_registry(
+        self, registry_data: Dict[str, Any], force_rescan: bool
+    ) -> List[str]:
+        """Discover registry databases; the caller holds the discovery lock."""
+        stats = {"manifest_hits": 0, "manifest_misses": 0}
+        cached_roots = (
+            self._load_manifest() if self.use_manifest and not force_rescan else {}
+        )
+        visited_roots: Dict[str, Any] = {}
+        found: List[str] = []
+
+        for paths in registry_data.values():
+            if isinstance(paths, list):
+                for path in paths:
+                    if not isinstance(path, str) or not os.path.exists(path):
+                        continue
+                    cached_root = cached_roots.get(path)
+                    visited = visited_roots.setdefault(path, {})
+                    found.extend(
+                        self._walk(
+                            path,
+                            cached_root if isinstance(cached_root, dict) else {},
+                            visited,
+                            stats,
+                        )
+                    )
+
+        if self.use_manifest and (
+            stats["manifest_misses"] or visited_roots.keys() != cached_roots.keys()
+        ):
+            self._save_manifest(visited_roots)
+
+        self.last_stats = stats
+        return found
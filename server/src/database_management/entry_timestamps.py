@@ -0,0 +1,111 @@
+"""
+Normalization of conversation entry timestamps to epoch milliseconds.
+"""
+
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable
+
+# Fields probed for an entry's timestamp, in order, then again in "metadata"
+TIMESTAMP_FIELDS = ("timestamp", "createdAt", "date", "time", "created_at", "created")
+
+# Numbers above this are milliseconds, at or below it seconds
+MILLISECONDS_THRESHOLD = 1e10
+
+# Stands for a missing timestamp in integer timestamp arrays
+UNDATED = -(2**63)
+
+# Numbers whose millisecond value is out of this range are not timestamps
+TIMESTAMP_LIMIT_MS = 2**62
+
+CONVERSATION_FIELDS = ("prompts", "generations", "history_entries")
+
+
+def entry_timestamp_ms(entry: Any) -> int | None:
+    """Return an entry's timestamp in epoch milliseconds, if it has one.
+
+    Numbers are taken as milliseconds above MILLISECONDS_THRESHOLD and as
+    seconds otherwise, without building a datetime. Strings are parsed as
+    ISO-8601, timestamps without a timezone as UTC. A field whose value
+    cannot be used is passed over for the next one.
+    """
+    # Fast path for the common case, integer milliseconds under "timestamp"
+    if type(entry) is dict:
+        value = entry.get("timestamp")
+        if type(value) is int and MILLISECONDS_THRESHOLD < value < TIMESTAMP_LIMIT_MS:
+            return value
+    while isinstance(entry, dict):
+        for field in TIMESTAMP_FIELDS:
+            if field not in entry:
+                continue
+            value = entry[field]
+            if isinstance(value, (int, float)):
+                ms = value if value > MILLISECONDS_THRESHOLD else value * 1000
+                # Also false for NaN
+                if not -TIMESTAMP_LIMIT_MS < ms < TIMESTAMP_LIMIT_MS:
+                    continue
+                return int(ms)
+            if isinstance(value, str):
+                try:
+                    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+                except ValueError:
+                    continue
+                if parsed.tzinfo is None:
+                    parsed = parsed.replace(tzinfo=timezone.utc)
+                return int(parsed.timestamp() * 1000)
+        entry = entry.get("metadata")
+    return None
+
+
+def entry_timestamps(entries: Iterable[Any]) -> "array[int]":
+    """Normalize the timestamps of entries, UNDATED where one is missing."""
+    timestamps = array("q")
+    append = timestamps.append
+    for entry in entries:
+        # Inlined fast path of entry_timestamp_ms, which dominates otherwise
+        if type(entry) is dict:
+            value = entry.get("timestamp")
+            if (
+                type(value) is int
+                and MILLISECONDS_THRESHOLD < value < TIMESTAMP_LIMIT_MS
+            ):
+                append(value)
+                continue
+        timestamp_ms = entry_timestamp_ms(entry)
+        append(UNDATED if timestamp_ms is None else timestamp_ms)
+    return timestamps
+
+
+def conversation_timestamps(
+    conversation_data: Dict[str, Any], field: str
+) -> "array[int]":
+    """Get the timestamps of one entry list of a conversation data dictionary.
+
+    Extraction stores them under "timestamps" as the entries are decoded or
+    read from an index, so scoring, date filtering and threading share one
+    normalization. Data built elsewhere gets them computed and stored on
+    first use.
+
+    Args:
+        conversation_data: Conversation data dictionary
+        field: Entry list, e.g. "prompts"
+
+    Returns:
+        Epoch-millisecond timestamps parallel to the entry list
+    """
+    entries = conversation_data.get(field) or []
+    timestamps_by_field = conversation_data.setdefault("timestamps", {})
+    timestamps: "array[int] | None" = timestamps_by_field.get(field)
+    if timestamps is None or len(timestamps) != len(entries):
+        timestamps = timestamps_by_field[field] = entry_timestamps(entries)
+    return timestamps
+
+
+def attach_timestamps(conversation_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Store the timestamps of every entry list of freshly decoded data."""
+    conversation_data["timestamps"] = {
+        field: entry_timestamps(conversation_data[field])
+        for field in CONVERSATION_FIELDS
+        if isinstance(conversation_data.get(field), list)
+    }
+    return conversation_data
@@ -5,21 +5,219 @@ Database query execution for conversation recall operations.
 import json
 import sqlite3
 import traceback
-from typing import Any, Dict, List
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Hashable, Iterator, List
+from urllib.request import pathname2url
 
-from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+from src.config.constants import (
+    BLOB_CACHE_MAX_BYTES,
+    BLOB_STREAM_CHUNK_BYTES,
+    BLOB_STREAMING_ENABLED,
+    CONNECTION_POOL_MAX_CONNECTIONS,
+    RECALL_CONVERSATIONS_QUERIES,
+    SQLITE_ACCESS_MODE,
+    SQLITE_ACCESS_MODES,
+    SQLITE_CACHE_SIZE,
+    SQLITE_JSON_PUSHDOWN,
+    SQLITE_MMAP_SIZE,
+)
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.connection_pool import ConnectionPool
 from src.database_management.create_filters import SearchFilterBuilder
-from src.utils.logger import log_error
+from src.database_management.database_fingerprint import (
+    DatabaseFingerprint,
+    get_database_fingerprint,
+)
+from src.database_management.decode_json_tail import JsonTailDecoder
+from src.database_management.entry_timestamps import attach_timestamps
+from src.database_management.stream_blob import BlobStreamReader
+from src.utils.logger import log_debug, log_error
+
+
+# Trailing bytes of an ItemTable value; the window size is bound first
+VALUE_SUFFIX_SQL = "substr(CAST(value AS BLOB), -?)"
 
 
 class QueryExecutor:
     """Executes database queries for conversation data extraction."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        access_mode: str = SQLITE_ACCESS_MODE,
+        mmap_size: int = SQLITE_MMAP_SIZE,
+        cache_size: int = SQLITE_CACHE_SIZE,
+        pool: ConnectionPool | None = None,
+        blob_cache: ParsedBlobCache | None = None,
+        stream_blobs: bool = BLOB_STREAMING_ENABLED,
+        json_pushdown: bool = SQLITE_JSON_PUSHDOWN,
+    ) -> None:
+        """Initialize the query executor.
+
+        Args:
+            access_mode: One of SQLITE_ACCESS_MODES
+            mmap_size: Value for PRAGMA mmap_size on each connection
+            cache_size: Value for PRAGMA cache_size on each connection
+            pool: Connection pool to reuse connections from, defaults to a new
+                pool unless CONNECTION_POOL_MAX_CONNECTIONS is 0
+            blob_cache: Cache of decoded values, defaults to a new cache
+                unless BLOB_CACHE_MAX_BYTES is 0
+            stream_blobs: Read values through incremental blob I/O when this
+                Python supports it, instead of copying them whole
+            json_pushdown: Filter phrase searches per entry inside SQLite when
+                its JSON1 functions are available
+
+        Raises:
+            ValueError: If access_mode is not supported
+        """
+        if access_mode not in SQLITE_ACCESS_MODES:
+            raise ValueError(
+                f"Unsupported SQLite access mode: {access_mode}. "
+                f"Expected one of {', '.join(SQLITE_ACCESS_MODES)}"
+            )
         self.filter_builder = SearchFilterBuilder()
+        self.tail_decoder = JsonTailDecoder()
+        self.access_mode = access_mode
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self._last_fingerprints: Dict[str, DatabaseFingerprint] = {}
+        self._statement_cache: Dict[tuple[str, int, tuple[str, ...]], str] = {}
+        if pool is None and CONNECTION_POOL_MAX_CONNECTIONS > 0:
+            pool = ConnectionPool()
+        self.pool = pool
+        if blob_cache is None and BLOB_CACHE_MAX_BYTES > 0:
+            blob_cache = ParsedBlobCache()
+        self.blob_cache = blob_cache
+        self.blob_reader = (
+            BlobStreamReader(decoder=self.tail_decoder)
+            if stream_blobs and BlobStreamReader.is_supported()
+            else None
+        )
+        self.suffix_window = BLOB_STREAM_CHUNK_BYTES
+        self.json_pushdown = json_pushdown
+        self._json1_available: bool | None = None
+
+    def _build_connection_uri(self, db_path: str) -> str | None:
+        """Build the URI used to open a database in the configured access mode.
+
+        In immutable mode, immutable=1 is only used when the snapshot
+        fingerprint matches the one seen on the previous open and there is no
+        pending write-ahead log, since immutable connections skip locking and
+        ignore the WAL entirely.
+
+        Args:
+            db_path: Path to the database file
+
+        Returns:
+            A file: URI, or None to open the plain path read-write
+        """
+        if self.access_mode == "rw":
+            return None
+
+        uri = f"file:{pathname2url(db_path)}?mode=ro"
+        if self.access_mode == "immutable":
+            fingerprint = get_database_fingerprint(db_path)
+            previous = self._last_fingerprints.get(db_path)
+            if fingerprint is not None:
+                self._last_fingerprints[db_path] = fingerprint
+                if fingerprint == previous and fingerprint.wal_size == 0:
+                    uri += "&immutable=1"
+        return uri
+
+    def _connect_uri(self, db_path: str, uri: str | None) -> sqlite3.Connection:
+        """Open a connection from a URI built by _build_connection_uri."""
+        # Pooled connections may be checked out by different threads over
+        # their lifetime, but never by two at once.
+        if uri is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        try:
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+            conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def connect(self, db_path: str) -> sqlite3.Connection:
+        """Open an unpooled connection to a conversation database.
+
+        Args:
+            db_path: Path to the database file
+
+        Returns:
+            SQLite connection with mmap and cache pragmas applied
+        """
+        return self._connect_uri(db_path, self._build_connection_uri(db_path))
+
+    @contextmanager
+    def open_connection(self, db_path: str) -> Iterator[sqlite3.Connection]:
+        """Check out a connection from the pool, or open a temporary one.
+
+        Args:
+            db_path: Path to the database file
+
+        Yields:
+            SQLite connection with mmap and cache pragmas applied
+        """
+        uri = self._build_connection_uri(db_path)
+        if self.pool is None:
+            with closing(self._connect_uri(db_path, uri)) as conn:
+                yield conn
+            return
+
+        # Immutable connections never see later writes, so they are only
+        # reused for the exact snapshot they were opened on.
+        identity: Hashable = (
+            uri,
+            self._last_fingerprints.get(db_path)
+            if uri is not None and "immutable=1" in uri
+            else None,
+        )
+        with self.pool.acquire(
+            db_path, lambda: self._connect_uri(db_path, uri), identity
+        ) as conn:
+            yield conn
+
+    def _build_multi_key_query(
+        self,
+        key_count: int,
+        search_conditions: List[str],
+        columns: str = "key, value",
+    ) -> str:
+        """Build the single statement that fetches every requested key.
+
+        The SQL text only depends on the number of keys and the search
+        conditions, so the built text is cached and identical text lets the
+        sqlite3 statement cache reuse the compiled statement on pooled
+        connections.
+
+        Args:
+            key_count: Number of ItemTable keys to fetch
+            search_conditions: Search conditions list
+            columns: Columns to select
+
+        Returns:
+            SQL query text
+        """
+        cache_key = (columns, key_count, tuple(search_conditions))
+        query = self._statement_cache.get(cache_key)
+        if query is None:
+            placeholders = ", ".join("?" for _ in range(key_count))
+            query = f"SELECT {columns} FROM ItemTable WHERE key IN ({placeholders})"
+            if search_conditions:
+                query += " AND (" + " OR ".join(search_conditions) + ")"
+            self._statement_cache[cache_key] = query
+        return query
 
     def execute_conversation_query(
-        self, db_path: str, limit: int, phrases: List[str] | None = None
+        self,
+        db_path: str,
+        limit: int,
+        phrases: List[str] | None = None,
+        include_prompts: bool = True,
+        include_generations: bool = True,
+        include_history: bool = True,
     ) -> Dict[str, Any]:
         """Execute queries to extract conversation data from a database file.
 
@@ -27,9 +225,13 @@ class QueryExecutor:
             db_path: Path to the database file
             limit: Maximum number of entries to return
             phrases: List of phrases to filter by
+            include_prompts: Whether to fetch prompts
+            include_generations: Whether to fetch generations
+            include_history: Whether to fetch history entries
 
         Returns:
-            Dictionary containing extracted conversation data
+            Dictionary containing extracted conversation data, with the
+            epoch-millisecond timestamps of each entry list under "timestamps"
         """
         conversation_data: Dict[str, Any] = {
             "prompts": [],
@@ -39,55 +241,72 @@ class QueryExecutor:
             "error": None,
         }
 
+        query_fields: Dict[str, str] = {}
+        if include_prompts:
+            query_fields[RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"]] = "prompts"
+        if include_generations:
+            query_fields[RECALL_CONVERSATIONS_QUERIES["GENERATIONS_KEY"]] = (
+                "generations"
+            )
+        if include_history:
+            query_fields[RECALL_CONVERSATIONS_QUERIES["HISTORY_KEY"]] = (
+                "history_entries"
+            )
+        if not query_fields:
+            return attach_timestamps(conversation_data)
+
         search_conditions, search_params = self.filter_builder.build_search_conditions(
             phrases or []
         )
 
-        try:
-            with sqlite3.connect(db_path) as conn:
-                cursor = conn.cursor()
-
-                # Build dynamic queries
-                base_query = "SELECT value FROM ItemTable WHERE key = ?"
-
-                if search_conditions:
-                    where_clause = " AND (" + " OR ".join(search_conditions) + ")"
-                    filtered_query = base_query + where_clause
-                else:
-                    filtered_query = base_query
-
-                # Execute prompts query
-                conversation_data["prompts"] = self._execute_single_query(
-                    cursor,
-                    filtered_query,
-                    base_query,
-                    search_conditions,
-                    search_params,
-                    RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
-                    limit,
-                )
+        if search_conditions and self._json_pushdown_available():
+            pushed = self._execute_json_each_query(
+                db_path, list(query_fields), phrases or [], limit
+            )
+            if pushed is not None:
+                for query_key, matches in pushed.items():
+                    conversation_data[query_fields[query_key]] = matches
+                return attach_timestamps(conversation_data)
 
-                # Execute generations query
-                conversation_data["generations"] = self._execute_single_query(
-                    cursor,
-                    filtered_query,
-                    base_query,
-                    search_conditions,
-                    search_params,
-                    RECALL_CONVERSATIONS_QUERIES["GENERATIONS_KEY"],
-                    limit,
-                )
+        fingerprint = (
+            get_database_fingerprint(db_path) if self.blob_cache is not None else None
+        )
+        cached: Dict[str, List[Any]] = {}
+        if self.blob_cache is not None and fingerprint is not None:
+            for query_key in query_fields:
+                entries = self.blob_cache.get(db_path, query_key, fingerprint, limit)
+                if entries is not None:
+                    cached[query_key] = entries
+        missing_keys = [key for key in query_fields if key not in cached]
 
-                # Execute history query
-                conversation_data["history_entries"] = self._execute_single_query(
-                    cursor,
-                    filtered_query,
-                    base_query,
-                    search_conditions,
-                    search_params,
-                    RECALL_CONVERSATIONS_QUERIES["HISTORY_KEY"],
-                    limit,
-                )
+        try:
+            results: Dict[str, List[Any]] = {}
+            if missing_keys or (cached and search_conditions):
+                with (
+                    self.open_connection(db_path) as conn,
+                    closing(conn.cursor()) as cursor,
+                ):
+                    if cached and search_conditions:
+                        # Cached values still have to match the phrases, which
+                        # SQLite can check without returning the value.
+                        cached = self._filter_matching_keys(
+                            cursor, cached, search_conditions, search_params
+                        )
+                    if missing_keys:
+                        results = self._execute_multi_key_query(
+                            cursor,
+                            missing_keys,
+                            search_conditions,
+                            search_params,
+                            limit,
+                            db_path,
+                            fingerprint,
+                        )
+
+            for query_key, entries in cached.items():
+                conversation_data[query_fields[query_key]] = entries[-limit:]
+            for query_key, entries in results.items():
+                conversation_data[query_fields[query_key]] = entries
 
         except sqlite3.Error as e:
             error_msg = f"Database error: {str(e)}"
@@ -103,56 +322,344 @@ class QueryExecutor:
             log_error(error_msg, {"traceback": traceback.format_exc()})
             conversation_data["error"] = error_msg
 
-        return conversation_data
+        return attach_timestamps(conversation_data)
+
+    def _json_pushdown_available(self) -> bool:
+        """Check once whether SQLite can filter entries with json_each.
+
+        Returns:
+            True if pushdown is enabled and JSON1 and window functions work
+        """
+        if not self.json_pushdown:
+            return False
+        if self._json1_available is None:
+            try:
+                with closing(sqlite3.connect(":memory:")) as conn:
+                    conn.execute(
+                        "SELECT ROW_NUMBER() OVER (ORDER BY entry.id), "
+                        "json_extract(entry.value, '$.text') "
+                        'FROM json_each(\'[{"text": ""}]\') AS entry'
+                    ).fetchall()
+                self._json1_available = True
+            except sqlite3.Error:
+                log_debug("SQLite JSON1 unavailable, filtering whole values")
+                self._json1_available = False
+        return self._json1_available
 
-    def _execute_single_query(
+    def _build_json_each_query(
+        self,
+        key_count: int,
+        search_conditions: List[str],
+        entry_conditions: List[str],
+    ) -> str:
+        """Build the statement that returns only matching entries per key.
+
+        Values are first narrowed with the whole-value conditions, then
+        expanded with json_each. The same conditions on each entry's JSON
+        text skip most entries before their text fields are extracted and
+        matched on their own. Only the newest matches per key are kept.
+
+        Args:
+            key_count: Number of ItemTable keys to fetch
+            search_conditions: Whole-value search conditions
+            entry_conditions: Search conditions on the ``entry_text`` alias
+
+        Returns:
+            SQL query text taking key, whole-value (twice), entry and limit
+            parameters
+        """
+        cache_key = (
+            "json_each",
+            key_count,
+            tuple(search_conditions) + tuple(entry_conditions),
+        )
+        query = self._statement_cache.get(cache_key)
+        if query is None:
+            values = self._build_multi_key_query(key_count, search_conditions)
+            entry_text = self.filter_builder.build_entry_text_expression("entry")
+            query = (
+                "WITH entries AS ("
+                "SELECT item.key AS key, entry.id AS position, "
+                "entry.type AS type, entry.value AS value, "
+                f"{entry_text} AS entry_text "
+                f"FROM ({values}) AS item, json_each(item.value) AS entry "
+                # Only array elements have integer keys; checking that
+                # avoids parsing the value again with json_type
+                "WHERE typeof(entry.key) = 'integer' AND ("
+                + " OR ".join(
+                    condition.replace("value", "entry.value", 1)
+                    for condition in search_conditions
+                )
+                + ")), matches AS ("
+                "SELECT key, position, type, value, ROW_NUMBER() OVER "
+                "(PARTITION BY key ORDER BY position DESC) AS recency "
+                "FROM entries WHERE " + " OR ".join(entry_conditions) + ") "
+                "SELECT key, type, value FROM matches "
+                "WHERE ? <= 0 OR recency <= ? ORDER BY key, position"
+            )
+            self._statement_cache[cache_key] = query
+        return query
+
+    def _execute_json_each_query(
+        self, db_path: str, query_keys: List[str], phrases: List[str], limit: int
+    ) -> Dict[str, List[Any]] | None:
+        """Fetch only the entries whose own text matches a phrase.
+
+        Args:
+            db_path: Path to the database file
+            query_keys: ItemTable keys to fetch
+            phrases: List of phrases to filter by
+            limit: Maximum number of matching entries per key, 0 for all
+
+        Returns:
+            Mapping of each key to its newest matching entries, or None if
+            SQLite rejected the statement and the caller should fall back
+        """
+        search_conditions, search_params = self.filter_builder.build_search_conditions(
+            phrases
+        )
+        entry_conditions, entry_params = self.filter_builder.build_search_conditions(
+            phrases, "entry_text"
+        )
+        query = self._build_json_each_query(
+            len(query_keys), search_conditions, entry_conditions
+        )
+        params = (
+            tuple(query_keys)
+            + tuple(search_params)
+            + tuple(search_params)
+            + tuple(entry_params)
+            + (limit, limit)
+        )
+        try:
+            with (
+                self.open_connection(db_path) as conn,
+                closing(conn.cursor()) as cursor,
+            ):
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            # Malformed values make json_each fail; the fallback path reports
+            # them the same way as before
+            log_debug(
+                "json_each filtering failed, falling back",
+                {"database_path": db_path, "error": str(e)},
+            )
+            return None
+
+        results: Dict[str, List[Any]] = {}
+        for query_key, entry_type, value in rows:
+            results.setdefault(query_key, []).append(
+                self._decode_json_each_value(entry_type, value)
+            )
+        return results
+
+    @staticmethod
+    def _decode_json_each_value(entry_type: str, value: Any) -> Any:
+        """Convert a json_each value column back to its Python value."""
+        if entry_type in ("object", "array"):
+            return json.loads(value)
+        if entry_type == "true":
+            return True
+        if entry_type == "false":
+            return False
+        return value
+
+    def _filter_matching_keys(
         self,
         cursor: sqlite3.Cursor,
-        filtered_query: str,
-        base_query: str,
+        cached: Dict[str, List[Any]],
+        search_conditions: List[str],
+        search_params: List[str],
+    ) -> Dict[str, List[Any]]:
+        """Keep only the cached keys whose stored value matches the phrases.
+
+        Args:
+            cursor: Database cursor
+            cached: Cached entries by key
+            search_conditions: Search conditions list
+            search_params: Search parameters list
+
+        Returns:
+            Cached entries for the keys that match
+        """
+        query_keys = list(cached)
+        cursor.execute(
+            self._build_multi_key_query(len(query_keys), search_conditions, "key"),
+            tuple(query_keys) + tuple(search_params),
+        )
+        matched = {row[0] for row in cursor.fetchall()}
+        return {key: entries for key, entries in cached.items() if key in matched}
+
+    def _execute_multi_key_query(
+        self,
+        cursor: sqlite3.Cursor,
+        query_keys: List[str],
         search_conditions: List[str],
         search_params: List[str],
-        query_key: str,
         limit: int,
-    ) -> List[Any]:
-        """Execute a single query for prompts, generations, or history.
+        db_path: str | None = None,
+        fingerprint: DatabaseFingerprint | None = None,
+    ) -> Dict[str, List[Any]]:
+        """Fetch prompts, generations and history in one statement.
 
         Args:
             cursor: Database cursor
-            filtered_query: Query with search conditions
-            base_query: Base query without conditions
+            query_keys: ItemTable keys to fetch
             search_conditions: Search conditions list
             search_params: Search parameters list
-            query_key: Key for the specific query type
-            limit: Maximum number of entries to return
+            limit: Maximum number of entries to return per key
+            db_path: Database path, required to populate the blob cache
+            fingerprint: Snapshot fingerprint taken before the query
 
         Returns:
-            List of conversation entries
+            Mapping of each key that matched to its conversation entries
         """
-        try:
-            if search_conditions:
-                cursor.execute(
-                    filtered_query,
-                    (query_key,) + tuple(search_params),
+        # With blob streaming only row ids are fetched; values are read in
+        # chunks afterwards instead of being copied whole into Python.
+        # Otherwise a recent-N read only fetches the trailing bytes.
+        params: tuple[Any, ...] = tuple(query_keys) + tuple(search_params)
+        if self.blob_reader is not None:
+            columns = "key, rowid"
+        elif limit > 0:
+            columns = f"key, {VALUE_SUFFIX_SQL}"
+            params = (self.suffix_window,) + params
+        else:
+            columns = "key, value"
+        cursor.execute(
+            self._build_multi_key_query(len(query_keys), search_conditions, columns),
+            params,
+        )
+
+        results: Dict[str, List[Any]] = {}
+        for query_key, value in cursor.fetchall():
+            # Keys are unique in Cursor databases; keep the first row if not
+            if query_key in results:
+                continue
+            # Apply optimization: only decode the most recent conversations
+            if self.blob_reader is not None:
+                entries, complete, size_bytes = self._stream_entries(
+                    self.blob_reader, cursor.connection, value, query_key, limit
+                )
+            elif limit > 0:
+                entries, complete, size_bytes = self._suffix_entries(
+                    cursor, value, query_key, limit
                 )
             else:
-                cursor.execute(base_query, (query_key,))
-
-            result = cursor.fetchone()
-            if result:
-                value = result[0]
-                if isinstance(value, bytes):
-                    data = json.loads(value.decode("utf-8"))
-                else:
-                    data = json.loads(value)
-
-                # Apply optimization: limit and prioritize recent conversations
-                if isinstance(data, list):
-                    # Take most recent conversations
-                    return data[-limit:]
-                else:
-                    return []
-            return []
+                entries, complete = self._decode_entries(value, query_key, limit)
+                size_bytes = len(value or "")
+            if (
+                self.blob_cache is not None
+                and db_path is not None
+                and fingerprint is not None
+            ):
+                self.blob_cache.put(
+                    db_path, query_key, fingerprint, entries, size_bytes, complete
+                )
+            results[query_key] = entries[-limit:] if limit > 0 else entries
+        return results
+
+    def _tail_size(self, entries: List[Any]) -> int:
+        """Estimate the encoded size of a decoded tail for cache accounting."""
+        return len(json.dumps(entries, ensure_ascii=False))
+
+    def _suffix_entries(
+        self, cursor: sqlite3.Cursor, suffix: bytes | None, query_key: str, limit: int
+    ) -> tuple[List[Any], bool, int]:
+        """Decode the most recent entries from the trailing bytes of a value.
+
+        The suffix window grows until it holds the last ``limit`` entries or
+        the whole value, so only that much is copied out of SQLite.
+
+        Args:
+            cursor: Database cursor
+            suffix: Trailing bytes fetched with the first query
+            query_key: ItemTable key the value is stored under
+            limit: Number of trailing entries wanted
+
+        Returns:
+            Tuple of (entries, complete, size_bytes)
+
+        Raises:
+            ValueError: If the value is not valid JSON
+        """
+        window = self.suffix_window
+        while suffix is not None and len(suffix) >= window:
+            tail = self.tail_decoder.decode_suffix(suffix, limit)
+            if tail is not None:
+                return tail, False, self._tail_size(tail)
+            window *= 16
+            cursor.execute(
+                f"SELECT {VALUE_SUFFIX_SQL} FROM ItemTable WHERE key = ? LIMIT 1",
+                (window, query_key),
+            )
+            row = cursor.fetchone()
+            suffix = row[0] if row else None
+
+        # The suffix is the whole value
+        entries, complete = self._decode_entries(suffix, query_key, limit)
+        return entries, complete, len(suffix or b"")
+
+    def _stream_entries(
+        self,
+        reader: BlobStreamReader,
+        conn: sqlite3.Connection,
+        rowid: int,
+        query_key: str,
+        limit: int,
+    ) -> tuple[List[Any], bool, int]:
+        """Decode the most recent entries of a value through blob I/O.
+
+        Values that cannot be opened as a blob, such as NULL, are fetched
+        whole and decoded in memory instead.
+
+        Args:
+            reader: Blob reader to decode with
+            conn: Connection the row was selected on
+            rowid: Row id of the ItemTable row
+            query_key: Key the value was stored under, used in errors
+            limit: Number of trailing entries wanted, 0 or less for all
+
+        Returns:
+            Tuple of (entries, complete, size_bytes)
+
+        Raises:
+            ValueError: If the value is not valid JSON
+        """
+        try:
+            return reader.read_entries(conn, rowid, limit)
+        except sqlite3.Error:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute("SELECT value FROM ItemTable WHERE rowid = ?", (rowid,))
+                row = cursor.fetchone()
+            value = row[0] if row else None
+            entries, complete = self._decode_entries(value, query_key, limit)
+            return entries, complete, len(value or "")
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            error_msg = f"Error parsing {query_key}: {str(e)}"
+            log_error(error_msg, {"traceback": traceback.format_exc()})
+            raise ValueError(error_msg) from e
+
+    def _decode_entries(
+        self, value: Any, query_key: str, limit: int
+    ) -> tuple[List[Any], bool]:
+        """Decode the most recent entries of an ItemTable value.
+
+        Args:
+            value: Raw column value
+            query_key: Key the value was stored under, used in errors
+            limit: Number of trailing entries wanted, 0 or less for all
+
+        Returns:
+            Tuple of (entries, complete), complete when every entry was decoded
+
+        Raises:
+            ValueError: If the value is not valid JSON
+        """
+        if value is None:
+            return [], True
+        try:
+            return self.tail_decoder.decode(value, limit)
         except (json.JSONDecodeError, UnicodeDecodeError) as e:
             error_msg = f"Error parsing {query_key}: {str(e)}"
             log_error(error_msg, {"traceback": traceback.format_exc()})
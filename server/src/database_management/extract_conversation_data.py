@@ -3,20 +3,93 @@ Conversation data extraction from database files.
 """
 
 import os
-from typing import Any, Dict, List
+import sqlite3
+import threading
+import traceback
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Set
 
-from src.config.constants import SUPPORTED_DB_FILES
+from src.config.constants import (
+    RECALL_DEDUPLICATE_ENABLED,
+    RECALL_EXTRACTION_WORKERS,
+    RECALL_INDEX_ENABLED,
+    RECALL_MEMORY_INDEX_ENABLED,
+)
+from src.database_management.bm25_scorer import TermStatistics
+from src.database_management.conversation_index import ConversationIndex
+from src.database_management.conversation_source import (
+    ENTRY_TYPE_FIELDS,
+    INDEXED_KEYS,
+    entry_text,
+)
+from src.database_management.database_fingerprint import (
+    DatabaseFingerprint,
+    get_database_fingerprint,
+)
+from src.database_management.deduplicate_entries import deduplicate_conversations
+from src.database_management.discover_databases import DatabaseDiscovery
+from src.database_management.entry_timestamps import conversation_timestamps
 from src.database_management.execute_query import QueryExecutor
+from src.database_management.inverted_index import InvertedIndex
+from src.database_management.time_partitions import TimePartitions, TimeWindow
+from src.utils.cancellation import current_cancel_event, raise_if_cancelled
+from src.utils.logger import log_debug, log_error
 
 
 class ConversationDataExtractor:
     """Extracts conversation data from database files."""
 
-    def __init__(self) -> None:
-        self.query_executor = QueryExecutor()
+    def __init__(
+        self,
+        query_executor: QueryExecutor | None = None,
+        index: ConversationIndex | InvertedIndex | None = None,
+        deduplicate: bool = RECALL_DEDUPLICATE_ENABLED,
+        max_workers: int = RECALL_EXTRACTION_WORKERS,
+    ) -> None:
+        """Initialize the extractor.
+
+        Args:
+            query_executor: Executor used to query database files
+            index: Conversation index searched instead of each database,
+                defaults to a new index when RECALL_INDEX_ENABLED is set and
+                SQLite supports it, or to an in-memory inverted index when
+                RECALL_MEMORY_INDEX_ENABLED is set
+            deduplicate: Whether entries repeated across databases are
+                returned once
+            max_workers: Threads extracting databases in parallel when there
+                is no index, 1 to extract them in sequence
+        """
+        self.query_executor = query_executor or QueryExecutor()
+        self.discovery = DatabaseDiscovery()
+        if index is None:
+            if RECALL_INDEX_ENABLED and ConversationIndex.is_supported():
+                index = ConversationIndex(query_executor=self.query_executor)
+            elif RECALL_MEMORY_INDEX_ENABLED:
+                index = InvertedIndex(self.query_executor)
+        self.index: ConversationIndex | InvertedIndex | None = index
+        self.deduplicate = deduplicate
+        self.max_workers = max(1, max_workers)
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+        self._term_statistics: Dict[
+            str, tuple[DatabaseFingerprint, Dict[str, TermStatistics]]
+        ] = {}
+        self._time_partitions: Dict[
+            str, tuple[DatabaseFingerprint, Dict[str, TimePartitions]]
+        ] = {}
+        # Extractions of concurrent requests fill the per-database caches
+        # from pool threads; only retain_databases removes from them
+        self._cache_lock = threading.Lock()
+        self._retained_paths: Set[str] | None = None
 
     def extract_conversation_data(
-        self, db_path: str, limit: int = 50, phrases: List[str] | None = None
+        self,
+        db_path: str,
+        limit: int = 50,
+        phrases: List[str] | None = None,
+        include_prompts: bool = True,
+        include_generations: bool = True,
     ) -> Dict[str, Any]:
         """Extract conversation data from a database file with optional phrase filtering.
 
@@ -24,51 +97,469 @@ class ConversationDataExtractor:
             db_path: Path to the database file
             limit: Maximum number of entries to return
             phrases: List of phrases to filter by (applied at SQL level)
+            include_prompts: Whether to fetch prompts
+            include_generations: Whether to fetch generations
 
         Returns:
             Dictionary containing extracted conversation data
         """
-        return self.query_executor.execute_conversation_query(db_path, limit, phrases)
+        return self.query_executor.execute_conversation_query(
+            db_path, limit, phrases, include_prompts, include_generations
+        )
 
     def process_database_files(
         self,
         registry_data: Dict[str, Any],
         limit: int,
         phrases: List[str] | None = None,
+        force_rescan: bool = False,
+        include_prompts: bool = True,
+        include_generations: bool = True,
+        window: TimeWindow | None = None,
     ) -> tuple[List[Dict[str, Any]], List[str], int, Dict[str, int]]:
         """Process database files from registry and extract conversation data.
 
+        Without an index, databases are extracted by up to ``max_workers``
+        threads and returned in discovery order; a database that fails
+        yields its error without stopping the others. With a window,
+        ``limit`` applies to the entries inside it, and databases known to
+        hold no entry inside it are skipped unopened. Entries repeated
+        across databases are kept in the first database holding them, which
+        lists the others under "sources". A cancelled request stops before
+        the next database is opened.
+
         Args:
             registry_data: The loaded registry data
             limit: Maximum number of conversations to return per database
             phrases: List of phrases to filter by
+            force_rescan: Ignore the discovery manifest and rescan every path
+            include_prompts: Whether to fetch prompts
+            include_generations: Whether to fetch generations
+            window: Dates the entries must fall in
 
         Returns:
             Tuple of (all_conversations, found_paths, total_db_files, db_file_counts)
+
+        Raises:
+            RequestCancelledError: If the request is cancelled
+        """
+        found_paths, total_db_files, db_file_counts = self.discover_databases(
+            registry_data, force_rescan
+        )
+        all_conversations = self.extract_databases(
+            found_paths, limit, phrases, include_prompts, include_generations, window
+        )
+        return all_conversations, found_paths, total_db_files, db_file_counts
+
+    def discover_databases(
+        self, registry_data: Dict[str, Any], force_rescan: bool = False
+    ) -> tuple[List[str], int, Dict[str, int]]:
+        """Discover the database files of the registry.
+
+        Cached statistics and partitions of databases no longer found are
+        dropped.
+
+        Args:
+            registry_data: The loaded registry data
+            force_rescan: Ignore the discovery manifest and rescan every path
+
+        Returns:
+            Tuple of (found_paths, total_db_files, db_file_counts)
         """
         total_db_files = 0
         db_file_counts: Dict[str, int] = {}
         found_paths = []
-        all_conversations = []
-
-        for tool_name, paths in registry_data.items():
-            if isinstance(paths, list):
-                for path in paths:
-                    if os.path.exists(path):
-                        for db_file in SUPPORTED_DB_FILES:
-                            for root, dirs, files in os.walk(path):
-                                if db_file in files:
-                                    db_path = os.path.join(root, db_file)
-                                    total_db_files += 1
-                                    db_file_counts[db_file] = (
-                                        db_file_counts.get(db_file, 0) + 1
-                                    )
-                                    found_paths.append(db_path)
-
-                                    # Extract conversation data from this database
-                                    conversation_data = self.extract_conversation_data(
-                                        db_path, limit, phrases
-                                    )
-                                    all_conversations.append(conversation_data)
 
-        return all_conversations, found_paths, total_db_files, db_file_counts
+        for db_path in self.discovery.discover_registry(registry_data, force_rescan):
+            db_file = os.path.basename(db_path)
+            total_db_files += 1
+            db_file_counts[db_file] = db_file_counts.get(db_file, 0) + 1
+            found_paths.append(db_path)
+        self.retain_databases(found_paths)
+        return found_paths, total_db_files, db_file_counts
+
+    def extract_databases(
+        self,
+        db_paths: List[str],
+        limit: int,
+        phrases: List[str] | None = None,
+        include_prompts: bool = True,
+        include_generations: bool = True,
+        window: TimeWindow | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Extract conversation data from the given databases.
+
+        See ``process_database_files``, which discovers ``db_paths``.
+
+        Returns:
+            Conversation data per database, in the order of ``db_paths``
+
+        Raises:
+            RequestCancelledError: If the request is cancelled
+        """
+        indexed = self._search_index(
+            db_paths, limit, phrases, include_prompts, include_generations, window
+        )
+        if indexed is not None:
+            self._deduplicate(indexed)
+            return indexed
+
+        # Pool threads do not inherit the request context
+        cancel_event = current_cancel_event()
+
+        def extract(db_path: str) -> Dict[str, Any]:
+            raise_if_cancelled(cancel_event)
+            return self._extract_isolated(
+                db_path, limit, phrases, include_prompts, include_generations, window
+            )
+
+        if self.max_workers == 1 or len(db_paths) < 2:
+            all_conversations = [extract(db_path) for db_path in db_paths]
+        else:
+            # map yields results in input order, whichever finishes first
+            all_conversations = list(self._get_executor().map(extract, db_paths))
+
+        self._deduplicate(all_conversations)
+        return all_conversations
+
+    def retain_databases(self, db_paths: Iterable[str]) -> None:
+        """Keep cached statistics and partitions only for the given databases.
+
+        Discovery calls this with every database it found, so caches of
+        databases that went away are dropped in one place, and extractions
+        still running for them do not add them back.
+        """
+        retained = set(db_paths)
+        with self._cache_lock:
+            self._retained_paths = retained
+            for db_path in self._term_statistics.keys() - retained:
+                del self._term_statistics[db_path]
+            for db_path in self._time_partitions.keys() - retained:
+                del self._time_partitions[db_path]
+
+    def _cache_database(self, cache: Dict[str, Any], db_path: str, value: Any) -> None:
+        """Cache a value of one database unless it is no longer retained."""
+        with self._cache_lock:
+            if self._retained_paths is None or db_path in self._retained_paths:
+                cache[db_path] = value
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the extraction thread pool, starting it on first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="gandalf-extract",
+                )
+            return self._executor
+
+    def close(self) -> None:
+        """Stop the extraction threads once running extractions finish."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _extract_isolated(
+        self,
+        db_path: str,
+        limit: int,
+        phrases: List[str] | None,
+        include_prompts: bool,
+        include_generations: bool,
+        window: TimeWindow | None,
+    ) -> Dict[str, Any]:
+        """Extract one database, turning any failure into its error result.
+
+        Query errors are already reported in the result; this also keeps an
+        unexpected error in one database from failing the whole recall.
+        """
+        try:
+            if window is not None:
+                return self._extract_window(
+                    db_path,
+                    limit,
+                    phrases,
+                    include_prompts,
+                    include_generations,
+                    window,
+                )
+            return self.extract_conversation_data(
+                db_path, limit, phrases, include_prompts, include_generations
+            )
+        except Exception as e:
+            error_msg = f"Unexpected extraction error: {str(e)}"
+            log_error(error_msg, {"traceback": traceback.format_exc()})
+            return self._empty_result(db_path, error_msg)
+
+    @staticmethod
+    def _empty_result(db_path: str, error: str | None = None) -> Dict[str, Any]:
+        """Conversation data of a database that contributes no entries."""
+        return {
+            "prompts": [],
+            "generations": [],
+            "history_entries": [],
+            "database_path": db_path,
+            "error": error,
+        }
+
+    def _deduplicate(self, conversations: List[Dict[str, Any]]) -> None:
+        """Drop entries repeated across databases when deduplication is on."""
+        if not self.deduplicate:
+            return
+        dropped = deduplicate_conversations(conversations)
+        if dropped:
+            log_debug("Dropped duplicate conversation entries", {"dropped": dropped})
+
+    def _search_index(
+        self,
+        db_paths: List[str],
+        limit: int,
+        phrases: List[str] | None,
+        include_prompts: bool,
+        include_generations: bool,
+        window: TimeWindow | None = None,
+    ) -> List[Dict[str, Any]] | None:
+        """Refresh the conversation index and search it for every database.
+
+        Returns:
+            Conversation data per database in discovery order, or None when
+            there is no index or it cannot be used
+        """
+        if self.index is None:
+            return None
+        try:
+            errors = self.index.refresh(db_paths)
+            results = self.index.search(
+                db_paths,
+                limit,
+                phrases,
+                include_prompts,
+                include_generations,
+                window=window,
+            )
+        except (sqlite3.Error, OSError) as e:
+            log_error(
+                f"Conversation index unavailable, querying databases: {str(e)}",
+                {"traceback": traceback.format_exc()},
+            )
+            return None
+
+        for db_path, error in errors.items():
+            results[db_path]["error"] = error
+        return [results[db_path] for db_path in db_paths]
+
+    def _extract_window(
+        self,
+        db_path: str,
+        limit: int,
+        phrases: List[str] | None,
+        include_prompts: bool,
+        include_generations: bool,
+        window: TimeWindow,
+    ) -> Dict[str, Any]:
+        """Extract the newest entries of one database that fall in a window.
+
+        A database whose cached partitions show no entry in the window is
+        skipped unopened, and without phrases the cached partitions tell how
+        many trailing entries hold the window, so only those are read.
+        Otherwise every matching entry is read, so the limit counts entries
+        in the window rather than the newest overall, and an unfiltered read
+        refreshes the cached partitions.
+        """
+        fingerprint = get_database_fingerprint(db_path)
+        cached = self._time_partitions.get(db_path)
+        if cached is not None and cached[0] == fingerprint:
+            if not any(
+                partitions.overlaps(window) for partitions in cached[1].values()
+            ):
+                return self._empty_result(db_path)
+            if not phrases:
+                tail_data = self._extract_window_tail(
+                    db_path,
+                    limit,
+                    include_prompts,
+                    include_generations,
+                    window,
+                    cached[1],
+                )
+                if tail_data is not None:
+                    return tail_data
+
+        conversation_data = self.extract_conversation_data(
+            db_path, 0, phrases, include_prompts, include_generations
+        )
+        if conversation_data.get("error"):
+            return conversation_data
+        partitions = self._build_time_partitions(conversation_data)
+        # Only a read of every entry describes the whole database
+        if (
+            fingerprint is not None
+            and not phrases
+            and include_prompts
+            and include_generations
+        ):
+            self._cache_database(
+                self._time_partitions, db_path, (fingerprint, partitions)
+            )
+        for field, field_partitions in partitions.items():
+            entries = conversation_data[field]
+            timestamps = conversation_timestamps(conversation_data, field)
+            positions = field_partitions.select(window)
+            if limit > 0:
+                positions = positions[-limit:]
+            conversation_data[field] = [entries[p] for p in positions]
+            conversation_data["timestamps"][field] = array(
+                "q", (timestamps[p] for p in positions)
+            )
+        return conversation_data
+
+    def _extract_window_tail(
+        self,
+        db_path: str,
+        limit: int,
+        include_prompts: bool,
+        include_generations: bool,
+        window: TimeWindow,
+        partitions: Dict[str, TimePartitions],
+    ) -> Dict[str, Any] | None:
+        """Read only the trailing entries holding a window's newest entries.
+
+        Args:
+            partitions: Cached partitions of the current database snapshot
+
+        Returns:
+            Conversation data, or None when the entries read do not line up
+            with the partitions and every entry must be read instead
+        """
+        included = {
+            "prompts": include_prompts,
+            "generations": include_generations,
+            "history_entries": True,
+        }
+        selected: Dict[str, List[int]] = {}
+        for field, field_partitions in partitions.items():
+            if included.get(field):
+                positions = field_partitions.select(window)
+                selected[field] = positions[-limit:] if limit > 0 else positions
+        tail = max(
+            (
+                len(partitions[field]) - positions[0]
+                for field, positions in selected.items()
+                if positions
+            ),
+            default=0,
+        )
+        if tail == 0:
+            return self._empty_result(db_path)
+
+        conversation_data = self.extract_conversation_data(
+            db_path, tail, None, include_prompts, include_generations
+        )
+        if conversation_data.get("error"):
+            return conversation_data
+        for field, positions in selected.items():
+            entries = conversation_data[field]
+            timestamps = conversation_timestamps(conversation_data, field)
+            offset = len(partitions[field]) - len(entries)
+            if positions and positions[0] < offset:
+                return None
+            conversation_data[field] = [entries[p - offset] for p in positions]
+            conversation_data["timestamps"][field] = array(
+                "q", (timestamps[p - offset] for p in positions)
+            )
+        return conversation_data
+
+    @staticmethod
+    def _build_time_partitions(
+        conversation_data: Dict[str, Any],
+    ) -> Dict[str, TimePartitions]:
+        """Partition the entries of each conversation array by week."""
+        return {
+            field: TimePartitions.build(
+                conversation_timestamps(conversation_data, field)
+            )
+            for field in ENTRY_TYPE_FIELDS.values()
+            if isinstance(conversation_data.get(field), list)
+        }
+
+    def get_term_statistics(
+        self,
+        db_paths: List[str],
+        terms: Iterable[str],
+        include_prompts: bool = True,
+        include_generations: bool = True,
+        include_history: bool = True,
+    ) -> TermStatistics:
+        """Get BM25 statistics over every entry of the given databases.
+
+        The conversation index keeps them up to date as it ingests. Without
+        it, each database's statistics are built once from all of its
+        entries and reused until its fingerprint changes.
+
+        Args:
+            db_paths: Databases making up the corpus
+            terms: Terms whose document frequencies are needed
+            include_prompts: Whether prompts are part of the corpus
+            include_generations: Whether generations are part of the corpus
+            include_history: Whether history entries are part of the corpus
+
+        Returns:
+            Combined statistics for the given terms
+        """
+        terms = list(terms)
+        entry_types = [
+            entry_type
+            for entry_type, included in (
+                ("prompt", include_prompts),
+                ("generation", include_generations),
+                ("history", include_history),
+            )
+            if included
+        ]
+        if self.index is not None:
+            try:
+                return self.index.term_statistics(entry_types, terms)
+            except (sqlite3.Error, OSError) as e:
+                log_error(
+                    f"Conversation index unavailable, building statistics: {str(e)}",
+                    {"traceback": traceback.format_exc()},
+                )
+
+        return TermStatistics.combine(
+            (
+                self._database_term_statistics(db_path)[entry_type]
+                for db_path in dict.fromkeys(db_paths)
+                for entry_type in entry_types
+            ),
+            terms,
+        )
+
+    def _database_term_statistics(self, db_path: str) -> Dict[str, TermStatistics]:
+        """Get the statistics of each entry type of one database snapshot."""
+        raise_if_cancelled()
+        fingerprint = get_database_fingerprint(db_path)
+        cached = self._term_statistics.get(db_path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        statistics = {
+            entry_type: TermStatistics() for entry_type, _ in INDEXED_KEYS.values()
+        }
+        conversation_data = self.extract_conversation_data(db_path, 0)
+        if conversation_data.get("error"):
+            return statistics
+        for entry_type, field in INDEXED_KEYS.values():
+            for entry in conversation_data[field]:
+                statistics[entry_type].add(entry_text(entry))
+        if fingerprint is not None:
+            self._cache_database(
+                self._term_statistics, db_path, (fingerprint, statistics)
+            )
+            # The same full read tells which weeks the database covers
+            self._cache_database(
+                self._time_partitions,
+                db_path,
+                (fingerprint, self._build_time_partitions(conversation_data)),
+            )
+        return statistics
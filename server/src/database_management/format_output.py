@@ -2,13 +2,19 @@
 Output formatting for conversation recall operations.
 """
 
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TypedDict
 
 from src.config.constants import (
     DEFAULT_INCLUDE_EDITOR_HISTORY,
     MAX_SUMMARY_ENTRIES,
     MAX_SUMMARY_LENGTH,
 )
+from src.database_management.entry_timestamps import (
+    conversation_timestamps,
+    entry_timestamps,
+)
+from src.database_management.phrase_matcher import PhraseMatcher
+from src.database_management.time_partitions import TimeWindow
 
 
 class ConversationSummary(TypedDict, total=False):
@@ -25,11 +31,31 @@ class ConversationSummary(TypedDict, total=False):
 class OutputFormatter:
     """Formats conversation data for output."""
 
-    def create_conversation_summary(self, conversation: Dict[str, Any]) -> str:
+    def __init__(self) -> None:
+        self._phrase_matcher: PhraseMatcher | None = None
+
+    def _get_phrase_matcher(self, phrases: List[str]) -> PhraseMatcher:
+        """Get the matcher for the given phrases, reusing the last one built.
+
+        Every database of a request is formatted with the same phrases, so
+        the matcher is built once per request rather than once per entry.
+        """
+        matcher = self._phrase_matcher
+        if matcher is None or matcher.phrases != list(phrases):
+            matcher = self._phrase_matcher = PhraseMatcher(phrases)
+        return matcher
+
+    def create_conversation_summary(
+        self,
+        conversation: Dict[str, Any],
+        match_span: Optional[Tuple[int, int]] = None,
+    ) -> str:
         """Create a concise summary of a conversation entry.
 
         Args:
             conversation: Conversation data dictionary
+            match_span: Start and end of a phrase match in the text content,
+                kept in the summary when truncation would cut it out
 
         Returns:
             Concise summary string limited to MAX_SUMMARY_LENGTH
@@ -54,10 +80,39 @@ class OutputFormatter:
         summary = text_content.strip()
         if len(summary) > MAX_SUMMARY_LENGTH:
             half_length = MAX_SUMMARY_LENGTH // 2
+            if match_span is not None:
+                leading = len(text_content) - len(text_content.lstrip())
+                start, end = match_span[0] - leading, match_span[1] - leading
+                tail_start = len(summary) - (half_length - 3)
+                if end > half_length and start < tail_start:
+                    return self._match_snippet(summary, start, end)
             summary = summary[:half_length] + "..." + summary[-(half_length - 3) :]
 
         return summary
 
+    def _first_match_span(
+        self, conversation: Dict[str, Any], matcher: PhraseMatcher
+    ) -> Optional[Tuple[int, int]]:
+        """Locate the first phrase match of a text too long to summarize whole."""
+        text = self._extract_text_content(conversation)
+        if len(text) <= MAX_SUMMARY_LENGTH:
+            return None
+        offsets = matcher.scan(text).offsets
+        if not offsets:
+            return None
+        start, index = offsets[0]
+        return start, start + len(matcher.phrases[index])
+
+    def _match_snippet(self, summary: str, start: int, end: int) -> str:
+        """Cut a MAX_SUMMARY_LENGTH window of the summary around a match."""
+        width = MAX_SUMMARY_LENGTH - 6
+        begin = max(0, start - max(0, width - (end - start)) // 2)
+        begin = min(begin, len(summary) - width)
+        snippet = summary[begin : begin + width]
+        prefix = "..." if begin > 0 else ""
+        suffix = "..." if begin + width < len(summary) else ""
+        return prefix + snippet + suffix
+
     def _is_editor_state(self, history_entry: Dict[str, Any]) -> bool:
         """Return True if entry is editor UI state (not conversational)."""
         if not isinstance(history_entry, dict):
@@ -97,6 +152,8 @@ class OutputFormatter:
         conversation: Dict[str, Any],
         phrases: List[str],
         recency_scorer: Optional[Any] = None,
+        matcher: Optional[PhraseMatcher] = None,
+        timestamp_ms: Optional[int] = None,
     ) -> float:
         """Score conversation relevance using exact phrase matching or recency.
 
@@ -108,6 +165,10 @@ class OutputFormatter:
             conversation: Conversation data
             phrases: List of exact phrases to search for (case-insensitive)
             recency_scorer: Optional RecencyScorer instance
+            matcher: PhraseMatcher built from ``phrases``, defaults to the
+                formatter's cached matcher
+            timestamp_ms: Normalized timestamp of the conversation, read from
+                the conversation when not given
 
         Returns:
             Relevance score (0.0 or 1.0 for phrase match, 0.0-1.0 for recency)
@@ -117,18 +178,18 @@ class OutputFormatter:
 
         # If phrases provided, use exact phrase matching
         if phrases:
-            conversation_text = self._extract_text_content(conversation).lower()
-            matched = sum(
-                1
-                for phrase in phrases
-                if phrase and phrase.lower() in conversation_text
-            )
-            return matched / len(phrases) if phrases else 0.0
+            matcher = matcher or self._get_phrase_matcher(phrases)
+            text = self._extract_text_content(conversation)
+            return matcher.matched_count(text) / len(phrases)
 
         # No phrases: use recency scoring
         if recency_scorer:
             try:
-                score: float = recency_scorer.calculate_recency_score(conversation)
+                score: float = (
+                    recency_scorer.calculate_recency_score(conversation)
+                    if timestamp_ms is None
+                    else recency_scorer.score_timestamp_ms(timestamp_ms)
+                )
                 return score
             except Exception:
                 pass
@@ -155,8 +216,8 @@ class OutputFormatter:
         phrases: List[str] | None = None,
         include_editor_history: bool = DEFAULT_INCLUDE_EDITOR_HISTORY,
         recency_scorer: Optional[Any] = None,
-        date_from: Optional[str] = None,
-        date_to: Optional[str] = None,
+        window: Optional[TimeWindow] = None,
+        bm25_scorer: Optional[Any] = None,
     ) -> Dict[str, Any]:
         """Format a conversation entry with concise output for reduced context window impact.
 
@@ -167,11 +228,21 @@ class OutputFormatter:
             phrases: List of search phrases for relevance scoring
             include_editor_history: Whether to include editor UI state entries
             recency_scorer: Optional RecencyScorer instance
+            window: Optional dates the entries must fall in
+            bm25_scorer: Optional BM25Scorer ranking phrase matches instead
+                of the share of phrases matched
 
         Returns:
-            Formatted conversation entry dictionary with flattened structure
+            Formatted conversation entry dictionary with flattened structure;
+            entries found in several databases list them under "sources",
+            and entries of data carrying "content_keys" keep theirs under
+            "content_key"
         """
         phrases = phrases or []
+        sources: Dict[str, Dict[int, List[str]]] = conv_data.get("sources") or {}
+        content_keys: Dict[str, List[Optional[bytes]]] = (
+            conv_data.get("content_keys") or {}
+        )
 
         if conv_data.get("error"):
             return {"status": "error", "error": conv_data["error"], "conversations": []}
@@ -185,8 +256,11 @@ class OutputFormatter:
                 "prompt",
                 phrases,
                 recency_scorer,
-                date_from,
-                date_to,
+                window,
+                bm25_scorer,
+                conversation_timestamps(conv_data, "prompts"),
+                sources.get("prompts"),
+                content_keys.get("prompts"),
             )
             conversations.extend(prompt_entries)
 
@@ -196,22 +270,49 @@ class OutputFormatter:
                 "generation",
                 phrases,
                 recency_scorer,
-                date_from,
-                date_to,
+                window,
+                bm25_scorer,
+                conversation_timestamps(conv_data, "generations"),
+                sources.get("generations"),
+                content_keys.get("generations"),
             )
             conversations.extend(generation_entries)
 
         if conv_data.get("history_entries"):
             history_list = conv_data["history_entries"]
+            history_timestamps: Sequence[int] = conversation_timestamps(
+                conv_data, "history_entries"
+            )
+            history_sources = sources.get("history_entries")
+            history_keys: Optional[List[Optional[bytes]]] = content_keys.get(
+                "history_entries"
+            )
             if not include_editor_history:
-                history_list = [h for h in history_list if not self._is_editor_state(h)]
+                kept = [
+                    i
+                    for i, h in enumerate(history_list)
+                    if not self._is_editor_state(h)
+                ]
+                history_list = [history_list[i] for i in kept]
+                history_timestamps = [history_timestamps[i] for i in kept]
+                if history_sources:
+                    history_sources = {
+                        position: history_sources[i]
+                        for position, i in enumerate(kept)
+                        if i in history_sources
+                    }
+                if history_keys is not None:
+                    history_keys = [history_keys[i] for i in kept]
             history_entries = self._process_entries(
                 history_list,
                 "history",
                 phrases,
                 recency_scorer,
-                date_from,
-                date_to,
+                window,
+                bm25_scorer,
+                history_timestamps,
+                history_sources,
+                history_keys,
             )
             conversations.extend(history_entries)
 
@@ -226,86 +327,98 @@ class OutputFormatter:
         entry_type: str,
         phrases: List[str],
         recency_scorer: Optional[Any],
-        date_from: Optional[str] = None,
-        date_to: Optional[str] = None,
+        window: Optional[TimeWindow] = None,
+        bm25_scorer: Optional[Any] = None,
+        timestamps: Optional[Sequence[int]] = None,
+        sources: Optional[Dict[int, List[str]]] = None,
+        content_keys: Optional[Sequence[Optional[bytes]]] = None,
     ) -> List[Dict[str, Any]]:
         """Process entries with phrase-aware limiting.
 
         When phrases are provided, returns ALL matches (no per-database limit).
         Global limit is applied later in the tool. Without phrases, limits first.
+        Entries outside the window are dropped before they are scored.
 
         Args:
             entries: List of conversation entries to process
             entry_type: Type label for the entries (prompt, generation, history)
             phrases: List of search phrases for relevance scoring
             recency_scorer: Optional RecencyScorer instance
+            window: Optional dates the entries must fall in
+            bm25_scorer: Optional BM25Scorer scoring the phrase matches
+            timestamps: Normalized timestamps parallel to ``entries``,
+                computed here when not given
+            sources: Databases of the entries found in several, keyed by
+                position in ``entries``
+            content_keys: Content keys parallel to ``entries``, copied to
+                the processed entries
 
         Returns:
             List of processed entry dictionaries
         """
         result: List[Dict[str, Any]] = []
+        if timestamps is None:
+            timestamps = entry_timestamps(entries)
+        sources = sources or {}
+        dated = list(enumerate(zip(entries, timestamps)))
+        if window is not None:
+            dated = [
+                (position, (entry_data, timestamp_ms))
+                for position, (entry_data, timestamp_ms) in dated
+                if window.contains(timestamp_ms)
+            ]
 
         if phrases:
             # With phrases: score all, filter matches, NO per-database limit
             # Global limit is applied in recall_conversations_tool.py
-            for entry_data in entries:
+            matcher = self._get_phrase_matcher(phrases)
+            for position, (entry_data, timestamp_ms) in dated:
                 relevance = self._truncate_relevance(
                     self.score_conversation_relevance(
-                        entry_data, phrases, recency_scorer
+                        entry_data, phrases, recency_scorer, matcher
                     )
                 )
                 if relevance > 0:
-                    # Apply date filtering if requested
-                    if date_from or date_to:
-                        ts = (
-                            recency_scorer.extract_timestamp(entry_data)
-                            if recency_scorer
-                            else None
+                    if bm25_scorer is not None:
+                        relevance = self._truncate_relevance(
+                            bm25_scorer.calculate_relevance(
+                                entry_data,
+                                self._extract_text_content(entry_data),
+                                timestamp_ms,
+                            )
                         )
-                        if ts:
-                            ts_iso = ts.isoformat()
-                            if date_from and ts_iso < date_from:
-                                continue
-                            if date_to and ts_iso > date_to:
-                                continue
-
-                    summary = self.create_conversation_summary(entry_data)
-                    result.append(
-                        {
-                            "summary": summary,
-                            "type": entry_type,
-                            "relevance": relevance,
-                        }
+                    summary = self.create_conversation_summary(
+                        entry_data, self._first_match_span(entry_data, matcher)
                     )
+                    matched: Dict[str, Any] = {
+                        "summary": summary,
+                        "type": entry_type,
+                        "relevance": relevance,
+                    }
+                    if position in sources:
+                        matched["sources"] = sources[position]
+                    if content_keys is not None:
+                        matched["content_key"] = content_keys[position]
+                    result.append(matched)
         else:
             # Without phrases: limit first, then score for recency
-            for entry_data in entries[:MAX_SUMMARY_ENTRIES]:
+            for position, (entry_data, timestamp_ms) in dated[:MAX_SUMMARY_ENTRIES]:
                 summary = self.create_conversation_summary(entry_data)
                 relevance = self._truncate_relevance(
                     self.score_conversation_relevance(
-                        entry_data, phrases, recency_scorer
+                        entry_data, phrases, recency_scorer, timestamp_ms=timestamp_ms
                     )
                 )
-                # Apply date filtering if requested
-                if date_from or date_to:
-                    ts = (
-                        recency_scorer.extract_timestamp(entry_data)
-                        if recency_scorer
-                        else None
-                    )
-                    if ts:
-                        ts_iso = ts.isoformat()
-                        if date_from and ts_iso < date_from:
-                            continue
-                        if date_to and ts_iso > date_to:
-                            continue
-
                 entry: Dict[str, Any] = {
                     "summary": summary,
                     "type": entry_type,
                 }
                 if relevance > 0:
                     entry["relevance"] = relevance
+                if position in sources:
+                    entry["sources"] = sources[position]
+                if content_keys is not None:
+                    entry["content_key"] = content_keys[position]
                 result.append(entry)
 
         return result
@@ -0,0 +1,172 @@
+"""
+Low-priority background maintenance of the persistent conversation index.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import traceback
+from pathlib import Path
+from typing import Any, Dict, List
+
+from src.config.constants import (
+    GANDALF_INDEX_FILE,
+    INDEX_MAINTENANCE_INTERVAL_SECONDS,
+    INDEX_MAINTENANCE_TIMEOUT_SECONDS,
+    INDEX_MAX_BYTES,
+    INDEX_RETENTION_DAYS,
+)
+from src.database_management.conversation_index import ConversationIndex
+from src.utils.logger import log_error, log_info
+
+# Lowest CPU scheduling priority
+MAINTENANCE_NICENESS = 19
+
+# Directory holding the src package, the working directory of the worker
+SERVER_ROOT = Path(__file__).resolve().parents[2]
+
+
+def low_priority_command(command: List[str]) -> List[str]:
+    """Wrap a command so it runs at idle I/O and lowest CPU priority.
+
+    ionice (Linux) puts the process in the idle I/O class, served only when
+    no other process wants the disk, and nice lowers its CPU priority. A
+    wrapper missing on the platform is left out.
+    """
+    prefix: List[str] = []
+    ionice = shutil.which("ionice")
+    if ionice:
+        prefix += [ionice, "-c", "3"]
+    nice = shutil.which("nice")
+    if nice:
+        prefix += [nice, "-n", str(MAINTENANCE_NICENESS)]
+    return prefix + command
+
+
+class IndexMaintenanceScheduler:
+    """Runs index maintenance periodically in a low-priority worker process.
+
+    Merging segments and vacuuming rewrite the index file, so the work runs
+    in a separate process started through ``low_priority_command`` instead
+    of a server thread: the IDE and the server's requests keep precedence
+    for the CPU and the disk, and the event loop is never blocked. The
+    worker opens the index on its own connection, which WAL mode lets run
+    beside the server's. Each run is logged with its counters.
+    """
+
+    def __init__(
+        self,
+        index_path: str = GANDALF_INDEX_FILE,
+        interval_seconds: float = INDEX_MAINTENANCE_INTERVAL_SECONDS,
+        max_bytes: int = INDEX_MAX_BYTES,
+        retention_days: float = INDEX_RETENTION_DAYS,
+        timeout_seconds: float = INDEX_MAINTENANCE_TIMEOUT_SECONDS,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            index_path: Index database to maintain
+            interval_seconds: Time between runs, the first run included
+            max_bytes: Size budget of the index, 0 for none
+            retention_days: Age after which entries are deleted, 0 for none
+            timeout_seconds: Time after which a run is killed
+        """
+        self.index_path = index_path
+        self.interval_seconds = interval_seconds
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.timeout_seconds = timeout_seconds
+
+    def command(self) -> List[str]:
+        """Command line of one low-priority maintenance run."""
+        return low_priority_command(
+            [
+                sys.executable,
+                "-m",
+                "src.database_management.index_maintenance",
+                "--index-file",
+                self.index_path,
+                "--max-bytes",
+                str(self.max_bytes),
+                "--retention-days",
+                str(self.retention_days),
+            ]
+        )
+
+    async def run_once(self) -> Dict[str, Any] | None:
+        """Run maintenance once in a worker process and log its counters.
+
+        Returns:
+            Counters of the run, or None when there is no index yet or the
+            run failed
+        """
+        if not os.path.exists(self.index_path):
+            return None
+        process = await asyncio.create_subprocess_exec(
+            *self.command(),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=SERVER_ROOT,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(), timeout=self.timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            log_error(
+                f"Index maintenance timed out after {self.timeout_seconds} seconds"
+            )
+            return None
+        finally:
+            # Also reached when the server cancels the scheduler
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        if process.returncode != 0:
+            log_error(
+                f"Index maintenance failed with exit code {process.returncode}",
+                {"stderr": stderr.decode("utf-8", errors="replace")},
+            )
+            return None
+        stats: Dict[str, Any] = json.loads(stdout)
+        log_info("Conversation index maintenance completed", stats)
+        return stats
+
+    async def run(self) -> None:
+        """Run maintenance every interval until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except (OSError, ValueError) as e:
+                log_error(
+                    f"Index maintenance error: {str(e)}",
+                    {"traceback": traceback.format_exc()},
+                )
+
+
+def main() -> None:
+    """Maintain the index once and print the counters as JSON."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--index-file", default=GANDALF_INDEX_FILE)
+    parser.add_argument("--max-bytes", type=int, default=INDEX_MAX_BYTES)
+    parser.add_argument("--retention-days", type=float, default=INDEX_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    # Also lowers the priority where the nice wrapper is unavailable
+    if hasattr(os, "nice"):
+        os.nice(max(0, MAINTENANCE_NICENESS - os.nice(0)))
+
+    index = ConversationIndex(args.index_file)
+    try:
+        stats = index.maintain(args.max_bytes, args.retention_days)
+    finally:
+        index.close()
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,669 @@
+"""
+In-memory inverted index of conversation entries across every database.
+"""
+
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+from src.database_management.bm25_scorer import (
+    TOKEN_PATTERN,
+    TermStatistics,
+    tokenize,
+)
+from src.database_management.conversation_source import (
+    ENTRY_TYPE_FIELDS,
+    IncrementalArrayReader,
+    Watermark,
+    entry_text,
+)
+from src.database_management.database_fingerprint import (
+    DatabaseFingerprint,
+    get_database_fingerprint,
+)
+from src.database_management.entry_timestamps import (
+    CONVERSATION_FIELDS,
+    UNDATED,
+    entry_timestamp_ms,
+)
+from src.database_management.execute_query import QueryExecutor
+from src.database_management.time_partitions import TimePartitions, TimeWindow
+from src.utils.cancellation import raise_if_cancelled
+from src.utils.logger import log_debug, log_error
+
+# Removed documents are only dropped from the postings once they outnumber
+# the live ones and there are at least this many
+COMPACT_MIN_DEAD_DOCUMENTS = 4096
+
+# Lone phrase words whose vocabulary matches are kept between searches
+SUBSTRING_CACHE_SIZE = 256
+
+# A phrase search draws candidates from postings only when they hold fewer
+# than this share of the documents a scan would check per phrase; checking a
+# candidate costs several times what scanning a document does
+INDEXED_CANDIDATE_SHARE = 0.125
+
+
+def _value_bytes(value: Any) -> int:
+    """Approximate the memory held by a decoded JSON value."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + _value_bytes(item)
+    elif isinstance(value, list):
+        for item in value:
+            size += _value_bytes(item)
+    return size
+
+
+def _contains(documents: "array[int]", document: int) -> bool:
+    """Check whether a sorted document array holds a document."""
+    i = bisect_left(documents, document)
+    return i < len(documents) and documents[i] == document
+
+
+def _prefixed(terms: List[str], prefix: str) -> Iterator[str]:
+    """Yield the terms of a sorted list that start with ``prefix``."""
+    for i in range(bisect_left(terms, prefix), len(terms)):
+        if not terms[i].startswith(prefix):
+            break
+        yield terms[i]
+
+
+@dataclass
+class PhrasePlan:
+    """How one search phrase is matched against the documents.
+
+    ``driver`` holds the documents of the phrase word with the fewest, the
+    only ones that can match; None when it holds so many documents that
+    scanning is cheaper. Every matching document is also in each array of
+    ``filters``. ``verify`` tells whether candidates still need the
+    substring check against their lowercase text.
+    """
+
+    lowered: str
+    driver: "array[int] | None"
+    filters: List["array[int]"]
+    verify: bool
+
+
+@dataclass
+class SourceArray:
+    """Documents indexed from one conversation array of a source database."""
+
+    documents: "array[int]" = field(default_factory=lambda: array("I"))
+    watermark: Watermark | None = None
+    # Positions in ``documents`` by week of the entries' timestamps
+    partitions: TimePartitions = field(default_factory=TimePartitions)
+
+
+@dataclass
+class SourceState:
+    """Snapshot and arrays indexed from one source database."""
+
+    fingerprint: DatabaseFingerprint | None = None
+    arrays: Dict[str, SourceArray] = field(default_factory=dict)
+
+
+class InvertedIndex:
+    """In-memory inverted index for the long-running server.
+
+    Every entry is a document whose lowercase word terms are posted to
+    sorted document id arrays. The index is built by the first ``refresh``
+    and kept up to date incrementally: unchanged sources are skipped, and
+    only entries appended to an array since its watermark are tokenized.
+    Each document's lowercase text is kept for the substring check. A
+    phrase search takes each source array's candidates from the postings
+    of the phrase word held by the fewest documents, checks the other
+    words by bisection and walks them newest first until it has ``limit``
+    matches. Where the postings would not rule out most of an array, its
+    lowercase texts are scanned instead. Each document's
+    timestamp is kept, and each source array partitions its documents by
+    week, so a search bounded by dates skips arrays and weeks outside its
+    window. It has the same interface as ConversationIndex and returns the
+    same results.
+    """
+
+    def __init__(self, query_executor: QueryExecutor | None = None) -> None:
+        """Initialize an empty index.
+
+        Args:
+            query_executor: Executor used to open source databases
+        """
+        self.reader = IncrementalArrayReader(query_executor)
+        self._lock = threading.Lock()
+        self._sources: Dict[str, SourceState] = {}
+        self._postings: Dict[str, "array[int]"] = {}
+        # Terms in the order they were first posted, and sorted for prefix
+        # and (reversed) suffix lookups, rebuilt when the vocabulary grew
+        self._terms: List[str] = []
+        self._sorted_terms: List[str] = []
+        self._sorted_reversed_terms: List[str] = []
+        # Lone word -> (terms looked at so far, terms containing it)
+        self._substring_terms: Dict[str, Tuple[int, List[str]]] = {}
+        self._entries: List[Any] = []
+        self._texts: List[str] = []
+        self._groups = array("I")
+        self._lengths = array("I")
+        self._timestamps = array("q")
+        self._live = bytearray()
+        self._group_keys: List[tuple[str, str]] = []
+        self._group_ids: Dict[tuple[str, str], int] = {}
+        self._type_totals: Dict[str, List[int]] = {}
+        self._dead_documents = 0
+        self._posting_count = 0
+        self._vocabulary_bytes = 0
+        self._entry_bytes = 0
+        self._text_bytes = 0
+        self.build_ms: float | None = None
+        self.last_stats: Dict[str, Any] = {}
+
+    def _group_id(self, db_path: str, entry_type: str) -> int:
+        key = (db_path, entry_type)
+        group = self._group_ids.get(key)
+        if group is None:
+            group = len(self._group_keys)
+            self._group_keys.append(key)
+            self._group_ids[key] = group
+        return group
+
+    def _add_documents(self, group: int, entries: Iterable[Any]) -> "array[int]":
+        """Post the terms of new entries and return their document ids."""
+        entry_type = self._group_keys[group][1]
+        totals = self._type_totals.setdefault(entry_type, [0, 0])
+        documents = array("I")
+        postings_by_term = self._postings
+        new_terms = self._terms
+        for entry in entries:
+            document = len(self._entries)
+            # Already lowered, so the words are split without tokenize
+            text = entry_text(entry).lower()
+            terms = TOKEN_PATTERN.findall(text)
+            self._entries.append(entry)
+            self._entry_bytes += _value_bytes(entry)
+            self._texts.append(text)
+            self._text_bytes += sys.getsizeof(text)
+            self._groups.append(group)
+            self._lengths.append(len(terms))
+            timestamp_ms = entry_timestamp_ms(entry)
+            self._timestamps.append(UNDATED if timestamp_ms is None else timestamp_ms)
+            self._live.append(1)
+            unique_terms = set(terms)
+            for term in unique_terms:
+                postings = postings_by_term.get(term)
+                if postings is None:
+                    postings = postings_by_term[term] = array("I")
+                    new_terms.append(term)
+                    self._vocabulary_bytes += sys.getsizeof(term)
+                postings.append(document)
+            self._posting_count += len(unique_terms)
+            totals[0] += 1
+            totals[1] += len(terms)
+            documents.append(document)
+        return documents
+
+    def _remove_documents(self, documents: Iterable[int]) -> None:
+        """Mark documents removed; their postings are dropped on compaction."""
+        for document in documents:
+            if not self._live[document]:
+                continue
+            self._live[document] = 0
+            self._entry_bytes -= _value_bytes(self._entries[document])
+            self._text_bytes -= sys.getsizeof(self._texts[document])
+            self._entries[document] = None
+            self._texts[document] = ""
+            totals = self._type_totals[self._group_keys[self._groups[document]][1]]
+            totals[0] -= 1
+            totals[1] -= self._lengths[document]
+            self._dead_documents += 1
+
+    def _compact(self) -> None:
+        """Rebuild the postings from live documents once most are removed."""
+        live = len(self._entries) - self._dead_documents
+        if (
+            self._dead_documents < COMPACT_MIN_DEAD_DOCUMENTS
+            or self._dead_documents <= live
+        ):
+            return
+        entries, groups, alive = self._entries, self._groups, self._live
+        self._postings = {}
+        self._terms = []
+        self._sorted_terms = []
+        self._sorted_reversed_terms = []
+        self._substring_terms = {}
+        self._entries = []
+        self._texts = []
+        self._groups = array("I")
+        self._lengths = array("I")
+        self._timestamps = array("q")
+        self._live = bytearray()
+        self._type_totals = {}
+        self._dead_documents = 0
+        self._posting_count = 0
+        self._vocabulary_bytes = 0
+        self._entry_bytes = 0
+        self._text_bytes = 0
+        renumbered: Dict[int, int] = {}
+        for document, entry in enumerate(entries):
+            if alive[document]:
+                renumbered[document] = len(self._entries)
+                self._add_documents(groups[document], [entry])
+        for state in self._sources.values():
+            for source_array in state.arrays.values():
+                source_array.documents = array(
+                    "I", (renumbered[d] for d in source_array.documents)
+                )
+
+    def _remove_source(self, db_path: str) -> None:
+        state = self._sources.pop(db_path, None)
+        if state is not None:
+            for source_array in state.arrays.values():
+                self._remove_documents(source_array.documents)
+
+    def _ingest_source(self, db_path: str) -> int:
+        """Bring the indexed entries of one source database up to date.
+
+        Returns:
+            Number of entries added
+
+        Raises:
+            sqlite3.Error: If the source cannot be read
+            OSError: If the source no longer exists
+            ValueError: If a source value is not valid JSON
+        """
+        fingerprint = get_database_fingerprint(db_path)
+        if fingerprint is None:
+            raise OSError(f"Database not found: {db_path}")
+        state = self._sources.get(db_path) or SourceState()
+        previous: Dict[str, Watermark] = {
+            entry_type: source_array.watermark
+            for entry_type, source_array in state.arrays.items()
+            if source_array.watermark is not None
+        }
+        updates = self.reader.read_updates(db_path, previous)
+
+        added = 0
+        for update in updates:
+            source_array = state.arrays.setdefault(update.entry_type, SourceArray())
+            if update.reset:
+                self._remove_documents(source_array.documents)
+                source_array.documents = array("I")
+                source_array.partitions = TimePartitions()
+            documents = self._add_documents(
+                self._group_id(db_path, update.entry_type), update.entries
+            )
+            for position, document in enumerate(documents, len(source_array.documents)):
+                source_array.partitions.add(position, self._timestamps[document])
+            source_array.documents.extend(documents)
+            source_array.watermark = update.watermark
+            added += len(update.entries)
+        state.fingerprint = fingerprint
+        self._sources[db_path] = state
+        return added
+
+    def refresh(self, db_paths: List[str]) -> Dict[str, str]:
+        """Bring the index up to date with the given source databases.
+
+        The first refresh builds the index. Later ones skip sources whose
+        fingerprint is unchanged and drop sources missing from ``db_paths``.
+        A source that fails to ingest is dropped, so it is retried next time.
+
+        Args:
+            db_paths: Every currently discovered database path
+
+        Returns:
+            Error messages keyed by the database paths that failed to ingest
+        """
+        started = time.perf_counter()
+        errors: Dict[str, str] = {}
+        stats: Dict[str, Any] = {
+            "ingested_sources": 0,
+            "unchanged_sources": 0,
+            "ingested_entries": 0,
+        }
+
+        with self._lock:
+            for db_path in self._sources.keys() - set(db_paths):
+                self._remove_source(db_path)
+
+            for db_path in dict.fromkeys(db_paths):
+                # Sources ingested so far stay indexed
+                raise_if_cancelled()
+                state = self._sources.get(db_path)
+                if (
+                    state is not None
+                    and state.fingerprint is not None
+                    and state.fingerprint == get_database_fingerprint(db_path)
+                ):
+                    stats["unchanged_sources"] += 1
+                    continue
+                try:
+                    stats["ingested_entries"] += self._ingest_source(db_path)
+                    stats["ingested_sources"] += 1
+                except (sqlite3.Error, OSError, ValueError) as e:
+                    error_msg = f"Index ingest error: {str(e)}"
+                    log_error(error_msg, {"traceback": traceback.format_exc()})
+                    errors[db_path] = error_msg
+                    self._remove_source(db_path)
+            self._compact()
+
+            refresh_ms = round((time.perf_counter() - started) * 1000, 3)
+            if self.build_ms is None:
+                self.build_ms = refresh_ms
+            stats["refresh_ms"] = refresh_ms
+            stats.update(self._footprint())
+        self.last_stats = stats
+        log_debug("Inverted index refreshed", stats)
+        return errors
+
+    def _footprint(self) -> Dict[str, Any]:
+        """Sizes of the index structures and of the entries it holds."""
+        return {
+            "documents": len(self._entries) - self._dead_documents,
+            "terms": len(self._postings),
+            # Each posting is a 4-byte document id
+            "postings_bytes": self._posting_count * 4,
+            "vocabulary_bytes": self._vocabulary_bytes + sys.getsizeof(self._postings),
+            "document_bytes": len(self._groups) * 16
+            + len(self._live)
+            + sys.getsizeof(self._entries),
+            "entry_bytes": self._entry_bytes,
+            "text_bytes": self._text_bytes + sys.getsizeof(self._texts),
+            "build_ms": self.build_ms,
+        }
+
+    def _slot_terms(self, tokens: List[str], slot: int) -> List[str]:
+        """Return the indexed terms a phrase word can occur inside.
+
+        A phrase found anywhere in a text has its inner words as whole
+        terms of the text, while its first word may end a longer term, its
+        last word may start one and a lone word may sit anywhere in one.
+        Prefixes and suffixes are looked up by bisection of the sorted
+        vocabulary; lone words are matched against terms posted since the
+        word was last searched for.
+        """
+        token = tokens[slot]
+        if len(tokens) == 1:
+            checked, terms = self._substring_terms.pop(token, (0, []))
+            terms.extend(term for term in self._terms[checked:] if token in term)
+            if len(self._substring_terms) >= SUBSTRING_CACHE_SIZE:
+                self._substring_terms.clear()
+            self._substring_terms[token] = (len(self._terms), terms)
+            return terms
+        if slot not in (0, len(tokens) - 1):
+            return [token] if token in self._postings else []
+        if len(self._sorted_terms) != len(self._terms):
+            self._sorted_terms = sorted(self._terms)
+            self._sorted_reversed_terms = sorted(term[::-1] for term in self._terms)
+        if slot == 0:
+            return [
+                term[::-1]
+                for term in _prefixed(self._sorted_reversed_terms, token[::-1])
+            ]
+        return list(_prefixed(self._sorted_terms, token))
+
+    def _plan(self, phrase: str) -> PhrasePlan:
+        """Choose the postings a phrase search draws its candidates from."""
+        lowered = phrase.lower()
+        tokens = tokenize(lowered)
+        if not tokens:
+            return PhrasePlan(lowered, None, [], True)
+        slots = [self._slot_terms(tokens, slot) for slot in range(len(tokens))]
+        sizes = [sum(len(self._postings[term]) for term in terms) for terms in slots]
+        rarest = min(range(len(slots)), key=sizes.__getitem__)
+        # A lone word matched inside a term is already a substring match
+        verify = len(tokens) > 1 or lowered != tokens[0]
+        live = len(self._entries) - self._dead_documents
+        if sizes[rarest] >= live * INDEXED_CANDIDATE_SHARE:
+            return PhrasePlan(lowered, None, [], verify)
+        terms = slots[rarest]
+        if len(terms) == 1:
+            driver = self._postings[terms[0]]
+        else:
+            driver = array(
+                "I", sorted(set().union(*(self._postings[term] for term in terms)))
+            )
+        # Words matching several terms are left to the substring check
+        filters = [
+            self._postings[terms[0]]
+            for slot, terms in enumerate(slots)
+            if slot != rarest and len(terms) == 1
+        ]
+        return PhrasePlan(lowered, driver, filters, verify)
+
+    def search(
+        self,
+        db_paths: List[str],
+        limit: int,
+        phrases: List[str] | None = None,
+        include_prompts: bool = True,
+        include_generations: bool = True,
+        include_history: bool = True,
+        window: TimeWindow | None = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Find entries in the index, shaped like per-database query results.
+
+        Each source contributes at most ``limit`` entries per type: the most
+        recent matches when phrases are given, otherwise the most recent
+        entries. Entries keep their source order. With a window, arrays
+        whose entries all lie outside it are skipped and only entries that
+        are undated or fall in it are returned.
+
+        Args:
+            db_paths: Databases to return results for
+            limit: Maximum entries per source and type, 0 or less for all
+            phrases: Phrases of which any must appear in the entry text
+            include_prompts: Whether to return prompts
+            include_generations: Whether to return generations
+            include_history: Whether to return history entries
+            window: Dates the entries must fall in
+
+        Returns:
+            Conversation data dictionaries keyed by database path, with the
+            indexed epoch-millisecond timestamps of each entry list under
+            "timestamps"
+        """
+        results: Dict[str, Dict[str, Any]] = {
+            db_path: {
+                "prompts": [],
+                "generations": [],
+                "history_entries": [],
+                "database_path": db_path,
+                "error": None,
+                "timestamps": {field: array("q") for field in CONVERSATION_FIELDS},
+            }
+            for db_path in db_paths
+        }
+        entry_types = [
+            entry_type
+            for entry_type, included in (
+                ("prompt", include_prompts),
+                ("generation", include_generations),
+                ("history", include_history),
+            )
+            if included
+        ]
+        phrases = [phrase for phrase in phrases or [] if phrase]
+
+        with self._lock:
+            arrays = {
+                self._group_ids[(db_path, entry_type)]: source_array
+                for db_path in results
+                if db_path in self._sources
+                for entry_type, source_array in self._sources[db_path].arrays.items()
+                if entry_type in entry_types
+                and (window is None or source_array.partitions.overlaps(window))
+            }
+            selected: Dict[int, List[int]] = {}
+            if not phrases:
+                for group, source_array in arrays.items():
+                    documents = source_array.documents
+                    if window is not None:
+                        positions = source_array.partitions.select(window)
+                        if limit > 0:
+                            positions = positions[-limit:]
+                        selected[group] = [documents[p] for p in positions]
+                        continue
+                    selected[group] = list(
+                        documents[-limit:] if limit > 0 else documents
+                    )
+            else:
+                selected = self._match(phrases, arrays, limit, window)
+
+            for group, chosen in sorted(selected.items()):
+                db_path, entry_type = self._group_keys[group]
+                field = ENTRY_TYPE_FIELDS[entry_type]
+                results[db_path][field].extend(
+                    self._entries[document] for document in chosen
+                )
+                results[db_path]["timestamps"][field].extend(
+                    self._timestamps[document] for document in chosen
+                )
+        return results
+
+    def _match(
+        self,
+        phrases: List[str],
+        arrays: Dict[int, SourceArray],
+        limit: int,
+        window: TimeWindow | None = None,
+    ) -> Dict[int, List[int]]:
+        """Select the newest live documents of each array matching any phrase.
+
+        Each phrase takes the candidates of an array from its postings
+        within the array's document id range and walks them newest first
+        until it has ``limit`` matches; the newest of all phrases' matches
+        are kept. An array whose candidates are no small share of the
+        checks a scan would make is scanned newest first instead. Documents outside the
+        window are passed over before their text is looked at.
+
+        Returns:
+            Matching document ids in source order, keyed by group
+        """
+        plans = [self._plan(phrase) for phrase in phrases]
+        lowered = [plan.lowered for plan in plans]
+        texts = self._texts
+        selected: Dict[int, List[int]] = {}
+        for group, source_array in arrays.items():
+            documents: Sequence[int] = source_array.documents
+            if not documents:
+                continue
+            first, last = documents[0], documents[-1]
+            slices: List["array[int]"] = []
+            for plan in plans:
+                if plan.driver is None:
+                    break
+                start = bisect_left(plan.driver, first)
+                slices.append(plan.driver[start : bisect_right(plan.driver, last)])
+            if (
+                len(slices) < len(plans)
+                or sum(map(len, slices))
+                >= len(documents) * len(lowered) * INDEXED_CANDIDATE_SHARE
+            ):
+                if window is not None:
+                    documents = [
+                        documents[p] for p in source_array.partitions.select(window)
+                    ]
+                chosen: List[int] = []
+                for document in reversed(documents):
+                    if window is not None and not window.contains(
+                        self._timestamps[document]
+                    ):
+                        continue
+                    text = texts[document]
+                    for phrase in lowered:
+                        if phrase in text:
+                            break
+                    else:
+                        continue
+                    chosen.append(document)
+                    if len(chosen) == limit:
+                        break
+            else:
+                matches: Set[int] = set()
+                for plan, candidates in zip(plans, slices):
+                    matches.update(self._walk(plan, candidates, group, limit, window))
+                chosen = sorted(matches, reverse=True)
+                if limit > 0:
+                    chosen = chosen[:limit]
+            if chosen:
+                chosen.reverse()
+                selected[group] = chosen
+        return selected
+
+    def _walk(
+        self,
+        plan: PhrasePlan,
+        candidates: "array[int]",
+        group: int,
+        limit: int,
+        window: TimeWindow | None,
+    ) -> List[int]:
+        """Find the newest ``limit`` documents of a group holding a phrase."""
+        matches: List[int] = []
+        for document in reversed(candidates):
+            if self._groups[document] != group or not self._live[document]:
+                continue
+            if window is not None and not window.contains(self._timestamps[document]):
+                continue
+            if not all(_contains(f, document) for f in plan.filters):
+                continue
+            if plan.verify and plan.lowered not in self._texts[document]:
+                continue
+            matches.append(document)
+            if len(matches) == limit:
+                break
+        return matches
+
+    def term_statistics(
+        self, entry_types: List[str], terms: Iterable[str]
+    ) -> TermStatistics:
+        """Compute the BM25 statistics of the indexed entries of some types.
+
+        Args:
+            entry_types: Entry types making up the corpus
+            terms: Terms whose document frequencies are needed
+
+        Returns:
+            Statistics with document frequencies for the given terms only
+        """
+        statistics = TermStatistics()
+        with self._lock:
+            for entry_type in entry_types:
+                documents, length = self._type_totals.get(entry_type, (0, 0))
+                statistics.document_count += documents
+                statistics.total_length += length
+            groups = {
+                group
+                for group, (_, entry_type) in enumerate(self._group_keys)
+                if entry_type in entry_types
+            }
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                frequency = sum(
+                    1
+                    for document in postings
+                    if self._live[document] and self._groups[document] in groups
+                )
+                if frequency:
+                    statistics.document_frequency[term] = frequency
+        return statistics
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the index footprint and the counters of the last refresh.
+
+        Returns:
+            Dictionary with document, term and byte counts, the initial
+            build time and the last refresh counters
+        """
+        with self._lock:
+            footprint = self._footprint()
+        return {**self.last_stats, **footprint, "sources": len(self._sources)}
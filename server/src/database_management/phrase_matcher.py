@@ -0,0 +1,109 @@
+"""
+Case-insensitive multi-phrase matching for relevance scoring and snippets.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+
+@dataclass(slots=True)
+class PhraseMatches:
+    """Occurrences of every phrase of a matcher in one text.
+
+    ``counts`` follows the order of the matcher's phrases and ``offsets``
+    holds ``(start, phrase index)`` pairs sorted by start. Occurrences may
+    overlap, as with repeated ``str.find`` from the previous start plus one.
+    """
+
+    counts: List[int]
+    offsets: List[Tuple[int, int]]
+
+    @property
+    def matched(self) -> int:
+        """Number of phrases found at least once."""
+        return sum(1 for count in self.counts if count)
+
+    @property
+    def total(self) -> int:
+        """Number of occurrences of all phrases."""
+        return sum(self.counts)
+
+
+class PhraseMatcher:
+    """Finds a fixed set of phrases in texts, case-insensitively.
+
+    Built once per request: phrases are lowercased and deduplicated up
+    front, and each text is lowercased once per scan however many phrases
+    there are. With at most MAX_PHRASES phrases the scan runs one C-level
+    ``str.find`` pass per distinct phrase, which is faster in CPython than
+    stepping an Aho-Corasick automaton one character at a time.
+    """
+
+    def __init__(self, phrases: Iterable[str]) -> None:
+        """Prepare the phrases.
+
+        Args:
+            phrases: Phrases to find; empty phrases never match
+        """
+        self.phrases = list(phrases)
+        self._indices: Dict[str, List[int]] = {}
+        for index, phrase in enumerate(self.phrases):
+            if phrase:
+                self._indices.setdefault(phrase.lower(), []).append(index)
+        # (phrase, number of input phrases it stands for), for presence checks
+        self._weights = [
+            (phrase, len(indices)) for phrase, indices in self._indices.items()
+        ]
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def matched_count(self, text: str) -> int:
+        """Count the phrases occurring at least once in a text.
+
+        Args:
+            text: Text to search
+
+        Returns:
+            Number of phrases found, duplicates counted once per phrase
+        """
+        if not self._indices or not text:
+            return 0
+        lowered = text.lower()
+        matched = 0
+        for phrase, weight in self._weights:
+            if phrase in lowered:
+                matched += weight
+        return matched
+
+    def scan(self, text: str) -> PhraseMatches:
+        """Find every occurrence of every phrase in a text.
+
+        Offsets index the lowercased text, which lines up with the text
+        itself unless lowercasing changed its length.
+
+        Args:
+            text: Text to search
+
+        Returns:
+            Per-phrase counts and the start offsets of all occurrences
+        """
+        offsets: List[Tuple[int, int]] = []
+        counts = [0] * len(self.phrases)
+        if not text:
+            return PhraseMatches(counts, offsets)
+        find = text.lower().find
+        for phrase, indices in self._indices.items():
+            position = find(phrase)
+            if position == -1:
+                continue
+            starts = []
+            while position != -1:
+                starts.append(position)
+                position = find(phrase, position + 1)
+            for index in indices:
+                counts[index] = len(starts)
+                offsets.extend([(start, index) for start in starts])
+        if len(self._indices) > 1:
+            offsets.sort()
+        return PhraseMatches(counts, offsets)
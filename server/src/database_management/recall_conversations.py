@@ -4,11 +4,20 @@ Database management for conversation recall operations.
 
 from typing import Any, Dict, List
 
+from src.config.constants import (
+    BM25_RECENCY_WEIGHT,
+    RECALL_DEDUPLICATE_ENABLED,
+    RECALL_INDEX_ENABLED,
+    RECALL_PROCESS_WORKERS,
+)
+from src.database_management.bm25_scorer import BM25Scorer, tokenize
 from src.database_management.create_filters import SearchFilterBuilder
 from src.database_management.execute_query import QueryExecutor
 from src.database_management.extract_conversation_data import ConversationDataExtractor
 from src.database_management.format_output import OutputFormatter
 from src.database_management.recency_scorer import RecencyScorer
+from src.database_management.sharded_recall import ShardedRecall, ShardQuery
+from src.database_management.time_partitions import TimeWindow
 
 
 class ConversationDatabaseManager:
@@ -17,8 +26,15 @@ class ConversationDatabaseManager:
     def __init__(self) -> None:
         self.filter_builder = SearchFilterBuilder()
         self.query_executor = QueryExecutor()
-        self.data_extractor = ConversationDataExtractor()
+        self.data_extractor = ConversationDataExtractor(self.query_executor)
         self.output_formatter = OutputFormatter()
+        # Worker processes share recall when there is no persistent index,
+        # whose single writer they would contend for
+        self.sharded_recall: ShardedRecall | None = (
+            ShardedRecall(RECALL_PROCESS_WORKERS)
+            if RECALL_PROCESS_WORKERS > 1 and not RECALL_INDEX_ENABLED
+            else None
+        )
 
         self._recency_scorer: RecencyScorer | None = None
 
@@ -71,7 +87,12 @@ class ConversationDatabaseManager:
         return self.output_formatter.score_conversation_relevance(conversation, phrases)
 
     def extract_conversation_data(
-        self, db_path: str, limit: int = 50, phrases: List[str] | None = None
+        self,
+        db_path: str,
+        limit: int = 50,
+        phrases: List[str] | None = None,
+        include_prompts: bool = True,
+        include_generations: bool = True,
     ) -> Dict[str, Any]:
         """Extract conversation data from a database file with optional phrase filtering.
 
@@ -79,17 +100,25 @@ class ConversationDatabaseManager:
             db_path: Path to the database file
             limit: Maximum number of entries to return
             phrases: List of phrases to filter by (applied at SQL level)
+            include_prompts: Whether to fetch prompts
+            include_generations: Whether to fetch generations
 
         Returns:
             Dictionary containing extracted conversation data
         """
-        return self.data_extractor.extract_conversation_data(db_path, limit, phrases)
+        return self.data_extractor.extract_conversation_data(
+            db_path, limit, phrases, include_prompts, include_generations
+        )
 
     def process_database_files(
         self,
         registry_data: Dict[str, Any],
         limit: int,
         phrases: List[str] | None = None,
+        force_rescan: bool = False,
+        include_prompts: bool = True,
+        include_generations: bool = True,
+        window: TimeWindow | None = None,
     ) -> tuple[List[Dict[str, Any]], List[str], int, Dict[str, int]]:
         """Process database files from registry and extract conversation data.
 
@@ -97,11 +126,158 @@ class ConversationDatabaseManager:
             registry_data: The loaded registry data
             limit: Maximum number of conversations to return per database
             phrases: List of phrases to filter by
+            force_rescan: Ignore the discovery manifest and rescan every path
+            include_prompts: Whether to fetch prompts
+            include_generations: Whether to fetch generations
+            window: Optional dates the entries must fall in
 
         Returns:
             Tuple of (all_conversations, found_paths, total_db_files, db_file_counts)
         """
-        return self.data_extractor.process_database_files(registry_data, limit, phrases)
+        return self.data_extractor.process_database_files(
+            registry_data,
+            limit,
+            phrases,
+            force_rescan,
+            include_prompts,
+            include_generations,
+            window,
+        )
+
+    def create_bm25_scorer(
+        self,
+        db_paths: List[str],
+        phrases: List[str],
+        include_prompts: bool = True,
+        include_generations: bool = True,
+        recency_weight: float = BM25_RECENCY_WEIGHT,
+    ) -> BM25Scorer:
+        """Create a BM25 scorer over every entry of the searched databases.
+
+        Args:
+            db_paths: Databases that were searched
+            phrases: Search phrases
+            include_prompts: Whether prompts were searched
+            include_generations: Whether generations were searched
+            recency_weight: Share of the relevance taken from recency
+
+        Returns:
+            Scorer for the phrase terms
+        """
+        statistics = self.data_extractor.get_term_statistics(
+            db_paths,
+            (term for phrase in phrases for term in tokenize(phrase)),
+            include_prompts,
+            include_generations,
+        )
+        return BM25Scorer(
+            statistics,
+            phrases,
+            recency_weight=recency_weight,
+            recency_scorer=self._get_recency_scorer(),
+        )
+
+    def recall_sharded(
+        self,
+        registry_data: Dict[str, Any],
+        limit: int,
+        top_k: int,
+        phrases: List[str],
+        force_rescan: bool = False,
+        include_prompts: bool = True,
+        include_generations: bool = True,
+        include_editor_history: bool = False,
+        window: TimeWindow | None = None,
+        use_bm25: bool = False,
+        recency_weight: float = BM25_RECENCY_WEIGHT,
+    ) -> tuple[List[Dict[str, Any]], int]:
+        """Recall the best entries of the registry's databases in worker processes.
+
+        Args:
+            registry_data: The loaded registry data
+            limit: Maximum number of conversations to return per database
+            top_k: Maximum number of entries to return
+            phrases: List of search phrases
+            force_rescan: Ignore the discovery manifest and rescan every path
+            include_prompts: Whether to include prompts
+            include_generations: Whether to include generations
+            include_editor_history: Whether to include editor UI history entries
+            window: Optional dates the entries must fall in
+            use_bm25: Whether to rank phrase matches with BM25
+            recency_weight: Share of the BM25 relevance taken from recency
+
+        Returns:
+            Tuple of (formatted entries, total_db_files)
+
+        Raises:
+            ValueError: If sharded recall is disabled
+        """
+        if self.sharded_recall is None:
+            raise ValueError("Sharded recall is disabled")
+        found_paths, total_db_files, _ = self.data_extractor.discover_databases(
+            registry_data, force_rescan
+        )
+        bm25_scorer = None
+        if use_bm25:
+            terms = [term for phrase in phrases for term in tokenize(phrase)]
+            bm25_scorer = BM25Scorer(
+                self.sharded_recall.term_statistics(
+                    found_paths, terms, include_prompts, include_generations
+                ),
+                phrases,
+                recency_weight=recency_weight,
+                recency_scorer=self._get_recency_scorer(),
+            )
+        entries = self.sharded_recall.recall(
+            found_paths,
+            ShardQuery(
+                limit,
+                top_k,
+                phrases,
+                include_prompts,
+                include_generations,
+                include_editor_history,
+                window,
+                RECALL_DEDUPLICATE_ENABLED,
+                bm25_scorer,
+            ),
+        )
+        return entries, total_db_files
+
+    def get_discovery_stats(self) -> Dict[str, int]:
+        """Get discovery manifest hit and miss counts from the last scan.
+
+        Returns:
+            Dictionary with manifest_hits and manifest_misses
+        """
+        return dict(self.data_extractor.discovery.last_stats)
+
+    def get_connection_pool_stats(self) -> Dict[str, int]:
+        """Get connection pool counters for tuning.
+
+        Returns:
+            Pool statistics, or an empty dictionary when pooling is disabled
+        """
+        pool = self.query_executor.pool
+        return pool.get_stats() if pool is not None else {}
+
+    def get_blob_cache_stats(self) -> Dict[str, Any]:
+        """Get decoded value cache counters for tuning.
+
+        Returns:
+            Cache statistics, or an empty dictionary when caching is disabled
+        """
+        cache = self.query_executor.blob_cache
+        return cache.get_stats() if cache is not None else {}
+
+    def get_index_stats(self) -> Dict[str, Any]:
+        """Get conversation index counters from the last refresh.
+
+        Returns:
+            Refresh statistics, or an empty dictionary when the index is disabled
+        """
+        index = self.data_extractor.index
+        return dict(index.last_stats) if index is not None else {}
 
     def format_conversation_entry(
         self,
@@ -110,8 +286,8 @@ class ConversationDatabaseManager:
         include_generations: bool,
         phrases: List[str] | None = None,
         include_editor_history: bool = False,
-        date_from: str | None = None,
-        date_to: str | None = None,
+        window: TimeWindow | None = None,
+        bm25_scorer: BM25Scorer | None = None,
     ) -> Dict[str, Any]:
         """Format a conversation entry with concise output.
 
@@ -121,8 +297,9 @@ class ConversationDatabaseManager:
             include_generations: Whether to include generations in output
             phrases: List of search phrases for relevance scoring
             include_editor_history: Whether to include editor UI history entries
-            date_from: Optional start date for filtering (ISO format)
-            date_to: Optional end date for filtering (ISO format)
+            window: Optional dates the entries must fall in, converted once
+                per request with TimeWindow.from_bounds
+            bm25_scorer: Optional scorer ranking phrase matches with BM25
 
         Returns:
             Formatted conversation entry dictionary
@@ -135,6 +312,6 @@ class ConversationDatabaseManager:
             phrases,
             include_editor_history,
             recency_scorer,
-            date_from,
-            date_to,
+            window,
+            bm25_scorer,
         )
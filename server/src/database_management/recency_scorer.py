@@ -3,13 +3,17 @@ Recency scoring for conversation recall based on conversation timestamps.
 """
 
 import logging
+import time
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
 from src.config.constants import RECENCY_DECAY_RATE
+from src.database_management.entry_timestamps import UNDATED, entry_timestamp_ms
 
 logger = logging.getLogger(__name__)
 
+DAY_MS = 24 * 3600 * 1000
+
 
 class RecencyScorer:
     """Calculates recency scores for conversations based on timestamps."""
@@ -39,39 +43,10 @@ class RecencyScorer:
         Returns:
             Datetime object if found, None otherwise.
         """
-        if not isinstance(conversation, dict):
+        timestamp_ms = entry_timestamp_ms(conversation)
+        if timestamp_ms is None:
             return None
-
-        # Try common timestamp field names
-        timestamp_fields = [
-            "timestamp",
-            "createdAt",
-            "date",
-            "time",
-            "created_at",
-            "created",
-        ]
-
-        for field in timestamp_fields:
-            if field in conversation:
-                value = conversation[field]
-                if isinstance(value, (int, float)):
-                    # Unix timestamp (seconds or milliseconds)
-                    if value > 1e10:  # Milliseconds
-                        value = value / 1000
-                    return datetime.fromtimestamp(value, tz=timezone.utc)
-                elif isinstance(value, str):
-                    # Try parsing ISO format
-                    try:
-                        return datetime.fromisoformat(value.replace("Z", "+00:00"))
-                    except (ValueError, AttributeError):
-                        pass
-
-        # Check nested structures
-        if "metadata" in conversation and isinstance(conversation["metadata"], dict):
-            return self.extract_timestamp(conversation["metadata"])
-
-        return None
+        return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
 
     def calculate_recency_score(self, conversation: Dict[str, Any]) -> float:
         """Calculate recency score based on conversation age.
@@ -85,20 +60,32 @@ class RecencyScorer:
             Recency score between 0.0 and 1.0.
             Returns 0.5 if timestamp cannot be determined (neutral score).
         """
-        timestamp = self.extract_timestamp(conversation)
+        try:
+            timestamp_ms = entry_timestamp_ms(conversation)
+        except Exception as e:
+            logger.warning(
+                f"Recency scoring failed: {e}, returning neutral score 0.5",
+                exc_info=True,
+            )
+            return 0.5
+        return self.score_timestamp_ms(timestamp_ms)
+
+    def score_timestamp_ms(self, timestamp_ms: Optional[int]) -> float:
+        """Calculate recency score from a normalized timestamp.
+
+        Args:
+            timestamp_ms: Epoch milliseconds, None or UNDATED if unknown.
 
-        if timestamp is None:
+        Returns:
+            Recency score between 0.0 and 1.0, 0.5 without a timestamp.
+        """
+        if timestamp_ms is None or timestamp_ms == UNDATED:
             # neutral score
             return 0.5
 
         try:
-            now = datetime.now(timezone.utc)
-            if timestamp.tzinfo is None:
-                # Assume UTC when no timezone info
-                timestamp = timestamp.replace(tzinfo=timezone.utc)
-
-            age_delta = now - timestamp
-            days_old = age_delta.total_seconds() / (24 * 3600)
+            now_ms = time.time() * 1000
+            days_old = (now_ms - timestamp_ms) / DAY_MS
 
             # Exponential decay: 1.0 for new conversations, 0.0ish for old
             recency_score = 1.0 / (1.0 + self.decay_rate * days_old)
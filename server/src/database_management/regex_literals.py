@@ -0,0 +1,168 @@
+"""
+Literal text every match of a regular expression must contain.
+"""
+
+import re
+import string
+from typing import List
+
+# Shortest literal worth narrowing by: one trigram of the FTS5 index
+MIN_LITERAL_LENGTH = 3
+
+# Characters a literal may hold. Under re.IGNORECASE "i", "k" and "s" also
+# match non-ASCII letters that SQLite does not fold to them, and quotes,
+# backslashes and non-ASCII text may be escaped where phrases are matched
+# against stored JSON.
+LITERAL_CHARACTERS = frozenset(
+    set(string.ascii_letters + string.digits + string.punctuation + " ")
+    - set("iksIKS\"'\\")
+)
+
+# Hex digits following the escapes of code points
+HEX_ESCAPE_DIGITS = {"x": 2, "u": 4, "U": 8}
+
+QUANTIFIER_PATTERN = re.compile(r"\{(\d*)(?:,(\d*))?\}")
+
+
+def _skip_class(pattern: str, i: int) -> int:
+    """Return the index just past the character class opening at ``i``."""
+    i += 1
+    if i < len(pattern) and pattern[i] == "^":
+        i += 1
+    # A leading "]" is a member of the class
+    if i < len(pattern) and pattern[i] == "]":
+        i += 1
+    while i < len(pattern) and pattern[i] != "]":
+        i += 2 if pattern[i] == "\\" else 1
+    return i + 1
+
+
+def _skip_group(pattern: str, i: int) -> int:
+    """Return the index just past the group opening at ``i``."""
+    depth = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            i = _skip_class(pattern, i)
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _skip_escape(pattern: str, i: int) -> int:
+    """Return the index just past the escape of a letter or digit at ``i``."""
+    escape = pattern[i + 1]
+    end = i + 2
+    if escape == "N" and pattern.startswith("{", end):
+        return pattern.index("}", end) + 1
+    if escape.isdigit():
+        # Octal escapes take up to three digits, backreferences two
+        while end < min(i + 4, len(pattern)) and pattern[end].isdigit():
+            end += 1
+        return end
+    return end + HEX_ESCAPE_DIGITS.get(escape, 0)
+
+
+def _quantifier(pattern: str, i: int) -> tuple[int, int]:
+    """Read the quantifier at ``i``, if any.
+
+    Returns:
+        Tuple of (fewest repetitions, index past the quantifier), with
+        1 repetitions and ``i`` itself when no quantifier follows
+    """
+    if i >= len(pattern):
+        return 1, i
+    char = pattern[i]
+    if char in "*?":
+        minimum, end = 0, i + 1
+    elif char == "+":
+        minimum, end = 1, i + 1
+    elif char == "{":
+        match = QUANTIFIER_PATTERN.match(pattern, i)
+        # "{}" is literal text, while "{,}" repeats any number of times
+        if match is None or not (match.group(1) or match.group(2) is not None):
+            return 1, i
+        minimum, end = int(match.group(1) or 0), match.end()
+    else:
+        return 1, i
+    # Lazy and possessive forms repeat the same number of times
+    if end < len(pattern) and pattern[end] in "?+":
+        end += 1
+    return minimum, end
+
+
+def required_literals(pattern: str) -> List[str]:
+    """Find literal runs of a pattern that every match contains.
+
+    Only the top level of the pattern is read: groups, classes, escapes
+    other than escaped punctuation and anything after an optional or
+    repeated character end a run, and a top-level alternation has no
+    required text at all. Runs keep to LITERAL_CHARACTERS, so matching them
+    case-insensitively as phrases never drops a match of the pattern.
+
+    Args:
+        pattern: Regular expression, matched with re.IGNORECASE
+
+    Returns:
+        Runs of at least MIN_LITERAL_LENGTH characters, in pattern order;
+        empty when the pattern is invalid or requires no such run
+    """
+    try:
+        flags = re.compile(pattern).flags
+    except re.error:
+        return []
+    if flags & re.VERBOSE:
+        return []
+
+    runs: List[str] = []
+    run: List[str] = []
+
+    def end_run() -> None:
+        if len(run) >= MIN_LITERAL_LENGTH:
+            runs.append("".join(run))
+        run.clear()
+
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "|":
+            return []
+        if char == "(":
+            end_run()
+            i = _quantifier(pattern, _skip_group(pattern, i))[1]
+            continue
+        if char == "[":
+            end_run()
+            i = _quantifier(pattern, _skip_class(pattern, i))[1]
+            continue
+        if char == "\\":
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                char = pattern[i + 1]
+                i += 1
+            else:
+                # Character types, anchors, backreferences and code points
+                end_run()
+                i = _quantifier(pattern, _skip_escape(pattern, i))[1]
+                continue
+        elif char in ".^$":
+            end_run()
+            i = _quantifier(pattern, i + 1)[1]
+            continue
+
+        minimum, end = _quantifier(pattern, i + 1)
+        if char in LITERAL_CHARACTERS and minimum > 0:
+            run.append(char)
+        if char not in LITERAL_CHARACTERS or end > i + 1:
+            end_run()
+        i = end
+    end_run()
+    return runs
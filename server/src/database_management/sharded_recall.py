@@ -0,0 +1,351 @@
+"""
+Recall sharded across worker processes and merged by relevance.
+"""
+
+import multiprocessing
+import threading
+import traceback
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from heapq import nsmallest
+from itertools import chain
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.config.constants import RECALL_PROCESS_WORKERS
+from src.database_management.bm25_scorer import BM25Scorer, TermStatistics
+from src.database_management.deduplicate_entries import deduplicate_conversations
+from src.database_management.extract_conversation_data import ConversationDataExtractor
+from src.database_management.format_output import OutputFormatter
+from src.database_management.recency_scorer import RecencyScorer
+from src.database_management.time_partitions import TimeWindow
+from src.utils.cancellation import RequestCancelledError, raise_if_cancelled
+from src.utils.logger import log_error
+
+# Seconds between checks for a cancelled request while shards run
+CANCEL_POLL_SECONDS = 0.05
+
+# Sort key, database path and formatted entry of one match. Sorting
+# candidates by key ranks them as in-process recall ranks its entries.
+Candidate = Tuple[Tuple[float, ...], str, Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class ShardQuery:
+    """Parameters of one recall, sent to every shard."""
+
+    limit: int
+    top_k: int
+    phrases: List[str]
+    include_prompts: bool = True
+    include_generations: bool = True
+    include_editor_history: bool = False
+    window: Optional[TimeWindow] = None
+    deduplicate: bool = True
+    bm25_scorer: Optional[BM25Scorer] = None
+
+
+WorkerState = Tuple[ConversationDataExtractor, OutputFormatter, RecencyScorer]
+
+# State of a worker process, kept across recalls so the caches of its shard
+# stay warm
+_worker_state: Optional[WorkerState] = None
+
+
+def _worker() -> WorkerState:
+    """Get the state of this worker process, creating it on first use."""
+    global _worker_state
+    if _worker_state is None:
+        # Shards already run side by side, so each worker extracts in sequence
+        _worker_state = (
+            ConversationDataExtractor(deduplicate=False, max_workers=1),
+            OutputFormatter(),
+            RecencyScorer(),
+        )
+    return _worker_state
+
+
+def shard_term_statistics(
+    db_paths: List[str],
+    terms: List[str],
+    include_prompts: bool,
+    include_generations: bool,
+) -> TermStatistics:
+    """Compute the BM25 statistics of one shard in its worker."""
+    extractor, _, _ = _worker()
+    extractor.retain_databases(db_paths)
+    if extractor.index is not None:
+        # The index counts what it holds, so it must hold the shard first
+        extractor.index.refresh(db_paths)
+    return extractor.get_term_statistics(
+        db_paths, terms, include_prompts, include_generations
+    )
+
+
+def recall_shard(shard: List[Tuple[int, str]], query: ShardQuery) -> List[Candidate]:
+    """Extract, score and rank one shard in its worker.
+
+    Args:
+        shard: Discovery position and path of each database of the shard
+        query: Recall parameters
+
+    Returns:
+        The shard's best ``query.top_k`` matches
+    """
+    extractor, formatter, recency_scorer = _worker()
+    db_paths = [db_path for _, db_path in shard]
+    extractor.retain_databases(db_paths)
+    conversations = extractor.extract_databases(
+        db_paths,
+        query.limit,
+        query.phrases,
+        query.include_prompts,
+        query.include_generations,
+        query.window,
+    )
+    if query.deduplicate:
+        deduplicate_conversations(conversations, keep_keys=True)
+
+    candidates: List[Candidate] = []
+    for (db_index, db_path), conv_data in zip(shard, conversations):
+        formatted = formatter.format_conversation_entry(
+            conv_data,
+            query.include_prompts,
+            query.include_generations,
+            query.phrases,
+            query.include_editor_history,
+            recency_scorer,
+            query.window,
+            query.bm25_scorer,
+        )
+        if formatted.get("status") != "success":
+            continue
+        for order, entry in enumerate(formatted["conversations"]):
+            if not query.phrases:
+                candidates.append(((db_index, order), db_path, entry))
+            elif entry.get("relevance", 0) > 0:
+                key = (-entry["relevance"], db_index, order)
+                candidates.append((key, db_path, entry))
+    return nsmallest(query.top_k, candidates, key=itemgetter(0))
+
+
+def merge_candidates(
+    candidates: Iterable[Candidate], top_k: int
+) -> List[Dict[str, Any]]:
+    """Merge the matches of every shard into the overall best ``top_k``.
+
+    Entries carrying a content key are merged with an earlier entry of the
+    same type and key from another database, which lists both databases
+    under "sources" as in-process deduplication does.
+    """
+    entries: List[Dict[str, Any]] = []
+    kept: Dict[Tuple[str, bytes], Tuple[Dict[str, Any], str]] = {}
+    for _, db_path, entry in sorted(candidates, key=itemgetter(0)):
+        content_key = entry.pop("content_key", None)
+        if content_key is None:
+            entries.append(entry)
+            continue
+        first = kept.get((entry["type"], content_key))
+        if first is None:
+            kept[(entry["type"], content_key)] = (entry, db_path)
+        if first is None or first[1] == db_path:
+            entries.append(entry)
+            continue
+        first_entry, first_path = first
+        paths = first_entry.setdefault("sources", [first_path])
+        for path in entry.get("sources", [db_path]):
+            if path not in paths:
+                paths.append(path)
+    return entries[:top_k]
+
+
+class ShardedRecall:
+    """Runs recall over database shards in worker processes.
+
+    Decoding JSON values is CPU-bound, so one process tops out at one core.
+    Databases are assigned to ``workers`` shards by a hash of their path,
+    and each shard runs in its own single-process pool, so a database keeps
+    its worker and that worker's caches across recalls. Each worker
+    extracts, scores and ranks its shard and returns only its best
+    ``top_k`` summaries, which are merged here; BM25 first combines the
+    statistics each worker computes for its shard.
+
+    The merged ranking equals in-process recall's, except that entries
+    repeated across shards are only merged among the returned summaries, so
+    a recall can return fewer than ``top_k`` entries when such repeats rank
+    near the top.
+    """
+
+    def __init__(self, workers: int = RECALL_PROCESS_WORKERS) -> None:
+        """Initialize the shards; worker processes start on first use.
+
+        Args:
+            workers: Number of shards and worker processes
+        """
+        self.workers = max(1, workers)
+        self._executors: List[Optional[ProcessPoolExecutor]] = [None] * self.workers
+        self._lock = threading.Lock()
+
+    def shard_of(self, db_path: str) -> int:
+        """Get the shard a database belongs to."""
+        return zlib.crc32(db_path.encode("utf-8")) % self.workers
+
+    def _shards(self, db_paths: List[str]) -> Dict[int, List[Tuple[int, str]]]:
+        """Split databases into shards, keeping their discovery positions."""
+        shards: Dict[int, List[Tuple[int, str]]] = {}
+        for db_index, db_path in enumerate(db_paths):
+            shards.setdefault(self.shard_of(db_path), []).append((db_index, db_path))
+        return shards
+
+    def _executor(self, shard: int) -> ProcessPoolExecutor:
+        """Get the pool of one shard, starting its worker on first use."""
+        with self._lock:
+            executor = self._executors[shard]
+            if executor is None:
+                # The server runs threads, which a forked worker would inherit
+                # mid-flight, so workers are spawned
+                executor = ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._executors[shard] = executor
+            return executor
+
+    def _submit(
+        self, shard: int, function: Callable[..., Any], args: Tuple[Any, ...]
+    ) -> Tuple[ProcessPoolExecutor, Future[Any]]:
+        """Submit ``function`` to the pool of one shard."""
+        executor = self._executor(shard)
+        return executor, executor.submit(function, *args)
+
+    def _recycle(
+        self, shard: int, executor: ProcessPoolExecutor, terminate: bool = False
+    ) -> None:
+        """Stop a shard's pool; the shard starts a new worker on next use.
+
+        Args:
+            shard: Shard the pool belongs to
+            executor: Pool to stop, left alone if already replaced
+            terminate: Also kill the worker, stopping the call it is running
+        """
+        with self._lock:
+            if self._executors[shard] is executor:
+                self._executors[shard] = None
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        if terminate:
+            for process in processes:
+                process.terminate()
+
+    def _wait(
+        self, submitted: Dict[int, Tuple[ProcessPoolExecutor, Future[Any]]]
+    ) -> None:
+        """Wait for every shard, checking for a cancelled request.
+
+        Raises:
+            RequestCancelledError: If the request is cancelled; shards not
+                yet started are dropped and workers running one are killed
+        """
+        try:
+            pending = {future for _, future in submitted.values()}
+            while pending:
+                raise_if_cancelled()
+                _, pending = wait(pending, timeout=CANCEL_POLL_SECONDS)
+        except RequestCancelledError:
+            for shard, (executor, future) in submitted.items():
+                if not future.cancel() and not future.done():
+                    self._recycle(shard, executor, terminate=True)
+            raise
+
+    def _map(
+        self, function: Callable[..., Any], shard_args: Dict[int, Tuple[Any, ...]]
+    ) -> List[Any]:
+        """Run ``function`` for every shard and collect the results.
+
+        A shard whose worker fails is logged and left out, and its worker is
+        replaced on the next recall. A shard whose pool was stopped by the
+        cancellation of another request is run again on a new worker.
+
+        Raises:
+            RequestCancelledError: If the request is cancelled
+        """
+        results: List[Any] = []
+        remaining = shard_args
+        while remaining:
+            submitted = {
+                shard: self._submit(shard, function, args)
+                for shard, args in remaining.items()
+            }
+            self._wait(submitted)
+            remaining = {}
+            for shard, (executor, future) in submitted.items():
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    with self._lock:
+                        recycled = self._executors[shard] is not executor
+                    if recycled:
+                        remaining[shard] = shard_args[shard]
+                        continue
+                    log_error(
+                        f"Recall shard {shard} failed: {str(e)}",
+                        {"traceback": traceback.format_exc()},
+                    )
+                    self._recycle(shard, executor)
+        return results
+
+    def term_statistics(
+        self,
+        db_paths: List[str],
+        terms: List[str],
+        include_prompts: bool = True,
+        include_generations: bool = True,
+    ) -> TermStatistics:
+        """Get BM25 statistics over the given databases, one shard per worker."""
+        statistics = self._map(
+            shard_term_statistics,
+            {
+                shard: (
+                    [db_path for _, db_path in databases],
+                    terms,
+                    include_prompts,
+                    include_generations,
+                )
+                for shard, databases in self._shards(db_paths).items()
+            },
+        )
+        return TermStatistics.combine(statistics, terms)
+
+    def recall(self, db_paths: List[str], query: ShardQuery) -> List[Dict[str, Any]]:
+        """Recall the best ``query.top_k`` entries of the given databases.
+
+        Args:
+            db_paths: Databases to search, in discovery order
+            query: Recall parameters
+
+        Returns:
+            Formatted entries, ranked as in-process recall ranks them
+        """
+        candidates = self._map(
+            recall_shard,
+            {
+                shard: (databases, query)
+                for shard, databases in self._shards(db_paths).items()
+            },
+        )
+        entries = merge_candidates(chain.from_iterable(candidates), query.top_k)
+        # Shards list their own databases first, in-process recall lists all
+        # in discovery order
+        position = {db_path: db_index for db_index, db_path in enumerate(db_paths)}
+        for entry in entries:
+            if "sources" in entry:
+                entry["sources"].sort(key=lambda path: position.get(path, -1))
+        return entries
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            executors, self._executors = self._executors, [None] * self.workers
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown()
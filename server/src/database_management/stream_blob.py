@@ -0,0 +1,211 @@
+"""
+Chunked reading of ItemTable values through SQLite incremental blob I/O.
+"""
+
+import codecs
+import json
+import re
+import sqlite3
+from collections import deque
+from contextlib import closing
+from typing import Any, Callable, Iterator, List
+
+from src.config.constants import BLOB_STREAM_CHUNK_BYTES
+from src.database_management.decode_json_tail import ChunkReader, JsonTailDecoder
+
+WHITESPACE = " \t\r\n"
+# Separator after an array element, with the whitespace around it
+DELIMITER = re.compile(r"[ \t\r\n]*([,\]])[ \t\r\n]*")
+
+
+class BlobStreamReader:
+    """Decodes conversation arrays from a blob handle without loading it whole.
+
+    The last N entries are located by scanning the blob backward in chunks
+    and decoding only that suffix. When every entry is needed, the array is
+    parsed forward one element at a time from a window of at most a few
+    chunks. Either way the raw bytes held at once are bounded by the chunk
+    size and the size of the largest entry, not by the size of the value.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = BLOB_STREAM_CHUNK_BYTES,
+        decoder: JsonTailDecoder | None = None,
+    ) -> None:
+        """Initialize the reader.
+
+        Args:
+            chunk_size: Bytes read from the blob per step
+            decoder: Tail decoder used to find where the last entries begin
+        """
+        self.chunk_size = chunk_size
+        self.decoder = decoder or JsonTailDecoder(chunk_size)
+
+    @staticmethod
+    def is_supported() -> bool:
+        """Check whether this Python exposes incremental blob I/O."""
+        return hasattr(sqlite3.Connection, "blobopen")
+
+    def read_entries(
+        self,
+        conn: sqlite3.Connection,
+        rowid: int,
+        count: int,
+        table: str = "ItemTable",
+        column: str = "value",
+    ) -> tuple[List[Any], bool, int]:
+        """Decode the last ``count`` entries of the array stored in one row.
+
+        Args:
+            conn: Open database connection
+            rowid: Row holding the value
+            count: Number of trailing entries wanted, 0 or less for all
+            table: Table holding the value
+            column: Column holding the value
+
+        Returns:
+            Tuple of (entries, complete, size_bytes) where size_bytes is the
+            number of raw bytes the returned entries were decoded from
+
+        Raises:
+            sqlite3.Error: If the value cannot be opened as a blob
+            json.JSONDecodeError: If the value is not valid JSON
+            UnicodeDecodeError: If the value is not valid UTF-8
+        """
+        # Connection.blobopen is only available from Python 3.11
+        blobopen = getattr(conn, "blobopen")
+        with closing(blobopen(table, column, rowid, readonly=True)) as blob:
+            length = len(blob)
+
+            def read(lo: int, hi: int) -> bytes:
+                chunk: bytes = blob[lo:hi]
+                return chunk
+
+            if count > 0:
+                close = self.find_closing_bracket(read, length)
+                if close is not None:
+                    start = self.decoder.find_tail_start(read, close, count)
+                    if start is not None:
+                        tail = self.decoder.decode_tail(read(start, close), count)
+                        if tail is not None:
+                            return tail, False, close - start + 2
+
+            entries = self._decode_stream(read, length, count)
+            return entries, True, length
+
+    @staticmethod
+    def find_closing_bracket(
+        read: Callable[[int, int], bytes], length: int
+    ) -> int | None:
+        """Return the offset of a trailing ``]``, skipping trailing whitespace.
+
+        Args:
+            read: Returns the raw value between two offsets
+            length: Size of the value in bytes
+
+        Returns:
+            Offset of the bracket, or None if the value does not end with one
+        """
+        window = read(max(0, length - 64), length)
+        stripped = window.rstrip(b" \t\r\n")
+        if not stripped or stripped[-1] != 0x5D:
+            return None
+        return length - (len(window) - len(stripped)) - 1
+
+    def _decode_stream(self, read: ChunkReader, length: int, count: int) -> List[Any]:
+        """Parse a whole value forward, keeping at most ``count`` entries."""
+        entries: "deque[Any]" = deque(maxlen=count if count > 0 else None)
+        entries.extend(self.iter_array(read, length))
+        return list(entries)
+
+    def iter_array(self, read: ChunkReader, length: int) -> Iterator[Any]:
+        """Yield the elements of a JSON array stored in a blob, in order.
+
+        Non-array values are decoded whole and yield nothing, matching how
+        non-list values are treated elsewhere.
+
+        Args:
+            read: Returns the raw value between two offsets
+            length: Size of the value in bytes
+
+        Yields:
+            Decoded array elements
+
+        Raises:
+            json.JSONDecodeError: If the value is not valid JSON
+            UnicodeDecodeError: If the value is not valid UTF-8
+        """
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        json_decoder = json.JSONDecoder()
+        offset = 0
+        buf = ""
+        pos = 0
+
+        def fill(size: int) -> bool:
+            nonlocal offset, buf, pos
+            if offset >= length:
+                return False
+            hi = min(length, offset + size)
+            chunk = read(offset, hi)
+            offset = hi
+            text = chunk if isinstance(chunk, str) else utf8.decode(chunk, hi == length)
+            buf = buf[pos:] + text
+            pos = 0
+            return True
+
+        def skip_whitespace() -> bool:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in WHITESPACE:
+                    pos += 1
+                if pos < len(buf):
+                    return True
+                if not fill(self.chunk_size):
+                    return False
+
+        def finish() -> None:
+            # Only whitespace may follow the closing bracket
+            if skip_whitespace():
+                raise json.JSONDecodeError("Extra data", buf, pos)
+
+        if not skip_whitespace() or buf[pos] != "[":
+            # Not an array: decode it whole so invalid JSON still raises
+            while fill(self.chunk_size):
+                pass
+            json.loads(buf)
+            return
+        pos += 1
+        if skip_whitespace() and buf[pos] == "]":
+            pos += 1
+            finish()
+            return
+
+        want = self.chunk_size
+        while True:
+            if (pos >= len(buf) or buf[pos] in WHITESPACE) and not skip_whitespace():
+                raise json.JSONDecodeError("Unterminated array", buf, pos)
+            delimiter = None
+            try:
+                element, end = json_decoder.raw_decode(buf, pos)
+                # A number cut at a chunk edge decodes as a shorter number,
+                # so the element only counts once a delimiter follows it
+                delimiter = DELIMITER.match(buf, end)
+            except json.JSONDecodeError:
+                if offset >= length:
+                    raise
+            if delimiter is None:
+                if offset >= length:
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buf, end)
+                # Grow the read size so one large element is not re-parsed
+                # once per chunk
+                fill(want)
+                want *= 2
+                continue
+            want = self.chunk_size
+            pos = delimiter.end()
+            yield element
+
+            if delimiter.group(1) == "]":
+                finish()
+                return
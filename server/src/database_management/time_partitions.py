@@ -0,0 +1,211 @@
+"""
+Time windows and week partitions for pruning conversation entries by date.
+"""
+
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from src.database_management.entry_timestamps import UNDATED
+
+# Width of one time partition
+PARTITION_MS = 7 * 24 * 3600 * 1000
+
+
+def partition_key(timestamp_ms: int) -> int:
+    """Return the partition holding an epoch-millisecond timestamp."""
+    return timestamp_ms // PARTITION_MS
+
+
+def _parse_bound(name: str, value: str, end_of_day: bool) -> int:
+    """Parse an ISO-8601 date or datetime into epoch milliseconds.
+
+    Raises:
+        ValueError: If the value is not an ISO-8601 date or datetime
+    """
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        raise ValueError(f"Invalid {name}: {value!r} is not an ISO-8601 date")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    if end_of_day and len(value.strip()) == 10:
+        # A bare date ends with the last millisecond of that day
+        return int((parsed + timedelta(days=1)).timestamp() * 1000) - 1
+    return int(parsed.timestamp() * 1000)
+
+
+@dataclass(frozen=True)
+class TimeWindow:
+    """Inclusive epoch-millisecond range requested with date_from/date_to.
+
+    Either end may be open. Entries without a timestamp are never excluded,
+    as they cannot be placed inside or outside the window.
+    """
+
+    start_ms: int | None = None
+    end_ms: int | None = None
+
+    @classmethod
+    def from_bounds(
+        cls, date_from: str | None, date_to: str | None
+    ) -> "TimeWindow | None":
+        """Convert the request's date bounds once.
+
+        Args:
+            date_from: ISO-8601 start date or datetime
+            date_to: ISO-8601 end date or datetime; a bare date includes the
+                whole day
+
+        Returns:
+            The window, or None when neither bound is given
+
+        Raises:
+            ValueError: If a bound is not an ISO-8601 date or datetime
+        """
+        start_ms = _parse_bound("date_from", date_from, False) if date_from else None
+        end_ms = _parse_bound("date_to", date_to, True) if date_to else None
+        if start_ms is None and end_ms is None:
+            return None
+        return cls(start_ms, end_ms)
+
+    def contains(self, timestamp_ms: int | None) -> bool:
+        """Check whether a timestamp falls in the window; undated ones do."""
+        if timestamp_ms is None or timestamp_ms == UNDATED:
+            return True
+        if self.start_ms is not None and timestamp_ms < self.start_ms:
+            return False
+        return self.end_ms is None or timestamp_ms <= self.end_ms
+
+    def overlaps(self, start_ms: int, end_ms: int) -> bool:
+        """Check whether any instant of an inclusive range is in the window."""
+        if self.start_ms is not None and end_ms < self.start_ms:
+            return False
+        return self.end_ms is None or start_ms <= self.end_ms
+
+    def covers(self, start_ms: int, end_ms: int) -> bool:
+        """Check whether an inclusive range lies wholly in the window."""
+        if self.start_ms is not None and start_ms < self.start_ms:
+            return False
+        return self.end_ms is None or end_ms <= self.end_ms
+
+
+class TimePartitions:
+    """Positions of a sequence of entries grouped by week of their timestamp.
+
+    Selecting a window skips weeks outside it without looking at their
+    entries and takes weeks inside it whole; only the entries of the weeks
+    on the window's edges are compared one by one.
+    """
+
+    __slots__ = ("partitions", "undated", "start_ms", "end_ms")
+
+    def __init__(self) -> None:
+        self.partitions: Dict[int, Tuple["array[int]", "array[int]"]] = {}
+        self.undated = array("I")
+        self.start_ms: int | None = None
+        self.end_ms: int | None = None
+
+    @classmethod
+    def build(cls, timestamps: Iterable[int | None]) -> "TimePartitions":
+        """Partition a sequence of timestamps by their positions."""
+        partitions = cls()
+        for position, timestamp_ms in enumerate(timestamps):
+            partitions.add(position, timestamp_ms)
+        return partitions
+
+    def __len__(self) -> int:
+        return len(self.undated) + sum(
+            len(positions) for positions, _ in self.partitions.values()
+        )
+
+    def add(self, position: int, timestamp_ms: int | None) -> None:
+        """Add the entry at a position; positions must be added in order."""
+        if timestamp_ms is None or timestamp_ms == UNDATED:
+            self.undated.append(position)
+            return
+        key = partition_key(timestamp_ms)
+        partition = self.partitions.get(key)
+        if partition is None:
+            partition = self.partitions[key] = (array("I"), array("q"))
+        partition[0].append(position)
+        partition[1].append(timestamp_ms)
+        if self.start_ms is None or timestamp_ms < self.start_ms:
+            self.start_ms = timestamp_ms
+        if self.end_ms is None or timestamp_ms > self.end_ms:
+            self.end_ms = timestamp_ms
+
+    def overlaps(self, window: TimeWindow) -> bool:
+        """Check whether any entry can fall in the window."""
+        if self.undated:
+            return True
+        return (
+            self.start_ms is not None
+            and self.end_ms is not None
+            and window.overlaps(self.start_ms, self.end_ms)
+        )
+
+    def select(self, window: TimeWindow) -> List[int]:
+        """Return the positions of the entries in the window, in order."""
+        if (
+            self.start_ms is not None
+            and self.end_ms is not None
+            and window.covers(self.start_ms, self.end_ms)
+        ):
+            return list(range(len(self)))
+        selected = list(self.undated)
+        for key, (positions, timestamps) in self.partitions.items():
+            first_ms = key * PARTITION_MS
+            last_ms = first_ms + PARTITION_MS - 1
+            if not window.overlaps(first_ms, last_ms):
+                continue
+            if window.covers(first_ms, last_ms):
+                selected.extend(positions)
+                continue
+            selected.extend(
+                position
+                for position, timestamp_ms in zip(positions, timestamps)
+                if window.contains(timestamp_ms)
+            )
+        selected.sort()
+        return selected
+
+
+def partition_runs(
+    timestamps: Sequence[int | None], min_length: int
+) -> Iterator[Tuple[int, int, int | None, int | None, bool]]:
+    """Split consecutive entries into runs that each keep to one partition.
+
+    A run is cut where a dated entry falls in another partition than the
+    run's first dated entry, once the run holds at least ``min_length``
+    entries, so entries out of time order cannot fragment it into tiny runs.
+
+    Args:
+        timestamps: Epoch-millisecond timestamps of the entries, None when
+            an entry has none
+        min_length: Fewest entries a run holds before it can be cut
+
+    Yields:
+        (first position, last position, earliest timestamp, latest
+        timestamp, whether the run holds undated entries) per run
+    """
+    start = 0
+    key: int | None = None
+    low: int | None = None
+    high: int | None = None
+    undated = False
+    for position, timestamp_ms in enumerate(timestamps):
+        if timestamp_ms is not None:
+            entry_key = partition_key(timestamp_ms)
+            if key is not None and entry_key != key and position - start >= min_length:
+                yield start, position - 1, low, high, undated
+                start, key, low, high, undated = position, None, None, None, False
+            if key is None:
+                key = entry_key
+            low = timestamp_ms if low is None else min(low, timestamp_ms)
+            high = timestamp_ms if high is None else max(high, timestamp_ms)
+        else:
+            undated = True
+    if start < len(timestamps):
+        yield start, len(timestamps) - 1, low, high, undated
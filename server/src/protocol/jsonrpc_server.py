@@ -5,22 +5,40 @@ Lightweight JSON-RPC server implementation.
 import asyncio
 import json
 import sys
+import threading
 import traceback
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Set, Tuple
 
-from src.config.constants import MCP_PROTOCOL_VERSION, SERVER_CAPABILITIES, SERVER_NAME
+from src.config.constants import (
+    MCP_PROTOCOL_VERSION,
+    SERVER_CAPABILITIES,
+    SERVER_MAX_CONCURRENT_REQUESTS,
+    SERVER_NAME,
+)
+from src.utils.cancellation import RequestCancelledError, bind_cancel_event
 from src.utils.common import get_version
-from src.utils.logger import log_error
+from src.utils.logger import log_error, log_info
 
 
 class JSONRPCServer:
     """Lightweight JSON-RPC server implementation."""
 
-    def __init__(self, name: str):
-        """Initialize the JSON-RPC server."""
+    def __init__(
+        self, name: str, max_concurrent_requests: int = SERVER_MAX_CONCURRENT_REQUESTS
+    ):
+        """Initialize the JSON-RPC server.
+
+        Args:
+            name: Server name
+            max_concurrent_requests: Requests handled at the same time
+        """
         self.name = name
         self.tools: Dict[str, Any] = {}
         self.request_id = 0
+        self.max_concurrent_requests = max(1, max_concurrent_requests)
+        # Task and cancellation event of each request being handled, by id
+        self._in_flight: Dict[Any, Tuple[asyncio.Task[None], threading.Event]] = {}
 
     async def handle_request(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Handle incoming JSON-RPC requests."""
@@ -32,6 +50,9 @@ class JSONRPCServer:
             return self._initialize(params, request_id)
         elif method == "notifications/initialized":
             return None
+        elif method == "notifications/cancelled":
+            self._cancel_request((params or {}).get("requestId"))
+            return None
         elif method == "tools/list":
             return self._list_tools(request_id)
         elif method == "tools/call":
@@ -70,6 +91,22 @@ class JSONRPCServer:
             response["id"] = request_id
         return response
 
+    def _cancel_request(self, request_id: Any) -> None:
+        """Cancel a request being handled.
+
+        Cancelling the task interrupts whatever it awaits, a spell
+        subprocess included, and setting the event stops blocking work in
+        worker threads at its next check. Unknown and already answered ids
+        are ignored, as the cancellation may cross the response.
+        """
+        in_flight = self._in_flight.get(request_id)
+        if in_flight is None:
+            return
+        task, cancel_event = in_flight
+        cancel_event.set()
+        task.cancel()
+        log_info("Request cancelled by the client", {"request_id": request_id})
+
     def _list_tools(self, request_id: Optional[int]) -> Dict[str, Any]:
         """List available tools."""
         tools = []
@@ -123,6 +160,9 @@ class JSONRPCServer:
             if request_id is not None:
                 response["id"] = request_id
             return response
+        except RequestCancelledError:
+            # Not a tool failure; the cancelled request gets no response
+            raise
         except (AttributeError, TypeError, KeyError) as e:
             error_msg = f"Tool execution error: {str(e)}"
             log_error(error_msg, {"traceback": traceback.format_exc()})
@@ -144,49 +184,136 @@ class JSONRPCServer:
             response["id"] = request_id
         return response
 
-    async def run(self) -> None:
-        """Run the server with stdio communication."""
-        while True:
-            try:
-                line = await asyncio.get_event_loop().run_in_executor(
-                    None, sys.stdin.readline
-                )
-                if not line:
-                    break
+    @staticmethod
+    def _request_id(request: Any) -> Any:
+        """Id of a parsed request line, None for notifications and non-objects."""
+        return request.get("id") if isinstance(request, dict) else None
+
+    def _track(
+        self, request_id: Any, task: asyncio.Task[None], cancel_event: threading.Event
+    ) -> None:
+        """Keep a request cancellable by its id until its task is done."""
+        self._in_flight[request_id] = (task, cancel_event)
+
+        def forget(done: asyncio.Task[None]) -> None:
+            if self._in_flight.get(request_id, (None,))[0] is done:
+                del self._in_flight[request_id]
+
+        task.add_done_callback(forget)
+
+    def _write_response(self, response: Dict[str, Any]) -> None:
+        """Write one response line to stdout."""
+        print(json.dumps(response))
+        sys.stdout.flush()
 
-                request = json.loads(line.strip())
+    async def _dispatch(
+        self,
+        request: Any,
+        semaphore: asyncio.Semaphore,
+        cancel_event: threading.Event,
+    ) -> None:
+        """Handle one request and write its response when it completes.
+
+        A cancelled request gets no response.
+        """
+        request_id = self._request_id(request)
+        # Seen by this task only, and by the worker threads it starts
+        bind_cancel_event(cancel_event)
+        try:
+            async with semaphore:
                 response = await self.handle_request(request)
-                if response is not None:
-                    print(json.dumps(response))
-                    sys.stdout.flush()
-            except json.JSONDecodeError as e:
-                log_error(
-                    f"JSON decode error: {str(e)}",
-                    {"traceback": traceback.format_exc()},
-                )
-                continue
-            except (OSError, IOError, ValueError) as e:
-                log_error(
-                    f"Server communication error: {str(e)}",
-                    {"traceback": traceback.format_exc()},
-                )
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32700,
-                        "message": f"Communication error: {str(e)}",
-                    },
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
-            except Exception as e:
-                log_error(
-                    f"Unexpected server error: {str(e)}",
-                    {"traceback": traceback.format_exc()},
+            if response is not None:
+                self._write_response(response)
+        except (asyncio.CancelledError, RequestCancelledError):
+            return
+        except (OSError, IOError, ValueError) as e:
+            log_error(
+                f"Server communication error: {str(e)}",
+                {"traceback": traceback.format_exc()},
+            )
+            self._write_response(
+                self._error_response(
+                    -32700, f"Communication error: {str(e)}", request_id
                 )
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "error": {"code": -32700, "message": f"Parse error: {str(e)}"},
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+            )
+        except Exception as e:
+            log_error(
+                f"Unexpected server error: {str(e)}",
+                {"traceback": traceback.format_exc()},
+            )
+            self._write_response(
+                self._error_response(-32700, f"Parse error: {str(e)}", request_id)
+            )
+
+    async def run(self) -> None:
+        """Run the server with stdio communication.
+
+        Every request is dispatched as its own task, at most
+        ``max_concurrent_requests`` of them running at once, so a slow tool
+        call does not hold up the requests read after it. Responses are
+        written as they complete and carry the id of their request; pending
+        requests are finished before returning at the end of input.
+        ``notifications/cancelled`` is handled as soon as it is read.
+
+        Input is read on a thread of its own: tools run blocking work in the
+        default executor, and a full executor must not stop the reading.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        pending: Set[asyncio.Task[None]] = set()
+        reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stdin-reader")
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    line = await loop.run_in_executor(reader, sys.stdin.readline)
+                    if not line:
+                        break
+
+                    request = json.loads(line.strip())
+                    if (
+                        isinstance(request, dict)
+                        and request.get("method") == "notifications/cancelled"
+                    ):
+                        # Handled at once, even with every request slot taken
+                        await self.handle_request(request)
+                        continue
+                    cancel_event = threading.Event()
+                    task = asyncio.create_task(
+                        self._dispatch(request, semaphore, cancel_event)
+                    )
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                    request_id = self._request_id(request)
+                    if isinstance(request_id, (str, int)):
+                        self._track(request_id, task, cancel_event)
+                except json.JSONDecodeError as e:
+                    log_error(
+                        f"JSON decode error: {str(e)}",
+                        {"traceback": traceback.format_exc()},
+                    )
+                    continue
+                except (OSError, IOError, ValueError) as e:
+                    log_error(
+                        f"Server communication error: {str(e)}",
+                        {"traceback": traceback.format_exc()},
+                    )
+                    self._write_response(
+                        self._error_response(
+                            -32700, f"Communication error: {str(e)}", None
+                        )
+                    )
+                except Exception as e:
+                    log_error(
+                        f"Unexpected server error: {str(e)}",
+                        {"traceback": traceback.format_exc()},
+                    )
+                    self._write_response(
+                        self._error_response(-32700, f"Parse error: {str(e)}", None)
+                    )
+            if pending:
+                # Requests cancelled before they started raise here
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            for task in list(pending):
+                task.cancel()
+            reader.shutdown(wait=False)
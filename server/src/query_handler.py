@@ -9,6 +9,7 @@ from typing import Any, Dict, List
 
 from src.config.constants import GANDALF_REGISTRY_FILE
 from src.database_management.recall_conversations import ConversationDatabaseManager
+from src.database_management.regex_literals import required_literals
 from src.utils.logger import log_error
 
 
@@ -81,6 +82,7 @@ class QueryHandler:
         query_data.setdefault("include_generations", False)
         query_data.setdefault("count_matches", False)
         query_data.setdefault("regex", False)
+        query_data.setdefault("force_rescan", False)
 
     def execute_query(self, query_data: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a database query."""
@@ -111,10 +113,27 @@ class QueryHandler:
         )
         count_matches = query_data.get("count_matches", False)
         regex = query_data.get("regex", False)
+        force_rescan = query_data.get("force_rescan", False)
+
+        # Every regex match holds the pattern's longest required literal, so
+        # it narrows the entries read like a phrase; the persistent FTS5
+        # index looks it up by its trigrams
+        phrases = search
+        if regex:
+            literals = required_literals(search)
+            if literals:
+                phrases = [max(literals, key=len)]
 
         try:
             all_conversations, found_paths, total_db_files, db_file_counts = (
-                self.db_manager.process_database_files(registry_data, limit, search)
+                self.db_manager.process_database_files(
+                    registry_data,
+                    limit,
+                    phrases,
+                    force_rescan,
+                    include_prompts,
+                    include_generations,
+                )
             )
 
             # Flatten conversation entries from all databases
@@ -124,30 +143,27 @@ class QueryHandler:
                     conv,
                     include_prompts,
                     include_generations,
-                    search,
+                    phrases,
                     include_editor_history,
                 )
                 if formatted.get("status") == "success":
                     all_entries.extend(formatted.get("conversations", []))
 
+            # Match each summary once, counting and filtering in one pass
             total_match_count = 0
-            if count_matches and search:
+            if search:
+                matching_entries: List[Dict[str, Any]] = []
                 for entry in all_entries:
                     summary = entry.get("summary", "")
                     matches = self.find_matches(summary, search, regex)
-                    entry["match_count"] = len(matches)
-                    total_match_count += len(matches)
-                    if matches and regex:
-                        entry["matched_texts"] = matches[:5]
-
-            # Filter to only matching if search provided
-            if search:
-                all_entries = [
-                    entry
-                    for entry in all_entries
-                    if self.find_matches(entry.get("summary", ""), search, regex)
-                    or entry.get("match_count", 0) > 0
-                ]
+                    if count_matches:
+                        entry["match_count"] = len(matches)
+                        total_match_count += len(matches)
+                        if matches and regex:
+                            entry["matched_texts"] = matches[:5]
+                    if matches:
+                        matching_entries.append(entry)
+                all_entries = matching_entries
 
             # Sort by relevance if search provided
             if search:
@@ -169,6 +185,7 @@ class QueryHandler:
                     "total_conversations": len(all_entries),
                     "databases_searched": total_db_files,
                     "total_found": len(all_entries),
+                    "discovery": self.db_manager.get_discovery_stats(),
                 },
             }
 
@@ -2,22 +2,28 @@
 Recall conversations tool implementation.
 """
 
+import asyncio
 import json
 import traceback
 from typing import Any, Dict, List
 
 from src.config.constants import (
+    BM25_RECENCY_WEIGHT,
     DEFAULT_INCLUDE_EDITOR_HISTORY,
+    DEFAULT_RANKING,
     DEFAULT_RESULTS_LIMIT,
     GANDALF_REGISTRY_FILE,
     INCLUDE_GENERATIONS_DEFAULT,
     INCLUDE_PROMPTS_DEFAULT,
     MAX_PHRASES,
     MAX_RESULTS_LIMIT,
+    RANKING_MODES,
 )
 from src.database_management.recall_conversations import ConversationDatabaseManager
+from src.database_management.time_partitions import TimeWindow
 from src.protocol.models import ToolResult
 from src.tools.base_tool import BaseTool
+from src.utils.cancellation import raise_if_cancelled
 from src.utils.logger import log_error, log_info
 
 
@@ -78,11 +84,130 @@ class RecallConversationsTool(BaseTool):
                     "type": "string",
                     "description": "End date for results (ISO-8601 format, e.g., '2024-12-31')",
                 },
+                "ranking": {
+                    "type": "string",
+                    "enum": list(RANKING_MODES),
+                    "description": "How phrase matches are ranked: 'phrase' by the share of phrases matched, 'bm25' by BM25 relevance over the phrase terms (default: phrase)",
+                    "default": DEFAULT_RANKING,
+                },
+                "recency_weight": {
+                    "type": "number",
+                    "description": f"Share of a bm25 relevance taken from recency, 0 to 1 (default: {BM25_RECENCY_WEIGHT})",
+                    "default": BM25_RECENCY_WEIGHT,
+                    "minimum": 0,
+                    "maximum": 1,
+                },
+                "rescan": {
+                    "type": "boolean",
+                    "description": "Ignore the discovery manifest and rescan registry paths for databases (default: false)",
+                    "default": False,
+                },
             },
         }
 
+    @staticmethod
+    def _load_registry() -> Dict[str, Any]:
+        """Read the registry file.
+
+        Raises:
+            FileNotFoundError: If there is no registry file
+            json.JSONDecodeError: If the registry is not valid JSON
+            IOError: If the registry cannot be read
+        """
+        with open(GANDALF_REGISTRY_FILE, "r", encoding="utf-8") as f:
+            registry_data: Dict[str, Any] = json.load(f)
+        return registry_data
+
+    def _format_entries(
+        self,
+        conversations: List[Dict[str, Any]],
+        include_prompts: bool,
+        include_generations: bool,
+        phrases: List[str],
+        include_editor_history: bool,
+        window: TimeWindow | None,
+        bm25_scorer: Any,
+    ) -> List[Dict[str, Any]]:
+        """Score and summarize the entries of every extracted database."""
+        all_entries: List[Dict[str, Any]] = []
+        for conv in conversations:
+            raise_if_cancelled()
+            formatted = self.db_manager.format_conversation_entry(
+                conv,
+                include_prompts,
+                include_generations,
+                phrases,
+                include_editor_history,
+                window,
+                bm25_scorer,
+            )
+            if formatted.get("status") == "success":
+                all_entries.extend(formatted.get("conversations", []))
+        return all_entries
+
+    async def _recall_in_process(
+        self,
+        registry_data: Dict[str, Any],
+        limit: int,
+        phrases: List[str],
+        rescan: bool,
+        include_prompts: bool,
+        include_generations: bool,
+        include_editor_history: bool,
+        window: TimeWindow | None,
+        use_bm25: bool,
+        recency_weight: float,
+    ) -> tuple[List[Dict[str, Any]], int]:
+        """Extract, score and summarize every database in this process.
+
+        Returns:
+            Tuple of (formatted entries, total_db_files)
+        """
+        # Find and process database files using database manager
+        all_conversations, found_paths, total_db_files, _ = await asyncio.to_thread(
+            self.db_manager.process_database_files,
+            registry_data,
+            limit,
+            phrases,
+            rescan,
+            include_prompts,
+            include_generations,
+            window,
+        )
+
+        bm25_scorer = (
+            await asyncio.to_thread(
+                self.db_manager.create_bm25_scorer,
+                found_paths,
+                phrases,
+                include_prompts,
+                include_generations,
+                recency_weight,
+            )
+            if use_bm25
+            else None
+        )
+
+        all_entries = await asyncio.to_thread(
+            self._format_entries,
+            all_conversations,
+            include_prompts,
+            include_generations,
+            phrases,
+            include_editor_history,
+            window,
+            bm25_scorer,
+        )
+        return all_entries, total_db_files
+
     async def execute(self, arguments: Dict[str, Any] | None) -> List[ToolResult]:
-        """Execute the recall conversations tool."""
+        """Execute the recall conversations tool.
+
+        Reading the registry, extracting databases, building BM25 statistics,
+        formatting and serializing each run in a worker thread, awaited one
+        after another, so the event loop keeps serving other requests while
+        a recall runs.
+        """
         log_info("Recall conversations tool called")
 
         # Parse arguments
@@ -98,13 +223,35 @@ class RecallConversationsTool(BaseTool):
         include_editor_history = args.get(
             "include_editor_history", DEFAULT_INCLUDE_EDITOR_HISTORY
         )
-        date_from = args.get("date_from")
-        date_to = args.get("date_to")
+        try:
+            window = TimeWindow.from_bounds(args.get("date_from"), args.get("date_to"))
+        except ValueError as e:
+            return [ToolResult(text=str(e))]
+        rescan = bool(args.get("rescan", False))
+        ranking = args.get("ranking", DEFAULT_RANKING)
+        if ranking not in RANKING_MODES:
+            return [
+                ToolResult(
+                    text=f"Unsupported ranking mode: {ranking}. "
+                    f"Expected one of {', '.join(RANKING_MODES)}"
+                )
+            ]
+        try:
+            recency_weight = float(args.get("recency_weight", BM25_RECENCY_WEIGHT))
+        except (TypeError, ValueError):
+            recency_weight = -1.0
+        if not 0 <= recency_weight <= 1:
+            return [
+                ToolResult(
+                    text=f"Invalid recency_weight: {args.get('recency_weight')}. "
+                    "Expected a number from 0 to 1"
+                )
+            ]
+        # BM25 ranks every match, so no database is cut to its newest ones
+        use_bm25 = ranking == "bm25" and bool(phrases)
 
         try:
-            # Load registry data
-            with open(GANDALF_REGISTRY_FILE, "r", encoding="utf-8") as f:
-                registry_data = json.load(f)
+            registry_data = await asyncio.to_thread(self._load_registry)
         except FileNotFoundError:
             return [ToolResult(text="Registry file not found")]
         except (json.JSONDecodeError, IOError) as e:
@@ -112,26 +259,35 @@ class RecallConversationsTool(BaseTool):
             log_error(error_msg, {"traceback": traceback.format_exc()})
             return [ToolResult(text=error_msg)]
 
-        # Find and process database files using database manager
-        all_conversations, _, total_db_files, _ = (
-            self.db_manager.process_database_files(
-                registry_data, results_limit, phrases
-            )
-        )
-
-        all_entries: List[Dict[str, Any]] = []
-        for conv in all_conversations:
-            formatted = self.db_manager.format_conversation_entry(
-                conv,
+        if self.db_manager.sharded_recall is not None:
+            # Worker processes return the best entries, ranked and limited
+            all_entries, total_db_files = await asyncio.to_thread(
+                self.db_manager.recall_sharded,
+                registry_data,
+                0 if use_bm25 else results_limit,
+                results_limit,
+                phrases,
+                rescan,
                 include_prompts,
                 include_generations,
+                include_editor_history,
+                window,
+                use_bm25,
+                recency_weight,
+            )
+        else:
+            all_entries, total_db_files = await self._recall_in_process(
+                registry_data,
+                0 if use_bm25 else results_limit,
                 phrases,
+                rescan,
+                include_prompts,
+                include_generations,
                 include_editor_history,
-                date_from,
-                date_to,
+                window,
+                use_bm25,
+                recency_weight,
             )
-            if formatted.get("status") == "success":
-                all_entries.extend(formatted.get("conversations", []))
 
         if phrases:
             # Filter to only exact phrase matches (relevance > 0)
@@ -146,11 +302,23 @@ class RecallConversationsTool(BaseTool):
             "conversations": all_entries,
             "search_info": {
                 "phrases": phrases if phrases else None,
+                "ranking": ranking,
                 "databases_searched": total_db_files,
                 "total_found": len(all_entries),
+                "discovery": self.db_manager.get_discovery_stats(),
             },
         }
 
-        formatted_output = json.dumps(result, ensure_ascii=False)
+        log_info(
+            "Recall conversations completed",
+            {
+                "connection_pool": self.db_manager.get_connection_pool_stats(),
+                "blob_cache": self.db_manager.get_blob_cache_stats(),
+                "index": self.db_manager.get_index_stats(),
+            },
+        )
+        formatted_output = await asyncio.to_thread(
+            json.dumps, result, ensure_ascii=False
+        )
 
         return [ToolResult(text=formatted_output)]
@@ -341,9 +341,12 @@ class SpellTool(BaseTool):
                     process.communicate(), timeout=timeout
                 )
             except asyncio.TimeoutError:
-                process.kill()
-                await process.wait()
                 raise TimeoutError(f"Spell execution timed out after {timeout} seconds")
+            finally:
+                # Also reached when the client cancels the request
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
 
             if process.returncode != 0:
                 error_output = stderr.decode("utf-8", errors="replace")
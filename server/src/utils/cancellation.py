@@ -0,0 +1,40 @@
+"""Cancellation of the request being handled."""
+
+import threading
+from contextvars import ContextVar
+
+
+class RequestCancelledError(Exception):
+    """Raised when the client cancelled the request being handled."""
+
+
+# Set by the server for the task handling each request. asyncio.to_thread
+# copies the context, so blocking work in worker threads sees it too.
+_cancel_event: ContextVar[threading.Event | None] = ContextVar(
+    "gandalf_cancel_event", default=None
+)
+
+
+def bind_cancel_event(event: threading.Event) -> None:
+    """Make ``event`` the cancellation event of the current context."""
+    _cancel_event.set(event)
+
+
+def current_cancel_event() -> threading.Event | None:
+    """Cancellation event of the current request, None outside a request."""
+    return _cancel_event.get()
+
+
+def raise_if_cancelled(event: threading.Event | None = None) -> None:
+    """Stop the current work if its request was cancelled.
+
+    Args:
+        event: Cancellation event to check, by default the current request's
+
+    Raises:
+        RequestCancelledError: If the event is set
+    """
+    if event is None:
+        event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise RequestCancelledError("Request cancelled by the client")
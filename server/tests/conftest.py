@@ -0,0 +1,24 @@
+"""Shared pytest fixtures for the Gandalf server tests."""
+
+from pathlib import Path
+from typing import Iterator
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_gandalf_state(tmp_path: Path) -> Iterator[Path]:
+    """Keep persistent Gandalf state files out of the real ~/.gandalf."""
+    state_dir = tmp_path / "gandalf_state"
+    with (
+        patch(
+            "src.database_management.discover_databases.GANDALF_DISCOVERY_MANIFEST_FILE",
+            str(state_dir / "discovery_manifest.json"),
+        ),
+        patch(
+            "src.database_management.conversation_index.GANDALF_INDEX_FILE",
+            str(state_dir / "index.db"),
+        ),
+    ):
+        yield state_dir
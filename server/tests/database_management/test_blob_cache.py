@@ -0,0 +1,79 @@
+"""
+Tests for blob_cache module.
+"""
+
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.database_fingerprint import DatabaseFingerprint
+
+FINGERPRINT = DatabaseFingerprint(size=100, mtime_ns=1, wal_size=0)
+
+
+class TestParsedBlobCache:
+    """Test suite for ParsedBlobCache class."""
+
+    def test_get_returns_entries_for_same_fingerprint(self) -> None:
+        """Test a stored value is returned while the fingerprint matches."""
+        cache = ParsedBlobCache(max_bytes=1000)
+        cache.put("/db", "prompts", FINGERPRINT, [{"text": "a"}], 10)
+
+        assert cache.get("/db", "prompts", FINGERPRINT) == [{"text": "a"}]
+        assert cache.get_stats()["hits"] == 1
+
+    def test_changed_fingerprint_misses(self) -> None:
+        """Test a new snapshot of the database is a miss."""
+        cache = ParsedBlobCache(max_bytes=1000)
+        cache.put("/db", "prompts", FINGERPRINT, [], 10)
+
+        changed = DatabaseFingerprint(size=100, mtime_ns=1, wal_size=4096)
+        assert cache.get("/db", "prompts", changed) is None
+        assert cache.get_stats()["misses"] == 1
+
+    def test_put_replaces_previous_snapshot(self) -> None:
+        """Test storing a newer snapshot releases the old one's bytes."""
+        cache = ParsedBlobCache(max_bytes=1000)
+        cache.put("/db", "prompts", FINGERPRINT, [1], 10)
+        newer = DatabaseFingerprint(size=200, mtime_ns=2, wal_size=0)
+        cache.put("/db", "prompts", newer, [1, 2], 20)
+
+        stats = cache.get_stats()
+        assert stats["resident_bytes"] == 20
+        assert stats["cached_values"] == 1
+
+    def test_evicts_least_recently_used_over_budget(self) -> None:
+        """Test the LRU value is evicted when the byte budget is exceeded."""
+        cache = ParsedBlobCache(max_bytes=25)
+        cache.put("/a", "prompts", FINGERPRINT, ["a"], 10)
+        cache.put("/b", "prompts", FINGERPRINT, ["b"], 10)
+        cache.get("/a", "prompts", FINGERPRINT)
+        cache.put("/c", "prompts", FINGERPRINT, ["c"], 10)
+
+        assert cache.get("/b", "prompts", FINGERPRINT) is None
+        assert cache.get("/a", "prompts", FINGERPRINT) == ["a"]
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["resident_bytes"] == 20
+
+    def test_oversized_value_not_cached(self) -> None:
+        """Test values larger than the budget are skipped."""
+        cache = ParsedBlobCache(max_bytes=5)
+        cache.put("/db", "prompts", FINGERPRINT, ["x"], 10)
+
+        assert cache.get_stats()["resident_bytes"] == 0
+
+    def test_hit_rate(self) -> None:
+        """Test hit rate is hits over lookups."""
+        cache = ParsedBlobCache(max_bytes=100)
+        cache.put("/db", "prompts", FINGERPRINT, [], 1)
+        cache.get("/db", "prompts", FINGERPRINT)
+        cache.get("/db", "history", FINGERPRINT)
+
+        assert cache.get_stats()["hit_rate"] == 0.5
+
+    def test_partial_value_serves_smaller_requests_only(self) -> None:
+        """Test a cached tail only answers requests it holds enough entries for."""
+        cache = ParsedBlobCache(max_bytes=100)
+        cache.put("/db", "prompts", FINGERPRINT, [3, 4], 10, complete=False)
+
+        assert cache.get("/db", "prompts", FINGERPRINT, 2) == [3, 4]
+        assert cache.get("/db", "prompts", FINGERPRINT, 3) is None
+        assert cache.get("/db", "prompts", FINGERPRINT) is None
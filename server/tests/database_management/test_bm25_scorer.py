@@ -0,0 +1,135 @@
+"""
+Tests for bm25_scorer module.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from src.config.constants import BM25_B, BM25_K1, BM25_RECENCY_WEIGHT
+from src.database_management.bm25_scorer import (
+    MIN_MATCH_RELEVANCE,
+    BM25Scorer,
+    TermStatistics,
+    tokenize,
+)
+from src.database_management.recency_scorer import RecencyScorer
+
+
+def build_statistics(*texts: str) -> TermStatistics:
+    statistics = TermStatistics()
+    for text in texts:
+        statistics.add(text)
+    return statistics
+
+
+class TestTermStatistics:
+    """Test suite for TermStatistics."""
+
+    def test_tokenize_lowercases_words(self) -> None:
+        """Test text is split into lowercase word terms."""
+        assert tokenize("Fix the Python-3 build!") == [
+            "fix",
+            "the",
+            "python",
+            "3",
+            "build",
+        ]
+
+    def test_add_counts_documents_and_frequencies(self) -> None:
+        """Test each document counts once per distinct term."""
+        statistics = build_statistics("python python tips", "rust tips")
+
+        assert statistics.document_count == 2
+        assert statistics.total_length == 5
+        assert statistics.average_length == 2.5
+        assert statistics.document_frequency == {"python": 1, "tips": 2, "rust": 1}
+
+    def test_empty_statistics_average_length(self) -> None:
+        """Test an empty corpus has no average length."""
+        assert TermStatistics().average_length == 0.0
+
+    def test_combine_keeps_requested_terms(self) -> None:
+        """Test combining sums counts and keeps only the requested terms."""
+        combined = TermStatistics.combine(
+            [build_statistics("python tips"), build_statistics("python rust")],
+            ["python", "rust", "go"],
+        )
+
+        assert combined.document_count == 2
+        assert combined.total_length == 4
+        assert combined.document_frequency == {"python": 2, "rust": 1}
+
+
+class TestBM25Scorer:
+    """Test suite for BM25Scorer."""
+
+    def setup_method(self) -> None:
+        """Build a small corpus where 'python' is common and 'asyncio' rare."""
+        self.statistics = build_statistics(
+            "python tips",
+            "python asyncio event loop",
+            "python packaging",
+            "rust borrow checker",
+        )
+
+    def test_defaults_use_constants(self) -> None:
+        """Test the scorer parameters default to the configured constants."""
+        scorer = BM25Scorer(self.statistics, ["python"])
+
+        assert scorer.k1 == BM25_K1
+        assert scorer.b == BM25_B
+        assert scorer.recency_weight == BM25_RECENCY_WEIGHT
+
+    def test_rare_terms_weigh_more(self) -> None:
+        """Test a rare term contributes more than a common one."""
+        scorer = BM25Scorer(self.statistics, ["python asyncio"])
+
+        assert scorer.idf["asyncio"] > scorer.idf["python"] > 0
+
+    def test_term_frequency_and_length_order_scores(self) -> None:
+        """Test repeated terms and shorter documents score higher."""
+        scorer = BM25Scorer(self.statistics, ["python"])
+
+        once = scorer.score_text("python tips for the event loop")
+        twice = scorer.score_text("python tips for python event loop")
+        short = scorer.score_text("python")
+
+        assert twice > once
+        assert short > once
+        assert scorer.score_text("rust only") == 0.0
+
+    def test_relevance_is_bounded_and_ordered(self) -> None:
+        """Test relevance keeps the BM25 order within (0, 1)."""
+        scorer = BM25Scorer(self.statistics, ["asyncio"])
+
+        high = scorer.calculate_relevance({}, "asyncio asyncio")
+        low = scorer.calculate_relevance({}, "asyncio and a much longer text body")
+
+        assert 0 < low < high < 1
+
+    def test_match_without_terms_keeps_floor(self) -> None:
+        """Test a phrase with no word terms still counts as a match."""
+        scorer = BM25Scorer(self.statistics, ["++"])
+
+        assert scorer.terms == []
+        assert scorer.calculate_relevance({}, "c++ tips") == MIN_MATCH_RELEVANCE
+
+    def test_recency_blending(self) -> None:
+        """Test a recency weight favors newer entries with equal text."""
+        scorer = BM25Scorer(
+            self.statistics,
+            ["python"],
+            recency_weight=0.5,
+            recency_scorer=RecencyScorer(),
+        )
+        now = datetime.now(timezone.utc)
+        recent = {"timestamp": now.isoformat()}
+        old = {"timestamp": (now - timedelta(days=365)).isoformat()}
+
+        assert scorer.calculate_relevance(
+            recent, "python tips"
+        ) > scorer.calculate_relevance(old, "python tips")
+
+    def test_recency_weight_is_clamped(self) -> None:
+        """Test the recency weight stays within 0 and 1."""
+        assert BM25Scorer(self.statistics, [], recency_weight=3).recency_weight == 1.0
+        assert BM25Scorer(self.statistics, [], recency_weight=-1).recency_weight == 0.0
@@ -0,0 +1,154 @@
+"""
+Tests for connection_pool module.
+"""
+
+import os
+import sqlite3
+import tempfile
+from typing import Callable, List
+
+import pytest
+from src.database_management.connection_pool import ConnectionPool
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestConnectionPool:
+    """Test suite for ConnectionPool class."""
+
+    def setup_method(self) -> None:
+        """Create databases and a pool with a controllable clock."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.paths: List[str] = []
+        for name in ["a.db", "b.db", "c.db"]:
+            path = os.path.join(self._temp_dir.name, name)
+            sqlite3.connect(path).close()
+            self.paths.append(path)
+        self.clock = FakeClock()
+        self.opened = 0
+
+    def teardown_method(self) -> None:
+        """Remove the temporary databases."""
+        self._temp_dir.cleanup()
+
+    def _opener(self, path: str) -> Callable[[], sqlite3.Connection]:
+        def open_connection() -> sqlite3.Connection:
+            self.opened += 1
+            return sqlite3.connect(path, check_same_thread=False)
+
+        return open_connection
+
+    def _use(self, pool: ConnectionPool, path: str, identity: object = None) -> None:
+        with pool.acquire(path, self._opener(path), identity) as conn:
+            conn.execute("SELECT 1").fetchone()
+
+    def test_reuses_idle_connection(self) -> None:
+        """Test a released connection is reused for the same path."""
+        pool = ConnectionPool(max_connections=4, idle_timeout=60, clock=self.clock)
+
+        self._use(pool, self.paths[0])
+        self._use(pool, self.paths[0])
+
+        stats = pool.get_stats()
+        assert self.opened == 1
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["idle"] == 1
+        assert stats["in_use"] == 0
+
+    def test_identity_change_reopens(self) -> None:
+        """Test a connection opened with different settings is not reused."""
+        pool = ConnectionPool(max_connections=4, idle_timeout=60, clock=self.clock)
+
+        self._use(pool, self.paths[0], identity="ro")
+        self._use(pool, self.paths[0], identity="immutable")
+
+        assert self.opened == 2
+        assert pool.get_stats()["idle"] == 1
+
+    def test_idle_timeout_closes_connection(self) -> None:
+        """Test idle connections past the timeout are closed."""
+        pool = ConnectionPool(max_connections=4, idle_timeout=10, clock=self.clock)
+        self._use(pool, self.paths[0])
+
+        self.clock.now = 11
+        assert pool.close_idle() == 1
+
+        stats = pool.get_stats()
+        assert stats["idle"] == 0
+        assert stats["expirations"] == 1
+
+    def test_lru_eviction_at_capacity(self) -> None:
+        """Test the least recently used idle connection is evicted at the cap."""
+        pool = ConnectionPool(max_connections=2, idle_timeout=60, clock=self.clock)
+
+        self._use(pool, self.paths[0])
+        self.clock.now = 1
+        self._use(pool, self.paths[1])
+        self.clock.now = 2
+        self._use(pool, self.paths[0])
+        self.clock.now = 3
+        self._use(pool, self.paths[2])
+
+        stats = pool.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["open"] == 2
+        # paths[1] was least recently used, so it was evicted
+        self._use(pool, self.paths[0])
+        assert pool.get_stats()["hits"] == 2
+
+    def test_overflow_connections_are_not_pooled(self) -> None:
+        """Test connections beyond the cap are closed on release."""
+        pool = ConnectionPool(max_connections=1, idle_timeout=60, clock=self.clock)
+
+        with pool.acquire(self.paths[0], self._opener(self.paths[0])):
+            with pool.acquire(self.paths[1], self._opener(self.paths[1])):
+                assert pool.get_stats()["in_use"] == 2
+
+        stats = pool.get_stats()
+        assert stats["overflow"] == 1
+        assert stats["open"] == 1
+
+    def test_health_check_detects_replaced_file(self) -> None:
+        """Test a pooled connection to a replaced database file is discarded."""
+        pool = ConnectionPool(max_connections=4, idle_timeout=60, clock=self.clock)
+        self._use(pool, self.paths[0])
+
+        replacement = self.paths[0] + ".new"
+        sqlite3.connect(replacement).close()
+        os.replace(replacement, self.paths[0])
+        self._use(pool, self.paths[0])
+
+        stats = pool.get_stats()
+        assert stats["health_check_failures"] == 1
+        assert self.opened == 2
+
+    def test_error_discards_connection(self) -> None:
+        """Test a connection is not returned to the pool after an error."""
+        pool = ConnectionPool(max_connections=4, idle_timeout=60, clock=self.clock)
+
+        with pytest.raises(sqlite3.OperationalError):
+            with pool.acquire(self.paths[0], self._opener(self.paths[0])) as conn:
+                conn.execute("SELECT * FROM missing_table")
+
+        stats = pool.get_stats()
+        assert stats["idle"] == 0
+        assert stats["in_use"] == 0
+
+    def test_close_all(self) -> None:
+        """Test close_all empties the pool."""
+        pool = ConnectionPool(max_connections=4, idle_timeout=60, clock=self.clock)
+        self._use(pool, self.paths[0])
+        self._use(pool, self.paths[1])
+
+        pool.close_all()
+
+        assert pool.get_stats()["open"] == 0
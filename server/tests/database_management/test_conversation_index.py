@@ -0,0 +1,532 @@
+"""
+Tests for conversation_index module.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import pytest
+from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+from src.database_management.bm25_scorer import TermStatistics
+from src.database_management.conversation_index import ConversationIndex
+from src.database_management.execute_query import QueryExecutor
+from src.database_management.extract_conversation_data import ConversationDataExtractor
+from src.database_management.time_partitions import PARTITION_MS, TimeWindow
+
+DAY_MS = 24 * 3600 * 1000
+
+pytestmark = pytest.mark.skipif(
+    not ConversationIndex.is_supported(),
+    reason="SQLite lacks FTS5 with the trigram tokenizer",
+)
+
+
+class TestConversationIndex:
+    """Test suite for ConversationIndex class."""
+
+    def setup_method(self) -> None:
+        """Create a source database directory and an index."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.root = self._temp_dir.name
+        self.index = ConversationIndex(os.path.join(self.root, "state", "index.db"))
+
+    def teardown_method(self) -> None:
+        """Close the index and remove temporary files."""
+        self.index.close()
+        self._temp_dir.cleanup()
+
+    def _create_db(
+        self,
+        name: str,
+        prompts: List[Any],
+        generations: List[Any] | None = None,
+        history: List[Any] | None = None,
+    ) -> str:
+        directory = os.path.join(self.root, name)
+        os.makedirs(directory, exist_ok=True)
+        db_path = os.path.join(directory, "state.vscdb")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ItemTable "
+            "(key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)"
+        )
+        conn.executemany(
+            "INSERT INTO ItemTable VALUES (?, ?)",
+            [
+                (RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"], json.dumps(prompts)),
+                (
+                    RECALL_CONVERSATIONS_QUERIES["GENERATIONS_KEY"],
+                    json.dumps(generations or []),
+                ),
+                (
+                    RECALL_CONVERSATIONS_QUERIES["HISTORY_KEY"],
+                    json.dumps(history or []),
+                ),
+            ],
+        )
+        conn.commit()
+        conn.close()
+        return db_path
+
+    def _bump_mtime(self, db_path: str) -> None:
+        os.utime(db_path, ns=(0, os.stat(db_path).st_mtime_ns + 1_000_000))
+
+    def _texts(self, conv_data: Dict[str, Any], field: str = "prompts") -> List[str]:
+        return [entry["text"] for entry in conv_data[field]]
+
+    def test_rows_carry_source_metadata(self) -> None:
+        """Test indexed rows record source, type, workspace and timestamp."""
+        db_path = self._create_db(
+            "ws1",
+            [{"text": "first prompt", "timestamp": 1_700_000_000_000}],
+            generations=[{"textDescription": "a generation"}],
+        )
+        with open(
+            os.path.join(self.root, "ws1", "workspace.json"), "w", encoding="utf-8"
+        ) as f:
+            json.dump({"folder": "file:///home/user/my%20project"}, f)
+
+        assert self.index.refresh([db_path]) == {}
+
+        with sqlite3.connect(self.index.index_path) as conn:
+            rows = conn.execute(
+                "SELECT db_path, entry_type, position, workspace, timestamp_ms, text "
+                "FROM entries ORDER BY entry_type"
+            ).fetchall()
+        assert rows == [
+            (db_path, "generation", 0, "/home/user/my project", None, "a generation"),
+            (
+                db_path,
+                "prompt",
+                0,
+                "/home/user/my project",
+                1_700_000_000_000,
+                "first prompt",
+            ),
+        ]
+
+    def test_search_phrases_across_sources(self) -> None:
+        """Test a phrase search returns matching entries from every source."""
+        first = self._create_db(
+            "ws1", [{"text": "Gandalf the Grey"}, {"text": "unrelated"}]
+        )
+        second = self._create_db("ws2", [{"text": "gandalf the white"}])
+        self.index.refresh([first, second])
+
+        results = self.index.search([first, second], 10, ["GANDALF"])
+
+        assert self._texts(results[first]) == ["Gandalf the Grey"]
+        assert self._texts(results[second]) == ["gandalf the white"]
+        assert results[first]["database_path"] == first
+        assert results[first]["error"] is None
+
+    def test_search_short_phrase_uses_like(self) -> None:
+        """Test phrases shorter than a trigram still match as substrings."""
+        db_path = self._create_db("ws1", [{"text": "go fast"}, {"text": "slow"}])
+        self.index.refresh([db_path])
+
+        results = self.index.search([db_path], 10, ["go"])
+
+        assert self._texts(results[db_path]) == ["go fast"]
+
+    def test_search_keeps_most_recent_per_type(self) -> None:
+        """Test limit keeps the newest entries in source order."""
+        prompts = [{"text": f"prompt {i}"} for i in range(5)]
+        db_path = self._create_db("ws1", prompts)
+        self.index.refresh([db_path])
+
+        recent = self.index.search([db_path], 2)
+        matched = self.index.search([db_path], 2, ["prompt"])
+
+        assert self._texts(recent[db_path]) == ["prompt 3", "prompt 4"]
+        assert self._texts(matched[db_path]) == ["prompt 3", "prompt 4"]
+
+    def test_search_respects_entry_types(self) -> None:
+        """Test excluded entry types are not returned."""
+        db_path = self._create_db(
+            "ws1", [{"text": "a prompt"}], generations=[{"text": "a generation"}]
+        )
+        self.index.refresh([db_path])
+
+        results = self.index.search([db_path], 10, include_generations=False)
+
+        assert self._texts(results[db_path]) == ["a prompt"]
+        assert results[db_path]["generations"] == []
+
+    def test_unchanged_sources_are_not_reopened(self) -> None:
+        """Test refresh skips sources whose fingerprint did not change."""
+        db_path = self._create_db("ws1", [{"text": "hello"}])
+        self.index.refresh([db_path])
+
+        with patch.object(
+            self.index.reader, "read_updates", wraps=self.index.reader.read_updates
+        ) as mock_read:
+            self.index.refresh([db_path])
+
+        mock_read.assert_not_called()
+        assert self.index.last_stats["unchanged_sources"] == 1
+
+    def test_changed_source_is_reingested(self) -> None:
+        """Test a modified source replaces its previous entries."""
+        db_path = self._create_db("ws1", [{"text": "old text"}])
+        self.index.refresh([db_path])
+        self._create_db("ws1", [{"text": "new text"}, {"text": "more text"}])
+        self._bump_mtime(db_path)
+
+        self.index.refresh([db_path])
+        results = self.index.search([db_path], 10, ["text"])
+
+        assert self._texts(results[db_path]) == ["new text", "more text"]
+
+    def test_appended_entries_decode_only_the_tail(self) -> None:
+        """Test a grown array indexes just the new entries."""
+        prompts = [{"text": f"prompt {i}"} for i in range(3)]
+        db_path = self._create_db("ws1", prompts)
+        self.index.refresh([db_path])
+        with sqlite3.connect(self.index.index_path) as conn:
+            old_ids = conn.execute("SELECT id FROM entries ORDER BY id").fetchall()
+
+        prompts += [{"text": "prompt 3"}, {"text": "prompt 4"}]
+        self._create_db("ws1", prompts)
+        self._bump_mtime(db_path)
+        with patch.object(
+            self.index.reader.stream_reader,
+            "iter_array",
+            wraps=self.index.reader.stream_reader.iter_array,
+        ) as mock_iter:
+            self.index.refresh([db_path])
+
+        mock_iter.assert_not_called()
+        assert self.index.last_stats["ingested_entries"] == 2
+        results = self.index.search([db_path], 10, ["prompt"])
+        assert self._texts(results[db_path]) == [f"prompt {i}" for i in range(5)]
+        with sqlite3.connect(self.index.index_path) as conn:
+            positions = conn.execute(
+                "SELECT position FROM entries ORDER BY id"
+            ).fetchall()
+            kept_ids = conn.execute(
+                "SELECT id FROM entries WHERE position < 3 ORDER BY id"
+            ).fetchall()
+        assert positions == [(i,) for i in range(5)]
+        assert kept_ids == old_ids
+
+    def test_changed_boundary_reingests_array(self) -> None:
+        """Test an array whose last indexed entry changed is read in full."""
+        db_path = self._create_db("ws1", [{"text": "one"}, {"text": "two"}])
+        self.index.refresh([db_path])
+
+        self._create_db("ws1", [{"text": "one"}, {"text": "TWO"}, {"text": "three"}])
+        self._bump_mtime(db_path)
+        self.index.refresh([db_path])
+
+        assert self.index.last_stats["ingested_entries"] == 3
+        results = self.index.search([db_path], 10)
+        assert self._texts(results[db_path]) == ["one", "TWO", "three"]
+
+    def test_shrunk_array_reingests(self) -> None:
+        """Test an array that lost entries is read in full."""
+        db_path = self._create_db("ws1", [{"text": "one"}, {"text": "two"}])
+        self.index.refresh([db_path])
+
+        self._create_db("ws1", [{"text": "one"}])
+        self._bump_mtime(db_path)
+        self.index.refresh([db_path])
+
+        results = self.index.search([db_path], 10)
+        assert self._texts(results[db_path]) == ["one"]
+
+    def test_unchanged_arrays_write_nothing(self) -> None:
+        """Test a changed source whose arrays did not grow writes no entries."""
+        db_path = self._create_db("ws1", [{"text": "one"}])
+        self.index.refresh([db_path])
+
+        self._bump_mtime(db_path)
+        self.index.refresh([db_path])
+
+        assert self.index.last_stats["ingested_sources"] == 1
+        assert self.index.last_stats["ingested_entries"] == 0
+        assert self._texts(self.index.search([db_path], 10)[db_path]) == ["one"]
+
+    def test_append_to_empty_array(self) -> None:
+        """Test entries added to an empty array are picked up incrementally."""
+        db_path = self._create_db("ws1", [])
+        self.index.refresh([db_path])
+
+        self._create_db("ws1", [{"text": "first"}])
+        self._bump_mtime(db_path)
+        with patch.object(
+            self.index.reader.stream_reader,
+            "iter_array",
+            wraps=self.index.reader.stream_reader.iter_array,
+        ) as mock_iter:
+            self.index.refresh([db_path])
+
+        mock_iter.assert_not_called()
+        assert self._texts(self.index.search([db_path], 10)[db_path]) == ["first"]
+
+    def test_append_without_blob_streaming(self) -> None:
+        """Test appends are detected when values are read with substr."""
+        self.index.close()
+        self.index = ConversationIndex(
+            os.path.join(self.root, "state", "substr.db"),
+            QueryExecutor(stream_blobs=False),
+        )
+        db_path = self._create_db("ws1", [{"text": "one"}])
+        self.index.refresh([db_path])
+
+        self._create_db("ws1", [{"text": "one"}, {"text": "two"}])
+        self._bump_mtime(db_path)
+        self.index.refresh([db_path])
+
+        assert self.index.last_stats["ingested_entries"] == 1
+        assert self._texts(self.index.search([db_path], 10)[db_path]) == [
+            "one",
+            "two",
+        ]
+
+    def test_term_statistics_follow_appends_and_resets(self) -> None:
+        """Test BM25 statistics match the indexed entries after each change."""
+        first = self._create_db("ws1", [{"text": "python tips"}])
+        second = self._create_db(
+            "ws2", [{"text": "rust tips"}], generations=[{"text": "python python"}]
+        )
+        self.index.refresh([first, second])
+
+        self._create_db("ws1", [{"text": "python tips"}, {"text": "asyncio loop"}])
+        self._bump_mtime(first)
+        self.index.refresh([first, second])
+        self._create_db("ws2", [{"text": "go tips"}], generations=[{"text": "python"}])
+        self._bump_mtime(second)
+        self.index.refresh([first, second])
+
+        terms = ["python", "tips", "rust", "asyncio", "go"]
+        prompts = self.index.term_statistics(["prompt"], terms)
+        expected = TermStatistics()
+        for text in ("python tips", "asyncio loop", "go tips"):
+            expected.add(text)
+        assert prompts == TermStatistics.combine([expected], terms)
+        both = self.index.term_statistics(["prompt", "generation"], ["python"])
+        assert (both.document_count, both.total_length) == (4, 7)
+        assert both.document_frequency == {"python": 2}
+
+        self.index.refresh([first])
+        remaining = self.index.term_statistics(["prompt", "generation"], terms)
+        assert remaining.document_count == 2
+        assert remaining.document_frequency == {"python": 1, "tips": 1, "asyncio": 1}
+        with sqlite3.connect(self.index.index_path) as conn:
+            assert conn.execute(
+                "SELECT COUNT(*) FROM term_stats WHERE document_count <= 0"
+            ).fetchone() == (0,)
+
+    def test_missing_sources_are_removed(self) -> None:
+        """Test sources no longer discovered are dropped from the index."""
+        first = self._create_db("ws1", [{"text": "one"}])
+        second = self._create_db("ws2", [{"text": "two"}])
+        self.index.refresh([first, second])
+
+        self.index.refresh([second])
+
+        stats = self.index.get_stats()
+        assert stats["sources"] == 1
+        assert stats["entries"] == 1
+
+    def test_ingest_error_is_reported(self) -> None:
+        """Test a source that cannot be read is reported and left out."""
+        broken = os.path.join(self.root, "broken.db")
+        sqlite3.connect(broken).close()
+
+        errors = self.index.refresh([broken])
+
+        assert "no such table" in errors[broken]
+        assert self.index.get_stats()["sources"] == 0
+
+    def test_search_window_skips_ranges_outside_it(self) -> None:
+        """Test dated searches read only ranges overlapping the window."""
+        base = 2800 * PARTITION_MS
+        prompts: List[Dict[str, Any]] = [
+            {"text": f"tip {i}", "timestamp": base + i * PARTITION_MS // 100}
+            for i in range(400)
+        ]
+        prompts.insert(150, {"text": "tip undated"})
+        db_path = self._create_db("ws1", prompts)
+        self.index.refresh([db_path])
+        with sqlite3.connect(self.index.index_path) as conn:
+            ranges = conn.execute(
+                "SELECT start_ms, end_ms, undated FROM entry_ranges ORDER BY first_id"
+            ).fetchall()
+        assert len(ranges) == 4
+        assert sum(undated for _, _, undated in ranges) == 1
+
+        window = TimeWindow(
+            base + 3 * PARTITION_MS, base + 3 * PARTITION_MS + PARTITION_MS // 20
+        )
+        expected = ["tip undated", *(f"tip {i}" for i in range(300, 306))]
+        for phrases in (None, ["tip"], ["ti"]):
+            results = self.index.search([db_path], 0, phrases, window=window)
+            assert self._texts(results[db_path]) == expected
+        window = TimeWindow(end_ms=base)
+        results = self.index.search([db_path], 2, ["tip"], window=window)
+        assert self._texts(results[db_path]) == ["tip 0", "tip undated"]
+
+    def test_maintain_expires_entries_past_retention(self) -> None:
+        """Test retention deletes old entries and keeps ranges to the rest."""
+        now_ms = int(time.time() * 1000)
+        # The oldest entries get the highest ids, whose ids are then reused
+        db_path = self._create_db(
+            "ws1",
+            [
+                {"text": "tip new", "timestamp": now_ms},
+                {"text": "tip undated"},
+                {"text": "tip old", "timestamp": now_ms - 30 * DAY_MS},
+            ],
+        )
+        self.index.refresh([db_path])
+
+        stats = self.index.maintain(0, 7)
+
+        assert stats["expired_entries"] == 1
+        assert stats["evicted_entries"] == 0
+        other = self._create_db("ws2", [{"text": "tip other", "timestamp": now_ms}])
+        self.index.refresh([db_path, other])
+        results = self.index.search([db_path, other], 0, ["tip"])
+        assert self._texts(results[db_path]) == ["tip new", "tip undated"]
+        assert self._texts(results[other]) == ["tip other"]
+        assert self.index.term_statistics(["prompt"], ["old"]) == TermStatistics(
+            document_count=3, total_length=6
+        )
+
+    def test_maintain_evicts_oldest_entries_over_budget(self) -> None:
+        """Test the size budget evicts the oldest entries, undated ones last."""
+        now_ms = int(time.time() * 1000)
+        prompts: List[Dict[str, Any]] = [
+            {"text": f"tip {i} " + "x" * 2000, "timestamp": now_ms - i * DAY_MS}
+            for i in range(200)
+        ]
+        prompts.append({"text": "tip undated"})
+        db_path = self._create_db("ws1", prompts)
+        self.index.refresh([db_path])
+        # A run without budget checkpoints the log into the index file
+        size = self.index.maintain(0, 0)["size_bytes"]
+
+        stats = self.index.maintain(size // 2, 0)
+
+        assert stats["evicted_entries"] > 0
+        assert stats["size_bytes"] < stats["size_before_bytes"]
+        texts = [
+            text.split(" x")[0]
+            for text in self._texts(self.index.search([db_path], 0)[db_path])
+        ]
+        assert texts == [
+            *(f"tip {i}" for i in range(200 - stats["evicted_entries"])),
+            "tip undated",
+        ]
+
+    def test_schema_version_change_rebuilds(self) -> None:
+        """Test an index written with another schema version is rebuilt."""
+        db_path = self._create_db("ws1", [{"text": "hello"}])
+        self.index.refresh([db_path])
+        self.index.close()
+        with sqlite3.connect(self.index.index_path) as conn:
+            conn.execute("PRAGMA user_version = 0")
+
+        assert self.index.get_stats()["entries"] == 0
+
+
+class TestIndexedExtraction:
+    """Test ConversationDataExtractor reading through the index."""
+
+    def setup_method(self) -> None:
+        """Create a registry root holding one database."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.root = self._temp_dir.name
+        self.db_path = os.path.join(self.root, "state.vscdb")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+        conn.execute(
+            "INSERT INTO ItemTable VALUES (?, ?)",
+            (
+                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                json.dumps([{"text": f"python tip {i}"} for i in range(6)]),
+            ),
+        )
+        conn.commit()
+        conn.close()
+        self.index = ConversationIndex(os.path.join(self.root, "index.db"))
+
+    def teardown_method(self) -> None:
+        """Close the index and remove temporary files."""
+        self.index.close()
+        self._temp_dir.cleanup()
+
+    def test_index_matches_direct_queries(self) -> None:
+        """Test indexed results equal per-database results."""
+        direct = ConversationDataExtractor()
+        indexed = ConversationDataExtractor(index=self.index)
+        registry = {"cursor": [self.root]}
+
+        for phrases in (None, ["tip 4"], ["python"]):
+            expected = direct.process_database_files(registry, 3, phrases)
+            actual = indexed.process_database_files(registry, 3, phrases)
+            assert actual == expected
+
+    def test_index_matches_direct_queries_in_window(self) -> None:
+        """Test dated indexed results equal per-database results."""
+        direct = ConversationDataExtractor()
+        indexed = ConversationDataExtractor(index=self.index)
+        registry = {"cursor": [self.root]}
+        window = TimeWindow(0, 0)
+
+        for phrases in (None, ["tip"]):
+            expected = direct.process_database_files(
+                registry, 3, phrases, window=window
+            )
+            actual = indexed.process_database_files(registry, 3, phrases, window=window)
+            assert actual == expected
+
+    def test_index_term_statistics_match_direct(self) -> None:
+        """Test index statistics equal those built from each database."""
+        direct = ConversationDataExtractor()
+        indexed = ConversationDataExtractor(index=self.index)
+        indexed.process_database_files({"cursor": [self.root]}, 3)
+
+        expected = direct.get_term_statistics([self.db_path], ["python", "tip", "4"])
+        actual = indexed.get_term_statistics([self.db_path], ["python", "tip", "4"])
+
+        assert actual == expected
+        assert actual.document_frequency == {"python": 6, "tip": 6, "4": 1}
+
+    def test_index_does_not_open_sources_when_unchanged(self) -> None:
+        """Test a repeated search is served from the index alone."""
+        extractor = ConversationDataExtractor(index=self.index)
+        extractor.process_database_files({"cursor": [self.root]}, 3)
+
+        with patch.object(
+            self.index.query_executor, "open_connection"
+        ) as mock_open_connection:
+            conversations, _, _, _ = extractor.process_database_files(
+                {"cursor": [self.root]}, 3, ["tip 5"]
+            )
+
+        mock_open_connection.assert_not_called()
+        assert conversations[0]["prompts"] == [{"text": "python tip 5"}]
+
+    def test_index_failure_falls_back_to_direct_queries(self) -> None:
+        """Test an unusable index falls back to querying each database."""
+        extractor = ConversationDataExtractor(index=self.index)
+
+        with patch.object(
+            self.index, "refresh", side_effect=sqlite3.OperationalError("locked")
+        ):
+            conversations, _, _, _ = extractor.process_database_files(
+                {"cursor": [self.root]}, 2
+            )
+
+        assert [p["text"] for p in conversations[0]["prompts"]] == [
+            "python tip 4",
+            "python tip 5",
+        ]
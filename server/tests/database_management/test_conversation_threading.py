@@ -14,67 +14,6 @@ class TestConversationThreader:
         """Set up test fixtures before each test method."""
         self.threader = ConversationThreader()
 
-    def test_extract_timestamp_int_seconds(self) -> None:
-        """Test _extract_timestamp with integer timestamp in seconds."""
-        now = datetime.now(timezone.utc)
-        timestamp = int(now.timestamp())
-        entry = {"timestamp": timestamp}
-
-        result = self.threader._extract_timestamp(entry)
-        assert result is not None
-        assert isinstance(result, datetime)
-
-    def test_extract_timestamp_int_milliseconds(self) -> None:
-        """Test _extract_timestamp with integer timestamp in milliseconds."""
-        now = datetime.now(timezone.utc)
-        timestamp_ms = int(now.timestamp() * 1000)
-        entry = {"timestamp": timestamp_ms}
-
-        result = self.threader._extract_timestamp(entry)
-        assert result is not None
-
-    def test_extract_timestamp_iso_string(self) -> None:
-        """Test _extract_timestamp with ISO format string."""
-        now = datetime.now(timezone.utc)
-        iso_string = now.isoformat()
-        entry = {"createdAt": iso_string}
-
-        result = self.threader._extract_timestamp(entry)
-        assert result is not None
-
-    def test_extract_timestamp_not_found(self) -> None:
-        """Test _extract_timestamp when no timestamp field exists."""
-        entry = {"text": "no timestamp"}
-
-        result = self.threader._extract_timestamp(entry)
-        assert result is None
-
-    def test_time_window_match_within_window(self) -> None:
-        """Test _time_window_match returns True for conversations within time window."""
-        base_time = datetime.now(timezone.utc)
-        prompt_time = base_time
-        gen_time = base_time + timedelta(seconds=60)  # 1 minute later
-
-        result = self.threader._time_window_match(prompt_time, gen_time)
-        assert result is True
-
-    def test_time_window_match_outside_window(self) -> None:
-        """Test _time_window_match returns False for conversations outside time window."""
-        base_time = datetime.now(timezone.utc)
-        prompt_time = base_time
-        gen_time = base_time + timedelta(seconds=400)  # > 5 minutes later
-
-        result = self.threader._time_window_match(prompt_time, gen_time)
-        assert result is False
-
-    def test_time_window_match_none_times(self) -> None:
-        """Test _time_window_match returns False when times are None."""
-        result = self.threader._time_window_match(None, None)
-        assert result is False
-
-        result = self.threader._time_window_match(datetime.now(timezone.utc), None)
-        assert result is False
-
     def test_thread_conversations_empty(self) -> None:
         """Test thread_conversations with empty inputs."""
         result = self.threader.thread_conversations([], [])
@@ -221,3 +160,18 @@ class TestConversationThreader:
             # Should match in sequence when timestamps are missing
             assert first_thread["prompt"] is not None
             assert first_thread["generation"] is not None
+
+    def test_thread_conversations_uses_given_timestamps(self) -> None:
+        """Test thread_conversations reads precomputed timestamps over the entries."""
+        base_ms = 1_700_000_000_000
+        prompts = [{"text": "Q1"}, {"text": "Q2"}]
+        generations = [{"textDescription": "A1"}]
+
+        result = self.threader.thread_conversations(
+            prompts, generations, [base_ms, base_ms + 1000], [base_ms + 2000]
+        )
+
+        assert [t["prompt"]["text"] for t in result] == ["Q2", "Q1"]
+        assert result[0]["timestamp"] == datetime.fromtimestamp(
+            (base_ms + 1000) / 1000, tz=timezone.utc
+        )
@@ -2,6 +2,9 @@
 Tests for create_filters module.
 """
 
+import json
+import sqlite3
+
 from src.database_management.create_filters import SearchFilterBuilder
 
 
@@ -75,3 +78,33 @@ class TestSearchFilterBuilder:
         assert len(conditions) == 2
         assert "%python%" in params
         assert "%java%" in params
+
+    def test_build_search_conditions_custom_column(self) -> None:
+        """Test conditions can target a column other than value."""
+        conditions, params = self.filter_builder.build_search_conditions(
+            ["python"], "entry_text"
+        )
+
+        assert conditions == ["entry_text LIKE ?"]
+        assert params == ["%python%"]
+
+    def test_build_entry_text_expression(self) -> None:
+        """Test the entry text expression picks the first non-empty field."""
+        expression = self.filter_builder.build_entry_text_expression("entry")
+        conn = sqlite3.connect(":memory:")
+        rows = conn.execute(
+            f"SELECT {expression} FROM json_each(?) AS entry",
+            (
+                json.dumps(
+                    [
+                        {"text": "a", "message": "b"},
+                        {"text": "", "textDescription": "c"},
+                        {"other": 1},
+                        "d",
+                    ]
+                ),
+            ),
+        ).fetchall()
+        conn.close()
+
+        assert [row[0] for row in rows] == ["a", "c", '{"other":1}', "d"]
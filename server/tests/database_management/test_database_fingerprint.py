@@ -0,0 +1,45 @@
+"""
+Tests for database_fingerprint module.
+"""
+
+import os
+import tempfile
+
+from src.database_management.database_fingerprint import (
+    DatabaseFingerprint,
+    get_database_fingerprint,
+)
+
+
+class TestDatabaseFingerprint:
+    """Test suite for get_database_fingerprint."""
+
+    def test_missing_database_returns_none(self) -> None:
+        """Test a missing file has no fingerprint."""
+        assert get_database_fingerprint("/nonexistent/state.vscdb") is None
+
+    def test_fingerprint_includes_wal_size(self) -> None:
+        """Test the WAL file size is part of the fingerprint."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "state.vscdb")
+            with open(db_path, "wb") as f:
+                f.write(b"x" * 10)
+
+            without_wal = get_database_fingerprint(db_path)
+            with open(f"{db_path}-wal", "wb") as f:
+                f.write(b"y" * 4)
+            with_wal = get_database_fingerprint(db_path)
+
+            assert isinstance(without_wal, DatabaseFingerprint)
+            assert without_wal.size == 10
+            assert without_wal.wal_size == 0
+            assert with_wal is not None
+            assert with_wal.wal_size == 4
+            assert with_wal != without_wal
+
+    def test_unchanged_file_has_equal_fingerprint(self) -> None:
+        """Test repeated stats of an unchanged file compare equal."""
+        with tempfile.NamedTemporaryFile(suffix=".db") as temp_db:
+            assert get_database_fingerprint(temp_db.name) == get_database_fingerprint(
+                temp_db.name
+            )
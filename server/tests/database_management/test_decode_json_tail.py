@@ -0,0 +1,96 @@
+"""
+Tests for decode_json_tail module.
+"""
+
+import json
+import random
+
+import pytest
+from src.database_management.decode_json_tail import JsonTailDecoder
+
+
+class TestJsonTailDecoder:
+    """Test suite for JsonTailDecoder class."""
+
+    def setup_method(self) -> None:
+        """Set up a decoder with a tiny chunk size to cross chunk boundaries."""
+        self.decoder = JsonTailDecoder(chunk_size=7)
+
+    def test_decodes_only_tail(self) -> None:
+        """Test the last N elements are returned as a partial result."""
+        value = json.dumps([{"text": f"prompt {i}"} for i in range(10)])
+
+        entries, complete = self.decoder.decode(value, 3)
+
+        assert entries == [{"text": f"prompt {i}"} for i in range(7, 10)]
+        assert complete is False
+
+    def test_short_array_is_complete(self) -> None:
+        """Test arrays with at most N elements are decoded in full."""
+        value = json.dumps([1, 2, 3])
+
+        assert self.decoder.decode(value, 3) == ([1, 2, 3], True)
+        assert self.decoder.decode(value, 10) == ([1, 2, 3], True)
+
+    def test_non_positive_count_decodes_everything(self) -> None:
+        """Test a count of zero returns every element."""
+        assert self.decoder.decode("[1, 2, 3]", 0) == ([1, 2, 3], True)
+
+    def test_structural_characters_inside_strings(self) -> None:
+        """Test commas, brackets and escaped quotes in strings are skipped."""
+        data = [
+            {"text": 'a, "b" ] [ {'},
+            {"text": "back\\\\", "n": [1, {"x": ","}]},
+            'tail\\",]',
+        ]
+        value = json.dumps(data)
+
+        assert self.decoder.decode(value, 2)[0] == data[-2:]
+        assert self.decoder.decode(value, 1)[0] == data[-1:]
+
+    def test_bytes_input(self) -> None:
+        """Test UTF-8 bytes decode the same as text."""
+        data = [{"text": "café"}, {"text": "✓, done"}, {"text": "last"}]
+        value = json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+        assert self.decoder.decode(value, 2) == (data[-2:], False)
+
+    def test_non_array_decodes_to_empty(self) -> None:
+        """Test a JSON object is treated as having no entries."""
+        assert self.decoder.decode('{"a": [1, 2]}', 1) == ([], True)
+
+    def test_decode_suffix_of_larger_array(self) -> None:
+        """Test the tail is found in trailing bytes cut from a larger array."""
+        data = [{"text": f"prompt {i}, [x]"} for i in range(10)]
+        value = json.dumps(data).encode("utf-8")
+
+        assert self.decoder.decode_suffix(value[-60:], 2) == data[-2:]
+        assert self.decoder.decode_suffix(value[-20:], 2) is None
+
+    def test_invalid_json_raises(self) -> None:
+        """Test malformed values surface the JSON error."""
+        with pytest.raises(json.JSONDecodeError):
+            self.decoder.decode("[1, 2, oops]", 1)
+
+    def test_matches_full_decode_on_random_documents(self) -> None:
+        """Test tail decoding agrees with json.loads on random nested arrays."""
+        rng = random.Random(7)
+        alphabet = ['"', "\\", ",", "[", "]", "{", "}", "a", " ", "é"]
+
+        def random_value(depth: int) -> object:
+            kind = rng.randrange(4 if depth < 3 else 2)
+            if kind == 0:
+                return "".join(rng.choice(alphabet) for _ in range(rng.randrange(6)))
+            if kind == 1:
+                return rng.randrange(100)
+            if kind == 2:
+                return [random_value(depth + 1) for _ in range(rng.randrange(4))]
+            return {f"k{i}": random_value(depth + 1) for i in range(rng.randrange(3))}
+
+        for _ in range(200):
+            data = [random_value(0) for _ in range(rng.randrange(8))]
+            text = json.dumps(data, ensure_ascii=rng.random() < 0.5)
+            count = rng.randrange(1, 10)
+            for value in (text, text.encode("utf-8")):
+                entries, _ = self.decoder.decode(value, count)
+                assert entries == data[-count:]
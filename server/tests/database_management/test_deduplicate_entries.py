@@ -0,0 +1,112 @@
+"""
+Tests for deduplicate_entries module.
+"""
+
+from typing import Any, Dict, List
+
+from src.database_management.deduplicate_entries import (
+    content_key,
+    deduplicate_conversations,
+)
+
+
+def _conversation(db_path: str, **fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"database_path": db_path, "error": None, **fields}
+
+
+class TestContentKey:
+    """Test suite for content_key function."""
+
+    def test_normalizes_case_and_whitespace(self) -> None:
+        assert content_key({"text": "Cast  the\nspell "}, 1) == content_key(
+            {"text": "cast the spell"}, 1
+        )
+
+    def test_timestamp_is_part_of_the_key(self) -> None:
+        assert content_key({"text": "cast"}, 1) != content_key({"text": "cast"}, 2)
+
+
+class TestDeduplicateConversations:
+    """Test suite for deduplicate_conversations function."""
+
+    def test_keeps_first_copy_with_sources(self) -> None:
+        conversations = [
+            _conversation(
+                "/a.db",
+                prompts=[
+                    {"text": "one", "timestamp": 5},
+                    {"text": "two", "timestamp": 6},
+                ],
+            ),
+            _conversation(
+                "/b.db",
+                prompts=[{"text": "TWO", "timestamp": 6}, {"text": "three"}],
+            ),
+            _conversation("/c.db", prompts=[{"text": "two", "timestamp": 6}]),
+        ]
+
+        assert deduplicate_conversations(conversations) == 2
+        assert [[p["text"] for p in c["prompts"]] for c in conversations] == [
+            ["one", "two"],
+            ["three"],
+            [],
+        ]
+        assert conversations[0]["sources"] == {
+            "prompts": {1: ["/a.db", "/b.db", "/c.db"]}
+        }
+        assert len(conversations[1]["timestamps"]["prompts"]) == 1
+
+    def test_entry_lists_are_kept_apart(self) -> None:
+        conversations = [
+            _conversation("/a.db", prompts=[{"text": "same", "timestamp": 5}]),
+            _conversation("/b.db", history_entries=[{"text": "same", "timestamp": 5}]),
+        ]
+
+        assert deduplicate_conversations(conversations) == 0
+        assert conversations[1]["history_entries"] == [{"text": "same", "timestamp": 5}]
+
+    def test_repeats_within_a_database_are_kept(self) -> None:
+        again = {"text": "again", "timestamp": 5}
+        conversations = [
+            _conversation("/a.db", prompts=[again, again]),
+            _conversation("/b.db", prompts=[again]),
+        ]
+
+        assert deduplicate_conversations(conversations) == 1
+        assert conversations[0]["prompts"] == [again, again]
+        assert conversations[0]["sources"] == {"prompts": {0: ["/a.db", "/b.db"]}}
+        assert conversations[1]["prompts"] == []
+
+    def test_undated_entries_are_never_merged(self) -> None:
+        conversations = [
+            _conversation("/a.db", prompts=[{"text": "continue"}] * 2),
+            _conversation("/b.db", prompts=[{"text": "continue"}]),
+        ]
+
+        assert deduplicate_conversations(conversations, keep_keys=True) == 0
+        assert [len(c["prompts"]) for c in conversations] == [2, 1]
+        assert "sources" not in conversations[0]
+        assert conversations[1]["content_keys"]["prompts"] == [None]
+
+    def test_failed_databases_are_skipped(self) -> None:
+        conversations = [
+            {
+                **_conversation("/a.db", prompts=[{"text": "x", "timestamp": 5}]),
+                "error": "locked",
+            },
+            _conversation("/b.db", prompts=[{"text": "x", "timestamp": 5}]),
+        ]
+
+        assert deduplicate_conversations(conversations) == 0
+
+    def test_keeps_content_keys_of_kept_entries(self) -> None:
+        one = {"text": "one", "timestamp": 5}
+        conversations = [
+            _conversation("/a.db", prompts=[one]),
+            _conversation("/b.db", prompts=[one, {"text": "two", "timestamp": 6}]),
+        ]
+
+        deduplicate_conversations(conversations, keep_keys=True)
+
+        assert conversations[0]["content_keys"]["prompts"] == [content_key(one, 5000)]
+        assert len(conversations[1]["content_keys"]["prompts"]) == 1
@@ -0,0 +1,198 @@
+"""
+Tests for discover_databases module.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from src.config.constants import _discovery_max_depth
+from src.database_management.discover_databases import DatabaseDiscovery
+
+
+class TestDatabaseDiscovery:
+    """Test suite for DatabaseDiscovery class."""
+
+    def setup_method(self) -> None:
+        """Set up a temporary directory tree for each test."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self._temp_dir.name)
+
+    def teardown_method(self) -> None:
+        """Remove the temporary directory tree."""
+        self._temp_dir.cleanup()
+
+    def _touch(self, relative_path: str) -> str:
+        path = self.root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        return str(path)
+
+    def test_discover_finds_supported_files(self) -> None:
+        """Test discover returns supported files at every level."""
+        top = self._touch("cursor.db")
+        nested = self._touch("workspaceStorage/abc/state.vscdb")
+        self._touch("workspaceStorage/abc/other.db")
+
+        found = DatabaseDiscovery().discover(str(self.root))
+
+        assert sorted(found) == sorted([top, nested])
+
+    def test_discover_respects_max_depth(self) -> None:
+        """Test discover does not descend past max_depth."""
+        shallow = self._touch("a/state.vscdb")
+        self._touch("a/b/state.vscdb")
+
+        found = DatabaseDiscovery(max_depth=1).discover(str(self.root))
+
+        assert found == [shallow]
+
+    def test_discover_max_depth_zero_only_scans_root(self) -> None:
+        """Test max_depth of zero only inspects the root directory."""
+        top = self._touch("state.vscdb")
+        self._touch("a/state.vscdb")
+
+        found = DatabaseDiscovery(max_depth=0).discover(str(self.root))
+
+        assert found == [top]
+
+    def test_discover_skips_matching_directories(self) -> None:
+        """Test discover skips directories matching skip patterns."""
+        kept = self._touch("keep/state.vscdb")
+        self._touch("node_modules/state.vscdb")
+        self._touch("cache-1/state.vscdb")
+
+        found = DatabaseDiscovery(skip_patterns=["node_modules", "cache-*"]).discover(
+            str(self.root)
+        )
+
+        assert found == [kept]
+
+    def test_discover_does_not_follow_symlinked_directories(self) -> None:
+        """Test discover matches os.walk and ignores symlinked directories."""
+        real = self._touch("real/state.vscdb")
+        os.symlink(self.root / "real", self.root / "link")
+
+        found = DatabaseDiscovery().discover(str(self.root))
+
+        assert found == [real]
+
+    def test_discover_missing_root_returns_empty(self) -> None:
+        """Test discover handles a root that does not exist."""
+        assert DatabaseDiscovery().discover(str(self.root / "missing")) == []
+
+    def test_discover_registry_combines_roots(self) -> None:
+        """Test discover_registry walks every list of paths in the registry."""
+        first = self._touch("one/cursor.db")
+        second = self._touch("two/claude.db")
+        registry = {
+            "cursor": [str(self.root / "one")],
+            "claude": [str(self.root / "two"), str(self.root / "missing")],
+            "version": "1",
+        }
+
+        found = DatabaseDiscovery().discover_registry(registry)
+
+        assert found == [first, second]
+
+    def test_max_depth_setting_falls_back_to_unlimited(self) -> None:
+        """Test malformed or negative depth settings mean unlimited depth."""
+        assert _discovery_max_depth("3") == 3
+        assert _discovery_max_depth("0") == 0
+        for value in (None, "", "deep", "2.5", "-1"):
+            assert _discovery_max_depth(value) is None
+
+
+class TestDiscoveryManifest:
+    """Test suite for DatabaseDiscovery manifest revalidation."""
+
+    def setup_method(self) -> None:
+        """Set up a temporary tree and manifest location for each test."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self._temp_dir.name) / "root"
+        self.root.mkdir()
+        self.manifest_path = str(Path(self._temp_dir.name) / "state" / "manifest.json")
+        self.registry = {"cursor": [str(self.root)]}
+
+    def teardown_method(self) -> None:
+        """Remove the temporary directory tree."""
+        self._temp_dir.cleanup()
+
+    def _discovery(self) -> DatabaseDiscovery:
+        return DatabaseDiscovery(manifest_path=self.manifest_path)
+
+    def test_first_scan_writes_manifest(self) -> None:
+        """Test the first scan misses every directory and writes the manifest."""
+        (self.root / "a").mkdir()
+        (self.root / "a" / "state.vscdb").touch()
+        discovery = self._discovery()
+
+        found = discovery.discover_registry(self.registry)
+
+        assert found == [str(self.root / "a" / "state.vscdb")]
+        assert discovery.last_stats == {"manifest_hits": 0, "manifest_misses": 2}
+        assert Path(self.manifest_path).exists()
+
+    def test_warm_scan_only_stats_directories(self) -> None:
+        """Test a warm scan reuses the manifest without listing directories."""
+        (self.root / "a").mkdir()
+        (self.root / "a" / "state.vscdb").touch()
+        self._discovery().discover_registry(self.registry)
+
+        discovery = self._discovery()
+        with patch(
+            "src.database_management.discover_databases.os.scandir",
+            wraps=os.scandir,
+        ) as mock_scandir:
+            found = discovery.discover_registry(self.registry)
+
+        assert found == [str(self.root / "a" / "state.vscdb")]
+        assert mock_scandir.call_count == 0
+        assert discovery.last_stats == {"manifest_hits": 2, "manifest_misses": 0}
+
+    def test_changed_directory_is_rescanned(self) -> None:
+        """Test a directory whose mtime changed is listed again."""
+        (self.root / "a").mkdir()
+        self._discovery().discover_registry(self.registry)
+
+        new_db = self.root / "a" / "state.vscdb"
+        new_db.touch()
+        os.utime(self.root / "a", ns=(1, 1))
+
+        discovery = self._discovery()
+        found = discovery.discover_registry(self.registry)
+
+        assert found == [str(new_db)]
+        assert discovery.last_stats == {"manifest_hits": 1, "manifest_misses": 1}
+
+    def test_force_rescan_ignores_manifest(self) -> None:
+        """Test force_rescan lists every directory again."""
+        (self.root / "a").mkdir()
+        self._discovery().discover_registry(self.registry)
+
+        discovery = self._discovery()
+        discovery.discover_registry(self.registry, force_rescan=True)
+
+        assert discovery.last_stats == {"manifest_hits": 0, "manifest_misses": 2}
+
+    def test_corrupt_manifest_is_rebuilt(self) -> None:
+        """Test an unreadable manifest falls back to a full scan."""
+        Path(self.manifest_path).parent.mkdir(parents=True)
+        Path(self.manifest_path).write_text("{not json", encoding="utf-8")
+        (self.root / "cursor.db").touch()
+
+        discovery = self._discovery()
+        found = discovery.discover_registry(self.registry)
+
+        assert found == [str(self.root / "cursor.db")]
+        assert discovery.last_stats["manifest_misses"] == 1
+
+    def test_settings_change_invalidates_manifest(self) -> None:
+        """Test a manifest built with different settings is not reused."""
+        self._discovery().discover_registry(self.registry)
+
+        discovery = DatabaseDiscovery(manifest_path=self.manifest_path, max_depth=0)
+        discovery.discover_registry(self.registry)
+
+        assert discovery.last_stats == {"manifest_hits": 0, "manifest_misses": 1}
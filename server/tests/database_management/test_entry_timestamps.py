@@ -0,0 +1,84 @@
+"""
+Tests for entry_timestamps module.
+"""
+
+from datetime import datetime, timezone
+
+from src.database_management.entry_timestamps import (
+    UNDATED,
+    attach_timestamps,
+    conversation_timestamps,
+    entry_timestamp_ms,
+    entry_timestamps,
+)
+
+
+def _ms(year: int, month: int, day: int, hour: int = 0) -> int:
+    moment = datetime(year, month, day, hour, tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+class TestEntryTimestampMs:
+    """Test suite for entry_timestamp_ms function."""
+
+    def test_numbers_in_seconds_and_milliseconds(self) -> None:
+        ms = _ms(2024, 1, 1)
+
+        assert entry_timestamp_ms({"timestamp": ms}) == ms
+        assert entry_timestamp_ms({"createdAt": ms // 1000}) == ms
+        assert entry_timestamp_ms({"time": ms / 1000 + 0.5}) == ms + 500
+
+    def test_iso_strings_default_to_utc(self) -> None:
+        ms = _ms(2024, 1, 1, 12)
+
+        assert entry_timestamp_ms({"date": "2024-01-01T12:00:00Z"}) == ms
+        assert entry_timestamp_ms({"created_at": "2024-01-01T12:00:00"}) == ms
+        assert entry_timestamp_ms({"created": "2024-01-01T14:00:00+02:00"}) == ms
+
+    def test_unusable_fields_are_passed_over(self) -> None:
+        ms = _ms(2024, 1, 1)
+
+        assert entry_timestamp_ms({"timestamp": "soon", "createdAt": ms}) == ms
+        assert entry_timestamp_ms({"timestamp": float("nan")}) is None
+        assert entry_timestamp_ms({"timestamp": 1e300}) is None
+
+    def test_metadata_and_missing(self) -> None:
+        ms = _ms(2024, 1, 1)
+
+        assert entry_timestamp_ms({"metadata": {"timestamp": ms}}) == ms
+        assert entry_timestamp_ms({"text": "no timestamp"}) is None
+        assert entry_timestamp_ms("not an entry") is None
+
+
+class TestConversationTimestamps:
+    """Test suite for the per-conversation timestamp arrays."""
+
+    def test_entry_timestamps_marks_undated(self) -> None:
+        ms = _ms(2024, 1, 1)
+
+        assert list(entry_timestamps([{"timestamp": ms}, {}])) == [ms, UNDATED]
+
+    def test_attach_timestamps_covers_entry_lists(self) -> None:
+        ms = _ms(2024, 1, 1)
+        conv_data = attach_timestamps(
+            {"prompts": [{"timestamp": ms}], "generations": [], "other": [{}]}
+        )
+
+        assert {f: list(t) for f, t in conv_data["timestamps"].items()} == {
+            "prompts": [ms],
+            "generations": [],
+        }
+
+    def test_conversation_timestamps_reuses_stored(self) -> None:
+        conv_data = attach_timestamps({"prompts": [{"timestamp": _ms(2024, 1, 1)}]})
+        stored = conv_data["timestamps"]["prompts"]
+
+        assert conversation_timestamps(conv_data, "prompts") is stored
+
+    def test_conversation_timestamps_recomputes_stale(self) -> None:
+        ms = _ms(2024, 1, 1)
+        conv_data = attach_timestamps({"prompts": [{"timestamp": ms}]})
+        conv_data["prompts"].append({})
+
+        assert list(conversation_timestamps(conv_data, "prompts")) == [ms, UNDATED]
+        assert list(conversation_timestamps({}, "generations")) == []
@@ -3,12 +3,18 @@ Tests for execute_query module.
 """
 
 import json
+import os
 import sqlite3
 import tempfile
+from typing import Any, List
+from unittest.mock import patch
 
 import pytest
 from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+from src.database_management.blob_cache import ParsedBlobCache
+from src.database_management.connection_pool import ConnectionPool
 from src.database_management.execute_query import QueryExecutor
+from src.database_management.stream_blob import BlobStreamReader
 
 
 class TestQueryExecutor:
@@ -79,8 +85,8 @@ class TestQueryExecutor:
         assert "error" in result
         assert result["error"] is not None
 
-    def test_execute_single_query_success(self) -> None:
-        """Test _execute_single_query with successful execution."""
+    def test_execute_multi_key_query_success(self) -> None:
+        """Test _execute_multi_key_query with successful execution."""
         with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as temp_db:
             conn = sqlite3.connect(temp_db.name)
             cursor = conn.cursor()
@@ -94,15 +100,13 @@ class TestQueryExecutor:
             )
             conn.commit()
 
-            result = self.query_executor._execute_single_query(
+            result = self.query_executor._execute_multi_key_query(
                 cursor,
-                "SELECT value FROM ItemTable WHERE key = ?",
-                "SELECT value FROM ItemTable WHERE key = ?",
+                [RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"]],
                 [],
                 [],
-                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
                 2,
-            )
+            ).get(RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"], [])
 
             assert len(result) == 2
             assert result[0]["text"] == "test prompt 1"
@@ -110,8 +114,8 @@ class TestQueryExecutor:
 
             conn.close()
 
-    def test_execute_single_query_json_error(self) -> None:
-        """Test _execute_single_query with JSON decode error."""
+    def test_execute_multi_key_query_json_error(self) -> None:
+        """Test _execute_multi_key_query with JSON decode error."""
         with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as temp_db:
             conn = sqlite3.connect(temp_db.name)
             cursor = conn.cursor()
@@ -123,42 +127,38 @@ class TestQueryExecutor:
             conn.commit()
 
             with pytest.raises(ValueError, match="Error parsing"):
-                self.query_executor._execute_single_query(
+                self.query_executor._execute_multi_key_query(
                     cursor,
-                    "SELECT value FROM ItemTable WHERE key = ?",
-                    "SELECT value FROM ItemTable WHERE key = ?",
+                    [RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"]],
                     [],
                     [],
-                    RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
                     2,
                 )
 
             conn.close()
 
-    def test_execute_single_query_empty_result(self) -> None:
-        """Test _execute_single_query with empty result."""
+    def test_execute_multi_key_query_empty_result(self) -> None:
+        """Test _execute_multi_key_query with empty result."""
         with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as temp_db:
             conn = sqlite3.connect(temp_db.name)
             cursor = conn.cursor()
             cursor.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
             conn.commit()
 
-            result = self.query_executor._execute_single_query(
+            result = self.query_executor._execute_multi_key_query(
                 cursor,
-                "SELECT value FROM ItemTable WHERE key = ?",
-                "SELECT value FROM ItemTable WHERE key = ?",
+                [RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"]],
                 [],
                 [],
-                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
                 2,
-            )
+            ).get(RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"], [])
 
             assert result == []
 
             conn.close()
 
-    def test_execute_single_query_limit_application(self) -> None:
-        """Test _execute_single_query applies limit correctly."""
+    def test_execute_multi_key_query_limit_application(self) -> None:
+        """Test _execute_multi_key_query applies limit correctly."""
         with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as temp_db:
             conn = sqlite3.connect(temp_db.name)
             cursor = conn.cursor()
@@ -172,15 +172,13 @@ class TestQueryExecutor:
             )
             conn.commit()
 
-            result = self.query_executor._execute_single_query(
+            result = self.query_executor._execute_multi_key_query(
                 cursor,
-                "SELECT value FROM ItemTable WHERE key = ?",
-                "SELECT value FROM ItemTable WHERE key = ?",
+                [RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"]],
                 [],
                 [],
-                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
                 3,
-            )
+            ).get(RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"], [])
 
             # Should return only the last 3 items (most recent)
             assert len(result) == 3
@@ -189,3 +187,438 @@ class TestQueryExecutor:
             assert result[2]["text"] == "prompt 9"
 
             conn.close()
+
+    def test_execute_multi_key_query_fetches_all_keys(self) -> None:
+        """Test prompts, generations and history come back from one statement."""
+        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as temp_db:
+            conn = sqlite3.connect(temp_db.name)
+            cursor = conn.cursor()
+            cursor.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+            for key_name in ["PROMPTS_KEY", "GENERATIONS_KEY", "HISTORY_KEY"]:
+                cursor.execute(
+                    "INSERT INTO ItemTable VALUES (?, ?)",
+                    (
+                        RECALL_CONVERSATIONS_QUERIES[key_name],
+                        json.dumps([{"text": key_name}]),
+                    ),
+                )
+            conn.commit()
+
+            keys = [
+                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                RECALL_CONVERSATIONS_QUERIES["GENERATIONS_KEY"],
+                RECALL_CONVERSATIONS_QUERIES["HISTORY_KEY"],
+            ]
+            with patch.object(
+                self.query_executor,
+                "_build_multi_key_query",
+                wraps=self.query_executor._build_multi_key_query,
+            ) as mock_build:
+                result = self.query_executor._execute_multi_key_query(
+                    cursor, keys, [], [], 10
+                )
+
+            assert mock_build.call_count == 1
+            assert result[keys[0]] == [{"text": "PROMPTS_KEY"}]
+            assert result[keys[1]] == [{"text": "GENERATIONS_KEY"}]
+            assert result[keys[2]] == [{"text": "HISTORY_KEY"}]
+
+            conn.close()
+
+    def test_execute_conversation_query_skips_unwanted_keys(self) -> None:
+        """Test generations are not fetched when they are excluded."""
+        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as temp_db:
+            conn = sqlite3.connect(temp_db.name)
+            conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+            conn.execute(
+                "INSERT INTO ItemTable VALUES (?, ?)",
+                (
+                    RECALL_CONVERSATIONS_QUERIES["GENERATIONS_KEY"],
+                    json.dumps([{"text": "generated"}]),
+                ),
+            )
+            conn.commit()
+            conn.close()
+
+            with patch.object(
+                self.query_executor,
+                "_decode_entries",
+                wraps=self.query_executor._decode_entries,
+            ) as mock_decode:
+                result = self.query_executor.execute_conversation_query(
+                    temp_db.name, 50, include_generations=False
+                )
+
+            assert result["error"] is None
+            assert result["generations"] == []
+            mock_decode.assert_not_called()
+
+    def test_build_multi_key_query_is_cached(self) -> None:
+        """Test identical query shapes reuse the same SQL text."""
+        first = self.query_executor._build_multi_key_query(2, ["value LIKE ?"])
+        second = self.query_executor._build_multi_key_query(2, ["value LIKE ?"])
+
+        assert first is second
+        assert first == (
+            "SELECT key, value FROM ItemTable WHERE key IN (?, ?) AND (value LIKE ?)"
+        )
+
+
+class TestQueryExecutorAccessModes:
+    """Test suite for QueryExecutor SQLite access modes."""
+
+    def setup_method(self) -> None:
+        """Create a populated database for each test."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._temp_dir.name, "state.vscdb")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+        conn.execute(
+            "INSERT INTO ItemTable VALUES (?, ?)",
+            (
+                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                json.dumps([{"text": "hello"}]),
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+    def teardown_method(self) -> None:
+        """Remove the temporary database."""
+        self._temp_dir.cleanup()
+
+    def test_invalid_access_mode_raises(self) -> None:
+        """Test unsupported access modes are rejected."""
+        with pytest.raises(ValueError, match="Unsupported SQLite access mode"):
+            QueryExecutor(access_mode="exclusive")
+
+    def test_read_only_mode_rejects_writes(self) -> None:
+        """Test ro connections cannot modify the database."""
+        executor = QueryExecutor(access_mode="ro")
+        conn = executor.connect(self.db_path)
+        try:
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM ItemTable")
+        finally:
+            conn.close()
+
+    def test_read_only_mode_does_not_create_missing_database(self) -> None:
+        """Test ro mode reports an error instead of creating a new file."""
+        missing = os.path.join(self._temp_dir.name, "missing.vscdb")
+
+        result = QueryExecutor(access_mode="ro").execute_conversation_query(missing, 50)
+
+        assert result["error"] is not None
+        assert not os.path.exists(missing)
+
+    def test_read_only_mode_returns_entries(self) -> None:
+        """Test ro mode reads conversation data."""
+        result = QueryExecutor(access_mode="ro").execute_conversation_query(
+            self.db_path, 50
+        )
+
+        assert result["error"] is None
+        assert result["prompts"] == [{"text": "hello"}]
+
+    def test_immutable_mode_requires_unchanged_snapshot(self) -> None:
+        """Test immutable=1 is only used once the fingerprint is stable."""
+        executor = QueryExecutor(access_mode="immutable")
+
+        assert "immutable=1" not in (executor._build_connection_uri(self.db_path) or "")
+        assert "immutable=1" in (executor._build_connection_uri(self.db_path) or "")
+
+        os.utime(self.db_path, ns=(1, 1))
+        assert "immutable=1" not in (executor._build_connection_uri(self.db_path) or "")
+
+    def test_immutable_mode_skipped_with_pending_wal(self) -> None:
+        """Test immutable=1 is never used while a WAL file has content."""
+        with open(f"{self.db_path}-wal", "wb") as f:
+            f.write(b"\0" * 32)
+        executor = QueryExecutor(access_mode="immutable")
+
+        executor._build_connection_uri(self.db_path)
+        uri = executor._build_connection_uri(self.db_path)
+
+        assert uri is not None
+        assert "mode=ro" in uri
+        assert "immutable=1" not in uri
+
+    def test_rw_mode_uses_plain_path(self) -> None:
+        """Test rw mode keeps the plain read-write connection."""
+        assert (
+            QueryExecutor(access_mode="rw")._build_connection_uri(self.db_path) is None
+        )
+
+    def test_connect_applies_pragmas(self) -> None:
+        """Test mmap_size and cache_size pragmas are applied."""
+        executor = QueryExecutor(access_mode="ro", mmap_size=4096, cache_size=-512)
+        conn = executor.connect(self.db_path)
+        try:
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] == -512
+            assert conn.execute("PRAGMA mmap_size").fetchone()[0] in (0, 4096)
+        finally:
+            conn.close()
+
+    def test_pooled_connection_reused_across_queries(self) -> None:
+        """Test repeated queries reuse a pooled connection."""
+        executor = QueryExecutor(access_mode="ro", pool=ConnectionPool())
+
+        executor.execute_conversation_query(self.db_path, 50)
+        result = executor.execute_conversation_query(self.db_path, 50)
+
+        assert result["error"] is None
+        assert executor.pool is not None
+        stats = executor.pool.get_stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+
+    def test_unchanged_database_is_not_decoded_again(self) -> None:
+        """Test a second query of an unchanged database is served from cache."""
+        executor = QueryExecutor(access_mode="ro", blob_cache=ParsedBlobCache())
+        executor.execute_conversation_query(self.db_path, 50)
+
+        with (
+            patch.object(
+                executor, "_decode_entries", wraps=executor._decode_entries
+            ) as mock_decode,
+            patch.object(
+                executor, "_stream_entries", wraps=executor._stream_entries
+            ) as mock_stream,
+        ):
+            result = executor.execute_conversation_query(self.db_path, 50)
+
+        mock_decode.assert_not_called()
+        mock_stream.assert_not_called()
+        assert result["prompts"] == [{"text": "hello"}]
+        assert executor.blob_cache is not None
+        assert executor.blob_cache.get_stats()["hits"] == 1
+
+    def test_changed_database_is_decoded_again(self) -> None:
+        """Test a write to the database invalidates cached values."""
+        executor = QueryExecutor(access_mode="ro", blob_cache=ParsedBlobCache())
+        executor.execute_conversation_query(self.db_path, 50)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "UPDATE ItemTable SET value = ? WHERE key = ?",
+            (
+                json.dumps([{"text": "hello"}, {"text": "again"}]),
+                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+        result = executor.execute_conversation_query(self.db_path, 50)
+
+        assert result["prompts"] == [{"text": "hello"}, {"text": "again"}]
+
+    def test_cached_values_still_filtered_by_phrases(self) -> None:
+        """Test cached values are only returned when they match the phrases."""
+        executor = QueryExecutor(access_mode="ro", blob_cache=ParsedBlobCache())
+        executor.execute_conversation_query(self.db_path, 50)
+
+        missing = executor.execute_conversation_query(self.db_path, 50, ["absent"])
+        found = executor.execute_conversation_query(self.db_path, 50, ["hello"])
+
+        assert missing["prompts"] == []
+        assert found["prompts"] == [{"text": "hello"}]
+
+    def test_cached_values_respect_limit(self) -> None:
+        """Test cache hits still return only the most recent entries."""
+        executor = QueryExecutor(access_mode="ro", blob_cache=ParsedBlobCache())
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "UPDATE ItemTable SET value = ? WHERE key = ?",
+            (
+                json.dumps([{"text": f"prompt {i}"} for i in range(5)]),
+                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+        executor.execute_conversation_query(self.db_path, 50)
+        result = executor.execute_conversation_query(self.db_path, 2)
+
+        assert result["prompts"] == [{"text": "prompt 3"}, {"text": "prompt 4"}]
+
+    def test_partial_decode_cached_for_smaller_limits(self) -> None:
+        """Test a tail decoded for one limit is reused for smaller limits only."""
+        executor = QueryExecutor(access_mode="ro", blob_cache=ParsedBlobCache())
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "UPDATE ItemTable SET value = ? WHERE key = ?",
+            (
+                json.dumps([{"text": f"prompt {i}"} for i in range(5)]),
+                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+        first = executor.execute_conversation_query(self.db_path, 3)
+        smaller = executor.execute_conversation_query(self.db_path, 2)
+        larger = executor.execute_conversation_query(self.db_path, 5)
+
+        assert first["prompts"] == [{"text": f"prompt {i}"} for i in range(2, 5)]
+        assert smaller["prompts"] == [{"text": "prompt 3"}, {"text": "prompt 4"}]
+        assert larger["prompts"] == [{"text": f"prompt {i}"} for i in range(5)]
+
+    def test_values_read_in_memory_without_blob_streaming(self) -> None:
+        """Test values are selected whole when blob streaming is disabled."""
+        executor = QueryExecutor(access_mode="ro", stream_blobs=False)
+
+        with patch.object(
+            executor, "_decode_entries", wraps=executor._decode_entries
+        ) as mock_decode:
+            result = executor.execute_conversation_query(self.db_path, 50)
+
+        assert executor.blob_reader is None
+        assert mock_decode.call_count == 1
+        assert result["prompts"] == [{"text": "hello"}]
+
+    def test_recent_entries_read_from_growing_suffix(self) -> None:
+        """Test only trailing bytes are fetched, widening until they fit."""
+        prompts = [{"text": f"prompt {i} " + "x" * 40} for i in range(200)]
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "UPDATE ItemTable SET value = ? WHERE key = ?",
+            (json.dumps(prompts), RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"]),
+        )
+        conn.commit()
+        conn.close()
+        executor = QueryExecutor(access_mode="ro", stream_blobs=False)
+        executor.suffix_window = 64
+
+        with patch.object(
+            executor, "_decode_entries", wraps=executor._decode_entries
+        ) as mock_decode:
+            result = executor.execute_conversation_query(
+                self.db_path, 5, include_generations=False, include_history=False
+            )
+
+        assert result["error"] is None
+        assert result["prompts"] == prompts[-5:]
+        mock_decode.assert_not_called()
+
+    @pytest.mark.skipif(
+        not BlobStreamReader.is_supported(),
+        reason="Connection.blobopen requires Python 3.11+",
+    )
+    def test_blob_streaming_falls_back_for_null_values(self) -> None:
+        """Test values that cannot be opened as blobs are read in memory."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "INSERT INTO ItemTable VALUES (?, NULL)",
+            (RECALL_CONVERSATIONS_QUERIES["GENERATIONS_KEY"],),
+        )
+        conn.commit()
+        conn.close()
+        executor = QueryExecutor(access_mode="ro", stream_blobs=True)
+
+        result = executor.execute_conversation_query(self.db_path, 50)
+
+        assert executor.blob_reader is not None
+        assert result["error"] is None
+        assert result["prompts"] == [{"text": "hello"}]
+        assert result["generations"] == []
+
+
+class TestQueryExecutorJsonPushdown:
+    """Test suite for per-entry phrase filtering with json_each."""
+
+    def setup_method(self) -> None:
+        """Create a database whose prompts mix matching and other entries."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._temp_dir.name, "state.vscdb")
+        self.prompts: List[Any] = [
+            {"text": f"python {i}" if i % 2 == 0 else f"other {i}"} for i in range(8)
+        ]
+        self.prompts += ["plain python", {"text": "", "content": "Python content"}]
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE ItemTable (key TEXT, value BLOB)")
+        conn.execute(
+            "INSERT INTO ItemTable VALUES (?, ?)",
+            (RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"], json.dumps(self.prompts)),
+        )
+        conn.execute(
+            "INSERT INTO ItemTable VALUES (?, ?)",
+            (
+                RECALL_CONVERSATIONS_QUERIES["GENERATIONS_KEY"],
+                json.dumps([{"textDescription": "unrelated"}]),
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+    def teardown_method(self) -> None:
+        """Remove the temporary database."""
+        self._temp_dir.cleanup()
+
+    def test_only_matching_entries_are_returned(self) -> None:
+        """Test entries that do not contain a phrase stay in the database."""
+        executor = QueryExecutor(access_mode="ro", json_pushdown=True)
+
+        result = executor.execute_conversation_query(self.db_path, 50, ["python"])
+
+        assert result["error"] is None
+        assert result["prompts"] == [
+            {"text": "python 0"},
+            {"text": "python 2"},
+            {"text": "python 4"},
+            {"text": "python 6"},
+            "plain python",
+            {"text": "", "content": "Python content"},
+        ]
+        assert result["generations"] == []
+
+    def test_limit_keeps_newest_matches(self) -> None:
+        """Test the limit applies to matching entries, newest first."""
+        executor = QueryExecutor(access_mode="ro", json_pushdown=True)
+
+        result = executor.execute_conversation_query(self.db_path, 2, ["python"])
+
+        assert result["prompts"] == [
+            "plain python",
+            {"text": "", "content": "Python content"},
+        ]
+
+    def test_malformed_value_falls_back(self) -> None:
+        """Test json_each errors fall back to whole-value filtering."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "INSERT INTO ItemTable VALUES (?, ?)",
+            (RECALL_CONVERSATIONS_QUERIES["HISTORY_KEY"], "not json python"),
+        )
+        conn.commit()
+        conn.close()
+        executor = QueryExecutor(access_mode="ro", json_pushdown=True)
+
+        with patch.object(
+            executor,
+            "_execute_multi_key_query",
+            wraps=executor._execute_multi_key_query,
+        ) as mock_fallback:
+            result = executor.execute_conversation_query(self.db_path, 50, ["python"])
+
+        assert mock_fallback.call_count == 1
+        assert "Error parsing" in result["error"]
+
+    def test_whole_values_returned_without_json1(self) -> None:
+        """Test the whole-value path is used when JSON1 is unavailable."""
+        executor = QueryExecutor(access_mode="ro", json_pushdown=True)
+        executor._json1_available = False
+
+        result = executor.execute_conversation_query(self.db_path, 50, ["python"])
+
+        assert result["prompts"] == self.prompts
+
+    def test_disabled_pushdown_returns_whole_values(self) -> None:
+        """Test pushdown can be turned off."""
+        executor = QueryExecutor(access_mode="ro", json_pushdown=False)
+
+        result = executor.execute_conversation_query(self.db_path, 50, ["python"])
+
+        assert executor._json_pushdown_available() is False
+        assert result["prompts"] == self.prompts
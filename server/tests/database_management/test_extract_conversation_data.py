@@ -2,14 +2,22 @@
 Tests for extract_conversation_data module.
 """
 
+import contextvars
 import json
+import os
 import sqlite3
 import tempfile
+import threading
+from pathlib import Path
 from typing import Any, Dict
 from unittest.mock import patch
 
+import pytest
 from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+from src.database_management.bm25_scorer import TermStatistics
 from src.database_management.extract_conversation_data import ConversationDataExtractor
+from src.database_management.time_partitions import TimeWindow
+from src.utils.cancellation import RequestCancelledError, bind_cancel_event
 
 
 class TestConversationDataExtractor:
@@ -121,91 +129,390 @@ class TestConversationDataExtractor:
         assert total_files == 0
         assert file_counts == {}
 
-    @patch("os.path.exists")
-    @patch("os.walk")
-    def test_process_database_files_with_existing_paths(
-        self, mock_walk: Any, mock_exists: Any
-    ) -> None:
+    def test_process_database_files_with_existing_paths(self) -> None:
         """Test process_database_files with existing paths and database files."""
-        # Mock os.path.exists to return True for our test paths
-        mock_exists.return_value = True
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path1 = Path(temp_dir) / "path"
+            path2 = Path(temp_dir) / "path2"
+            path1.mkdir()
+            path2.mkdir()
+            (path1 / "cursor.db").touch()
+            (path2 / "claude.db").touch()
+
+            registry_data = {
+                "cursor": [str(path1)],
+                "claude": [str(path2)],
+            }
+
+            with patch.object(
+                self.data_extractor, "extract_conversation_data"
+            ) as mock_extract:
+
+                def mock_extract_side_effect(
+                    db_path: str, limit: int, keywords: str, *flags: bool
+                ) -> Dict[str, Any]:
+                    return {
+                        "prompts": [],
+                        "generations": [],
+                        "history_entries": [],
+                        "database_path": db_path,
+                        "error": None,
+                    }
 
-        # Mock os.walk to return different results for different paths
-        def mock_walk_side_effect(path: str) -> list[tuple[str, list[str], list[str]]]:
-            if path == "/test/path":
-                return [("/test/path", [], ["cursor.db"])]
-            elif path == "/test/path2":
-                return [("/test/path2", [], ["claude.db"])]
-            return []
+                mock_extract.side_effect = mock_extract_side_effect
 
-        mock_walk.side_effect = mock_walk_side_effect
+                conversations, paths, total_files, file_counts = (
+                    self.data_extractor.process_database_files(registry_data, 50)
+                )
 
-        registry_data = {
-            "cursor": ["/test/path"],
-            "claude": ["/test/path2"],
-        }
-
-        with patch.object(
-            self.data_extractor, "extract_conversation_data"
-        ) as mock_extract:
+                # Should find and process database files
+                assert len(conversations) == 2
+                assert len(paths) == 2
+                assert total_files == 2
+                assert file_counts["cursor.db"] == 1
+                assert file_counts["claude.db"] == 1
+                assert str(path1 / "cursor.db") in paths
+                assert str(path2 / "claude.db") in paths
 
-            def mock_extract_side_effect(
-                db_path: str, limit: int, keywords: str
-            ) -> Dict[str, Any]:
-                return {
+    def test_process_database_files_multiple_db_files(self) -> None:
+        """Test process_database_files with multiple database files in same path."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for file_name in ["cursor.db", "claude.db", "other.db"]:
+                (Path(temp_dir) / file_name).touch()
+
+            registry_data = {
+                "cursor": [temp_dir],
+            }
+
+            with patch.object(
+                self.data_extractor, "extract_conversation_data"
+            ) as mock_extract:
+                mock_extract.return_value = {
                     "prompts": [],
                     "generations": [],
                     "history_entries": [],
-                    "database_path": db_path,
+                    "database_path": str(Path(temp_dir) / "cursor.db"),
                     "error": None,
                 }
 
-            mock_extract.side_effect = mock_extract_side_effect
-
-            conversations, paths, total_files, file_counts = (
-                self.data_extractor.process_database_files(registry_data, 50)
-            )
+                conversations, paths, total_files, file_counts = (
+                    self.data_extractor.process_database_files(registry_data, 50)
+                )
+
+                # Should find all supported database files
+                assert len(conversations) == 2  # cursor.db and claude.db
+                assert len(paths) == 2
+                assert total_files == 2
+                assert file_counts["cursor.db"] == 1
+                assert file_counts["claude.db"] == 1
+                assert "other.db" not in file_counts  # Not in SUPPORTED_DB_FILES
+
+    def test_process_database_files_walks_each_root_once(self) -> None:
+        """Test process_database_files scans each directory a single time."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            nested = Path(temp_dir) / "workspace" / "abc123"
+            nested.mkdir(parents=True)
+            (nested / "state.vscdb").touch()
+            (Path(temp_dir) / "cursor.db").touch()
+
+            with (
+                patch(
+                    "src.database_management.discover_databases.os.scandir",
+                    wraps=os.scandir,
+                ) as mock_scandir,
+                patch.object(
+                    self.data_extractor, "extract_conversation_data", return_value={}
+                ),
+            ):
+                _, paths, total_files, _ = self.data_extractor.process_database_files(
+                    {"cursor": [temp_dir]}, 50
+                )
 
-            # Should find and process database files
-            assert len(conversations) == 2
-            assert len(paths) == 2
+            # One scandir per directory: root, workspace, abc123
+            assert mock_scandir.call_count == 3
             assert total_files == 2
-            assert file_counts["cursor.db"] == 1
-            assert file_counts["claude.db"] == 1
-            assert "/test/path/cursor.db" in paths
-            assert "/test/path2/claude.db" in paths
+            assert str(nested / "state.vscdb") in paths
+
+    def test_term_statistics_are_built_once_per_snapshot(self) -> None:
+        """Test BM25 statistics are reused until the database changes."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "state.vscdb")
+
+            def write_prompts(texts: list[str]) -> None:
+                conn = sqlite3.connect(db_path)
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS ItemTable "
+                    "(key TEXT UNIQUE ON CONFLICT REPLACE, value TEXT)"
+                )
+                conn.execute(
+                    "INSERT INTO ItemTable VALUES (?, ?)",
+                    (
+                        RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                        json.dumps([{"text": text} for text in texts]),
+                    ),
+                )
+                conn.commit()
+                conn.close()
+
+            write_prompts(["python tips", "rust tips"])
+            with patch.object(
+                self.data_extractor,
+                "extract_conversation_data",
+                wraps=self.data_extractor.extract_conversation_data,
+            ) as mock_extract:
+                first = self.data_extractor.get_term_statistics([db_path], ["tips"])
+                second = self.data_extractor.get_term_statistics([db_path], ["python"])
+                assert mock_extract.call_count == 1
+
+                write_prompts(["python tips", "rust tips", "python again"])
+                os.utime(db_path, ns=(0, os.stat(db_path).st_mtime_ns + 1_000_000))
+                third = self.data_extractor.get_term_statistics([db_path], ["python"])
+                assert mock_extract.call_count == 2
+
+            assert (first.document_count, first.document_frequency) == (
+                2,
+                {"tips": 2},
+            )
+            assert second.document_frequency == {"python": 1}
+            assert (third.document_count, third.document_frequency) == (
+                3,
+                {"python": 2},
+            )
+            assert (
+                self.data_extractor.get_term_statistics(
+                    [db_path], ["python"], include_prompts=False
+                )
+                == TermStatistics()
+            )
 
-    def test_process_database_files_multiple_db_files(self) -> None:
-        """Test process_database_files with multiple database files in same path."""
-        with patch("os.path.exists", return_value=True):
-            with patch("os.walk") as mock_walk:
-                mock_walk.return_value = [
-                    ("/test/path", [], ["cursor.db", "claude.db", "other.db"]),
-                ]
-
-                registry_data = {
-                    "cursor": ["/test/path"],
-                }
+    def test_window_skips_databases_outside_it(self) -> None:
+        """Test a database with no entry in the window is not opened again."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "state.vscdb")
+            conn = sqlite3.connect(db_path)
+            conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+            conn.execute(
+                "INSERT INTO ItemTable VALUES (?, ?)",
+                (
+                    RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                    json.dumps(
+                        [
+                            {"text": f"tip {i}", "timestamp": 1_700_000_000_000 + i}
+                            for i in range(6)
+                        ]
+                    ),
+                ),
+            )
+            conn.commit()
+            conn.close()
+            registry = {"cursor": [temp_dir]}
 
-                with patch.object(
-                    self.data_extractor, "extract_conversation_data"
-                ) as mock_extract:
-                    mock_extract.return_value = {
-                        "prompts": [],
-                        "generations": [],
-                        "history_entries": [],
-                        "database_path": "/test/path/cursor.db",
-                        "error": None,
-                    }
+            conversations, _, _, _ = self.data_extractor.process_database_files(
+                registry, 2, window=TimeWindow(1_700_000_000_001, 1_700_000_000_003)
+            )
+            assert [p["text"] for p in conversations[0]["prompts"]] == [
+                "tip 2",
+                "tip 3",
+            ]
+
+            with patch.object(
+                self.data_extractor, "extract_conversation_data"
+            ) as mock_extract:
+                conversations, _, _, _ = self.data_extractor.process_database_files(
+                    registry, 2, ["tip"], window=TimeWindow(1_700_000_000_006)
+                )
+            mock_extract.assert_not_called()
+            assert conversations[0]["prompts"] == []
+            assert conversations[0]["error"] is None
+
+    def test_window_reads_only_the_entries_it_needs(self) -> None:
+        """Test cached partitions narrow a repeated window to a tail read."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "state.vscdb")
+            conn = sqlite3.connect(db_path)
+            conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+            conn.execute(
+                "INSERT INTO ItemTable VALUES (?, ?)",
+                (
+                    RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                    json.dumps(
+                        [
+                            {"text": f"tip {i}", "timestamp": 1_700_000_000_000 + i}
+                            for i in range(10)
+                        ]
+                    ),
+                ),
+            )
+            conn.commit()
+            conn.close()
+            registry = {"cursor": [temp_dir]}
+            window = TimeWindow(1_700_000_000_004, 1_700_000_000_006)
 
-                    conversations, paths, total_files, file_counts = (
-                        self.data_extractor.process_database_files(registry_data, 50)
-                    )
-
-                    # Should find all supported database files
-                    assert len(conversations) == 2  # cursor.db and claude.db
-                    assert len(paths) == 2
-                    assert total_files == 2
-                    assert file_counts["cursor.db"] == 1
-                    assert file_counts["claude.db"] == 1
-                    assert "other.db" not in file_counts  # Not in SUPPORTED_DB_FILES
+            first, _, _, _ = self.data_extractor.process_database_files(
+                registry, 2, window=window
+            )
+            with patch.object(
+                self.data_extractor,
+                "extract_conversation_data",
+                wraps=self.data_extractor.extract_conversation_data,
+            ) as mock_extract:
+                second, _, _, _ = self.data_extractor.process_database_files(
+                    registry, 2, window=window
+                )
+
+            # Entries 5 and 6 are wanted, so the last five are read
+            assert mock_extract.call_args.args[1] == 5
+            assert [p["text"] for p in second[0]["prompts"]] == ["tip 5", "tip 6"]
+            assert second[0]["prompts"] == first[0]["prompts"]
+            assert list(second[0]["timestamps"]["prompts"]) == [
+                1_700_000_000_005,
+                1_700_000_000_006,
+            ]
+
+    def test_entries_repeated_across_databases_are_returned_once(self) -> None:
+        """Test a prompt stored by two workspaces is kept once with both sources."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for workspace, prompts in (
+                ("a", [{"text": "Cast  the spell", "timestamp": 1_700_000_000_000}]),
+                (
+                    "b",
+                    [
+                        {"text": "cast the spell", "timestamp": 1_700_000_000_000},
+                        {"text": "cast the spell", "timestamp": 1_700_000_060_000},
+                    ],
+                ),
+            ):
+                os.makedirs(os.path.join(temp_dir, workspace))
+                conn = sqlite3.connect(os.path.join(temp_dir, workspace, "state.vscdb"))
+                conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+                conn.execute(
+                    "INSERT INTO ItemTable VALUES (?, ?)",
+                    (RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"], json.dumps(prompts)),
+                )
+                conn.commit()
+                conn.close()
+            registry = {"cursor": [temp_dir]}
+
+            conversations, found_paths, _, _ = (
+                self.data_extractor.process_database_files(registry, 10)
+            )
+            first, second = conversations
+            assert len(first["prompts"]) + len(second["prompts"]) == 2
+            assert first["sources"] == {"prompts": {0: found_paths}}
+            assert "sources" not in second
+
+            extractor = ConversationDataExtractor(deduplicate=False)
+            conversations, _, _, _ = extractor.process_database_files(registry, 10)
+            assert sum(len(c["prompts"]) for c in conversations) == 3
+
+    def test_parallel_extraction_keeps_order_and_isolates_failures(self) -> None:
+        """Test worker threads return databases in order despite a failure."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i in range(6):
+                os.makedirs(os.path.join(temp_dir, f"ws{i}"))
+                conn = sqlite3.connect(os.path.join(temp_dir, f"ws{i}", "state.vscdb"))
+                conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+                conn.execute(
+                    "INSERT INTO ItemTable VALUES (?, ?)",
+                    (
+                        RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                        json.dumps([{"text": f"ws{i} {j}"} for j in range(i * 200)]),
+                    ),
+                )
+                conn.commit()
+                conn.close()
+            registry = {"cursor": [temp_dir]}
+            sequential = ConversationDataExtractor(max_workers=1)
+            parallel = ConversationDataExtractor(max_workers=4)
+            failing = os.path.join(temp_dir, "ws3", "state.vscdb")
+            extract = parallel.extract_conversation_data
+
+            def fail_one(db_path: str, *args: Any) -> Dict[str, Any]:
+                if db_path == failing:
+                    raise RuntimeError("corrupt value")
+                return extract(db_path, *args)
+
+            expected, found_paths, _, _ = sequential.process_database_files(registry, 0)
+            with patch.object(
+                parallel, "extract_conversation_data", side_effect=fail_one
+            ):
+                conversations, _, _, _ = parallel.process_database_files(registry, 0)
+            parallel.close()
+
+            assert [c["database_path"] for c in conversations] == found_paths
+            for conv_data, expected_data in zip(conversations, expected):
+                if conv_data["database_path"] == failing:
+                    assert conv_data["prompts"] == []
+                    assert "corrupt value" in conv_data["error"]
+                else:
+                    assert conv_data["prompts"] == expected_data["prompts"]
+
+    def test_extractions_of_other_databases_keep_cached_partitions(self) -> None:
+        """Test only discovery drops cached partitions, and dropped stay out."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_paths = []
+            for i in range(3):
+                os.makedirs(os.path.join(temp_dir, f"ws{i}"))
+                db_path = os.path.join(temp_dir, f"ws{i}", "state.vscdb")
+                conn = sqlite3.connect(db_path)
+                conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+                conn.execute(
+                    "INSERT INTO ItemTable VALUES (?, ?)",
+                    (
+                        RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                        json.dumps([{"text": "tip", "timestamp": 1_700_000_000_000}]),
+                    ),
+                )
+                conn.commit()
+                conn.close()
+                db_paths.append(db_path)
+            window = TimeWindow(1_600_000_000_000)
+            extractor = ConversationDataExtractor(max_workers=2)
+            extractor.discover_databases({"cursor": [temp_dir]})
+
+            # Requests over different databases leave each other's caches
+            extractor.extract_databases(db_paths[:1], 5, window=window)
+            extractor.extract_databases(db_paths[1:], 5, window=window)
+            assert extractor._time_partitions.keys() == set(db_paths)
+
+            # A database discovery no longer finds is not cached again
+            extractor.retain_databases(db_paths[:2])
+            extractor.extract_databases(db_paths, 5, window=window)
+            extractor.close()
+            assert extractor._time_partitions.keys() == set(db_paths[:2])
+
+    def test_cancelled_request_stops_between_databases(self) -> None:
+        """Test a cancelled request opens no further database."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i in range(4):
+                os.makedirs(os.path.join(temp_dir, f"ws{i}"))
+                conn = sqlite3.connect(os.path.join(temp_dir, f"ws{i}", "state.vscdb"))
+                conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+                conn.commit()
+                conn.close()
+            for max_workers in (1, 2):
+                extractor = ConversationDataExtractor(max_workers=max_workers)
+                cancel_event = threading.Event()
+                opened = []
+
+                def cancel_after_first(db_path: str, *args: Any) -> Dict[str, Any]:
+                    opened.append(db_path)
+                    cancel_event.set()
+                    return extractor._empty_result(db_path)
+
+                def recall() -> Any:
+                    bind_cancel_event(cancel_event)
+                    return extractor.process_database_files({"cursor": [temp_dir]}, 0)
+
+                with (
+                    patch.object(
+                        extractor,
+                        "extract_conversation_data",
+                        side_effect=cancel_after_first,
+                    ),
+                    pytest.raises(RequestCancelledError),
+                ):
+                    contextvars.copy_context().run(recall)
+                extractor.close()
+
+                assert len(opened) <= max_workers
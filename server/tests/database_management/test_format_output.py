@@ -6,6 +6,7 @@ from typing import Any, Dict
 
 from src.config.constants import MAX_SUMMARY_ENTRIES, MAX_SUMMARY_LENGTH
 from src.database_management.format_output import OutputFormatter
+from src.database_management.time_partitions import TimeWindow
 
 
 class TestOutputFormatter:
@@ -29,6 +30,26 @@ class TestOutputFormatter:
         assert len(summary) == MAX_SUMMARY_LENGTH
         assert "..." in summary
 
+    def test_create_conversation_summary_keeps_match(self) -> None:
+        """Test create_conversation_summary centers on a match truncation would cut."""
+        long_text = "a" * MAX_SUMMARY_LENGTH + " palantir " + "b" * MAX_SUMMARY_LENGTH
+        conversation = {"text": long_text}
+        start = long_text.index("palantir")
+        summary = self.output_formatter.create_conversation_summary(
+            conversation, (start, start + len("palantir"))
+        )
+        assert len(summary) == MAX_SUMMARY_LENGTH
+        assert "palantir" in summary
+        assert summary.startswith("...") and summary.endswith("...")
+
+    def test_create_conversation_summary_match_in_head(self) -> None:
+        """Test create_conversation_summary keeps head and tail when the match fits."""
+        long_text = "palantir " + "a" * (MAX_SUMMARY_LENGTH + 50)
+        conversation = {"text": long_text}
+        assert self.output_formatter.create_conversation_summary(
+            conversation, (0, len("palantir"))
+        ) == self.output_formatter.create_conversation_summary(conversation)
+
     def test_create_conversation_summary_empty(self) -> None:
         """Test create_conversation_summary with empty conversation."""
         summary = self.output_formatter.create_conversation_summary({})
@@ -92,6 +113,17 @@ class TestOutputFormatter:
         )
         assert score == 0.5  # Only "python" matches (1/2)
 
+    def test_score_conversation_relevance_reuses_matcher(self) -> None:
+        """Test score_conversation_relevance builds one matcher per phrase list."""
+        phrases = ["python", "rust"]
+        self.output_formatter.score_conversation_relevance({"text": "python"}, phrases)
+        matcher = self.output_formatter._phrase_matcher
+        self.output_formatter.score_conversation_relevance({"text": "rust"}, phrases)
+        assert self.output_formatter._phrase_matcher is matcher
+
+        self.output_formatter.score_conversation_relevance({"text": "go"}, ["go"])
+        assert self.output_formatter._phrase_matcher is not matcher
+
     def test_score_conversation_relevance_empty_phrases(self) -> None:
         """Test score_conversation_relevance with empty phrases."""
         conversation = {"text": "test"}
@@ -238,6 +270,27 @@ class TestOutputFormatter:
         if prompt_convs:
             assert len(prompt_convs) <= MAX_SUMMARY_ENTRIES
 
+    def test_format_conversation_entry_window(self) -> None:
+        """Test entries outside the window are dropped and undated ones kept."""
+        conversation_data = {
+            "database_path": "/test/path.db",
+            "prompts": [
+                {"text": "old ring", "timestamp": "2023-12-31T23:59:59Z"},
+                {"text": "new ring", "timestamp": "2024-01-01T08:00:00+00:00"},
+                {"text": "undated ring"},
+            ],
+        }
+        window = TimeWindow.from_bounds("2024-01-01", "2024-01-01")
+
+        for phrases in ([], ["ring"]):
+            result = self.output_formatter.format_conversation_entry(
+                conversation_data, True, True, phrases, window=window
+            )
+            assert [c["summary"] for c in result["conversations"]] == [
+                "new ring",
+                "undated ring",
+            ]
+
     def test_format_conversation_entry_filters_editor_history(self) -> None:
         """Test format_conversation_entry filters out editor state entries by default."""
         conversation_data = {
@@ -326,3 +379,30 @@ class TestOutputFormatter:
         if thread_entries:
             for thread in thread_entries:
                 assert "prompt" in thread or "generation" in thread
+
+    def test_format_conversation_entry_sources(self) -> None:
+        """Test entries found in several databases list their sources."""
+        conversation_data = {
+            "database_path": "/a.db",
+            "prompts": [{"text": "shared ring"}, {"text": "own ring"}],
+            "history_entries": [
+                {"editor": {"resource": "file.py"}},
+                {"text": "shared history"},
+            ],
+            "sources": {
+                "prompts": {0: ["/a.db", "/b.db"]},
+                "history_entries": {1: ["/a.db", "/c.db"]},
+            },
+        }
+
+        for phrases in ([], ["shared"]):
+            result = self.output_formatter.format_conversation_entry(
+                conversation_data, True, True, phrases
+            )
+            assert {
+                c["summary"]: c.get("sources") for c in result["conversations"]
+            } == {
+                "shared ring": ["/a.db", "/b.db"],
+                "shared history": ["/a.db", "/c.db"],
+                **({} if phrases else {"own ring": None}),
+            }
@@ -0,0 +1,111 @@
+"""
+Tests for index_maintenance module.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from unittest.mock import patch
+
+import pytest
+from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+from src.database_management.conversation_index import ConversationIndex
+from src.database_management.index_maintenance import (
+    IndexMaintenanceScheduler,
+    low_priority_command,
+)
+
+
+class TestLowPriorityCommand:
+    """Test suite for low_priority_command function."""
+
+    def test_wraps_with_available_tools(self) -> None:
+        with patch("shutil.which", side_effect=lambda name: f"/usr/bin/{name}"):
+            assert low_priority_command(["run"]) == [
+                "/usr/bin/ionice",
+                "-c",
+                "3",
+                "/usr/bin/nice",
+                "-n",
+                "19",
+                "run",
+            ]
+
+    def test_leaves_out_missing_tools(self) -> None:
+        with patch("shutil.which", return_value=None):
+            assert low_priority_command(["run"]) == ["run"]
+
+
+@pytest.mark.skipif(
+    not ConversationIndex.is_supported(),
+    reason="SQLite lacks FTS5 with the trigram tokenizer",
+)
+class TestIndexMaintenanceScheduler:
+    """Test suite for IndexMaintenanceScheduler class."""
+
+    def setup_method(self) -> None:
+        """Create an index of one source database."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.root = self._temp_dir.name
+        self.index_path = os.path.join(self.root, "index.db")
+        db_path = os.path.join(self.root, "state.vscdb")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE ItemTable (key TEXT, value BLOB)")
+        conn.execute(
+            "INSERT INTO ItemTable VALUES (?, ?)",
+            (
+                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                json.dumps(
+                    [
+                        {"text": "ancient tip", "timestamp": 1_000_000_000_000},
+                        {"text": "undated tip"},
+                    ]
+                ),
+            ),
+        )
+        conn.commit()
+        conn.close()
+        index = ConversationIndex(self.index_path)
+        index.refresh([db_path])
+        index.close()
+
+    def teardown_method(self) -> None:
+        """Remove temporary files."""
+        self._temp_dir.cleanup()
+
+    def test_run_once_maintains_index_in_worker(self) -> None:
+        """Test a run applies retention in a worker process and logs it."""
+        scheduler = IndexMaintenanceScheduler(
+            self.index_path, interval_seconds=0, max_bytes=0, retention_days=30
+        )
+        assert sys.executable in scheduler.command()
+
+        with patch("src.database_management.index_maintenance.log_info") as log:
+            stats = asyncio.run(scheduler.run_once())
+
+        assert stats is not None
+        assert stats["expired_entries"] == 1
+        log.assert_called_once_with("Conversation index maintenance completed", stats)
+
+    def test_run_once_without_index(self) -> None:
+        """Test nothing runs before the index exists."""
+        scheduler = IndexMaintenanceScheduler(os.path.join(self.root, "none.db"))
+
+        with patch("asyncio.create_subprocess_exec") as create:
+            assert asyncio.run(scheduler.run_once()) is None
+        create.assert_not_called()
+
+    def test_run_once_reports_failures(self) -> None:
+        """Test a failing worker is logged as an error."""
+        scheduler = IndexMaintenanceScheduler(self.index_path)
+        failing = [sys.executable, "-c", "1/0"]
+
+        with (
+            patch.object(scheduler, "command", return_value=failing),
+            patch("src.database_management.index_maintenance.log_error") as log,
+        ):
+            assert asyncio.run(scheduler.run_once()) is None
+        assert "exit code 1" in log.call_args[0][0]
@@ -0,0 +1,343 @@
+"""
+Tests for inverted_index module.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+from array import array
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+from src.database_management import inverted_index
+from src.database_management.extract_conversation_data import ConversationDataExtractor
+from src.database_management.inverted_index import InvertedIndex
+from src.database_management.time_partitions import PARTITION_MS, TimeWindow
+
+
+class _CountingList(List[str]):
+    """List counting the items read from it."""
+
+    reads = 0
+
+    def __getitem__(self, index: Any) -> Any:
+        self.reads += 1
+        return super().__getitem__(index)
+
+
+class TestInvertedIndex:
+    """Test suite for InvertedIndex class."""
+
+    def setup_method(self) -> None:
+        """Create a source database directory and an empty index."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.root = self._temp_dir.name
+        self.index = InvertedIndex()
+
+    def teardown_method(self) -> None:
+        """Remove temporary files."""
+        self._temp_dir.cleanup()
+
+    def _create_db(
+        self,
+        name: str,
+        prompts: List[Any],
+        generations: List[Any] | None = None,
+    ) -> str:
+        directory = os.path.join(self.root, name)
+        os.makedirs(directory, exist_ok=True)
+        db_path = os.path.join(directory, "state.vscdb")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ItemTable "
+            "(key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)"
+        )
+        conn.executemany(
+            "INSERT INTO ItemTable VALUES (?, ?)",
+            [
+                (RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"], json.dumps(prompts)),
+                (
+                    RECALL_CONVERSATIONS_QUERIES["GENERATIONS_KEY"],
+                    json.dumps(generations or []),
+                ),
+            ],
+        )
+        conn.commit()
+        conn.close()
+        os.utime(db_path, ns=(0, os.stat(db_path).st_mtime_ns + 1_000_000))
+        return db_path
+
+    def _texts(self, conv_data: Dict[str, Any], field: str = "prompts") -> List[str]:
+        return [entry["text"] for entry in conv_data[field]]
+
+    def _search(self, db_path: str, phrases: List[str], limit: int = 10) -> List[str]:
+        return self._texts(self.index.search([db_path], limit, phrases)[db_path])
+
+    def test_postings_are_document_arrays(self) -> None:
+        """Test postings hold each document holding a term once, in order."""
+        db_path = self._create_db(
+            "ws1", [{"text": "to be or not to be"}, {"text": "let it be"}]
+        )
+        self.index.refresh([db_path])
+
+        postings = self.index._postings["be"]
+        assert isinstance(postings, array)
+        assert postings.typecode == "I"
+        assert list(postings) == [0, 1]
+
+    def test_phrases_keep_substring_semantics(self) -> None:
+        """Test phrases match inside words and across word boundaries."""
+        db_path = self._create_db(
+            "ws1",
+            [
+                {"text": "Pythonic tip 42"},
+                {"text": "tip-4 is different"},
+                {"text": "beta alpha"},
+                {"text": "alpha gamma beta"},
+                {"text": "alpha beta"},
+                {"text": "c++ templates"},
+            ],
+        )
+        self.index.refresh([db_path])
+
+        assert self._search(db_path, ["ython"]) == ["Pythonic tip 42"]
+        assert self._search(db_path, ["tip 4"]) == ["Pythonic tip 42"]
+        assert self._search(db_path, ["onic tip 4"]) == ["Pythonic tip 42"]
+        assert self._search(db_path, ["alpha beta"]) == ["alpha beta"]
+        assert self._search(db_path, ["c++"]) == ["c++ templates"]
+        assert self._search(db_path, ["++"]) == ["c++ templates"]
+        assert self._search(db_path, ["tip 4", "ALPHA BETA"]) == [
+            "Pythonic tip 42",
+            "alpha beta",
+        ]
+        assert self._search(db_path, ["missing"]) == []
+
+    def test_search_checks_only_candidate_texts(self) -> None:
+        """Test a selective phrase only reads entries holding its words."""
+        db_path = self._create_db(
+            "ws1",
+            [{"text": f"filler entry {i}"} for i in range(50)]
+            + [{"text": "rare phrase here"}, {"text": "phrase rare"}],
+        )
+        self.index.refresh([db_path])
+
+        texts = self.index._texts = _CountingList(self.index._texts)
+
+        assert self._search(db_path, ["rare phrase"]) == ["rare phrase here"]
+        assert texts.reads == 2
+
+    def test_frequent_phrase_stops_at_limit(self) -> None:
+        """Test a phrase in most entries scans newest first up to the limit."""
+        db_path = self._create_db(
+            "ws1", [{"text": f"common word {i}"} for i in range(50)]
+        )
+        self.index.refresh([db_path])
+
+        texts = self.index._texts = _CountingList(self.index._texts)
+
+        assert self._search(db_path, ["common word"], limit=2) == [
+            "common word 48",
+            "common word 49",
+        ]
+        assert texts.reads == 2
+
+    def test_vocabulary_lookups_follow_new_terms(self) -> None:
+        """Test words searched before are found in terms posted later."""
+        db_path = self._create_db("ws1", [{"text": "alpha"}])
+        self.index.refresh([db_path])
+        assert self._search(db_path, ["ytho"]) == []
+        assert self._search(db_path, ["thon alp"]) == []
+
+        self._create_db("ws1", [{"text": "alpha"}, {"text": "python alpine"}])
+        self.index.refresh([db_path])
+
+        assert self._search(db_path, ["ytho"]) == ["python alpine"]
+        assert self._search(db_path, ["thon alp"]) == ["python alpine"]
+
+    def test_search_keeps_most_recent_per_type(self) -> None:
+        """Test each source and type contributes its newest entries."""
+        db_path = self._create_db(
+            "ws1",
+            [{"text": f"prompt {i}"} for i in range(5)],
+            [{"text": f"generation {i}"} for i in range(3)],
+        )
+        self.index.refresh([db_path])
+
+        results = self.index.search([db_path], 2, include_generations=True)
+        assert self._texts(results[db_path]) == ["prompt 3", "prompt 4"]
+        assert self._texts(results[db_path], "generations") == [
+            "generation 1",
+            "generation 2",
+        ]
+        assert self._search(db_path, ["prompt"], limit=2) == ["prompt 3", "prompt 4"]
+
+    def test_appended_entries_are_added_incrementally(self) -> None:
+        """Test a refresh decodes and posts only appended entries."""
+        db_path = self._create_db("ws1", [{"text": "one"}, {"text": "two"}])
+        self.index.refresh([db_path])
+
+        self._create_db("ws1", [{"text": "one"}, {"text": "two"}, {"text": "three"}])
+        with patch.object(
+            self.index.reader.stream_reader,
+            "iter_array",
+            wraps=self.index.reader.stream_reader.iter_array,
+        ) as mock_iter:
+            self.index.refresh([db_path])
+
+        mock_iter.assert_not_called()
+        assert self.index.last_stats["ingested_entries"] == 1
+        assert self.index.last_stats["documents"] == 3
+        assert self._search(db_path, ["t"]) == ["two", "three"]
+
+    def test_rewritten_array_replaces_documents(self) -> None:
+        """Test an array whose indexed prefix changed is posted again."""
+        db_path = self._create_db("ws1", [{"text": "one"}, {"text": "two"}])
+        self.index.refresh([db_path])
+
+        self._create_db("ws1", [{"text": "uno"}])
+        self.index.refresh([db_path])
+
+        assert self._search(db_path, ["o"]) == ["uno"]
+        assert self.index.get_stats()["documents"] == 1
+
+    def test_unchanged_sources_are_skipped(self) -> None:
+        """Test a refresh does not read sources with the same fingerprint."""
+        db_path = self._create_db("ws1", [{"text": "one"}])
+        self.index.refresh([db_path])
+
+        with patch.object(self.index.reader, "read_updates") as mock_read:
+            self.index.refresh([db_path])
+
+        mock_read.assert_not_called()
+        assert self.index.last_stats["unchanged_sources"] == 1
+
+    def test_removed_sources_are_compacted(self) -> None:
+        """Test postings of removed sources are dropped once they dominate."""
+        first = self._create_db("ws1", [{"text": f"old {i}"} for i in range(5)])
+        second = self._create_db("ws2", [{"text": "new entry"}])
+        self.index.refresh([first, second])
+
+        with patch.object(inverted_index, "COMPACT_MIN_DEAD_DOCUMENTS", 1):
+            self.index.refresh([second])
+
+        assert "old" not in self.index._postings
+        assert list(self.index._postings["new"]) == [0]
+        assert self._search(second, ["new"]) == ["new entry"]
+        assert self.index.get_stats()["sources"] == 1
+
+    def test_ingest_error_is_reported(self) -> None:
+        """Test a source that cannot be read is reported and left out."""
+        broken = os.path.join(self.root, "broken.db")
+        sqlite3.connect(broken).close()
+
+        errors = self.index.refresh([broken])
+
+        assert "no such table" in errors[broken]
+        assert self.index.get_stats()["sources"] == 0
+
+    def test_stats_report_footprint_and_build_time(self) -> None:
+        """Test the footprint and initial build time are reported."""
+        db_path = self._create_db("ws1", [{"text": "alpha beta"}, {"text": "beta"}])
+        self.index.refresh([db_path])
+        build_ms = self.index.build_ms
+        self._create_db(
+            "ws1", [{"text": "alpha beta"}, {"text": "beta"}, {"text": "c"}]
+        )
+        self.index.refresh([db_path])
+
+        stats = self.index.get_stats()
+        assert build_ms is not None
+        assert stats["build_ms"] == build_ms
+        assert stats["documents"] == 3
+        assert stats["terms"] == 3
+        assert stats["postings_bytes"] == 4 * 4
+        assert stats["vocabulary_bytes"] > 0
+        assert stats["entry_bytes"] > 0
+
+    def test_search_window(self) -> None:
+        """Test dated searches skip arrays and entries outside the window."""
+        base = 2800 * PARTITION_MS
+        old = self._create_db(
+            "ws1",
+            [{"text": f"tip {i}", "timestamp": base + i * 1000} for i in range(5)],
+        )
+        new = self._create_db(
+            "ws2",
+            [
+                {"text": "tip 9", "timestamp": base + 9 * PARTITION_MS},
+                {"text": "tip undated"},
+                {"text": "tip 10", "timestamp": base + 10 * PARTITION_MS},
+            ],
+        )
+        self.index.refresh([old, new])
+        window = TimeWindow(base + 2000, base + 9 * PARTITION_MS)
+
+        for phrases in (None, ["tip"]):
+            results = self.index.search([old, new], 2, phrases, window=window)
+            assert self._texts(results[old]) == ["tip 3", "tip 4"]
+            assert self._texts(results[new]) == ["tip 9", "tip undated"]
+        results = self.index.search([old], 10, window=TimeWindow(base + 10_000))
+        assert results[old]["prompts"] == []
+
+    def test_term_statistics(self) -> None:
+        """Test BM25 statistics cover live documents of the requested types."""
+        db_path = self._create_db(
+            "ws1", [{"text": "python tips"}, {"text": "rust"}], [{"text": "python"}]
+        )
+        self.index.refresh([db_path])
+
+        prompts = self.index.term_statistics(["prompt"], ["python", "go"])
+        both = self.index.term_statistics(["prompt", "generation"], ["python"])
+
+        assert (prompts.document_count, prompts.total_length) == (2, 3)
+        assert prompts.document_frequency == {"python": 1}
+        assert both.document_frequency == {"python": 2}
+
+
+class TestInvertedIndexExtraction:
+    """Test ConversationDataExtractor reading through the inverted index."""
+
+    def setup_method(self) -> None:
+        """Create a registry root holding one database."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.root = self._temp_dir.name
+        self.db_path = os.path.join(self.root, "state.vscdb")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+        conn.execute(
+            "INSERT INTO ItemTable VALUES (?, ?)",
+            (
+                RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                json.dumps([{"text": f"python tip {i}"} for i in range(12)]),
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+    def teardown_method(self) -> None:
+        """Remove temporary files."""
+        self._temp_dir.cleanup()
+
+    def test_index_matches_direct_queries(self) -> None:
+        """Test indexed results equal per-database results."""
+        direct = ConversationDataExtractor()
+        indexed = ConversationDataExtractor(index=InvertedIndex())
+        registry = {"cursor": [self.root]}
+
+        for phrases in (None, ["tip 1"], ["python"], ["on ti", "tip 4"], ["p 1"]):
+            expected = direct.process_database_files(registry, 3, phrases)
+            actual = indexed.process_database_files(registry, 3, phrases)
+            assert actual == expected
+
+    def test_term_statistics_match_direct(self) -> None:
+        """Test index statistics equal those built from each database."""
+        direct = ConversationDataExtractor()
+        indexed = ConversationDataExtractor(index=InvertedIndex())
+        indexed.process_database_files({"cursor": [self.root]}, 3)
+
+        terms = ["python", "tip", "4"]
+        assert indexed.get_term_statistics(
+            [self.db_path], terms
+        ) == direct.get_term_statistics([self.db_path], terms)
@@ -0,0 +1,41 @@
+"""
+Tests for phrase_matcher module.
+"""
+
+from src.database_management.phrase_matcher import PhraseMatcher
+
+
+class TestPhraseMatcher:
+    """Test suite for PhraseMatcher class."""
+
+    def test_scan_counts_and_offsets(self) -> None:
+        matcher = PhraseMatcher(["ring", "the ring"])
+        matches = matcher.scan("The Ring, the ring, one ring")
+
+        assert matches.counts == [3, 2]
+        assert matches.offsets == [
+            (0, 1),
+            (4, 0),
+            (10, 1),
+            (14, 0),
+            (24, 0),
+        ]
+        assert matches.matched == 2
+        assert matches.total == 5
+
+    def test_scan_counts_overlapping_occurrences(self) -> None:
+        assert PhraseMatcher(["aa"]).scan("aaaa").counts == [3]
+
+    def test_duplicate_and_empty_phrases(self) -> None:
+        matcher = PhraseMatcher(["Shire", "shire", ""])
+        matches = matcher.scan("the shire")
+
+        assert matches.counts == [1, 1, 0]
+        assert matcher.matched_count("the shire") == 2
+        assert len(matcher) == 3
+
+    def test_matched_count(self) -> None:
+        matcher = PhraseMatcher(["gandalf", "frodo", "sauron"])
+        assert matcher.matched_count("Gandalf and FRODO") == 2
+        assert matcher.matched_count("") == 0
+        assert PhraseMatcher([]).matched_count("anything") == 0
@@ -3,8 +3,11 @@ Tests for recency_scorer module.
 """
 
 from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
 
+import pytest
 from src.config.constants import RECENCY_DECAY_RATE
+from src.database_management.entry_timestamps import UNDATED
 from src.database_management.recency_scorer import RecencyScorer
 
 
@@ -144,3 +147,25 @@ class TestRecencyScorer:
         score = self.scorer.calculate_recency_score(conversation)
         # Should return neutral score on exception
         assert score == 0.5
+
+    def test_calculate_recency_score_malformed_timestamp(self) -> None:
+        """Test a timestamp that fails to parse scores neutral instead of raising."""
+        with patch(
+            "src.database_management.recency_scorer.entry_timestamp_ms",
+            side_effect=OverflowError("date value out of range"),
+        ):
+            assert self.scorer.calculate_recency_score({"timestamp": "x"}) == 0.5
+
+        assert self.scorer.score_timestamp_ms("x") == 0.5  # type: ignore[arg-type]
+
+    def test_score_timestamp_ms_matches_conversation_score(self) -> None:
+        """Test score_timestamp_ms scores a normalized timestamp like its entry."""
+        old_ms = (
+            int((datetime.now(timezone.utc) - timedelta(days=3)).timestamp()) * 1000
+        )
+
+        assert self.scorer.score_timestamp_ms(old_ms) == pytest.approx(
+            self.scorer.calculate_recency_score({"timestamp": old_ms})
+        )
+        assert self.scorer.score_timestamp_ms(None) == 0.5
+        assert self.scorer.score_timestamp_ms(UNDATED) == 0.5
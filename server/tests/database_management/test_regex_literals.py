@@ -0,0 +1,60 @@
+"""
+Tests for regex_literals module.
+"""
+
+import re
+
+from src.database_management.regex_literals import required_literals
+
+
+class TestRequiredLiterals:
+    """Test suite for required_literals."""
+
+    def test_literal_runs_between_metacharacters(self) -> None:
+        assert required_literals(r"error: \w+ full") == ["error: ", " full"]
+        assert required_literals(r"hello.*world") == ["hello", "world"]
+
+    def test_escaped_punctuation_is_literal(self) -> None:
+        assert required_literals(r"foo\.bar\(\)") == ["foo.bar()"]
+
+    def test_optional_characters_end_a_run(self) -> None:
+        assert required_literals(r"colou?r chart") == ["colo", "r chart"]
+        assert required_literals(r"ab+cdef") == ["cdef"]
+        assert required_literals(r"x{,}yzw") == ["yzw"]
+        assert required_literals(r"x{}yzw") == ["x{}yzw"]
+
+    def test_groups_classes_and_escapes_are_skipped(self) -> None:
+        assert required_literals(r"(?:abc)?def") == ["def"]
+        assert required_literals(r"[abc]]def") == ["]def"]
+        assert required_literals(r"\x41bcdef") == ["bcdef"]
+        assert required_literals(r"\N{LATIN SMALL LETTER A}bcd") == ["bcd"]
+        assert required_literals(r"(a)\1bcd") == ["bcd"]
+
+    def test_letters_with_non_ascii_case_matches_end_a_run(self) -> None:
+        # "s" also matches U+017F and "k" the Kelvin sign under IGNORECASE
+        assert required_literals("no such task") == ["no ", "uch ta"]
+        assert re.search("task", "taſK", re.IGNORECASE)
+
+    def test_quotes_and_non_ascii_end_a_run(self) -> None:
+        assert required_literals('abc"def') == ["abc", "def"]
+        assert required_literals("café au lait") == ["caf", " au la"]
+
+    def test_no_required_literal(self) -> None:
+        assert required_literals(r"abc|def") == []
+        assert required_literals(r"(abc|def) \w+") == []
+        assert required_literals(r"ab") == []
+        assert required_literals(r"(?x) abc def") == []
+        assert required_literals(r"abc(") == []
+
+    def test_every_match_holds_the_literals(self) -> None:
+        text = "Error: disk full. colour chart, color chart; foo.bar() x{}yzw"
+        for pattern in (
+            r"error: \w+ full",
+            r"colou?r chart",
+            r"foo\.bar\(\)",
+            r"x{}yzw",
+        ):
+            matches = [m.group().lower() for m in re.finditer(pattern, text, re.I)]
+            assert matches
+            for literal in required_literals(pattern):
+                assert all(literal.lower() in match for match in matches)
@@ -0,0 +1,245 @@
+"""
+Tests for sharded_recall module.
+"""
+
+import contextvars
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+from src.database_management.recall_conversations import ConversationDatabaseManager
+from src.database_management.sharded_recall import (
+    ShardedRecall,
+    ShardQuery,
+    merge_candidates,
+)
+from src.utils.cancellation import RequestCancelledError, bind_cancel_event
+
+
+def _create_database(db_path: str, prompts: List[Dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(db_path))
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+    conn.execute(
+        "INSERT INTO ItemTable VALUES (?, ?)",
+        (RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"], json.dumps(prompts)),
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestMergeCandidates:
+    """Test suite for merge_candidates function."""
+
+    def test_ranks_by_key_and_keeps_top_k(self) -> None:
+        candidates = [
+            ((-0.5, 1, 0), "/b.db", {"summary": "b", "type": "prompt"}),
+            ((-0.9, 2, 0), "/c.db", {"summary": "c", "type": "prompt"}),
+            ((-0.5, 0, 3), "/a.db", {"summary": "a", "type": "prompt"}),
+        ]
+
+        merged = merge_candidates(candidates, 2)
+
+        assert [e["summary"] for e in merged] == ["c", "a"]
+
+    def test_merges_repeats_across_shards(self) -> None:
+        candidates = [
+            (
+                (-0.5, 3, 0),
+                "/d.db",
+                {"summary": "x", "type": "prompt", "content_key": b"k"},
+            ),
+            (
+                (-0.5, 0, 0),
+                "/a.db",
+                {
+                    "summary": "x",
+                    "type": "prompt",
+                    "content_key": b"k",
+                    "sources": ["/a.db", "/b.db"],
+                },
+            ),
+            (
+                (-0.5, 1, 0),
+                "/b.db",
+                {"summary": "x", "type": "history", "content_key": b"k"},
+            ),
+        ]
+
+        merged = merge_candidates(candidates, 10)
+
+        assert merged == [
+            {"summary": "x", "type": "prompt", "sources": ["/a.db", "/b.db", "/d.db"]},
+            {"summary": "x", "type": "history"},
+        ]
+
+    def test_keeps_repeats_within_a_database(self) -> None:
+        candidates = [
+            (
+                (-0.5, 0, 0),
+                "/a.db",
+                {"summary": "x", "type": "prompt", "content_key": b"k"},
+            ),
+            (
+                (-0.5, 0, 1),
+                "/a.db",
+                {"summary": "x", "type": "prompt", "content_key": b"k"},
+            ),
+            (
+                (-0.5, 1, 0),
+                "/b.db",
+                {"summary": "x", "type": "prompt", "content_key": b"k"},
+            ),
+        ]
+
+        merged = merge_candidates(candidates, 10)
+
+        assert merged == [
+            {"summary": "x", "type": "prompt", "sources": ["/a.db", "/b.db"]},
+            {"summary": "x", "type": "prompt"},
+        ]
+
+
+class TestShardedRecall:
+    """Test suite for ShardedRecall class."""
+
+    def setup_method(self) -> None:
+        """Create databases sharing some prompts."""
+        self._temp_dir = tempfile.TemporaryDirectory()
+        root = self._temp_dir.name
+        shared = [
+            {"text": f"shared palantir note {i}", "timestamp": 1_700_000_000_000 + i}
+            for i in range(3)
+        ]
+        for d in range(6):
+            own = [
+                {
+                    "text": f"palantir {'palantir ' * (i % 3)}from workspace {d} #{i}",
+                    "timestamp": 1_700_000_100_000 + d * 1000 + i,
+                }
+                for i in range(8)
+            ]
+            _create_database(
+                os.path.join(root, "workspaceStorage", f"ws{d}", "state.vscdb"),
+                shared + own,
+            )
+        self.registry = {"cursor": [os.path.join(root, "workspaceStorage")]}
+        self.manager = ConversationDatabaseManager()
+        self.sharded = ShardedRecall(workers=2)
+        # Spread the workspaces over both shards whatever their paths hash to
+        self.sharded.shard_of = (  # type: ignore[method-assign]
+            lambda db_path: int(os.path.basename(os.path.dirname(db_path))[2:]) % 2
+        )
+
+    def teardown_method(self) -> None:
+        """Stop the workers and remove temporary files."""
+        self.sharded.close()
+        self._temp_dir.cleanup()
+
+    def _in_process(
+        self, phrases: List[str], top_k: int, bm25: bool
+    ) -> List[Dict[str, Any]]:
+        conversations, found_paths, _, _ = self.manager.process_database_files(
+            self.registry, 0 if bm25 else top_k, phrases
+        )
+        scorer = self.manager.create_bm25_scorer(found_paths, phrases) if bm25 else None
+        entries: List[Dict[str, Any]] = []
+        for conv_data in conversations:
+            entries.extend(
+                self.manager.format_conversation_entry(
+                    conv_data, True, True, phrases, bm25_scorer=scorer
+                )["conversations"]
+            )
+        if phrases:
+            entries = [e for e in entries if e.get("relevance", 0) > 0]
+            entries.sort(key=lambda e: e.get("relevance", 0), reverse=True)
+        return entries[:top_k]
+
+    @staticmethod
+    def _comparable(entries: List[Dict[str, Any]]) -> List[Any]:
+        return [(e["summary"], e["type"], e.get("sources")) for e in entries]
+
+    def test_shards_are_stable(self) -> None:
+        """Test a database always belongs to the same shard."""
+        assert ShardedRecall(workers=3).shard_of("/a/state.vscdb") == ShardedRecall(
+            workers=3
+        ).shard_of("/a/state.vscdb")
+
+    def test_matches_in_process_recall(self) -> None:
+        """Test merged shard results equal in-process recall."""
+        db_paths = self.manager.data_extractor.discover_databases(self.registry)[0]
+
+        for phrases, top_k in ((["palantir"], 12), ([], 5)):
+            merged = self.sharded.recall(db_paths, ShardQuery(top_k, top_k, phrases))
+            assert self._comparable(merged) == self._comparable(
+                self._in_process(phrases, top_k, bm25=False)
+            )
+
+    def test_bm25_combines_shard_statistics(self) -> None:
+        """Test BM25 over shards uses statistics of the whole corpus."""
+        manager = ConversationDatabaseManager()
+        manager.sharded_recall = self.sharded
+
+        merged, total_db_files = manager.recall_sharded(
+            self.registry, 0, 10, ["palantir"], use_bm25=True
+        )
+
+        assert total_db_files == 6
+        assert self._comparable(merged) == self._comparable(
+            self._in_process(["palantir"], 10, bm25=True)
+        )
+
+    def _cancellable_sleep(self, event: threading.Event, seconds: float) -> None:
+        def run() -> None:
+            bind_cancel_event(event)
+            self.sharded._map(time.sleep, {0: (seconds,)})
+
+        contextvars.copy_context().run(run)
+
+    def test_cancel_kills_running_worker(self) -> None:
+        """Test cancelling a request stops the worker running its shard."""
+        self.sharded._map(os.getpid, {0: ()})
+        executor = self.sharded._executors[0]
+        assert executor is not None
+        (process,) = executor._processes.values()
+        event = threading.Event()
+        threading.Timer(0.5, event.set).start()
+
+        start = time.perf_counter()
+        with pytest.raises(RequestCancelledError):
+            self._cancellable_sleep(event, 30)
+
+        process.join(timeout=10)
+        assert not process.is_alive()
+        assert time.perf_counter() - start < 15
+        assert self.sharded._executors[0] is None
+
+    def test_shard_stopped_by_another_cancel_runs_again(self) -> None:
+        """Test a request queued behind a cancelled one still gets its shard."""
+        self.sharded._map(os.getpid, {0: ()})
+        event = threading.Event()
+        cancelled: List[BaseException] = []
+
+        def cancelled_request() -> None:
+            try:
+                self._cancellable_sleep(event, 30)
+            except RequestCancelledError as e:
+                cancelled.append(e)
+
+        first = threading.Thread(target=cancelled_request)
+        first.start()
+        time.sleep(0.5)
+        threading.Timer(0.5, event.set).start()
+
+        start = time.perf_counter()
+        assert self.sharded._map(abs, {0: (-3,)}) == [3]
+        assert time.perf_counter() - start < 15
+        first.join(timeout=10)
+        assert len(cancelled) == 1
@@ -0,0 +1,109 @@
+"""
+Tests for stream_blob module.
+"""
+
+import json
+import random
+import sqlite3
+
+import pytest
+from src.database_management.stream_blob import BlobStreamReader
+
+pytestmark = pytest.mark.skipif(
+    not BlobStreamReader.is_supported(),
+    reason="Connection.blobopen requires Python 3.11+",
+)
+
+
+class TestBlobStreamReader:
+    """Test suite for BlobStreamReader class."""
+
+    def setup_method(self) -> None:
+        """Create an in-memory ItemTable and a reader with tiny chunks."""
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE ItemTable (key TEXT, value BLOB)")
+        self.reader = BlobStreamReader(chunk_size=5)
+
+    def teardown_method(self) -> None:
+        """Close the database."""
+        self.conn.close()
+
+    def _store(self, value: str | bytes | None) -> int:
+        self.conn.execute("DELETE FROM ItemTable")
+        cursor = self.conn.execute(
+            "INSERT INTO ItemTable VALUES (?, ?)", ("key", value)
+        )
+        assert cursor.lastrowid is not None
+        return cursor.lastrowid
+
+    def test_reads_tail_only(self) -> None:
+        """Test the last N entries come back as a partial result."""
+        data = [{"text": f"prompt {i}"} for i in range(20)]
+        value = json.dumps(data)
+        rowid = self._store(value)
+
+        entries, complete, size_bytes = self.reader.read_entries(self.conn, rowid, 3)
+
+        assert entries == data[-3:]
+        assert complete is False
+        assert size_bytes < len(value)
+
+    def test_streams_whole_array(self) -> None:
+        """Test a count of zero parses every entry forward."""
+        data = [{"text": "café"}, 1.25, [1, {"a": "]"}], 'x\\", ]', None]
+        value = json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8")
+        rowid = self._store(value)
+
+        assert self.reader.read_entries(self.conn, rowid, 0) == (
+            data,
+            True,
+            len(value),
+        )
+
+    def test_short_array_is_complete(self) -> None:
+        """Test arrays with at most N entries are returned complete."""
+        rowid = self._store("[1, 2]  ")
+
+        assert self.reader.read_entries(self.conn, rowid, 5)[:2] == ([1, 2], True)
+
+    def test_non_array_yields_no_entries(self) -> None:
+        """Test a JSON object is treated as having no entries."""
+        rowid = self._store('{"a": [1, 2]}')
+
+        assert self.reader.read_entries(self.conn, rowid, 0)[0] == []
+
+    @pytest.mark.parametrize("value", ["[1, 2", "[1 2]", "[1] x", "", "[1.]"])
+    def test_invalid_json_raises(self, value: str) -> None:
+        """Test malformed values surface a JSON error."""
+        rowid = self._store(value)
+
+        with pytest.raises(json.JSONDecodeError):
+            self.reader.read_entries(self.conn, rowid, 0)
+
+    def test_null_value_cannot_be_opened(self) -> None:
+        """Test NULL values raise so callers can fall back to a plain read."""
+        rowid = self._store(None)
+
+        with pytest.raises(sqlite3.Error):
+            self.reader.read_entries(self.conn, rowid, 1)
+
+    def test_matches_full_decode_on_random_documents(self) -> None:
+        """Test chunked reads agree with json.loads across chunk boundaries."""
+        rng = random.Random(11)
+
+        def random_value(depth: int) -> object:
+            kind = rng.randrange(4 if depth < 2 else 2)
+            if kind == 0:
+                return "".join(rng.choice('"\\\\,[]{} aé') for _ in range(5))
+            if kind == 1:
+                return rng.choice([rng.randrange(10**6), rng.random() * 1e5, True])
+            if kind == 2:
+                return [random_value(depth + 1) for _ in range(rng.randrange(3))]
+            return {"k": random_value(depth + 1)}
+
+        for _ in range(100):
+            data = [random_value(0) for _ in range(rng.randrange(8))]
+            rowid = self._store(json.dumps(data, ensure_ascii=False))
+            for count in range(0, 10):
+                entries, _, _ = self.reader.read_entries(self.conn, rowid, count)
+                assert entries == (data[-count:] if count else data)
@@ -0,0 +1,112 @@
+"""
+Tests for time_partitions module.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+from src.database_management.entry_timestamps import UNDATED
+from src.database_management.time_partitions import (
+    PARTITION_MS,
+    TimePartitions,
+    TimeWindow,
+    partition_runs,
+)
+
+DAY_MS = 24 * 3600 * 1000
+
+
+def _ms(year: int, month: int, day: int, hour: int = 0) -> int:
+    moment = datetime(year, month, day, hour, tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+class TestTimeWindow:
+    """Test suite for TimeWindow class."""
+
+    def test_from_bounds_converts_dates_once(self) -> None:
+        window = TimeWindow.from_bounds("2024-01-01", "2024-01-31")
+
+        assert window == TimeWindow(_ms(2024, 1, 1), _ms(2024, 2, 1) - 1)
+
+    def test_from_bounds_datetimes_and_timezones(self) -> None:
+        window = TimeWindow.from_bounds("2024-01-01T12:00:00Z", "2024-01-02T00:00")
+
+        assert window == TimeWindow(_ms(2024, 1, 1, 12), _ms(2024, 1, 2))
+
+    def test_from_bounds_without_bounds(self) -> None:
+        assert TimeWindow.from_bounds(None, None) is None
+        assert TimeWindow.from_bounds("", None) is None
+
+    def test_from_bounds_rejects_invalid_dates(self) -> None:
+        with pytest.raises(ValueError, match="date_to"):
+            TimeWindow.from_bounds("2024-01-01", "last week")
+
+    def test_contains_keeps_undated(self) -> None:
+        window = TimeWindow(start_ms=100)
+
+        assert window.contains(None)
+        assert window.contains(UNDATED)
+        assert window.contains(100)
+        assert not window.contains(99)
+
+    def test_overlaps_and_covers(self) -> None:
+        window = TimeWindow(100, 200)
+
+        assert window.overlaps(50, 100)
+        assert not window.overlaps(201, 300)
+        assert window.covers(100, 200)
+        assert not window.covers(50, 150)
+
+
+class TestTimePartitions:
+    """Test suite for TimePartitions class."""
+
+    def test_select_matches_per_entry_check(self) -> None:
+        start = _ms(2024, 1, 1)
+        timestamps = [
+            None if i % 7 == 0 else start + (i * 37 % 60) * DAY_MS for i in range(120)
+        ]
+        partitions = TimePartitions.build(timestamps)
+
+        for window in (
+            TimeWindow(start + 10 * DAY_MS, start + 25 * DAY_MS),
+            TimeWindow(start_ms=start + 50 * DAY_MS),
+            TimeWindow(end_ms=start - 1),
+            TimeWindow(start, start + 60 * DAY_MS),
+        ):
+            assert partitions.select(window) == [
+                i for i, ms in enumerate(timestamps) if window.contains(ms)
+            ]
+        assert len(partitions) == len(timestamps)
+
+    def test_overlaps_uses_span(self) -> None:
+        dated = TimePartitions.build([1000, 2000])
+        undated = TimePartitions.build([1000, None])
+
+        assert not dated.overlaps(TimeWindow(start_ms=3000))
+        assert dated.overlaps(TimeWindow(1500, 1600))
+        assert undated.overlaps(TimeWindow(start_ms=3000))
+        assert not TimePartitions().overlaps(TimeWindow(start_ms=0))
+
+
+class TestPartitionRuns:
+    """Test suite for partition_runs function."""
+
+    def test_runs_split_at_partition_changes(self) -> None:
+        timestamps = [0, 1, None, PARTITION_MS, PARTITION_MS + 5, 3 * PARTITION_MS]
+
+        assert list(partition_runs(timestamps, 2)) == [
+            (0, 2, 0, 1, True),
+            (3, 4, PARTITION_MS, PARTITION_MS + 5, False),
+            (5, 5, 3 * PARTITION_MS, 3 * PARTITION_MS, False),
+        ]
+
+    def test_runs_keep_min_length(self) -> None:
+        timestamps = [0, PARTITION_MS, 0, PARTITION_MS]
+
+        assert list(partition_runs(timestamps, 3)) == [
+            (0, 2, 0, PARTITION_MS, False),
+            (3, 3, PARTITION_MS, PARTITION_MS, False),
+        ]
+        assert list(partition_runs([], 3)) == []
@@ -90,6 +90,111 @@ class TestQueryHandler:
         assert self.handler.find_matches("hello", "") == []
         assert self.handler.find_matches("", "hello") == []
 
+    @patch("src.query_handler.json.load")
+    @patch("src.query_handler.open")
+    def test_execute_query_regex_filters_and_counts(
+        self, mock_open: Any, mock_json_load: Any
+    ) -> None:
+        mock_json_load.return_value = {"test_tool": ["/test/path"]}
+        conversations = [
+            {"summary": "error: disk full", "type": "prompt", "relevance": 0.5},
+            {"summary": "all good", "type": "prompt", "relevance": 0.4},
+        ]
+
+        with (
+            patch.object(
+                self.handler.db_manager,
+                "process_database_files",
+                return_value=([{}], ["/test/path"], 1, {"test.db": 1}),
+            ),
+            patch.object(
+                self.handler.db_manager,
+                "format_conversation_entry",
+                return_value={"status": "success", "conversations": conversations},
+            ),
+        ):
+            result = self.handler.execute_query(
+                {
+                    "search": r"error: \w+ full",
+                    "limit": 5,
+                    "regex": True,
+                    "count_matches": True,
+                }
+            )
+
+        assert result["status"] == "success"
+        assert result["results"]["total_found"] == 1
+        assert result["results"]["total_match_count"] == 1
+        assert result["results"]["conversations"][0]["matched_texts"] == [
+            "error: disk full"
+        ]
+
+    @patch("src.query_handler.json.load")
+    @patch("src.query_handler.open")
+    def test_execute_query_regex_reads_entries_holding_its_literal(
+        self, mock_open: Any, mock_json_load: Any
+    ) -> None:
+        mock_json_load.return_value = {"test_tool": ["/test/path"]}
+
+        with (
+            patch.object(
+                self.handler.db_manager,
+                "process_database_files",
+                return_value=([{}], ["/test/path"], 1, {"test.db": 1}),
+            ) as mock_process,
+            patch.object(
+                self.handler.db_manager,
+                "format_conversation_entry",
+                return_value={"status": "success", "conversations": []},
+            ) as mock_format,
+        ):
+            self.handler.execute_query(
+                {"search": r"error: \w+ full", "limit": 5, "regex": True}
+            )
+            self.handler.execute_query(
+                {"search": r"disk|drive", "limit": 5, "regex": True}
+            )
+
+        assert mock_process.call_args_list[0].args[2] == ["error: "]
+        assert mock_format.call_args_list[0].args[3] == ["error: "]
+        # No literal is required, so the pattern is passed on as before
+        assert mock_process.call_args_list[1].args[2] == r"disk|drive"
+
+    @patch("src.query_handler.json.load")
+    @patch("src.query_handler.open")
+    def test_execute_query_counts_matches_in_one_pass(
+        self, mock_open: Any, mock_json_load: Any
+    ) -> None:
+        mock_json_load.return_value = {"test_tool": ["/test/path"]}
+        conversations = [
+            {"summary": "ring and Ring", "type": "prompt", "relevance": 0.5},
+            {"summary": "no match", "type": "prompt", "relevance": 0.4},
+        ]
+
+        with (
+            patch.object(
+                self.handler.db_manager,
+                "process_database_files",
+                return_value=([{}], ["/test/path"], 1, {"test.db": 1}),
+            ),
+            patch.object(
+                self.handler.db_manager,
+                "format_conversation_entry",
+                return_value={"status": "success", "conversations": conversations},
+            ),
+            patch.object(
+                self.handler, "find_matches", wraps=self.handler.find_matches
+            ) as mock_find,
+        ):
+            result = self.handler.execute_query(
+                {"search": "ring", "limit": 5, "count_matches": True}
+            )
+
+        assert mock_find.call_count == len(conversations)
+        assert result["results"]["total_found"] == 1
+        assert result["results"]["total_match_count"] == 2
+        assert result["results"]["conversations"][0]["match_count"] == 2
+
     @patch("src.query_handler.open")
     def test_execute_query_registry_not_found(self, mock_open: Any) -> None:
         mock_open.side_effect = FileNotFoundError()
@@ -0,0 +1,191 @@
+"""Test suite for concurrent dispatch and cancellation in the JSON-RPC server."""
+
+import asyncio
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from src.protocol.jsonrpc_server import JSONRPCServer
+from src.protocol.models import ToolResult
+from src.utils.cancellation import current_cancel_event, raise_if_cancelled
+
+
+class MockTool:
+    """Mock tool for testing."""
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self.input_schema = {"type": "object", "properties": {}}
+
+    async def execute(self, arguments: Dict[str, Any]) -> list[ToolResult]:
+        """Mock execute method."""
+        return [ToolResult(text=f"Mock result for {self.name}")]
+
+
+class SlowTool(MockTool):
+    """Mock tool that waits before answering."""
+
+    def __init__(self, name: str, delay: float) -> None:
+        super().__init__(name, "Slow tool description")
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    async def execute(self, arguments: Dict[str, Any]) -> list[ToolResult]:
+        """Wait, tracking how many calls run at once."""
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return [ToolResult(text=f"Mock result for {self.name}")]
+
+
+def _run_server(server: JSONRPCServer, requests: List[Dict[str, Any]]) -> List[Any]:
+    """Run the server over the given request lines and return the response ids."""
+    stdin = io.StringIO("".join(json.dumps(r) + "\n" for r in requests))
+    stdout = io.StringIO()
+    with patch("sys.stdin", stdin), patch("sys.stdout", stdout):
+        asyncio.run(server.run())
+    return [json.loads(line).get("id") for line in stdout.getvalue().splitlines()]
+
+
+class TestJSONRPCServerRun:
+    """Test suite for JSONRPCServer.run."""
+
+    def setup_method(self) -> None:
+        """Set up test fixtures before each test method."""
+        self.server = JSONRPCServer("TestServer")
+        self.server.tools["test_tool"] = MockTool("test_tool", "Test tool description")
+
+    def test_run_writes_responses_as_they_complete(self) -> None:
+        """Test a slow tool call does not hold up the requests read after it."""
+        self.server.tools["slow_tool"] = SlowTool("slow_tool", 0.2)
+
+        ids = _run_server(
+            self.server,
+            [
+                {"method": "tools/call", "params": {"name": "slow_tool"}, "id": 1},
+                {"method": "tools/list", "id": 2},
+                {"method": "tools/call", "params": {"name": "test_tool"}, "id": 3},
+            ],
+        )
+
+        assert ids == [2, 3, 1]
+
+    def test_run_limits_concurrent_requests(self) -> None:
+        """Test no more requests run at once than the concurrency limit."""
+        server = JSONRPCServer("TestServer", max_concurrent_requests=2)
+        slow_tool = SlowTool("slow_tool", 0.01)
+        server.tools["slow_tool"] = slow_tool
+        calls = [
+            {"method": "tools/call", "params": {"name": "slow_tool"}, "id": i}
+            for i in range(6)
+        ]
+
+        ids = _run_server(server, calls)
+
+        assert sorted(ids) == list(range(6))
+        assert slow_tool.max_running == 2
+
+    def test_run_answers_invalid_request_with_error(self) -> None:
+        """Test a request that fails to dispatch is answered with an error."""
+        with patch.object(self.server, "handle_request", side_effect=ValueError("x")):
+            stdout = io.StringIO()
+            stdin = io.StringIO(json.dumps({"method": "tools/list", "id": 7}) + "\n")
+            with patch("sys.stdin", stdin), patch("sys.stdout", stdout):
+                asyncio.run(self.server.run())
+
+        response = json.loads(stdout.getvalue())
+        assert response["id"] == 7
+        assert response["error"]["code"] == -32700
+
+    def test_run_reads_input_while_worker_threads_are_busy(self) -> None:
+        """Test requests are read while blocking tool work fills the executor."""
+        released = threading.Event()
+
+        class BlockingTool(MockTool):
+            async def execute(self, arguments: Dict[str, Any]) -> list[ToolResult]:
+                await asyncio.to_thread(released.wait, 2)
+                return [ToolResult(text="released")]
+
+        class ReleasingTool(MockTool):
+            async def execute(self, arguments: Dict[str, Any]) -> list[ToolResult]:
+                released.set()
+                return [ToolResult(text="released")]
+
+        self.server.tools["block"] = BlockingTool("block", "Blocks")
+        self.server.tools["release"] = ReleasingTool("release", "Releases")
+
+        async def run_with_one_worker_thread() -> None:
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+            await self.server.run()
+
+        requests = [
+            {"method": "tools/call", "params": {"name": "block"}, "id": 1},
+            {"method": "tools/list", "id": 2},
+            {"method": "tools/call", "params": {"name": "release"}, "id": 3},
+        ]
+        stdin = io.StringIO("".join(json.dumps(r) + "\n" for r in requests))
+        stdout = io.StringIO()
+        with patch("sys.stdin", stdin), patch("sys.stdout", stdout):
+            asyncio.run(run_with_one_worker_thread())
+
+        ids = [json.loads(line)["id"] for line in stdout.getvalue().splitlines()]
+        assert ids == [2, 3, 1]
+
+    def test_run_cancels_request_by_id(self) -> None:
+        """Test notifications/cancelled stops a request without a response."""
+        slow_tool = SlowTool("slow_tool", 5)
+        self.server.tools["slow_tool"] = slow_tool
+
+        ids = _run_server(
+            self.server,
+            [
+                {"method": "tools/call", "params": {"name": "slow_tool"}, "id": 1},
+                {"method": "notifications/cancelled", "params": {"requestId": 1}},
+                {"method": "tools/list", "id": 2},
+            ],
+        )
+
+        assert ids == [2]
+        # Interrupted inside its wait
+        assert slow_tool.running == 1
+        assert self.server._in_flight == {}
+
+    def test_cancel_unknown_request_is_ignored(self) -> None:
+        """Test cancelling an id that is not in flight does nothing."""
+        self.server._cancel_request(42)
+
+        assert self.server._in_flight == {}
+
+    def test_run_drops_request_cancelled_from_a_worker_thread(self) -> None:
+        """Test a cancellation seen by blocking work is not reported as an error."""
+
+        class CancelledInThreadTool(MockTool):
+            async def execute(self, arguments: Dict[str, Any]) -> list[ToolResult]:
+                def scan() -> None:
+                    # The event is set without cancelling the request's task
+                    event = current_cancel_event()
+                    assert event is not None
+                    event.set()
+                    raise_if_cancelled()
+
+                await asyncio.to_thread(scan)
+                return [ToolResult(text="not reached")]
+
+        self.server.tools["scan"] = CancelledInThreadTool("scan", "Scans")
+
+        ids = _run_server(
+            self.server,
+            [
+                {"method": "tools/call", "params": {"name": "scan"}, "id": 1},
+                {"method": "tools/list", "id": 2},
+            ],
+        )
+
+        assert ids == [2]
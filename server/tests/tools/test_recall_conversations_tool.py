@@ -0,0 +1,160 @@
+"""Test suite for recall_conversations tool execution."""
+
+import asyncio
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+from unittest.mock import mock_open, patch
+
+import pytest
+from src.config.constants import RECALL_CONVERSATIONS_QUERIES
+from src.tools.recall_conversations_tool import RecallConversationsTool
+
+
+class TestRecallConversationsToolExecute:
+    """Test suite for RecallConversationsTool.execute."""
+
+    def setup_method(self) -> None:
+        """Set up test fixtures before each test method."""
+        self.tool = RecallConversationsTool()
+
+    @pytest.mark.asyncio
+    async def test_execute_bm25_ranking_returns_best_matches(self) -> None:
+        """Test bm25 ranking picks the best matches instead of the newest."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = Path(temp_dir) / "state.vscdb"
+            conn = sqlite3.connect(db_path)
+            conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+            prompts = [{"text": "asyncio asyncio event loop"}] + [
+                {"text": f"asyncio mentioned once in a long prompt about topic {i}"}
+                for i in range(5)
+            ]
+            conn.execute(
+                "INSERT INTO ItemTable VALUES (?, ?)",
+                (RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"], json.dumps(prompts)),
+            )
+            conn.commit()
+            conn.close()
+            registry_file = Path(temp_dir) / "registry.json"
+            registry_file.write_text(json.dumps({"cursor": [temp_dir]}))
+
+            with patch(
+                "src.tools.recall_conversations_tool.GANDALF_REGISTRY_FILE",
+                str(registry_file),
+            ):
+                phrase_result = await self.tool.execute(
+                    {"phrases": ["asyncio"], "limit": 2}
+                )
+                bm25_result = await self.tool.execute(
+                    {"phrases": ["asyncio"], "limit": 2, "ranking": "bm25"}
+                )
+
+        phrase_data = json.loads(phrase_result[0].text)
+        bm25_data = json.loads(bm25_result[0].text)
+        assert {c["relevance"] for c in phrase_data["conversations"]} == {1.0}
+        assert "asyncio asyncio" not in phrase_data["conversations"][0]["summary"]
+        assert bm25_data["search_info"]["ranking"] == "bm25"
+        best, second = bm25_data["conversations"]
+        assert best["summary"] == "asyncio asyncio event loop"
+        assert 0 < second["relevance"] < best["relevance"] < 1
+
+    @pytest.mark.asyncio
+    async def test_execute_unsupported_ranking(self) -> None:
+        """Test an unknown ranking mode is rejected."""
+        registry_data: Dict[str, Any] = {"cursor": []}
+
+        with patch("builtins.open", mock_open(read_data=json.dumps(registry_data))):
+            result = await self.tool.execute({"ranking": "random"})
+
+        assert result[0].text.startswith("Unsupported ranking mode: random")
+
+    @pytest.mark.asyncio
+    async def test_execute_invalid_recency_weight(self) -> None:
+        """Test a recency weight that is not a number from 0 to 1 is rejected."""
+        for weight in ("heavy", None, -0.1, 1.5, float("nan")):
+            with patch.object(self.tool, "_load_registry") as mock_load:
+                result = await self.tool.execute(
+                    {"phrases": ["loop"], "ranking": "bm25", "recency_weight": weight}
+                )
+
+            assert result[0].text.startswith("Invalid recency_weight")
+            mock_load.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_execute_does_not_block_event_loop(self) -> None:
+        """Test other coroutines run while a recall extracts databases."""
+        registry_data: Dict[str, Any] = {"cursor": []}
+        released = threading.Event()
+
+        def slow_process(*args: Any) -> Any:
+            assert released.wait(timeout=5)
+            return [], [], 0, 0
+
+        async def other_request() -> None:
+            await asyncio.sleep(0)
+            released.set()
+
+        with (
+            patch("builtins.open", mock_open(read_data=json.dumps(registry_data))),
+            patch.object(self.tool.db_manager, "process_database_files", slow_process),
+        ):
+            result, _ = await asyncio.gather(self.tool.execute({}), other_request())
+
+        assert json.loads(result[0].text)["search_info"]["total_found"] == 0
+
+    @pytest.mark.asyncio
+    async def test_overlapping_recalls_share_discovery_safely(self) -> None:
+        """Test two recalls at once each see one whole discovery pass."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i in range(3):
+                workspace = Path(temp_dir) / f"ws{i}"
+                workspace.mkdir()
+                conn = sqlite3.connect(workspace / "state.vscdb")
+                conn.execute("CREATE TABLE ItemTable (key TEXT, value TEXT)")
+                conn.execute(
+                    "INSERT INTO ItemTable VALUES (?, ?)",
+                    (
+                        RECALL_CONVERSATIONS_QUERIES["PROMPTS_KEY"],
+                        json.dumps([{"text": f"palantir {i}"}]),
+                    ),
+                )
+                conn.commit()
+                conn.close()
+            registry_file = Path(temp_dir) / "registry.json"
+            registry_file.write_text(json.dumps({"cursor": [temp_dir]}))
+            discovery = self.tool.db_manager.data_extractor.discovery
+            discovery.manifest_path = str(Path(temp_dir) / "manifest.json")
+            scan = discovery._scan_directory
+
+            def slow_scan(path: str) -> Any:
+                time.sleep(0.02)
+                return scan(path)
+
+            with (
+                patch(
+                    "src.tools.recall_conversations_tool.GANDALF_REGISTRY_FILE",
+                    str(registry_file),
+                ),
+                patch.object(discovery, "_scan_directory", side_effect=slow_scan),
+            ):
+                results = await asyncio.gather(
+                    *(
+                        self.tool.execute({"phrases": ["palantir"], "rescan": True})
+                        for _ in range(2)
+                    )
+                )
+
+            for result in results:
+                data = json.loads(result[0].text)
+                assert data["search_info"]["total_found"] == 3
+                assert data["search_info"]["discovery"] == {
+                    "manifest_hits": 0,
+                    "manifest_misses": 4,
+                }
+            manifest = json.loads(Path(discovery.manifest_path).read_text())
+            assert len(manifest["roots"][temp_dir]) == 4
+            assert not Path(f"{discovery.manifest_path}.tmp").exists()
@@ -1,9 +1,11 @@
 """Test suite for spell tool implementation."""
 
+import asyncio
 import json
 import os
 import tempfile
 from pathlib import Path
+from typing import Any
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -553,3 +555,30 @@ class TestOSCommandsSpell:
                 assert call_args.kwargs["cwd"] == subdir
         finally:
             setattr(self.tool, "_load_spells", original_load)
+
+    def test_execute_spell_kills_process_when_cancelled(self) -> None:
+        """Test cancelling a spell kills its subprocess."""
+        processes = []
+        create_subprocess_exec = asyncio.create_subprocess_exec
+
+        async def spawn(*args: Any, **kwargs: Any) -> Any:
+            process = await create_subprocess_exec(*args, **kwargs)
+            processes.append(process)
+            return process
+
+        async def cast_and_cancel(working_dir: str) -> None:
+            config = {"command": "sleep 30", "paths": [working_dir], "flags": []}
+            task = asyncio.create_task(self.tool._execute_spell(config, None))
+            while not processes:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        with (
+            tempfile.TemporaryDirectory() as tmpdir,
+            patch("asyncio.create_subprocess_exec", spawn),
+        ):
+            asyncio.run(cast_and_cancel(tmpdir))
+
+        assert processes[0].returncode is not None
@@ -0,0 +1,49 @@
+"""Test suite for request cancellation utilities."""
+
+import asyncio
+import contextvars
+import threading
+
+import pytest
+from src.utils.cancellation import (
+    RequestCancelledError,
+    bind_cancel_event,
+    current_cancel_event,
+    raise_if_cancelled,
+)
+
+
+class TestRaiseIfCancelled:
+    """Test suite for raise_if_cancelled function."""
+
+    def test_outside_a_request(self) -> None:
+        """Test nothing is raised without a cancellation event."""
+        assert current_cancel_event() is None
+        raise_if_cancelled()
+
+    def test_given_event(self) -> None:
+        """Test an explicit event is checked."""
+        event = threading.Event()
+        raise_if_cancelled(event)
+        event.set()
+        with pytest.raises(RequestCancelledError):
+            raise_if_cancelled(event)
+
+    def test_bound_event_reaches_worker_threads(self) -> None:
+        """Test the bound event is seen by work run through asyncio.to_thread."""
+        event = threading.Event()
+
+        async def request() -> None:
+            bind_cancel_event(event)
+            event.set()
+            await asyncio.to_thread(raise_if_cancelled)
+
+        with pytest.raises(RequestCancelledError):
+            asyncio.run(request())
+
+    def test_bound_event_stays_in_its_context(self) -> None:
+        """Test binding an event does not leak to other contexts."""
+        event = threading.Event()
+        contextvars.copy_context().run(bind_cancel_event, event)
+
+        assert current_cancel_event() is None